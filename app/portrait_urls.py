@@ -6,7 +6,10 @@ import unicodedata
 from pathlib import Path
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
-_RACERX_PORTRAIT_BY_NAME: dict[str, str] | None = None
+from cache_store import get_cache
+
+# Statisk CSV — laddas en gång per process, ingen TTL och ingen delad backend.
+_RACERX_PORTRAIT_CACHE = get_cache("racerx_portrait_by_name", maxsize=1, shared=False)
 
 
 def _norm_racerx_lookup_name(name: str) -> str:
@@ -31,9 +34,9 @@ def _norm_racerx_lookup_name(name: str) -> str:
 
 
 def _load_racerx_portrait_by_name() -> dict[str, str]:
-	global _RACERX_PORTRAIT_BY_NAME
-	if _RACERX_PORTRAIT_BY_NAME is not None:
-		return _RACERX_PORTRAIT_BY_NAME
+	cached = _RACERX_PORTRAIT_CACHE.get("all")
+	if cached is not None:
+		return cached
 	out: dict[str, str] = {}
 	path = Path(__file__).resolve().parents[1] / "data" / "racerx_riders_2026.csv"
 	if path.is_file():
@@ -48,8 +51,7 @@ def _load_racerx_portrait_by_name() -> dict[str, str]:
 				key = _norm_racerx_lookup_name(name)
 				if key:
 					out[key] = img
-	_RACERX_PORTRAIT_BY_NAME = out
-	return out
+	return _RACERX_PORTRAIT_CACHE.set("all", out)
 
 
 def lookup_racerx_portrait_by_name(name: str | None) -> str | None:
@@ -19,6 +19,7 @@ from flask import (
 	render_template,
 	request,
 	Response,
+	send_file,
 	session,
 	url_for,
 )
@@ -37,8 +38,11 @@ from models import (
 	SeasonTeamRider,
 	User,
 	WildcardPick,
+	load_rider_bio,
+	load_snapshot_payload,
 	rider_query_for_list_ui,
 )
+import portrait_store
 
 bp = Blueprint('admin', __name__, url_prefix='')  # keep same absolute paths
 
@@ -332,7 +336,7 @@ def _racerx_portraits_debug() -> dict:
 				"class": r.class_name,
 				"number": r.rider_number,
 				"image_url": getattr(r, "image_url", None),
-				"has_db_portrait": bool(getattr(r, "rider_image_data", None)),
+				"has_db_portrait": bool(portrait_store.rider_portrait_src(r)),
 			}
 		else:
 			info["inspect_rider"] = {"name": inspect_name, "found": False}
@@ -559,16 +563,11 @@ def social_recap_png():
 	include_rider_podium = request.args.get("include_rider_podium", "1") not in ("0", "false", "no")
 	if request.args.get("include_season", "1") in ("0", "false", "no"):
 		include_season_snippet = False
-	layout = request.args.get("layout", "facebook")
-	if layout == "feed":
-		layout = "facebook"
-	if layout not in ("facebook", "portrait", "story"):
-		layout = "facebook"
-	try:
-		from social_recap_service import build_social_recap_data, render_social_recap_png
+	import recap_cache
 
-		data = build_social_recap_data(
-			comp_id,
+	# Bara admin-sidans val — varje kombination blir en egen fil i diskcachen
+	try:
+		options = recap_cache.admin_options(
 			race_top=race_top,
 			season_top=season_top,
 			include_race=include_race,
@@ -577,18 +576,37 @@ def social_recap_png():
 			include_facts=include_facts,
 			include_rider_podium=include_rider_podium,
 		)
-		data["layout"] = layout
+	except ValueError as e:
+		return jsonify({"error": str(e)}), 400
+	layout = request.args.get("layout", "facebook")
+	if layout == "feed":
+		layout = "facebook"
+	if layout not in ("facebook", "portrait", "story"):
+		layout = "facebook"
+	try:
+		from render_pool import RenderPoolUnavailable, busy_response
+
+		comp = Competition.query.get(comp_id)
+		if not comp:
+			return jsonify({"error": "competition_not_found"}), 404
 		part = request.args.get("part", "graphic")
 		if layout != "facebook":
 			part = "graphic"
-		png_bytes = render_social_recap_png(data, layout=layout, part=part)
-		resp = Response(png_bytes, mimetype="image/png")
+		# Diskcachad per resultatversion (recap_cache.py) — standardvalen förrenderas
+		path = recap_cache.recap_png_path(
+			comp_id,
+			layout=layout,
+			part=part,
+			admin=True,
+			options=options,
+		)
+		resp = send_file(path, mimetype="image/png")
 		resp.headers["Cache-Control"] = "no-store, max-age=0, must-revalidate"
 		try:
 			import re
 			from urllib.parse import quote
 
-			race = str(data.get("competition_name") or data.get("race_name") or "race")
+			race = str(comp.name or "race")
 			slug = re.sub(r"[^a-zA-Z0-9]+", "-", race).strip("-").lower()[:60] or "race"
 			suffix = ""
 			if layout == "facebook":
@@ -611,7 +629,7 @@ def social_recap_png():
 
 			resp.headers["X-Recap-Engine"] = recap_renderer_engine()
 			resp.headers["X-Recap-Rev"] = RECAP_RENDERER_REV
-			resp.headers["X-Recap-Series"] = str(data.get("series") or "")
+			resp.headers["X-Recap-Series"] = str(getattr(comp, "series", None) or "")
 			if RECAP_TEMPLATE_GRAPHIC.is_file():
 				resp.headers["X-Recap-Template-Mtime"] = str(
 					int(RECAP_TEMPLATE_GRAPHIC.stat().st_mtime)
@@ -625,6 +643,8 @@ def social_recap_png():
 			return jsonify({"error": msg}), 404
 		current_app.logger.exception("social_recap_png render failed: %s", e)
 		return jsonify({"error": msg, "error_type": type(e).__name__}), 500
+	except RenderPoolUnavailable:
+		return busy_response()
 	except Exception as e:
 		current_app.logger.exception("social_recap_png failed: %s", e)
 		payload = {"error": str(e) or type(e).__name__, "error_type": type(e).__name__}
@@ -673,6 +693,104 @@ def admin_visit_stats_reset_today():
 		return jsonify({"ok": False, "error": str(e)}), 500
 
 
+@bp.get("/admin/metrics")
+def admin_metrics_prometheus():
+	"""Prometheus-text (den här workern). Admin-session eller Bearer $METRICS_TOKEN för scraping."""
+	import hmac
+
+	token = (os.getenv("METRICS_TOKEN") or "").strip()
+	auth = (request.headers.get("Authorization") or "").strip()
+	token_ok = bool(token) and hmac.compare_digest(auth, f"Bearer {token}")
+	if not token_ok and ("user_id" not in session or not is_admin_user()):
+		return Response("unauthorized\n", status=401, mimetype="text/plain")
+	from app_metrics import prometheus_text
+
+	return Response(prometheus_text(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+@bp.get("/admin/api/metrics_summary")
+@login_required
+def admin_metrics_summary():
+	if not is_admin_user():
+		return jsonify({"error": "unauthorized"}), 401
+	try:
+		from app_metrics import summary
+
+		limit = request.args.get("limit", 8, type=int)
+		return jsonify({"ok": True, **summary(limit=limit)})
+	except Exception as e:
+		return jsonify({"ok": False, "error": str(e)}), 500
+
+
+@bp.get("/admin/api/cache_stats")
+@login_required
+def admin_cache_stats():
+	"""Hit/miss/eviction per cache (den här workern) + delad backend + byggtider."""
+	if not is_admin_user():
+		return jsonify({"error": "unauthorized"}), 401
+	from cache_store import cache_stats
+	from lock_state import lock_state_stats
+	from portrait_index import index_stats
+	from refresh_coordinator import refresh_stats
+	from render_assets import stats as render_asset_stats
+	from render_pool import stats as render_pool_stats
+
+	return jsonify(
+		{
+			"ok": True,
+			**cache_stats(),
+			"refresh": refresh_stats(),
+			"portrait_index": index_stats(),
+			"lock_state": lock_state_stats(),
+			"render_pool": render_pool_stats(),
+			"render_assets": render_asset_stats(),
+		}
+	)
+
+
+@bp.route("/admin/sql-profile")
+@login_required
+def sql_profile_page():
+	if not is_admin_user():
+		return redirect(url_for("index"))
+	return render_template("admin_sql_profile.html")
+
+
+@bp.get("/admin/api/sql_profile")
+@login_required
+def admin_sql_profile():
+	"""Queries/DB-tid/N+1 per endpoint (den här workern, kräver SQL_PROFILING=1)."""
+	if not is_admin_user():
+		return jsonify({"error": "unauthorized"}), 401
+	from sql_profiler import endpoint_report
+
+	sort = (request.args.get("sort") or "queries").strip()
+	limit = request.args.get("limit", 50, type=int)
+	return jsonify({"ok": True, **endpoint_report(sort=sort, limit=limit)})
+
+
+@bp.post("/admin/api/sql_profile/reset")
+@login_required
+def admin_sql_profile_reset():
+	if not is_admin_user():
+		return jsonify({"error": "unauthorized"}), 401
+	from sql_profiler import endpoint_report, reset
+
+	reset()
+	return jsonify({"ok": True, **endpoint_report()})
+
+
+@bp.post("/admin/api/cache_stats/clear")
+@login_required
+def admin_cache_clear():
+	if not is_admin_user():
+		return jsonify({"error": "unauthorized"}), 401
+	from cache_store import cache_stats, clear_all_caches
+
+	clear_all_caches()
+	return jsonify({"ok": True, **cache_stats()})
+
+
 @bp.post("/admin/tools/racerx_portraits/normalize")
 @login_required
 def admin_racerx_portraits_normalize():
@@ -780,7 +898,7 @@ def admin_racerx_bio_status():
 		.filter(Rider.racerx_bio_skip.isnot(None), Rider.racerx_bio_skip != "")
 		.scalar()
 	) or 0
-	all_riders = Rider.query.order_by(Rider.class_name, Rider.rider_number, Rider.name).all()
+	all_riders = Rider.query.options(load_rider_bio()).order_by(Rider.class_name, Rider.rider_number, Rider.name).all()
 	remaining_to_fetch = len(iter_names_needing_racerx_bio(all_riders, refresh_all=False))
 	return jsonify({
 		"ok": True,
@@ -894,7 +1012,7 @@ def admin_racerx_bio_bulk():
 		refresh_all = bool(data.get("all"))
 		class_name = (data.get("class_name") or "").strip()
 
-		all_riders = Rider.query.order_by(Rider.class_name, Rider.rider_number, Rider.name).all()
+		all_riders = Rider.query.options(load_rider_bio()).order_by(Rider.class_name, Rider.rider_number, Rider.name).all()
 		name_keys = iter_names_needing_racerx_bio(
 			all_riders,
 			refresh_all=refresh_all,
@@ -1468,7 +1586,8 @@ def admin_picks_snapshots_preview():
 			return jsonify({"error": "competition_not_found"}), 404
 
 		rows = (
-			PicksSnapshot.query.filter_by(competition_id=comp_id)
+			PicksSnapshot.query.options(load_snapshot_payload())
+			.filter_by(competition_id=comp_id)
 			.order_by(PicksSnapshot.created_at.desc())
 			.limit(limit)
 			.all()
@@ -1969,7 +2088,7 @@ def entry_list_fetch_images():
 			r = Rider.query.get(rid)
 			if not r:
 				continue
-			if not force and getattr(r, "rider_image_data", None):
+			if not force and portrait_store.rider_portrait_src(r):
 				skipped += 1
 				continue
 			# Try to build a rider URL from name (best effort) if we don't have it.
@@ -1980,7 +2099,7 @@ def entry_list_fetch_images():
 				if not img_data:
 					skipped += 1
 					continue
-				r.rider_image_data = img_data
+				portrait_store.set_rider_portrait(r, img_data)
 				updated += 1
 			except Exception as e:
 				errors.append(f"{r.name}: {e}")
@@ -2044,7 +2163,7 @@ def rider_images_racerx_preview():
 
 		ids_with_blob = {
 			row[0]
-			for row in db.session.query(Rider.id).filter(Rider.rider_image_data.isnot(None)).all()
+			for row in db.session.query(Rider.id).filter(portrait_store.has_portrait_clause()).all()
 		}
 		candidates = []
 		for rider in rider_query_for_list_ui().all():
@@ -2079,7 +2198,7 @@ def rider_images_racerx_preview():
 @bp.route("/rider_management/racerx_images/apply", methods=["POST"])
 @login_required
 def rider_images_racerx_apply():
-	"""Apply selected image updates from RacerX CSV (stores as rider_image_data data URL)."""
+	"""Apply selected image updates from RacerX CSV (stores in the portrait blob store)."""
 	if not is_admin_user():
 		return jsonify({"error": "Unauthorized"}), 401
 	data = request.get_json(silent=True) or {}
@@ -2107,7 +2226,6 @@ def rider_images_racerx_apply():
 				continue
 			by_name[_norm_racerx_name(name)] = {"img_url": img}
 
-		import base64
 		import requests
 
 		headers = {
@@ -2124,7 +2242,7 @@ def rider_images_racerx_apply():
 			r = Rider.query.get(rid)
 			if not r:
 				continue
-			if not force and getattr(r, "rider_image_data", None):
+			if not force and portrait_store.rider_portrait_src(r):
 				skipped += 1
 				continue
 			src = by_name.get(_norm_racerx_name(r.name))
@@ -2137,7 +2255,7 @@ def rider_images_racerx_apply():
 				mime = (resp.headers.get("Content-Type") or "image/jpeg").split(";", 1)[0].strip()
 				if not mime.startswith("image/"):
 					mime = "image/jpeg"
-				r.rider_image_data = f"data:{mime};base64,{base64.b64encode(resp.content).decode('ascii')}"
+				portrait_store.set_rider_portrait(r, resp.content, mime)
 				updated += 1
 			except Exception as e:
 				errors.append(f"{r.name}: {e}")
@@ -12,8 +12,14 @@ from models import (
 	CompetitionScore,
 	HoleshotPick,
 	HoleshotResult,
+	LeaderboardRankSnapshot,
+	LeagueCompetitionScore,
+	SeasonRiderPoints,
 )
 from datetime import datetime
+import crowd_picks
+import data_versions as dv
+import portrait_store
 
 def is_admin_user() -> bool:
 	"""Check if current user is admin"""
@@ -383,6 +389,16 @@ def _resolve_bike_brand(data: dict) -> str:
 	return brand or 'Unknown'
 
 
+def _generate_static_thumbs(rel_path: str) -> None:
+	"""64/128/256 px WebP-varianter för srcset (portrait_derivatives) — best effort."""
+	try:
+		from portrait_derivatives import generate_for_static
+
+		generate_for_static(rel_path, force=True)
+	except Exception as e:
+		print(f"Thumbnail generation failed for {rel_path}: {e}")
+
+
 @bp.route('/riders/quick-from-result', methods=['POST'])
 def quick_add_rider_from_result():
 	"""Lägg till förare från bulk preview (namn + klass, minimal input)."""
@@ -444,6 +460,7 @@ def quick_add_rider_from_result():
 	)
 	db.session.add(rider)
 	db.session.commit()
+	dv.bump_roster()
 	return jsonify({
 		'success': True,
 		'id': rider.id,
@@ -468,15 +485,15 @@ def add_rider():
 	data = request.get_json() if request.is_json else request.form.to_dict()
 	data['bike_brand'] = _resolve_bike_brand(data)
 
-	# Optional image upload – spara både till fil (lokalt) och som base64 i DB (överlever deploy på Render)
+	# Optional image upload – spara både till fil (lokalt) och i porträtt-lagret i DB (överlever deploy på Render)
 	image_url = None
-	rider_image_data = None
+	portrait_bytes = None
+	portrait_mime = None
 	if 'rider_image' in request.files:
 		file = request.files['rider_image']
 		if file and file.filename:
 			try:
 				import os
-				import base64
 				from werkzeug.utils import secure_filename
 				file_bytes = file.read()
 				file.seek(0)
@@ -487,11 +504,10 @@ def add_rider():
 				file_path = os.path.join(riders_dir, filename)
 				file.save(file_path)
 				image_url = f"riders/{filename}"
-				# Spara även som base64 så bilden överlever deploy (Render har tillfällig disk)
-				mime = file.content_type or 'image/jpeg'
-				if not mime.startswith('image/'):
-					mime = 'image/jpeg'
-				rider_image_data = f"data:{mime};base64,{base64.b64encode(file_bytes).decode()}"
+				_generate_static_thumbs(image_url)
+				# Spara även i porträtt-lagret så bilden överlever deploy (Render har tillfällig disk)
+				portrait_bytes = file_bytes
+				portrait_mime = file.content_type or 'image/jpeg'
 			except Exception as e:
 				print(f"Error saving rider image: {e}")
 
@@ -508,8 +524,8 @@ def add_rider():
 		existing_rider.bike_brand = data['bike_brand']
 		if image_url:
 			existing_rider.image_url = image_url
-		if rider_image_data is not None:
-			existing_rider.rider_image_data = rider_image_data
+		if portrait_bytes is not None:
+			portrait_store.set_rider_portrait(existing_rider, portrait_bytes, portrait_mime)
 		if 'price' in data:
 			existing_rider.price = data['price']
 		if 'coast_250' in data:
@@ -525,6 +541,7 @@ def add_rider():
 				setattr(existing_rider, field, data[field])
 		
 		db.session.commit()
+		dv.bump_roster()
 		response = {'success': True, 'id': existing_rider.id, 'updated': True, 'message': 'Förare uppdaterad (master-lista)'}
 		if season_warning:
 			response['warning'] = season_warning
@@ -559,6 +576,9 @@ def add_rider():
 		}), 400
 	price = data.get('price') or (450000 if class_name == '450cc' else 50000)
 
+	portrait_hash = None
+	if portrait_bytes is not None:
+		portrait_hash = portrait_store.put_bytes(portrait_bytes, portrait_mime)
 	rider = Rider(
 		name=data['name'],
 		class_name=class_name,
@@ -568,11 +588,12 @@ def add_rider():
 		coast_250=coast_250,
 		price=price,
 		image_url=image_url,
-		rider_image_data=rider_image_data,
+		portrait_hash=portrait_hash,
 		series_participation=data.get('series_participation')
 	)
 	db.session.add(rider)
 	db.session.commit()
+	dv.bump_roster()
 	response = {'success': True, 'id': rider.id, 'created': True}
 	if season_warning:
 		response['warning'] = season_warning
@@ -616,7 +637,6 @@ def update_rider(rider_id: int):
 			if file and file.filename:
 				try:
 					import os
-					import base64
 					from werkzeug.utils import secure_filename
 					file_bytes = file.read()
 					file.seek(0)
@@ -627,10 +647,8 @@ def update_rider(rider_id: int):
 					file_path = os.path.join(riders_dir, filename)
 					file.save(file_path)
 					rider.image_url = f"riders/{filename}"
-					mime = file.content_type or 'image/jpeg'
-					if not mime.startswith('image/'):
-						mime = 'image/jpeg'
-					rider.rider_image_data = f"data:{mime};base64,{base64.b64encode(file_bytes).decode()}"
+					_generate_static_thumbs(rider.image_url)
+					portrait_store.set_rider_portrait(rider, file_bytes, file.content_type)
 				except Exception as e:
 					print(f"Error saving rider image: {e}")
 
@@ -712,6 +730,7 @@ def update_rider(rider_id: int):
 						setattr(dup, field, getattr(rider, field))
 		
 		db.session.commit()
+		dv.bump_roster()
 		response = {'success': True}
 		if season_warning:
 			response['warning'] = season_warning
@@ -759,6 +778,8 @@ def delete_rider(rider_id: int):
 			raise
 		db.session.delete(rider)
 		db.session.commit()
+		# Resultat och picks för föraren rensades ovan
+		dv.bump(dv.ROSTER, dv.RESULTS, dv.PICKS, dv.PICKS_ALL)
 		response = {"success": True, "season_teams_kept_slot": teams_with_rider}
 		if teams_with_rider:
 			response["info"] = (
@@ -851,6 +872,7 @@ def create_competition():
 		competition = Competition(**competition_data)
 		db.session.add(competition)
 		db.session.commit()
+		dv.bump_schedule()
 		return jsonify({'success': True, 'id': competition.id})
 	except Exception as e:
 		db.session.rollback()
@@ -909,6 +931,7 @@ def update_competition(competition_id: int):
 		
 		# Expire the object so properties (like start_time) are re-read from database
 		db.session.expire(comp)
+		dv.bump_schedule()
 		
 		return jsonify({'success': True})
 	except Exception as e:
@@ -932,8 +955,25 @@ def delete_competition(competition_id: int):
 			db.session.execute(text("DELETE FROM competition_rider_status WHERE competition_id = :id"), {'id': competition_id})
 			db.session.commit()
 		comp = Competition.query.get_or_404(competition_id)
+		# Härledda tabeller (aggregat, poäng, rank-snapshots) pekar också på tävlingen
+		league_ids = [
+			lid for (lid,) in db.session.query(LeagueCompetitionScore.league_id).filter_by(competition_id=competition_id)
+		]
+		had_rider_points = SeasonRiderPoints.query.filter_by(competition_id=competition_id).delete(synchronize_session=False)
+		LeagueCompetitionScore.query.filter_by(competition_id=competition_id).delete(synchronize_session=False)
+		LeaderboardRankSnapshot.query.filter_by(competition_id=competition_id).delete(synchronize_session=False)
+		crowd_picks.clear(competition_id)
 		db.session.delete(comp)
 		db.session.commit()
+		if league_ids or had_rider_points:
+			from main import _rebuild_season_team_totals, _sync_league_totals
+
+			if league_ids:
+				_sync_league_totals(league_ids)
+			if had_rider_points:
+				_rebuild_season_team_totals()
+			db.session.commit()
+		dv.bump(dv.SCHEDULE, dv.results_key(competition_id), dv.RESULTS, dv.picks_key(competition_id), dv.PICKS)
 		return jsonify({'success': True})
 	except Exception as e:
 		db.session.rollback()
@@ -0,0 +1,342 @@
+"""Latenshistogram per endpoint + drifthälsa, exporteras som Prometheus-text.
+
+* mx_http_request_duration_seconds{endpoint,method,status} — histogram per
+  Flask-route (url_rule, inte rå path, så /leagues/<int:league_id> blir en serie)
+* mx_db_pool_checkout_wait_seconds — väntetid på en connection ur poolen
+* cache-träffar/missar per namngiven cache (cache_store) + byggtider (refresh_coordinator)
+* bakgrundsjobb (påminnelse-klockan, push) — senaste körning, fel, om tråden lever
+
+Siffrorna gäller den här workern (label pid i mx_process_info). Endpoint:
+/admin/metrics (admin-session eller Authorization: Bearer $METRICS_TOKEN).
+"""
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from typing import Any
+
+from flask import Flask, Response, g, request
+
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Pool-checkout är normalt under en millisekund — finare buckets i botten
+_POOL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_MAX_SERIES = 600
+_START_TIME = time.time()
+
+_lock = threading.Lock()
+_installed = False
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = _BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # sista = +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Övre bucketgräns för kvantilen (grov uppskattning; över sista gränsen rapporteras gränsen)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+        return self.buckets[-1]
+
+
+_requests: dict[tuple[str, str, str], _Histogram] = {}
+_pool_wait = _Histogram(_POOL_BUCKETS)
+_jobs: dict[str, dict[str, Any]] = {}
+_job_threads: dict[str, str] = {}
+
+
+# --- inspelning ---
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float) -> None:
+    key = (endpoint, method, str(int(status)))
+    with _lock:
+        hist = _requests.get(key)
+        if hist is None:
+            if len(_requests) >= _MAX_SERIES:
+                key = ("<other>", method, str(int(status)))
+                hist = _requests.get(key)
+            if hist is None:
+                hist = _requests[key] = _Histogram()
+        hist.observe(seconds)
+
+
+def record_job(name: str, *, ok: bool = True, duration: float | None = None, error: str | None = None) -> None:
+    """Hjärtslag från ett bakgrundsjobb (ett varv/ett utskick)."""
+    now = time.time()
+    with _lock:
+        job = _jobs.get(name)
+        if job is None:
+            job = _jobs[name] = {
+                "runs": 0,
+                "errors": 0,
+                "last_run": None,
+                "last_success": None,
+                "last_error": None,
+                "last_duration": None,
+            }
+        job["runs"] += 1
+        job["last_run"] = now
+        if duration is not None:
+            job["last_duration"] = duration
+        if ok:
+            job["last_success"] = now
+        else:
+            job["errors"] += 1
+            job["last_error"] = (error or "")[:200]
+
+
+def register_job_thread(name: str, thread_name: str) -> None:
+    """Koppla ett jobb till en långlivad tråd så att mx_background_thread_alive kan rapporteras."""
+    with _lock:
+        _job_threads[name] = thread_name
+
+
+def _pool_checkout_timer(connect):
+    def timed_connect(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return connect(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - t0
+            with _lock:
+                _pool_wait.observe(elapsed)
+
+    timed_connect._mx_timed = True  # type: ignore[attr-defined]
+    return timed_connect
+
+
+def _ensure_pool_timer() -> None:
+    # Poolen byts ut vid engine.dispose() — kontrollera per request (billigt attribut-uppslag).
+    from models import db
+
+    pool = db.engine.pool
+    if not getattr(pool.connect, "_mx_timed", False):
+        pool.connect = _pool_checkout_timer(pool.connect)
+
+
+def _before_request() -> None:
+    g._metrics_t0 = time.perf_counter()
+    try:
+        _ensure_pool_timer()
+    except Exception:
+        pass
+
+
+def _after_request(response: Response) -> Response:
+    t0 = g.pop("_metrics_t0", None)
+    if t0 is not None:
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        observe_request(rule, request.method, response.status_code, time.perf_counter() - t0)
+    return response
+
+
+# --- export ---
+
+def _pool_gauges() -> dict[str, float]:
+    from models import db
+
+    pool = db.engine.pool
+    out: dict[str, float] = {}
+    for name in ("size", "checkedout", "overflow", "checkedin"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            try:
+                out[name] = float(fn())
+            except Exception:
+                pass
+    return out
+
+
+def _thread_alive() -> dict[str, bool]:
+    names = {t.name for t in threading.enumerate() if t.is_alive()}
+    with _lock:
+        return {job: thread_name in names for job, thread_name in _job_threads.items()}
+
+
+def _esc(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: Any) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_esc(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, hist: _Histogram, **labels: Any) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, c in zip(hist.buckets, hist.counts):
+        cumulative += c
+        lines.append(f"{name}_bucket{_labels(**labels, le=repr(bound))} {cumulative}")
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {hist.count}')
+    lines.append(f"{name}_sum{_labels(**labels)} {hist.total:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+    return lines
+
+
+def prometheus_text() -> str:
+    from cache_store import cache_stats
+    from refresh_coordinator import refresh_stats
+
+    out: list[str] = [
+        "# HELP mx_process_info Worker process (metrics are per worker).",
+        "# TYPE mx_process_info gauge",
+        f"mx_process_info{_labels(pid=os.getpid())} 1",
+        "# HELP mx_process_start_time_seconds Worker start time.",
+        "# TYPE mx_process_start_time_seconds gauge",
+        f"mx_process_start_time_seconds {_START_TIME:.0f}",
+        "# HELP mx_http_request_duration_seconds Request latency per route, method and status.",
+        "# TYPE mx_http_request_duration_seconds histogram",
+    ]
+    with _lock:
+        for (endpoint, method, status), hist in sorted(_requests.items()):
+            out.extend(
+                _histogram_lines(
+                    "mx_http_request_duration_seconds", hist, endpoint=endpoint, method=method, status=status
+                )
+            )
+        out.append("# HELP mx_db_pool_checkout_wait_seconds Time spent waiting for a pooled DB connection.")
+        out.append("# TYPE mx_db_pool_checkout_wait_seconds histogram")
+        out.extend(_histogram_lines("mx_db_pool_checkout_wait_seconds", _pool_wait))
+        jobs = {k: dict(v) for k, v in _jobs.items()}
+
+    try:
+        pool = _pool_gauges()
+    except Exception:
+        pool = {}
+    for name, value in pool.items():
+        out.append(f"# TYPE mx_db_pool_{name} gauge")
+        out.append(f"mx_db_pool_{name} {value:g}")
+
+    caches = cache_stats().get("caches", {})
+    for metric, field, kind in (
+        ("mx_cache_hits_total", "hits", "counter"),
+        ("mx_cache_misses_total", "misses", "counter"),
+        ("mx_cache_evictions_total", "evictions", "counter"),
+        ("mx_cache_entries", "size", "gauge"),
+    ):
+        out.append(f"# TYPE {metric} {kind}")
+        for name, st in caches.items():
+            out.append(f"{metric}{_labels(cache=name)} {int(st.get(field) or 0)}")
+    out.append("# TYPE mx_cache_hit_ratio gauge")
+    for name, st in caches.items():
+        if st.get("hit_rate") is not None:
+            out.append(f"mx_cache_hit_ratio{_labels(cache=name)} {st['hit_rate']}")
+
+    refresh = refresh_stats()
+    out.append("# TYPE mx_cache_refresh_builds_total counter")
+    out.append("# TYPE mx_cache_refresh_last_build_seconds gauge")
+    for coordinator in refresh.values():
+        for name, st in coordinator.get("caches", {}).items():
+            out.append(f"mx_cache_refresh_builds_total{_labels(cache=name)} {st['builds']}")
+            if st.get("last_ms") is not None:
+                out.append(f"mx_cache_refresh_last_build_seconds{_labels(cache=name)} {st['last_ms'] / 1000.0:.4f}")
+
+    out.append("# HELP mx_background_runs_total Background job iterations.")
+    out.append("# TYPE mx_background_runs_total counter")
+    for name, job in sorted(jobs.items()):
+        out.append(f"mx_background_runs_total{_labels(job=name)} {job['runs']}")
+    out.append("# TYPE mx_background_errors_total counter")
+    for name, job in sorted(jobs.items()):
+        out.append(f"mx_background_errors_total{_labels(job=name)} {job['errors']}")
+    out.append("# TYPE mx_background_last_run_timestamp_seconds gauge")
+    out.append("# TYPE mx_background_last_success_timestamp_seconds gauge")
+    for name, job in sorted(jobs.items()):
+        if job["last_run"]:
+            out.append(f"mx_background_last_run_timestamp_seconds{_labels(job=name)} {job['last_run']:.0f}")
+        if job["last_success"]:
+            out.append(f"mx_background_last_success_timestamp_seconds{_labels(job=name)} {job['last_success']:.0f}")
+    out.append("# TYPE mx_background_thread_alive gauge")
+    for name, alive in sorted(_thread_alive().items()):
+        out.append(f"mx_background_thread_alive{_labels(job=name)} {1 if alive else 0}")
+    return "\n".join(out) + "\n"
+
+
+def summary(limit: int = 10) -> dict[str, Any]:
+    """Kompakt JSON för admin-kortet: långsammaste routes (p95), pool, cacher, jobb."""
+    from cache_store import cache_stats
+
+    with _lock:
+        by_route: dict[tuple[str, str], _Histogram] = {}
+        errors: dict[tuple[str, str], int] = {}
+        for (endpoint, method, status), hist in _requests.items():
+            merged = by_route.setdefault((endpoint, method), _Histogram())
+            merged.counts = [a + b for a, b in zip(merged.counts, hist.counts)]
+            merged.total += hist.total
+            merged.count += hist.count
+            if status.startswith("5"):
+                errors[(endpoint, method)] = errors.get((endpoint, method), 0) + hist.count
+        routes = [
+            {
+                "endpoint": endpoint,
+                "method": method,
+                "count": hist.count,
+                "avg_ms": round(hist.total / hist.count * 1000.0, 1) if hist.count else None,
+                "p50_ms": _ms(hist.quantile(0.5)),
+                "p95_ms": _ms(hist.quantile(0.95)),
+                "errors_5xx": errors.get((endpoint, method), 0),
+            }
+            for (endpoint, method), hist in by_route.items()
+        ]
+        pool_wait = {
+            "count": _pool_wait.count,
+            "avg_ms": round(_pool_wait.total / _pool_wait.count * 1000.0, 2) if _pool_wait.count else None,
+            "p95_ms": _ms(_pool_wait.quantile(0.95)),
+        }
+        jobs = {k: dict(v) for k, v in _jobs.items()}
+    routes.sort(key=lambda r: (r["p95_ms"] if r["p95_ms"] is not None else -1, r["avg_ms"] or 0), reverse=True)
+    try:
+        pool_wait.update(_pool_gauges())
+    except Exception:
+        pass
+    alive = _thread_alive()
+    now = time.time()
+    for name, job in jobs.items():
+        job["alive"] = alive.get(name)
+        job["seconds_since_run"] = round(now - job["last_run"]) if job["last_run"] else None
+    for name in alive:
+        jobs.setdefault(name, {"runs": 0, "errors": 0, "alive": alive[name], "seconds_since_run": None})
+    caches = {
+        name: {"hit_rate": st.get("hit_rate"), "hits": st.get("hits"), "misses": st.get("misses")}
+        for name, st in cache_stats().get("caches", {}).items()
+        if not name.endswith(":stale")
+    }
+    return {
+        "pid": os.getpid(),
+        "uptime_s": round(now - _START_TIME),
+        "routes": routes[: max(1, int(limit))],
+        "db_pool": pool_wait,
+        "caches": caches,
+        "jobs": jobs,
+    }
+
+
+def _ms(seconds: float | None) -> float | None:
+    return round(seconds * 1000.0, 1) if seconds is not None else None
+
+
+def init_app(app: Flask) -> None:
+    global _installed
+    if _installed or (os.getenv("APP_METRICS") or "1").lower() in ("0", "false", "no", "off"):
+        return
+    _installed = True
+    app.before_request(_before_request)
+    app.after_request(_after_request)
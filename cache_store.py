@@ -0,0 +1,390 @@
+"""Delad cache för tunga payloads (spotlight, power ranking, seriekort, väder …).
+
+Varje namngiven cache är en storleksbegränsad LRU med TTL i processen. Sätt
+CACHE_BACKEND för att dela värden mellan gunicorn-workers:
+
+    CACHE_BACKEND=memory                      (default, bara per process)
+    CACHE_BACKEND=sqlite:///tmp/mx_cache.db   (lokal disk, delas av alla workers på maskinen)
+    CACHE_BACKEND=redis://localhost:6379/0    (kräver paketet redis)
+
+Den lokala LRU:n ligger alltid först; den delade backenden fylls på vid set()
+och läses vid lokal miss.
+"""
+from __future__ import annotations
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+_MISSING = object()
+
+
+class _SqliteBackend:
+    """Disk-cache i en SQLite-fil — delas av alla processer på samma maskin."""
+
+    name = "sqlite"
+    # Storleksgränsen kontrolleras var N:e set() i processen, inte vid varje skrivning
+    # (COUNT(*) skannar tabellen) — tabellen kan tillfälligt bli N × workers för stor.
+    evict_every = 100
+    # accessed_at (LRU-ordningen vid eviction) skrivs högst så här ofta per nyckel —
+    # annars blir varje träff en skrivtransaktion som workers köar på.
+    touch_interval = 60.0
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._sets = 0
+        self._sets_lock = threading.Lock()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, expires_at REAL, accessed_at REAL, value BLOB)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> tuple[Any, float | None] | None:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT expires_at, accessed_at, value FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        expires_at, accessed_at, blob = row
+        if expires_at is not None and expires_at <= now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            return None
+        if accessed_at is None or now - accessed_at >= self.touch_interval:
+            conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(blob), expires_at
+
+    def set(self, key: str, value: Any, expires_at: float | None) -> int:
+        """Store value; returns number of evicted entries."""
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, expires_at, accessed_at, value) "
+            "VALUES (?, ?, ?, ?)",
+            (key, expires_at, time.time(), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+        )
+        with self._sets_lock:
+            self._sets += 1
+            if self._sets < self.evict_every:
+                return 0
+            self._sets = 0
+        return self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Ta bort utgångna poster och de äldst lästa över max_entries."""
+        evicted = conn.execute(
+            "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        overflow = int(count) - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                "SELECT key FROM cache_entries ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            evicted += overflow
+        return max(0, int(evicted or 0))
+
+    def add(self, key: str, value: Any, expires_at: float | None) -> bool:
+        """Store only if key is missing/expired (used for refresh leases)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                (key, time.time()),
+            )
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO cache_entries (key, expires_at, accessed_at, value) "
+                "VALUES (?, ?, ?, ?)",
+                (key, expires_at, time.time(), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self, prefix: str) -> None:
+        self._conn().execute(
+            "DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+        )
+
+
+class _RedisBackend:
+    """Redis-protokoll (Redis/Valkey/KeyDB); storleksgräns via servern (maxmemory-policy)."""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis  # valfritt beroende
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+
+    def get(self, key: str) -> tuple[Any, float | None] | None:
+        blob = self.client.get(key)
+        if blob is None:
+            return None
+        ttl_ms = self.client.pttl(key)
+        expires_at = time.time() + ttl_ms / 1000.0 if ttl_ms and ttl_ms > 0 else None
+        return pickle.loads(blob), expires_at
+
+    def set(self, key: str, value: Any, expires_at: float | None) -> int:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if expires_at is None:
+            self.client.set(key, blob)
+        else:
+            self.client.set(key, blob, px=max(1, int((expires_at - time.time()) * 1000)))
+        return 0
+
+    def add(self, key: str, value: Any, expires_at: float | None) -> bool:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if expires_at is None:
+            return bool(self.client.set(key, blob, nx=True))
+        px = max(1, int((expires_at - time.time()) * 1000))
+        return bool(self.client.set(key, blob, nx=True, px=px))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def clear(self, prefix: str) -> None:
+        for key in self.client.scan_iter(match=f"{prefix}*"):
+            self.client.delete(key)
+
+
+def _backend_from_env():
+    raw = (os.getenv("CACHE_BACKEND") or "memory").strip()
+    if not raw or raw == "memory":
+        return None
+    try:
+        if raw.startswith("sqlite:///"):
+            return _SqliteBackend(
+                raw[len("sqlite:///"):] or "/tmp/mx_cache.db",
+                max_entries=int(os.getenv("CACHE_SHARED_MAX_ENTRIES", "5000")),
+            )
+        if raw.startswith(("redis://", "rediss://", "unix://")):
+            return _RedisBackend(raw)
+        print(f"cache_store: unknown CACHE_BACKEND {raw!r}, using memory")
+    except Exception as e:
+        print(f"cache_store: shared backend unavailable ({e}), using memory")
+    return None
+
+
+_shared_backend = None
+_shared_backend_loaded = False
+_registry_lock = threading.Lock()
+_registry: dict[str, "BoundedCache"] = {}
+
+
+def _get_shared_backend():
+    global _shared_backend, _shared_backend_loaded
+    if not _shared_backend_loaded:
+        with _registry_lock:
+            if not _shared_backend_loaded:
+                _shared_backend = _backend_from_env()
+                _shared_backend_loaded = True
+    return _shared_backend
+
+
+class BoundedCache:
+    """LRU + TTL i processen, valfritt spegling till delad backend."""
+
+    def __init__(self, name: str, *, maxsize: int = 128, ttl: float | None = None, shared: bool = True):
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self.shared = shared
+        self._data: OrderedDict[Any, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.sets = 0
+        self.errors = 0
+
+    def _shared_key(self, key: Any) -> str:
+        return f"{self.name}:{key!r}"
+
+    def _backend(self):
+        return _get_shared_backend() if self.shared else None
+
+    def _store_local(self, key: Any, expires_at: float | None, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+        backend = self._backend()
+        if backend is not None:
+            try:
+                found = backend.get(self._shared_key(key))
+            except Exception as e:
+                self.errors += 1
+                print(f"cache_store[{self.name}] shared get: {e}")
+                found = None
+            if found is not None:
+                value, expires_at = found
+                self._store_local(key, expires_at, value)
+                with self._lock:
+                    self.hits += 1
+                    self.shared_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key: Any, value: Any, ttl: float | None = _MISSING) -> Any:
+        ttl = self.ttl if ttl is _MISSING else ttl
+        expires_at = time.time() + float(ttl) if ttl is not None else None
+        self._store_local(key, expires_at, value)
+        with self._lock:
+            self.sets += 1
+        backend = self._backend()
+        if backend is not None:
+            try:
+                evicted = backend.set(self._shared_key(key), value, expires_at)
+                if evicted:
+                    with self._lock:
+                        self.evictions += evicted
+            except Exception as e:
+                self.errors += 1
+                print(f"cache_store[{self.name}] shared set: {e}")
+        return value
+
+    def delete(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+        backend = self._backend()
+        if backend is not None:
+            try:
+                backend.delete(self._shared_key(key))
+            except Exception as e:
+                self.errors += 1
+                print(f"cache_store[{self.name}] shared delete: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+        backend = self._backend()
+        if backend is not None:
+            try:
+                backend.clear(f"{self.name}:")
+            except Exception as e:
+                self.errors += 1
+                print(f"cache_store[{self.name}] shared clear: {e}")
+
+    def values(self) -> list[Any]:
+        """Ögonblicksbild av de lokala värdena (t.ex. för minnesräkning)."""
+        with self._lock:
+            return [value for _expires_at, value in self._data.values()]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "shared_hits": self.shared_hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "sets": self.sets,
+                "errors": self.errors,
+            }
+
+
+def get_cache(name: str, *, maxsize: int = 128, ttl: float | None = None, shared: bool = True) -> BoundedCache:
+    """Namngiven cache (samma objekt vid upprepade anrop i processen)."""
+    with _registry_lock:
+        cache = _registry.get(name)
+        if cache is None:
+            cache = BoundedCache(name, maxsize=maxsize, ttl=ttl, shared=shared)
+            _registry[name] = cache
+        return cache
+
+
+def cache_stats() -> dict[str, Any]:
+    """Hit/miss/eviction per cache + vilken delad backend som används."""
+    backend = _get_shared_backend()
+    with _registry_lock:
+        caches = list(_registry.values())
+    return {
+        "backend": backend.name if backend is not None else "memory",
+        "pid": os.getpid(),
+        "caches": {c.name: c.stats() for c in sorted(caches, key=lambda c: c.name)},
+    }
+
+
+def acquire_lease(name: str, ttl: float = 60.0) -> bool:
+    """
+    Lås mellan workers via den delade backenden (t.ex. "en ombyggnad per nyckel").
+    Utan delad backend finns bara denna process — trådlås räcker, så alltid True.
+    """
+    backend = _get_shared_backend()
+    if backend is None:
+        return True
+    try:
+        return backend.add(f"lease:{name}", os.getpid(), time.time() + float(ttl))
+    except Exception as e:
+        print(f"cache_store lease {name}: {e}")
+        return True
+
+
+def release_lease(name: str) -> None:
+    backend = _get_shared_backend()
+    if backend is None:
+        return
+    try:
+        backend.delete(f"lease:{name}")
+    except Exception as e:
+        print(f"cache_store release lease {name}: {e}")
+
+
+def has_shared_backend() -> bool:
+    return _get_shared_backend() is not None
+
+
+def clear_all_caches() -> None:
+    with _registry_lock:
+        caches = list(_registry.values())
+    for cache in caches:
+        cache.clear()
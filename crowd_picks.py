@@ -0,0 +1,336 @@
+"""Crowd-pick-aggregat per tävling: slot × förare → antal användare.
+
+Crowd-andelarna (crowd_picks_summary, pick rates i spotlight, crowd-score i
+power ranking, förarsidans pick-stats) räknades genom att parsa varje
+användares snapshot-JSON eller bygga payloads från live-picks vid varje
+anrop. Här hålls räkningen i crowd_pick_counts — några hundra rader per
+tävling:
+
+* save_picks och rensa-endpoints applicerar användarens diff (före/efter) i
+  samma transaktion som plockändringen (apply_user_change),
+* vid låsning byggs aggregatet om från snapshots och fryses (rebuild(frozen=True)),
+* har picks ändrats på annat sätt (admin, simulering) stämmer inte
+  picks_version längre och aggregatet byggs om vid nästa läsning,
+* picks_version innehåller även ROSTER (förarnas klass avgör lineup-räkningen),
+  så ändras förarlistan byggs även ett fryst aggregat om (is_current).
+"""
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from typing import Iterable
+
+from flask import g, has_app_context
+from sqlalchemy import delete, select, update
+
+import data_versions as dv
+from models import CrowdPickCount, CrowdPickState, db
+
+RACE = "race"
+RIDER = "rider"
+HOLESHOT = "holeshot"
+WILDCARD = "wildcard"
+LINEUP = "lineup"
+LINEUP_ANY = "*"
+
+# Klasser som räknas som en "lineup" i crowd-andelarna
+SERIES_CLASSES = {True: ("wsx_sx1", "wsx_sx2"), False: ("450cc", "250cc")}
+
+_TABLES_READY = False
+
+Key = tuple[str, str, int, int]  # (kind, class_name, position, rider_id)
+
+
+def _ensure_tables() -> None:
+    global _TABLES_READY
+    if _TABLES_READY:
+        return
+    try:
+        CrowdPickState.__table__.create(bind=db.engine, checkfirst=True)
+        CrowdPickCount.__table__.create(bind=db.engine, checkfirst=True)
+        _TABLES_READY = True
+    except Exception as e:
+        print(f"crowd_picks ensure table: {e}")
+
+
+def contributions(payload: dict | None, *, is_wsx: bool, class_by_id: dict[int, str]) -> Counter:
+    """En användares bidrag (payload i snapshot-format) till aggregatet."""
+    out: Counter = Counter()
+    if not payload:
+        return out
+    riders: set[int] = set()
+    classes: set[str] = set()
+    for p in payload.get("race_picks") or []:
+        try:
+            rid = int(p.get("rider_id"))
+            pos = int(p.get("predicted_position"))
+        except (TypeError, ValueError):
+            continue
+        out[(RACE, "", pos, rid)] += 1
+        riders.add(rid)
+        cls = (class_by_id.get(rid) or "").strip().lower()
+        if cls:
+            classes.add(cls[:16])
+    for rid in riders:
+        out[(RIDER, "", 0, rid)] += 1
+    for cls in classes:
+        out[(LINEUP, cls, 0, 0)] += 1
+    if classes.intersection(SERIES_CLASSES[is_wsx]):
+        out[(LINEUP, LINEUP_ANY, 0, 0)] += 1
+    for cls, rid in (payload.get("holeshot_picks") or {}).items():
+        if rid is None:
+            continue
+        try:
+            out[(HOLESHOT, str(cls)[:16], 0, int(rid))] += 1
+        except (TypeError, ValueError):
+            continue
+    wcr, wcp = payload.get("wildcard_pick"), payload.get("wildcard_pos")
+    if wcr is not None and wcp is not None:
+        try:
+            out[(WILDCARD, "", int(wcp), int(wcr))] += 1
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+def race_rider_ids(*payloads: dict | None) -> set[int]:
+    """Förarna i payloadsens race picks — de enda vars klass contributions() behöver."""
+    out: set[int] = set()
+    for payload in payloads:
+        for p in (payload or {}).get("race_picks") or []:
+            try:
+                out.add(int(p.get("rider_id")))
+            except (TypeError, ValueError):
+                continue
+    return out
+
+
+class CrowdPicks:
+    """Aggregatet för en tävling (läst eller nybyggt)."""
+
+    def __init__(self, competition_id: int, n_users: int, counts: dict[Key, int], *, picks_version: str | None, frozen: bool):
+        self.competition_id = int(competition_id)
+        self.n_users = int(n_users)
+        self.counts = {k: n for k, n in sorted(counts.items()) if n > 0}
+        self.picks_version = picks_version
+        self.frozen = bool(frozen)
+
+    def _kind(self, kind: str):
+        return ((cls, pos, rid, n) for (k, cls, pos, rid), n in self.counts.items() if k == kind)
+
+    def race(self) -> dict[tuple[int, int], int]:
+        """(position, rider_id) → antal användare, stigande position."""
+        return {(pos, rid): n for _cls, pos, rid, n in self._kind(RACE)}
+
+    def riders(self) -> dict[int, int]:
+        """rider_id → antal användare med föraren någonstans i topp 6."""
+        return {rid: n for _cls, _pos, rid, n in self._kind(RIDER)}
+
+    def holeshots(self) -> dict[tuple[str, int], int]:
+        return {(cls, rid): n for cls, _pos, rid, n in self._kind(HOLESHOT)}
+
+    def wildcards(self) -> dict[tuple[int, int], int]:
+        return {(pos, rid): n for _cls, pos, rid, n in self._kind(WILDCARD)}
+
+    def lineups(self, class_name: str = LINEUP_ANY) -> int:
+        """Användare med minst ett race pick i klassen ("*" = seriens klasser)."""
+        return int(self.counts.get((LINEUP, class_name, 0, 0), 0))
+
+
+def picks_version(competition_id: int, *, fresh: bool = False) -> str:
+    """Aggregatets freshness-nyckel: tävlingens picks, alla picks och förarlistan."""
+    if fresh and has_app_context():
+        g.pop("_data_versions", None)
+    return "%d:%d:%d" % dv.versions(dv.picks_key(competition_id), dv.PICKS_ALL, dv.ROSTER)
+
+
+def is_current(agg: CrowdPicks) -> bool:
+    """Aktuellt aggregat? Ett fryst påverkas inte av picks-ändringar, men väl av förarlistan."""
+    current = picks_version(agg.competition_id)
+    if agg.picks_version == current:
+        return True
+    if not agg.frozen:
+        return False
+    return (agg.picks_version or "").rsplit(":", 1)[-1] == current.rsplit(":", 1)[-1]
+
+
+def _forget(competition_id: int) -> None:
+    if has_app_context():
+        g.get("_crowd_picks", {}).pop(int(competition_id), None)
+
+
+def load(competition_id: int) -> CrowdPicks | None:
+    """Sparat aggregat (memoiseras per request), None om det aldrig byggts."""
+    cid = int(competition_id)
+    memo = g.setdefault("_crowd_picks", {}) if has_app_context() else {}
+    if cid in memo:
+        return memo[cid]
+    _ensure_tables()
+    state = db.session.execute(
+        select(CrowdPickState.n_users, CrowdPickState.picks_version, CrowdPickState.frozen_at).where(
+            CrowdPickState.competition_id == cid
+        )
+    ).first()
+    if state is None:
+        return None
+    rows = db.session.execute(
+        select(
+            CrowdPickCount.kind, CrowdPickCount.class_name, CrowdPickCount.position, CrowdPickCount.rider_id, CrowdPickCount.n
+        ).where(CrowdPickCount.competition_id == cid)
+    ).all()
+    agg = CrowdPicks(
+        cid,
+        state.n_users or 0,
+        {(k, cls or "", int(pos or 0), int(rid or 0)): int(n or 0) for k, cls, pos, rid, n in rows},
+        picks_version=state.picks_version,
+        frozen=state.frozen_at is not None,
+    )
+    memo[cid] = agg
+    return agg
+
+
+def rebuild(
+    competition_id: int,
+    payloads: Iterable[tuple[int, dict]],
+    *,
+    is_wsx: bool,
+    class_by_id: dict[int, str],
+    frozen: bool = False,
+) -> CrowdPicks:
+    """
+    Räkna om från payloads ((user_id, payload) — snapshots, annars live-picks)
+    och spara. Committar; misslyckas sparandet returneras ändå det uträknade aggregatet.
+    """
+    cid = int(competition_id)
+    _ensure_tables()
+    # Versionen före läsningen — en samtidig ändring ger då bara en ny ombyggnad
+    version = picks_version(cid)
+    total: Counter = Counter()
+    n_users = 0
+    for _uid, payload in payloads:
+        n_users += 1
+        total.update(contributions(payload, is_wsx=is_wsx, class_by_id=class_by_id))
+    agg = CrowdPicks(cid, n_users, dict(total), picks_version=version, frozen=frozen)
+
+    now = datetime.utcnow()
+    try:
+        db.session.execute(delete(CrowdPickCount).where(CrowdPickCount.competition_id == cid))
+        if agg.counts:
+            db.session.execute(
+                CrowdPickCount.__table__.insert(),
+                [
+                    {"competition_id": cid, "kind": k, "class_name": cls, "position": pos, "rider_id": rid, "n": n}
+                    for (k, cls, pos, rid), n in agg.counts.items()
+                ],
+            )
+        values = {"n_users": n_users, "picks_version": version, "frozen_at": now if frozen else None, "updated_at": now}
+        res = db.session.execute(update(CrowdPickState).where(CrowdPickState.competition_id == cid).values(**values))
+        if not res.rowcount:
+            db.session.execute(CrowdPickState.__table__.insert().values(competition_id=cid, **values))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"crowd_picks rebuild competition_id={cid}: {e}")
+    _forget(cid)
+    return agg
+
+
+def clear(competition_id: int | None = None) -> None:
+    """Ta bort aggregatet för en tävling (None = alla) — innan tävlingar raderas. Committar inte."""
+    _ensure_tables()
+    for model in (CrowdPickCount, CrowdPickState):
+        stmt = delete(model)
+        if competition_id is not None:
+            stmt = stmt.where(model.competition_id == int(competition_id))
+        db.session.execute(stmt)
+    if has_app_context():
+        g.pop("_crowd_picks", None)
+
+
+def _add_counts(competition_id: int, delta: Counter) -> None:
+    table = CrowdPickCount.__table__
+    rows = [
+        {"competition_id": competition_id, "kind": k, "class_name": cls, "position": pos, "rider_id": rid, "n": d}
+        for (k, cls, pos, rid), d in sorted(delta.items())
+        if d
+    ]
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[c.name for c in table.primary_key.columns],
+            set_={"n": table.c.n + stmt.excluded.n},
+        )
+        db.session.execute(stmt, rows)
+        return
+    for row in rows:
+        res = db.session.execute(
+            update(table)
+            .where(
+                table.c.competition_id == row["competition_id"],
+                table.c.kind == row["kind"],
+                table.c.class_name == row["class_name"],
+                table.c.position == row["position"],
+                table.c.rider_id == row["rider_id"],
+            )
+            .values(n=table.c.n + row["n"])
+        )
+        if not res.rowcount:
+            db.session.execute(table.insert().values(**row))
+
+
+def apply_user_change(
+    competition_id: int,
+    before: dict | None,
+    after: dict | None,
+    *,
+    is_wsx: bool,
+    class_by_id: dict[int, str],
+) -> bool:
+    """
+    En användares picks ändrades (före commit): applicera diffen i pågående
+    transaktion och bumpa tävlingens picks-version (ersätter dv.bump_picks efter
+    commit). class_by_id behöver bara innehålla förarna i before/after.
+    Diffen hoppas över om aggregatet saknas, är fryst eller redan inaktuellt —
+    då byggs det om vid nästa läsning. Returnerar True om aggregatet uppdaterades.
+    """
+    cid = int(competition_id)
+    _ensure_tables()
+    applied = False
+    try:
+        with db.session.begin_nested():
+            state = db.session.execute(
+                select(CrowdPickState.picks_version, CrowdPickState.frozen_at).where(CrowdPickState.competition_id == cid)
+            ).first()
+            if state is not None and state.frozen_at is None and state.picks_version == picks_version(cid, fresh=True):
+                delta = contributions(after, is_wsx=is_wsx, class_by_id=class_by_id)
+                delta.subtract(contributions(before, is_wsx=is_wsx, class_by_id=class_by_id))
+                _add_counts(cid, delta)
+                db.session.execute(
+                    delete(CrowdPickCount).where(CrowdPickCount.competition_id == cid, CrowdPickCount.n <= 0)
+                )
+                user_delta = int(after is not None) - int(before is not None)
+                db.session.execute(
+                    update(CrowdPickState)
+                    .where(CrowdPickState.competition_id == cid)
+                    .values(n_users=CrowdPickState.n_users + user_delta, updated_at=datetime.utcnow())
+                )
+                applied = True
+    except Exception as e:
+        applied = False
+        print(f"crowd_picks apply competition_id={cid}: {e}")
+    dv.bump_in_transaction(dv.picks_key(cid))
+    if applied:
+        db.session.execute(
+            update(CrowdPickState)
+            .where(CrowdPickState.competition_id == cid)
+            .values(picks_version=picks_version(cid, fresh=True))
+        )
+    _forget(cid)
+    return applied
@@ -0,0 +1,270 @@
+"""Versionsräknare per datadomän — cachenycklar innehåller versionen.
+
+När resultat, picks, förarlistan eller admin-meddelanden ändras bumpas
+motsvarande räknare. Cachade payloads (spotlight, power ranking, seriekort …)
+har versionen i nyckeln, så de gäller tills datan faktiskt ändras och blir
+ogiltiga direkt när den gör det (TTL:en är bara ett skyddsnät).
+
+Räknarna ligger i databasen så att alla gunicorn-workers ser samma version.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import DataVersion, db
+
+RESULTS = "results"
+PICKS = "picks"
+ROSTER = "roster"
+SCHEDULE = "schedule"
+ANNOUNCEMENTS = "announcements"
+# Förarporträtt/bild-URL:er (bumpas automatiskt vid flush, se bump_on_change)
+PORTRAITS = "portraits"
+# Simuleringsläget i global_simulation (admin-test av deadlines, se lock_state)
+SIMULATION = "simulation"
+# Användarnamn/visningsnamn (bumpas vid flush, se picks_document)
+USERS = "users"
+# Bumpas när picks rensas för alla tävlingar (per-tävlingsnycklar kan saknas)
+PICKS_ALL = "picks:*"
+
+_TABLE_READY = False
+# (modell, nyckel, attribut) som bumpas i samma transaktion som ändringen
+_watched: list[tuple[type, str, tuple[str, ...]]] = []
+_flush_listener_installed = False
+# Callbacks efter commit med de nycklar som bumpats i transaktionen (se on_bumped)
+_bump_hooks: list = []
+_commit_listener_installed = False
+
+
+def results_key(competition_id: int) -> str:
+    return f"{RESULTS}:{int(competition_id)}"
+
+
+def picks_key(competition_id: int) -> str:
+    return f"{PICKS}:{int(competition_id)}"
+
+
+def _ensure_table() -> None:
+    global _TABLE_READY
+    if _TABLE_READY:
+        return
+    try:
+        DataVersion.__table__.create(bind=db.engine, checkfirst=True)
+        _TABLE_READY = True
+    except Exception as e:
+        print(f"data_versions ensure table: {e}")
+
+
+def _all_versions() -> dict[str, int]:
+    """Alla räknare i en query; memoiseras per app-/requestkontext."""
+    memo = g.get("_data_versions") if has_app_context() else None
+    if memo is not None:
+        return memo
+    _ensure_table()
+    try:
+        memo = {k: int(v or 0) for k, v in db.session.query(DataVersion.key, DataVersion.version).all()}
+    except Exception as e:
+        print(f"data_versions read: {e}")
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        memo = {}
+    if has_app_context():
+        g._data_versions = memo
+    return memo
+
+
+def versions(*keys: str) -> tuple[int, ...]:
+    """Aktuella versioner för keys (0 om domänen aldrig bumpats)."""
+    current = _all_versions()
+    return tuple(current.get(k, 0) for k in keys)
+
+
+def bump(*keys: str) -> None:
+    """
+    Öka räknarna för keys och committa. Anropas efter att anroparen committat
+    sin egen ändring, så att en annan worker aldrig cachar gammal data under ny version.
+    """
+    keys = tuple(dict.fromkeys(k for k in keys if k))
+    if not keys:
+        return
+    _ensure_table()
+    from sqlalchemy import update as sa_update
+
+    now = datetime.utcnow()
+    try:
+        for key in keys:
+            res = db.session.execute(
+                sa_update(DataVersion)
+                .where(DataVersion.key == key)
+                .values(version=DataVersion.version + 1, updated_at=now)
+            )
+            if res.rowcount:
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.add(DataVersion(key=key, version=1, updated_at=now))
+                    db.session.flush()
+            except IntegrityError:
+                # Annan worker skapade raden samtidigt
+                db.session.execute(
+                    sa_update(DataVersion)
+                    .where(DataVersion.key == key)
+                    .values(version=DataVersion.version + 1, updated_at=now)
+                )
+        _note_bumped(db.session(), keys)
+        db.session.commit()
+    except Exception as e:
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        print(f"data_versions bump {keys}: {e}")
+    if has_app_context():
+        g.pop("_data_versions", None)
+
+
+def bump_results(*competition_ids: int | None) -> None:
+    bump(RESULTS, *(results_key(cid) for cid in competition_ids if cid is not None))
+
+
+def bump_picks(*competition_ids: int | None) -> None:
+    """Utan id:n gäller det alla tävlingar."""
+    if not competition_ids:
+        bump(PICKS, PICKS_ALL)
+        return
+    bump(PICKS, *(picks_key(cid) for cid in competition_ids if cid is not None))
+
+
+def bump_roster() -> None:
+    bump(ROSTER)
+
+
+def bump_schedule() -> None:
+    bump(SCHEDULE)
+
+
+def bump_announcements() -> None:
+    bump(ANNOUNCEMENTS)
+
+
+def bump_portraits() -> None:
+    bump(PORTRAITS)
+
+
+def _insert_missing(conn, key: str, now: datetime) -> None:
+    table = DataVersion.__table__
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        conn.execute(table.insert().values(key=key, version=1, updated_at=now))
+        return
+    conn.execute(dialect_insert(table).values(key=key, version=1, updated_at=now).on_conflict_do_nothing())
+
+
+def _bump_on_connection(conn, keys) -> None:
+    _ensure_table()
+    table = DataVersion.__table__
+    now = datetime.utcnow()
+    for key in sorted(keys):
+        res = conn.execute(
+            table.update()
+            .where(table.c.key == key)
+            .values(version=table.c.version + 1, updated_at=now)
+        )
+        if not res.rowcount:
+            _insert_missing(conn, key, now)
+    if has_app_context():
+        g.pop("_data_versions", None)
+
+
+def bump_in_transaction(*keys: str) -> None:
+    """
+    Som bump() men i den pågående transaktionen och utan commit — för ändringar
+    gjorda med rå SQL som flush-lyssnaren inte ser. Core via sessionens
+    connection, så ingen autoflush.
+    """
+    keys = tuple(dict.fromkeys(k for k in keys if k))
+    if keys:
+        _bump_on_connection(db.session.connection(), keys)
+        _note_bumped(db.session(), keys)
+
+
+def _before_flush(session, flush_context, instances) -> None:
+    keys: set[str] = set()
+    for model, key, attrs in _watched:
+        if key in keys:
+            continue
+        if any(isinstance(obj, model) for obj in session.new) or any(
+            isinstance(obj, model) for obj in session.deleted
+        ):
+            keys.add(key)
+            continue
+        for obj in session.dirty:
+            if not isinstance(obj, model):
+                continue
+            state = sa_inspect(obj)
+            if any(state.attrs[a].history.has_changes() for a in attrs):
+                keys.add(key)
+                break
+    if keys:
+        _bump_on_connection(session.connection(), keys)
+        _note_bumped(session, keys)
+
+
+def _note_bumped(session, keys) -> None:
+    if _bump_hooks:
+        session.info.setdefault("data_versions_bumped", set()).update(keys)
+
+
+def _after_commit(session) -> None:
+    keys = session.info.pop("data_versions_bumped", None)
+    if not keys:
+        return
+    for hook in list(_bump_hooks):
+        try:
+            hook(frozenset(keys))
+        except Exception as e:
+            print(f"data_versions hook {getattr(hook, '__name__', hook)}: {e}")
+
+
+def _after_rollback(session, previous_transaction) -> None:
+    if not previous_transaction.nested:
+        session.info.pop("data_versions_bumped", None)
+
+
+def on_bumped(hook) -> None:
+    """
+    hook(keys) anropas efter commit med de nycklar som bumpats i transaktionen —
+    bara i den här processen, så lokala cacher kan tömmas direkt i stället för
+    att vänta på nästa versionskontroll.
+    """
+    global _commit_listener_installed
+    _bump_hooks.append(hook)
+    if not _commit_listener_installed:
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_soft_rollback", _after_rollback)
+        _commit_listener_installed = True
+
+
+def bump_on_change(model: type, key: str, *attrs: str) -> None:
+    """
+    Bumpa key automatiskt när rader av model skapas, tas bort eller något av
+    attrs ändras via ORM:en — i samma transaktion, så inga anropsställen glöms.
+    (Rå SQL-UPDATE går förbi; bumpa manuellt där.)
+    """
+    global _flush_listener_installed
+    _watched.append((model, key, tuple(attrs)))
+    if not _flush_listener_installed:
+        event.listen(Session, "before_flush", _before_flush)
+        _flush_listener_installed = True
@@ -0,0 +1,173 @@
+"""Cachat låsläge för picks — ersätter DB-frågorna i is_picks_locked.
+
+is_picks_locked anropas från save_picks, andras picks, power ranking,
+pickrates och en lång rad sidor — ofta flera gånger per request — och varje
+anrop gjorde två rollbacks och upp till tre SELECT mot global_simulation
+innan själva deadline-räkningen.
+
+Här hålls per process:
+
+* varje tävlings pick-deadline (UTC, från _competition_race_schedule),
+  förberäknad för alla tävlingar i en query,
+* simuleringsläget (raden i global_simulation).
+
+Båda gäller tills dataversionerna SCHEDULE resp. SIMULATION ändras (bumpas
+vid flush när en tävlings datum/tid/tidszon eller simuleringen ändras, se
+bump_on_change nedan). Versionen kontrolleras högst var check_interval sekund;
+den egna workern töms direkt vid commit (data_versions.on_bumped). Svaret memoiseras dessutom per
+request (flask.g). Ett svar som lästes medan cachen tömdes sparas inte (generation).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import date, datetime, time as dtime
+from typing import Any, Callable, NamedTuple
+
+from flask import g, has_app_context
+
+import data_versions as dv
+from models import Competition, GlobalSimulation
+
+# Samma transaktion som ändringen — andra workers ser nya deadlines inom check_interval.
+# start_time är en property med rå SQL och bumpas i settern (models.Competition).
+dv.bump_on_change(Competition, dv.SCHEDULE, "name", "event_date", "timezone")
+dv.bump_on_change(
+    GlobalSimulation, dv.SIMULATION, "active", "simulated_time", "start_time", "scenario", "active_race_id"
+)
+
+_services: list["LockStateService"] = []
+
+
+def _on_bumped(keys: frozenset[str]) -> None:
+    # Den här workern ser ändringen direkt efter commit
+    if dv.SCHEDULE in keys or dv.SIMULATION in keys:
+        for service in _services:
+            service.invalidate()
+
+
+dv.on_bumped(_on_bumped)
+
+
+class CompetitionDeadline(NamedTuple):
+    id: int
+    name: str
+    event_date: date | None
+    start_time: dtime | None
+    deadline_utc: datetime | None  # None = inget giltigt datum → aldrig låst
+
+
+class LockStateService:
+    def __init__(
+        self,
+        load_deadlines: Callable[[], dict[int, CompetitionDeadline]],
+        load_simulation: Callable[[], dict[str, Any] | None],
+        simulated_locked: Callable[[CompetitionDeadline, dict[str, Any]], bool],
+        *,
+        check_interval: float = 5.0,
+    ):
+        self._load_deadlines = load_deadlines
+        self._load_simulation = load_simulation
+        self._simulated_locked = simulated_locked
+        self._check_interval = float(check_interval)
+        self._lock = threading.Lock()
+        self._deadlines: dict[int, CompetitionDeadline] | None = None
+        self._simulation: dict[str, Any] | None = None
+        self._simulation_loaded = False
+        # Ökas vid varje tömning — en laddning som startade före den får inte sparas
+        self._generation = 0
+        self._version: tuple[int, ...] | None = None
+        self._checked_at = 0.0
+        self._hits = 0
+        self._loads = 0
+        self._resets = 0
+        _services.append(self)
+
+    def _sync(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self._check_interval:
+            return
+        self._checked_at = now
+        version = dv.versions(dv.SCHEDULE, dv.SIMULATION)
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self._resets += 1
+                self._deadlines = None
+                self._simulation = None
+                self._simulation_loaded = False
+                self._generation += 1
+                self._version = version
+
+    def deadlines(self) -> dict[int, CompetitionDeadline]:
+        self._sync()
+        current = self._deadlines
+        if current is None:
+            generation = self._generation
+            current = self._load_deadlines()
+            with self._lock:
+                if generation == self._generation:
+                    self._deadlines = current
+                self._loads += 1
+        return current
+
+    def deadline(self, competition_id: int) -> CompetitionDeadline | None:
+        return self.deadlines().get(int(competition_id))
+
+    def simulation(self) -> dict[str, Any] | None:
+        """Aktiv simulering (raden i global_simulation) eller None."""
+        self._sync()
+        if self._simulation_loaded:
+            return self._simulation
+        generation = self._generation
+        sim = self._load_simulation()
+        with self._lock:
+            if generation == self._generation:
+                self._simulation = sim
+                self._simulation_loaded = True
+        return sim
+
+    def is_locked(self, competition_id: int) -> bool:
+        cid = int(competition_id)
+        memo = g.setdefault("_picks_locked", {}) if has_app_context() else None
+        if memo is not None and cid in memo:
+            self._hits += 1
+            return memo[cid]
+        rec = self.deadline(cid)
+        if rec is None:
+            locked = False
+        else:
+            sim = self.simulation()
+            if sim is not None:
+                locked = bool(self._simulated_locked(rec, sim))
+            else:
+                locked = rec.deadline_utc is not None and rec.deadline_utc <= datetime.utcnow()
+        if memo is not None:
+            memo[cid] = locked
+        return locked
+
+    def invalidate(self) -> None:
+        """Töm i den här processen (t.ex. direkt efter en admin-ändring)."""
+        with self._lock:
+            self._deadlines = None
+            self._simulation = None
+            self._simulation_loaded = False
+            self._generation += 1
+        if has_app_context():
+            g.pop("_picks_locked", None)
+
+    def stats(self) -> dict[str, Any]:
+        deadlines = self._deadlines
+        return {
+            "competitions": len(deadlines) if deadlines is not None else None,
+            "simulation_active": self._simulation is not None,
+            "version": list(self._version) if self._version is not None else None,
+            "request_hits": self._hits,
+            "loads": self._loads,
+            "resets": self._resets,
+        }
+
+
+def lock_state_stats() -> dict[str, Any]:
+    """Statistik (den här workern) för admin/cache_stats."""
+    return _services[-1].stats() if _services else {}
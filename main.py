@@ -31,15 +31,31 @@ from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
-from models import db, User, GlobalSimulation, Series, Competition, Rider, SeasonTeam, SeasonTeamRider, League, LeagueMembership, LeagueRequest, LeagueChallenge, UserLeagueChallengeBadge, InboxNotification, BulletinPost, BulletinReaction, RacePick, PicksSnapshot, CompetitionScore, LeaderboardHistory, CompetitionRiderStatus, CompetitionResult, HoleshotPick, HoleshotResult, WildcardPick, CompetitionImage, CrossDinoHighScore, FinishedSeriesStats, AdminAnnouncement, UserRaceRecapDismissal, rider_query_for_list_ui
+from models import db, User, GlobalSimulation, Series, Competition, Rider, SeasonTeam, SeasonTeamRider, League, LeagueCompetitionScore, LeagueMembership, LeagueRequest, LeagueChallenge, UserLeagueChallengeBadge, InboxNotification, BulletinPost, BulletinReaction, RacePick, PicksSnapshot, CompetitionScore, UserSeasonTotal, LeaderboardHistory, LeaderboardRankSnapshot, CompetitionRiderStatus, CompetitionResult, HoleshotPick, HoleshotResult, WildcardPick, CompetitionImage, CrossDinoHighScore, FinishedSeriesStats, SeasonRiderPoints, AdminAnnouncement, UserRaceRecapDismissal, rider_query_for_list_ui, load_user_picture, load_rider_bio, load_snapshot_payload, load_bulletin_content
+from cache_store import get_cache
+from refresh_coordinator import RefreshCoordinator
+from portrait_index import PortraitIndex
+from lock_state import CompetitionDeadline, LockStateService
+import crowd_picks
+import pick_storage
+import picks_document
+import data_versions as dv
+import portrait_derivatives
+import portrait_store
 
 _INDEX_SCHEMA_CHECKED = False
 _RIDER_IMAGE_COLUMN_CHECKED = False
 _MOTO_COLUMNS_CHECKED = False
-_CHAMPIONSHIP_TOTALS_CACHE: dict[int, tuple[float, dict]] = {}
+# Cachenycklarna innehåller dataversioner (data_versions.py) — TTL:en är bara ett skyddsnät.
+_HOMEPAGE_CACHE_TTL = 3600.0
+_SERIES_STATUS_CACHE_TTL = 900.0
+_POWER_RANKING_CACHE_TTL = 3600.0
+_CHAMPIONSHIP_TOTALS_CACHE = get_cache("championship_totals", maxsize=8, ttl=_HOMEPAGE_CACHE_TTL)
 # Shell/mode cache keyed by series scope ("AMA", "SX", "MX", "SMX", "WSX")
-_RIDER_SPOTLIGHT_CACHE: dict[str, tuple[float, dict]] = {}
-_RIDER_SPOTLIGHT_MODE_CACHE: dict[str, tuple[float, dict]] = {}
+_RIDER_SPOTLIGHT_CACHE = get_cache("rider_spotlight", maxsize=16, ttl=_HOMEPAGE_CACHE_TTL)
+_RIDER_SPOTLIGHT_MODE_CACHE = get_cache("rider_spotlight_mode", maxsize=64, ttl=_HOMEPAGE_CACHE_TTL)
+# scope → ((dag, dataversioner), (senaste tävling, kommande tävling)) för spotlightens cachenyckel
+_SPOTLIGHT_COMP_IDS: dict[str, tuple[tuple, tuple[int | None, int | None]]] = {}
 _SPOTLIGHT_TAB_META: dict[str, dict[str, str]] = {
     "last_race": {"label": "Senaste race", "icon": "🏁"},
     "crowd_pick": {"label": "Crowd pick", "icon": "🔥"},
@@ -47,12 +63,13 @@ _SPOTLIGHT_TAB_META: dict[str, dict[str, str]] = {
     "dark_horse": {"label": "Mörk häst", "icon": "🌙"},
 }
 # Bump when portrait resolution logic changes (one-time cache rebuild, not every request).
-_SPOTLIGHT_PORTRAIT_CACHE_V = 3
-_SERIES_STATUS_CACHE: tuple[float, list] | None = None
-_POWER_RANKING_CACHE: dict[int, tuple[float, dict]] = {}
-_HOMEPAGE_CACHE_TTL = 600.0
-_SERIES_STATUS_CACHE_TTL = 120.0
-_POWER_RANKING_CACHE_TTL = 300.0
+_SPOTLIGHT_PORTRAIT_CACHE_V = 4
+_SERIES_STATUS_CACHE = get_cache("series_status", maxsize=1, ttl=_SERIES_STATUS_CACHE_TTL)
+_POWER_RANKING_CACHE = get_cache("power_ranking", maxsize=32, ttl=_POWER_RANKING_CACHE_TTL)
+_ADMIN_ANNOUNCEMENT_CACHE = get_cache("admin_announcement", maxsize=2, ttl=_HOMEPAGE_CACHE_TTL)
+# Single-flight + stale-while-revalidate för startsidans payloads (se refresh_coordinator.py)
+# Byggen i bakgrunden körs under app-kontext; payloads får inte bero på en request.
+_HOMEPAGE_REFRESH = RefreshCoordinator("homepage", context_factory=lambda: app.app_context())
 _HOMEPAGE_CACHE_WARM_STARTED = False
 _PORTRAIT_DECODE_SEM = threading.Semaphore(
     int(os.getenv("PORTRAIT_DECODE_CONCURRENCY", "2" if os.getenv("RENDER") else "4"))
@@ -63,24 +80,64 @@ def _spotlight_series_cache_key(series: str | None) -> str:
     return _normalize_countdown_series(series) or "AMA"
 
 
+def _spotlight_comp_ids(series_code: str | None) -> tuple[int | None, int | None]:
+    """(senaste tävling med resultat, kommande pick-race) — memoiserat per dag och dataversion."""
+    scope = _spotlight_series_cache_key(series_code)
+    key = (get_today().isoformat(), *dv.versions(dv.RESULTS, dv.SCHEDULE, dv.SIMULATION))
+    hit = _SPOTLIGHT_COMP_IDS.get(scope)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    last_comp = _last_completed_competition(series=series_code)
+    upcoming = _spotlight_upcoming_competition(series=series_code)
+    ids = (int(last_comp.id) if last_comp else None, int(upcoming.id) if upcoming else None)
+    _SPOTLIGHT_COMP_IDS[scope] = (key, ids)
+    return ids
+
+
+def _spotlight_data_version(series_code: str | None) -> tuple:
+    # Spotlight läser resultat, förarlistan, schemat och crowd picks för just
+    # senaste/kommande tävling (dark horse resp. crowd pick) — inte alla picks
+    comp_ids = [cid for cid in _spotlight_comp_ids(series_code) if cid is not None]
+    return (
+        get_today().isoformat(),
+        *dv.versions(
+            dv.RESULTS,
+            dv.ROSTER,
+            dv.SCHEDULE,
+            dv.PORTRAITS,
+            dv.SIMULATION,
+            dv.PICKS_ALL,
+            *(dv.picks_key(cid) for cid in comp_ids),
+        ),
+    )
+
+
+def _power_ranking_cache_key(competition_id: int) -> tuple:
+    cid = int(competition_id)
+    return (cid, *dv.versions(dv.RESULTS, dv.picks_key(cid), dv.PICKS_ALL, dv.ROSTER))
+
+
 def _peek_rider_spotlight_cache(series: str | None = None) -> dict | None:
-    key = _spotlight_series_cache_key(series)
-    now = time.time()
-    entry = _RIDER_SPOTLIGHT_CACHE.get(key)
-    if entry and entry[0] > now:
-        cached = entry[1]
-        if not _spotlight_cache_needs_refresh(cached) and not _spotlight_shell_stale(
-            cached, series=series
-        ):
-            return cached
-    return None
+    """Cachad (ev. stale) spotlight utan att bygga inline — ombyggnad sker i bakgrunden."""
+    series_code = _normalize_countdown_series(series)
+    scope = _spotlight_series_cache_key(series_code)
+    return _HOMEPAGE_REFRESH.peek(
+        _RIDER_SPOTLIGHT_CACHE,
+        (scope, _spotlight_data_version(series_code)),
+        lambda: _build_rider_spotlight(series_code),
+        stale_key=scope,
+        is_valid=lambda payload: _spotlight_shell_valid(payload, series_code),
+    )
 
 
 def _peek_power_ranking_cache(competition_id: int) -> dict | None:
-    cached = _POWER_RANKING_CACHE.get(int(competition_id))
-    if cached and cached[0] > time.time():
-        return cached[1]
-    return None
+    cid = int(competition_id)
+    return _HOMEPAGE_REFRESH.peek(
+        _POWER_RANKING_CACHE,
+        _power_ranking_cache_key(cid),
+        lambda: _build_power_ranking_payload(db.session.get(Competition, cid)),
+        stale_key=cid,
+    )
 
 
 def _warm_homepage_caches() -> None:
@@ -102,32 +159,47 @@ def _warm_homepage_caches() -> None:
             print(f"warm power_ranking: {e}")
 
 
+def _homepage_cache_warm_loop(interval: float, *, warm_now: bool) -> None:
+    """
+    Håll startsidans cacher varma. Nycklarna innehåller dataversioner, så ett
+    varv utan dataändringar är bara cacheträffar; efter t.ex. resultatimport
+    byggs payloads här i stället för i första besökarens request.
+    """
+    if warm_now:
+        _warm_homepage_caches()
+    while interval > 0:
+        time.sleep(interval)
+        _warm_homepage_caches()
+
+
 def _start_homepage_cache_warm() -> None:
-    # Render: undvik att fylla RAM med spotlight/power-ranking vid boot.
-    if os.getenv("RENDER"):
-        return
     if os.getenv("DISABLE_HOMEPAGE_CACHE_WARM", "").lower() in ("1", "true", "yes"):
         return
+    interval = float(os.getenv("HOMEPAGE_CACHE_REFRESH_SEC") or 0)
+    # Render: undvik att fylla RAM med spotlight/power-ranking vid boot.
+    warm_now = not os.getenv("RENDER")
+    if not warm_now and interval <= 0:
+        return
     global _HOMEPAGE_CACHE_WARM_STARTED
     if _HOMEPAGE_CACHE_WARM_STARTED:
         return
     _HOMEPAGE_CACHE_WARM_STARTED = True
     import threading
 
-    threading.Thread(target=_warm_homepage_caches, daemon=True).start()
+    threading.Thread(
+        target=_homepage_cache_warm_loop,
+        args=(interval,),
+        kwargs={"warm_now": warm_now},
+        daemon=True,
+    ).start()
 
 
-def _build_picks_snapshot_payload(user_id: int, competition_id: int) -> dict:
+def _picks_snapshot_payload(user_id: int, competition_id: int, picks, holos, wc) -> dict:
     """
-    Normalize current picks into a stable JSON payload.
+    Normalize pick rows into a stable JSON payload.
     Keeps only latest rows if duplicates exist (by PK), and sorts race picks by position.
     """
     # Race picks: dedupe by (rider_id, predicted_position) preferring latest pick_id
-    picks = (
-        RacePick.query.filter_by(user_id=user_id, competition_id=competition_id)
-        .order_by(RacePick.predicted_position.asc())
-        .all()
-    )
     by_key = {}
     for p in picks:
         k = (int(p.rider_id or 0), int(p.predicted_position or 0))
@@ -136,7 +208,6 @@ def _build_picks_snapshot_payload(user_id: int, competition_id: int) -> dict:
             by_key[k] = p
     unique_picks = sorted(by_key.values(), key=lambda p: int(p.predicted_position or 0))
 
-    holos = HoleshotPick.query.filter_by(user_id=user_id, competition_id=competition_id).all()
     # Dedupe holeshot by class_name, prefer latest id
     holo_by_class = {}
     for h in holos:
@@ -145,8 +216,6 @@ def _build_picks_snapshot_payload(user_id: int, competition_id: int) -> dict:
         if prev is None or int(h.id or 0) > int(prev.id or 0):
             holo_by_class[cls] = h
 
-    wc = WildcardPick.query.filter_by(user_id=user_id, competition_id=competition_id).first()
-
     payload = {
         "user_id": int(user_id),
         "competition_id": int(competition_id),
@@ -162,77 +231,109 @@ def _build_picks_snapshot_payload(user_id: int, competition_id: int) -> dict:
     return payload
 
 
+def _build_picks_snapshot_payload(user_id: int, competition_id: int) -> dict:
+    """Snapshot payload for one user from the live pick tables."""
+    picks = (
+        RacePick.query.filter_by(user_id=user_id, competition_id=competition_id)
+        .order_by(RacePick.predicted_position.asc())
+        .all()
+    )
+    holos = HoleshotPick.query.filter_by(user_id=user_id, competition_id=competition_id).all()
+    wc = WildcardPick.query.filter_by(user_id=user_id, competition_id=competition_id).first()
+    return _picks_snapshot_payload(user_id, competition_id, picks, holos, wc)
+
+
+def _live_picks_snapshot_payloads(competition_id: int, user_ids=None) -> dict[int, dict]:
+    """
+    Samma payload som _build_picks_snapshot_payload för alla användare med picks
+    (eller bara user_ids) — tre queries i stället för tre per användare.
+    """
+    comp_id = int(competition_id)
+    if user_ids is not None:
+        user_ids = [int(u) for u in user_ids]
+        if not user_ids:
+            return {}
+
+    def _rows(model, *order_by):
+        q = model.query.filter(model.competition_id == comp_id, model.user_id.isnot(None))
+        if user_ids is not None:
+            q = q.filter(model.user_id.in_(user_ids))
+        return q.order_by(*order_by).all()
+
+    picks_by_uid: dict[int, list] = defaultdict(list)
+    for p in _rows(RacePick, RacePick.predicted_position.asc(), RacePick.pick_id.asc()):
+        picks_by_uid[int(p.user_id)].append(p)
+    holos_by_uid: dict[int, list] = defaultdict(list)
+    for h in _rows(HoleshotPick, HoleshotPick.id.asc()):
+        holos_by_uid[int(h.user_id)].append(h)
+    wc_by_uid: dict[int, WildcardPick] = {}
+    for w in _rows(WildcardPick, WildcardPick.id.asc()):
+        wc_by_uid.setdefault(int(w.user_id), w)
+
+    uids = set(picks_by_uid) | set(holos_by_uid) | set(wc_by_uid)
+    return {
+        uid: _picks_snapshot_payload(uid, comp_id, picks_by_uid.get(uid, ()), holos_by_uid.get(uid, ()), wc_by_uid.get(uid))
+        for uid in sorted(uids)
+    }
+
+
+def _insert_picks_snapshots(rows: list[dict]) -> None:
+    """Bulk-insert; rader som redan finns (annan worker hann före) hoppas över."""
+    dialect = db.engine.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        db.session.execute(dialect_insert(PicksSnapshot).on_conflict_do_nothing(), rows)
+        return
+    from sqlalchemy.exc import IntegrityError
+
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.add(PicksSnapshot(**row))
+                db.session.flush()
+        except IntegrityError:
+            pass
+
+
 def ensure_picks_snapshots_for_competition(competition_id: int, source: str = "auto_lock") -> int:
     """
     Create missing PicksSnapshot rows for users who have any picks for this competition.
-    Safe to call multiple times (unique constraint prevents duplicates).
+    Set-based (four queries + one insert); safe to call multiple times and from
+    several workers at once (conflicting rows are skipped).
     Returns number of snapshots created.
     """
     import json
 
-    user_ids = set()
-    user_ids.update(
-        uid
-        for (uid,) in db.session.query(RacePick.user_id)
-        .filter(RacePick.competition_id == competition_id)
-        .distinct()
-        .all()
-        if uid is not None
-    )
-    user_ids.update(
-        uid
-        for (uid,) in db.session.query(HoleshotPick.user_id)
-        .filter(HoleshotPick.competition_id == competition_id)
-        .distinct()
-        .all()
-        if uid is not None
-    )
-    user_ids.update(
-        uid
-        for (uid,) in db.session.query(WildcardPick.user_id)
-        .filter(WildcardPick.competition_id == competition_id)
-        .distinct()
-        .all()
-        if uid is not None
-    )
-    if not user_ids:
-        return 0
-
+    comp_id = int(competition_id)
     existing = {
         int(uid)
-        for (uid,) in db.session.query(PicksSnapshot.user_id)
-        .filter(PicksSnapshot.competition_id == competition_id)
-        .filter(PicksSnapshot.user_id.in_(list(user_ids)))
-        .all()
+        for (uid,) in db.session.query(PicksSnapshot.user_id).filter(PicksSnapshot.competition_id == comp_id).all()
     }
-
-    created = 0
-    for uid in user_ids:
-        uid_i = int(uid)
-        if uid_i in existing:
-            continue
-        payload = _build_picks_snapshot_payload(uid_i, int(competition_id))
-        snap = PicksSnapshot(
-            user_id=uid_i,
-            competition_id=int(competition_id),
-            payload_json=json.dumps(payload, ensure_ascii=False),
-            source=source,
-        )
-        db.session.add(snap)
-        created += 1
-
-    if created:
-        try:
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-            created = 0
-    return created
-
-
-_PICKS_SNAPSHOT_AUTO_DONE: set[int] = set()
-_PICKS_SNAPSHOT_AUTO_LAST_RUN: dict[int, float] = {}
-_PICKS_SNAPSHOT_AUTO_INTERVAL_SEC = 90
+    payloads = _live_picks_snapshot_payloads(comp_id)
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": uid,
+            "competition_id": comp_id,
+            "payload_json": json.dumps(payload, ensure_ascii=False),
+            "created_at": now,
+            "source": source,
+        }
+        for uid, payload in payloads.items()
+        if uid not in existing
+    ]
+    if not rows:
+        return 0
+    try:
+        _insert_picks_snapshots(rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        return 0
+    return len(rows)
 
 
 def _user_ids_with_any_live_picks(competition_id: int) -> set[int]:
@@ -263,36 +364,56 @@ def _missing_pick_snapshot_user_count(competition_id: int) -> int:
     return len(user_ids - existing)
 
 
-def _auto_ensure_picks_snapshots_if_locked(comp: Competition | None) -> None:
-    """
-    Best-effort: when picks are locked, persist snapshots without admin action.
-    Throttled per competition; retries until every user with live picks has a row.
-    """
-    if comp is None:
-        return
-    comp_id = int(comp.id)
-    if comp_id in _PICKS_SNAPSHOT_AUTO_DONE:
-        return
-    try:
-        if not is_picks_locked(comp):
-            return
-    except Exception:
-        return
+# Tävlingar där alla användare med picks har en snapshot (den här processen)
+_PICKS_SNAPSHOT_DONE: set[int] = set()
 
-    now = time.time()
-    if now - _PICKS_SNAPSHOT_AUTO_LAST_RUN.get(comp_id, 0.0) < _PICKS_SNAPSHOT_AUTO_INTERVAL_SEC:
-        return
-    _PICKS_SNAPSHOT_AUTO_LAST_RUN[comp_id] = now
 
-    try:
-        created = ensure_picks_snapshots_for_competition(comp_id, source="auto_lock")
-        if created:
-            print(f"INFO: auto picks snapshots created={created} competition_id={comp_id}")
-        if _missing_pick_snapshot_user_count(comp_id) == 0:
-            _PICKS_SNAPSHOT_AUTO_DONE.add(comp_id)
-    except Exception as e:
-        db.session.rollback()
-        print(f"WARNING: auto picks snapshots failed competition_id={comp_id}: {e}")
+def run_due_picks_snapshots() -> dict:
+    """
+    Körs av picks_snapshot_scheduler vid varje pick-deadline: skapa snapshots för
+    tävlingar som just låsts (deadline inom PICKS_SNAPSHOT_LOOKBACK_H timmar).
+    Läsvägarna skapar inga snapshots — saknas en läses live-picks.
+    Den verkliga deadlinen gäller, inte simuleringens låsläge: snapshots, frysta
+    aggregat och förbyggda dokument är permanenta.
+    Returnerar även nästa deadline så att schemaläggaren kan vakna precis då.
+    """
+    now = datetime.utcnow()
+    oldest = now - timedelta(hours=float(os.getenv("PICKS_SNAPSHOT_LOOKBACK_H") or 72))
+    created: dict[int, int] = {}
+    next_deadline = None
+    for rec in _LOCK_STATE.deadlines().values():
+        if rec.deadline_utc is None or rec.id in _PICKS_SNAPSHOT_DONE:
+            continue
+        if rec.deadline_utc > now:
+            if next_deadline is None or rec.deadline_utc < next_deadline:
+                next_deadline = rec.deadline_utc
+            continue
+        if rec.deadline_utc < oldest:
+            continue
+        try:
+            n = ensure_picks_snapshots_for_competition(rec.id, source="auto_lock")
+            if n:
+                created[rec.id] = n
+            if _missing_pick_snapshot_user_count(rec.id) == 0:
+                # Frys crowd-aggregatet på snapshots
+                comp = db.session.get(Competition, rec.id)
+                crowd_picks.rebuild(
+                    rec.id,
+                    _iter_crowd_pick_payloads(rec.id),
+                    is_wsx=(getattr(comp, "series", None) or "") == "WSX",
+                    class_by_id=_rider_class_by_id(),
+                    frozen=True,
+                )
+                # Andras picks-dokumentet byggs nu i stället för vid första requesten efter låsning
+                if comp is not None:
+                    picks_document.get_or_build(
+                        rec.id, locked=True, build=lambda: _other_users_picks_document(comp, True)
+                    )
+                _PICKS_SNAPSHOT_DONE.add(rec.id)
+        except Exception as e:
+            db.session.rollback()
+            print(f"WARNING: picks snapshots failed competition_id={rec.id}: {e}")
+    return {"created": created, "next_deadline": next_deadline}
 
 
 # -------------------------------------------------
@@ -347,6 +468,19 @@ else:
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
+# SQL_PROFILING=1: queries/DB-tid per request, N+1-varningar, Server-Timing (se sql_profiler.py).
+# Registreras före övriga after_request-hooks så att deras queries också räknas.
+from sql_profiler import init_app as _init_sql_profiler  # noqa: E402
+from app_metrics import init_app as _init_app_metrics  # noqa: E402
+
+_init_sql_profiler(app)
+# Latenshistogram per route + pool/cache/bakgrundsjobb → /admin/metrics (se app_metrics.py)
+_init_app_metrics(app)
+# Pillow-rendering (recap/Din kväll/invite-kort) körs i en processpool (render_pool.py)
+import render_pool  # noqa: E402
+
+render_pool.init_app(app)
+
 
 @app.teardown_appcontext
 def _shutdown_session(exception=None):
@@ -354,45 +488,11 @@ def _shutdown_session(exception=None):
     db.session.remove()
 
 
-def _portrait_cache_dir() -> str:
-    d = os.environ.get("PORTRAIT_CACHE_DIR") or (
-        "/tmp/mx_portrait_cache"
-        if os.getenv("RENDER")
-        else os.path.join(app.instance_path, "portrait_cache")
-    )
-    os.makedirs(d, exist_ok=True)
-    return d
-
-
-def _portrait_cache_paths(portrait_id: int, etag: str) -> tuple[str, str]:
-    safe = etag.strip('"').replace("/", "_")[:40]
-    base = os.path.join(_portrait_cache_dir(), f"{portrait_id}_{safe}")
-    return base + ".bin", base + ".mime"
-
-
-def _cached_portrait_file(portrait_id: int) -> tuple[str, str] | None:
-    """Senast cachade fil för förare — undvik DB-läsning."""
-    import glob
-
-    pattern = os.path.join(_portrait_cache_dir(), f"{int(portrait_id)}_*.bin")
-    files = sorted(glob.glob(pattern))
-    if not files:
-        return None
-    bin_path = files[-1]
-    mime_path = bin_path.replace(".bin", ".mime")
-    mime = "image/jpeg"
-    if os.path.isfile(mime_path):
-        with open(mime_path, encoding="utf-8") as f:
-            mime = (f.read() or mime).strip() or mime
-    return bin_path, mime
-
-
 def _portrait_file_response(bin_path: str, mime: str, etag: str | None = None):
+    """send_file (zero-copy) — med etag=innehållshash svarar conditional=True 304 själv."""
     from flask import send_file
 
-    resp = send_file(bin_path, mimetype=mime, conditional=True)
-    if etag:
-        resp.headers["ETag"] = etag
+    resp = send_file(bin_path, mimetype=mime, conditional=True, etag=etag or True)
     resp.headers["Cache-Control"] = "public, max-age=2592000, immutable"
     return resp
 
@@ -2893,13 +2993,15 @@ def api_invite_card_png():
         layout = "story"
     series = (request.args.get("series") or "").strip().upper() or None
     try:
-        from invite_card_service import build_invite_card_data, render_invite_card_png
+        from invite_card_service import build_invite_card_data
 
         data = build_invite_card_data(ref, prefer_series=series)
-        png_bytes = render_invite_card_png(data, layout=layout)
+        png_bytes = render_pool.render("invite_card_service:render_invite_card_png", data, layout=layout)
         resp = Response(png_bytes, mimetype="image/png")
         resp.headers["Cache-Control"] = "public, max-age=300"
         return resp
+    except render_pool.RenderPoolUnavailable:
+        return render_pool.busy_response()
     except Exception as e:
         print(f"invite_card_png failed: {e}")
         return Response(status=500)
@@ -3023,14 +3125,19 @@ def _pick_next_competition(
 
 def build_series_status_list() -> list[dict]:
     """Seriekort för startsidan — cachad, undviker upprepade fullskanningar."""
-    global _SERIES_STATUS_CACHE
-    now = time.time()
-    if _SERIES_STATUS_CACHE and _SERIES_STATUS_CACHE[0] > now:
-        return _SERIES_STATUS_CACHE[1]
+    current_date = get_today()
+    cache_key = (current_date.isoformat(), *dv.versions(dv.RESULTS, dv.SCHEDULE))
+    return _HOMEPAGE_REFRESH.get(
+        _SERIES_STATUS_CACHE,
+        cache_key,
+        lambda: _build_series_status_list(current_date),
+        stale_key="all",
+    )
+
 
+def _build_series_status_list(current_date: date) -> list[dict]:
     from sqlalchemy import or_, and_
 
-    current_date = get_today()
     all_series = Series.query.filter(
         or_(
             Series.year == 2026,
@@ -3124,7 +3231,6 @@ def build_series_status_list() -> list[dict]:
             }
         )
 
-    _SERIES_STATUS_CACHE = (now + _SERIES_STATUS_CACHE_TTL, series_data)
     return series_data
 
 
@@ -3450,7 +3556,7 @@ def _index_impl():
 
         # Get user profile picture
         try:
-            user = User.query.get(uid)
+            user = User.query.options(load_user_picture()).get(uid)
             if user and hasattr(user, 'profile_picture_url') and user.profile_picture_url:
                 user_profile_picture = user.profile_picture_url
             needs_email = not (getattr(user, "email", None) or "").strip()
@@ -3718,18 +3824,26 @@ def _index_impl():
         import pit_lane_service as pls
 
         pls.ensure_pit_lane_tables()
-        ann = AdminAnnouncement.query.filter_by(is_active=True).order_by(
-            AdminAnnouncement.created_at.desc()
-        ).first()
-        if ann and ann.body:
-            admin_message = ann.body
-            admin_message_priority = ann.priority or "info"
-            admin_announcement_id = ann.id
+        ann_key = dv.versions(dv.ANNOUNCEMENTS)
+        cached_ann = _ADMIN_ANNOUNCEMENT_CACHE.get(ann_key)
+        if cached_ann is not None:
+            admin_message, admin_message_priority, admin_announcement_id = cached_ann
         else:
-            global_sim = GlobalSimulation.query.first()
-            if global_sim and global_sim.admin_message_active and global_sim.admin_message:
-                admin_message = global_sim.admin_message
-                admin_message_priority = global_sim.admin_message_priority or "info"
+            ann = AdminAnnouncement.query.filter_by(is_active=True).order_by(
+                AdminAnnouncement.created_at.desc()
+            ).first()
+            if ann and ann.body:
+                admin_message = ann.body
+                admin_message_priority = ann.priority or "info"
+                admin_announcement_id = ann.id
+            else:
+                global_sim = GlobalSimulation.query.first()
+                if global_sim and global_sim.admin_message_active and global_sim.admin_message:
+                    admin_message = global_sim.admin_message
+                    admin_message_priority = global_sim.admin_message_priority or "info"
+            _ADMIN_ANNOUNCEMENT_CACHE.set(
+                ann_key, (admin_message, admin_message_priority, admin_announcement_id)
+            )
     except Exception as e:
         print(f"Error fetching admin message: {e}")
         admin_message = None
@@ -4023,7 +4137,7 @@ def fantasy_supercross_leaderboard_for_year(year: int) -> list:
         return []
 
     uids = [u for u, _ in ranked]
-    users = User.query.filter(User.id.in_(uids)).all()
+    users = User.query.options(load_user_picture()).filter(User.id.in_(uids)).all()
     uid_map = {u.id: u for u in users}
 
     out = []
@@ -4046,33 +4160,13 @@ def fantasy_supercross_leaderboard_for_year(year: int) -> list:
     return out
 
 
-def _wsx_score_agg_for_comps(comp_ids: list[int]) -> dict[int, int]:
-    """Dedupe CompetitionScore per (user, competition); sum total_points per user."""
-    from collections import defaultdict
-
-    if not comp_ids:
-        return {}
-    by_uc: dict[tuple[int, int], CompetitionScore] = {}
-    for s in CompetitionScore.query.filter(
-        CompetitionScore.competition_id.in_(comp_ids)
-    ).all():
-        k = (int(s.user_id), int(s.competition_id))
-        prev = by_uc.get(k)
-        if prev is None or int(s.score_id or 0) > int(prev.score_id or 0):
-            by_uc[k] = s
-    agg: dict[int, int] = defaultdict(int)
-    for s in by_uc.values():
-        agg[int(s.user_id)] += int(s.total_points or 0)
-    return dict(agg)
-
-
 def calculate_wsx_leaderboard_deltas(
     *,
     year: int | None = None,
     recent_comp_ids: set[int] | None = None,
 ) -> list[dict]:
     """
-    WSX tippa-highscore med rank-delta vs poäng *före* recent_comp_ids.
+    WSX tippa-highscore med rank-delta vs rank-snapshot *före* recent_comp_ids.
     Används av WSX-leaderboard + Raket/Ankare (aldrig AMA/SMX-poäng).
     """
     year = int(year or _active_wsx_season_year())
@@ -4081,25 +4175,13 @@ def calculate_wsx_leaderboard_deltas(
     if not season_ids:
         return []
 
+    scope = _wsx_totals_scope(year)
     recent = {int(x) for x in (recent_comp_ids or set()) if int(x) in set(season_ids)}
-    totals = _wsx_score_agg_for_comps(season_ids)
+    totals = _season_totals_by_user(scope)
     if not totals:
         return []
 
-    recent_pts = _wsx_score_agg_for_comps(list(recent)) if recent else {}
-
-    rows = []
-    for uid, pts in totals.items():
-        recent_week = int(recent_pts.get(uid, 0))
-        baseline = max(0, int(pts) - recent_week)
-        rows.append(
-            {
-                "id": int(uid),
-                "total_points": int(pts),
-                "baseline_total": baseline,
-                "recent_week_points": recent_week,
-            }
-        )
+    rows = [{"id": int(uid), "total_points": int(pts)} for uid, pts in totals.items()]
 
     uids = [r["id"] for r in rows]
     users = User.query.filter(User.id.in_(uids)).all()
@@ -4110,12 +4192,10 @@ def calculate_wsx_leaderboard_deltas(
     }
 
     current = sorted(rows, key=lambda x: _leaderboard_sort_key(x, "total_points"))
-    # Första avklarade racet i säsongen: alla baseline=0 → delta blir meningslöst.
+    # Första avklarade racet i säsongen: ingen snapshot före fönstret → delta blir meningslöst.
     # Låt delta=0 så Raket/Ankare faller tillbaka till ren WSX-veckopoäng.
-    use_baseline = bool(recent) and any(int(r.get("baseline_total") or 0) > 0 for r in rows)
-    baseline_ranking = (
-        _build_rank_map(rows, "baseline_total") if use_baseline else {}
-    )
+    baseline_ranking = _rank_snapshot_baseline(scope, recent) if recent else {}
+    use_baseline = bool(baseline_ranking)
 
     out = []
     for i, row in enumerate(current, 1):
@@ -4437,27 +4517,135 @@ def api_leagues_leaderboard():
     return jsonify(leaderboard)
 
 
-def _user_pick_total_points(user_id: int) -> int:
-    """Total pick points (non-WSX), deduped per competition — same logic as season leaderboard."""
-    all_scores = (
-        db.session.query(CompetitionScore)
-        .outerjoin(Competition, Competition.id == CompetitionScore.competition_id)
-        .filter(CompetitionScore.user_id == user_id)
-        .filter(
-            db.or_(
-                Competition.series.is_(None),
-                Competition.series != "WSX",
-            )
+AMA_TOTALS_SCOPE = "AMA"
+
+_USER_SEASON_TOTALS_READY = False
+
+
+def _wsx_totals_scope(year: int) -> str:
+    return f"WSX:{int(year)}"
+
+
+def _wsx_years_by_competition() -> dict[int, list[int]]:
+    """WSX competition_id → säsongsår, samma urval som _wsx_competitions_for_year."""
+    years = {
+        int(y)
+        for (y,) in db.session.query(Series.year).filter(Series.name == "WSX").distinct()
+        if y
+    }
+    years.update(
+        int(d.year)
+        for (d,) in db.session.query(Competition.event_date)
+        .filter(Competition.series == "WSX", Competition.event_date.isnot(None))
+        .distinct()
+    )
+    out: dict[int, list[int]] = defaultdict(list)
+    for year in sorted(years):
+        for comp in _wsx_competitions_for_year(year):
+            out[int(comp.id)].append(year)
+    return out
+
+
+def _latest_competition_scores(user_ids=None) -> dict[tuple[int, int | None], tuple[int, int, str | None]]:
+    """(user_id, competition_id) → (score_id, total_points, series); senaste score-raden vinner."""
+    q = db.session.query(
+        CompetitionScore.user_id,
+        CompetitionScore.competition_id,
+        CompetitionScore.score_id,
+        CompetitionScore.total_points,
+        Competition.series,
+    ).outerjoin(Competition, Competition.id == CompetitionScore.competition_id)
+    if user_ids is not None:
+        q = q.filter(CompetitionScore.user_id.in_(list(user_ids)))
+    latest: dict[tuple[int, int | None], tuple[int, int, str | None]] = {}
+    for user_id, comp_id, score_id, total, series in q.all():
+        if user_id is None:
+            continue
+        key = (int(user_id), comp_id)
+        prev = latest.get(key)
+        if prev is None or score_id > prev[0]:
+            latest[key] = (score_id, total or 0, series)
+    return latest
+
+
+def _user_season_totals_grouped(user_ids=None) -> dict[tuple[int, str], int]:
+    """
+    Pick totals per (user_id, scope) from one CompetitionScore query.
+
+    Senaste score-raden per (användare, tävling) vinner. AMA = allt utom WSX,
+    inklusive säsongsteam-straff (competition_id = None); WSX summeras per säsongsår.
+    """
+    latest = _latest_competition_scores(user_ids)
+    wsx_years = (
+        _wsx_years_by_competition()
+        if any(series == "WSX" for _sid, _t, series in latest.values())
+        else {}
+    )
+    totals: dict[tuple[int, str], int] = defaultdict(int)
+    for (user_id, comp_id), (_score_id, total, series) in latest.items():
+        if series == "WSX":
+            for year in wsx_years.get(int(comp_id), ()):
+                totals[(user_id, _wsx_totals_scope(year))] += int(total)
+        else:
+            totals[(user_id, AMA_TOTALS_SCOPE)] += int(total)
+    return dict(totals)
+
+
+def _refresh_user_season_totals(user_ids=None) -> None:
+    """Rewrite user_season_totals for user_ids (None = everyone). Caller commits."""
+    from sqlalchemy import insert as sa_insert
+
+    if user_ids is not None:
+        user_ids = {int(u) for u in user_ids if u is not None}
+        if not user_ids:
+            return
+    grouped = _user_season_totals_grouped(user_ids)
+    old_q = UserSeasonTotal.query
+    if user_ids is not None:
+        old_q = old_q.filter(UserSeasonTotal.user_id.in_(list(user_ids)))
+    old_q.delete(synchronize_session=False)
+    if grouped:
+        now = datetime.utcnow()
+        db.session.execute(
+            sa_insert(UserSeasonTotal),
+            [
+                {"user_id": user_id, "scope": scope, "total_points": total, "updated_at": now}
+                for (user_id, scope), total in grouped.items()
+            ],
         )
-        .all()
+
+
+def _ensure_user_season_totals() -> None:
+    """Create/backfill user_season_totals once (first boot with the table)."""
+    global _USER_SEASON_TOTALS_READY
+    if _USER_SEASON_TOTALS_READY:
+        return
+    try:
+        UserSeasonTotal.__table__.create(bind=db.engine, checkfirst=True)
+        has_rows = db.session.query(UserSeasonTotal.user_id).first() is not None
+        _USER_SEASON_TOTALS_READY = True
+        if not has_rows and db.session.query(CompetitionScore.score_id).first() is not None:
+            _refresh_user_season_totals()
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"user_season_totals ensure: {e}")
+
+
+def _season_totals_by_user(scope: str = AMA_TOTALS_SCOPE, user_ids=None) -> dict[int, int]:
+    """{user_id: total_points} för ett scope — en query mot user_season_totals."""
+    _ensure_user_season_totals()
+    q = db.session.query(UserSeasonTotal.user_id, UserSeasonTotal.total_points).filter(
+        UserSeasonTotal.scope == scope
     )
-    scores_by_comp: dict[int | None, CompetitionScore] = {}
-    for score in all_scores:
-        comp_id = score.competition_id
-        prev = scores_by_comp.get(comp_id)
-        if prev is None or score.score_id > prev.score_id:
-            scores_by_comp[comp_id] = score
-    return int(sum(s.total_points or 0 for s in scores_by_comp.values()))
+    if user_ids is not None:
+        q = q.filter(UserSeasonTotal.user_id.in_(list(user_ids)))
+    return {int(uid): int(total or 0) for uid, total in q.all()}
+
+
+def _user_pick_total_points(user_id: int) -> int:
+    """Total pick points (non-WSX), deduped per competition — same logic as season leaderboard."""
+    return int(_season_totals_by_user(AMA_TOTALS_SCOPE, [user_id]).get(int(user_id), 0))
 
 
 def _user_avatar_fields(user: User | None) -> dict[str, str | int | bool | None]:
@@ -4489,13 +4677,14 @@ def _league_member_standings(league_id: int) -> list[dict]:
     if not member_user_ids:
         return []
 
-    members = User.query.filter(User.id.in_(member_user_ids)).all()
+    members = User.query.options(load_user_picture()).filter(User.id.in_(member_user_ids)).all()
+    totals = _season_totals_by_user(AMA_TOTALS_SCOPE, member_user_ids)
     scored = [
         {
             "user_id": u.id,
             "username": u.username,
             "display_name": getattr(u, "display_name", None) or u.username,
-            "total_points": _user_pick_total_points(u.id),
+            "total_points": totals.get(int(u.id), 0),
             **_user_avatar_fields(u),
         }
         for u in members
@@ -4779,6 +4968,7 @@ def _league_picks_pulse(league_id: int, viewer_id: int) -> dict | None:
 
     member_rows = (
         db.session.query(User)
+        .options(load_user_picture())
         .join(LeagueMembership, User.id == LeagueMembership.user_id)
         .filter(LeagueMembership.league_id == league_id)
         .all()
@@ -4953,8 +5143,8 @@ def _league_rival_card(league_id: int, user_id: int, summary: dict) -> dict | No
             )
 
     h2h = _league_h2h(user_id, opp_id)
-    opp_user = User.query.get(opp_id)
-    viewer_user = User.query.get(user_id)
+    opp_user = User.query.options(load_user_picture()).get(opp_id)
+    viewer_user = User.query.options(load_user_picture()).get(user_id)
     return {
         "role": role,
         "opp_user_id": opp_id,
@@ -4978,6 +5168,7 @@ def _league_last_race_digest(league_id: int, user_id: int, summary: dict) -> dic
     comp = races[0]
     member_rows = (
         db.session.query(User)
+        .options(load_user_picture())
         .join(LeagueMembership, User.id == LeagueMembership.user_id)
         .filter(LeagueMembership.league_id == league_id)
         .all()
@@ -5294,48 +5485,13 @@ def _prior_competition_for_picks(target: Competition) -> Competition | None:
 
 
 def _crowd_scores_for_competition(target: Competition, rider_ids: set[int]) -> dict[int, float]:
+    # Snapshots once picks are locked, live picks before (crowd_pick_counts)
     scores = defaultdict(float)
-    comp_id = int(target.id)
-
-    # Prefer snapshots once picks are locked (stable even if live rows change later)
-    try:
-        locked = is_picks_locked(target)
-    except Exception:
-        locked = False
-
-    if locked:
-        try:
-            ensure_picks_snapshots_for_competition(comp_id, source="auto_lock")
-        except Exception:
-            pass
-        import json
-
-        snaps = PicksSnapshot.query.filter_by(competition_id=comp_id).all()
-        for s in snaps:
-            try:
-                payload = json.loads(s.payload_json or "{}")
-            except Exception:
-                continue
-            for p in payload.get("race_picks", []) or []:
-                rid = p.get("rider_id")
-                pred = p.get("predicted_position")
-                if rid is None or pred is None:
-                    continue
-                if rid not in rider_ids:
-                    continue
-                if int(pred) < 1:
-                    continue
-                scores[int(rid)] += max(0.0, 11.0 - float(min(int(pred), 10)))
-    else:
-        picks = RacePick.query.filter_by(competition_id=comp_id).all()
-        for p in picks:
-            if p.rider_id not in rider_ids:
-                continue
-            pred = p.predicted_position
-            if pred is None or pred < 1:
-                continue
-            # Higher weight for better predicted finishes (Borda-style, cap at top 10)
-            scores[p.rider_id] += max(0.0, 11.0 - float(min(pred, 10)))
+    for (pred, rid), n in _crowd_picks(target).race().items():
+        if rid not in rider_ids or pred < 1:
+            continue
+        # Higher weight for better predicted finishes (Borda-style, cap at top 10)
+        scores[rid] += n * max(0.0, 11.0 - float(min(pred, 10)))
     return dict(scores)
 
 
@@ -5535,8 +5691,7 @@ def _rider_ama_twin_avatar_rel(r: Rider) -> str | None:
         static_hit = _static_rider_file_url(twin_img)
         if static_hit:
             return _static_rel_from_public(static_hit)
-    twin_blob = getattr(best, "rider_image_data", None)
-    if twin_blob and str(twin_blob).strip().startswith("data:"):
+    if portrait_store.rider_portrait_src(best):
         return f"/rider_portrait/{int(best.id)}"
     try:
         src = template_rider_image_src(best)
@@ -5560,12 +5715,12 @@ def _rider_ama_twin_avatar_rel(r: Rider) -> str | None:
 
 
 def _rider_portrait_url(r: Rider) -> str | None:
-    """Data-URL eller relativ sökväg under static (samma som övriga API:er)."""
+    """Blob-URL eller relativ sökväg under static (samma som övriga API:er)."""
     if not r:
         return None
-    raw_blob = getattr(r, "rider_image_data", None)
-    if raw_blob and str(raw_blob).strip().startswith("data:"):
-        return str(raw_blob).strip()
+    blob_url = portrait_store.rider_portrait_src(r)
+    if blob_url:
+        return blob_url
 
     # 1) Egen image_url om filen faktiskt finns (undvik trasiga mellanslags-URL:er)
     img = (getattr(r, "image_url", None) or "").strip()
@@ -5741,7 +5896,8 @@ def template_rider_image_src(
         if static_u:
             return static_u
         if int(r.id) in db_portrait_ids:
-            return f"/rider_portrait/{r.id}"
+            sha = getattr(r, "portrait_hash", None)
+            return portrait_store.portrait_url(sha) if sha else f"/rider_portrait/{r.id}"
         url = _display_image_url_for_rider_row(
             r.id,
             has_db_portrait=False,
@@ -5821,6 +5977,7 @@ def _rider_portrait_payload(
         portrait_url = racerx_url or img_url or portrait_url
     return {
         "portrait_url": portrait_url or "",
+        "portrait_srcset": portrait_derivatives.srcset_for(portrait_url),
         "image_url": img_url or "",
         "racerx_portrait_url": racerx_url,
         "bike_brand": (rider.bike_brand or "").lower(),
@@ -5882,6 +6039,7 @@ def _display_image_url_for_rider_row(
     shim.coast_250 = coast_250
     shim.series_participation = series_participation
     shim.rider_image_data = None
+    shim.portrait_hash = None
     shim.image_url = None
     static_path = _resolve_rider_headshot_for_display(shim)
     if static_path:
@@ -5908,14 +6066,15 @@ def _display_image_url_for_rider_row(
     return None
 
 
-@app.route("/rider_portrait/<int:rider_id>")
-def rider_portrait(rider_id: int):
-    """Serverar DB-porträtt som bytes — undviker base64 i sid-JSON."""
-    import base64
-    import hashlib
-
-    rider = rider_query_for_list_ui().filter_by(id=rider_id).first_or_404()
-    portrait_id = rider_id
+def _resolve_portrait_entry(rider_id: int) -> tuple | None:
+    """
+    Var förarens porträtt finns (post för portrait_index) — tvillingsökning och
+    queries körs här, en gång per förare och dataversion, inte per request.
+    """
+    rider = rider_query_for_list_ui().filter_by(id=rider_id).first()
+    if rider is None:
+        return None
+    portrait_id = int(rider_id)
     try:
         from racerx_rider_bio import find_best_portrait_rider_for_name, find_rider_twins
 
@@ -5926,74 +6085,101 @@ def rider_portrait(rider_id: int):
     except Exception:
         pass
 
-    for pid in dict.fromkeys((int(portrait_id), int(rider_id))):
-        img_u = db.session.query(Rider.image_url).filter_by(id=pid).scalar()
-        static_u = _static_rider_file_url(str(img_u or "").strip() or None)
+    pids = tuple(dict.fromkeys((portrait_id, int(rider_id))))
+    rows = {
+        int(r.id): r
+        for r in db.session.query(
+            Rider.id,
+            Rider.image_url,
+            Rider.portrait_hash,
+        ).filter(Rider.id.in_(pids))
+    }
+    legacy_ids = portrait_store._legacy_rider_ids()
+    for pid in pids:
+        row = rows.get(pid)
+        static_u = _static_rider_file_url(str(row.image_url or "").strip() or None) if row else None
         if static_u:
-            return redirect(static_u, code=302)
+            return ("static", static_u)
+    for pid in pids:
+        row = rows.get(pid)
+        if row is not None and row.portrait_hash:
+            return ("blob", row.portrait_hash)
+    primary = rows.get(portrait_id)
+    if primary is not None and portrait_id in legacy_ids:
+        return ("migrate", portrait_id)
+    ext_s = str(primary.image_url or "").strip() if primary is not None else ""
+    if ext_s.startswith(("http://", "https://")):
+        return ("external", ext_s)
+    return ("missing",)
+
+
+_PORTRAIT_INDEX = PortraitIndex(
+    _resolve_portrait_entry,
+    check_interval=float(os.getenv("PORTRAIT_INDEX_CHECK_SEC") or 5),
+)
 
-    for pid in dict.fromkeys((int(portrait_id), int(rider_id))):
-        hit = _cached_portrait_file(pid)
+
+@app.route("/rider_portrait/<int:rider_id>")
+def rider_portrait(rider_id: int):
+    """Serverar DB-porträtt ur blob-lagret (portrait_store) — ingen base64 i sid-JSON."""
+    entry = _PORTRAIT_INDEX.get(rider_id)
+    if entry is None:
+        return Response(status=404)
+    kind = entry[0]
+    if kind in ("static", "external"):
+        return redirect(entry[1], code=302)
+    if kind == "blob":
+        hit = portrait_store.portrait_file(entry[1])
         if hit:
-            return _portrait_file_response(hit[0], hit[1])
-
-    with _PORTRAIT_DECODE_SEM:
-        for pid in dict.fromkeys((int(portrait_id), int(rider_id))):
-            hit = _cached_portrait_file(pid)
-            if hit:
-                return _portrait_file_response(hit[0], hit[1])
-
-        raw = db.session.query(Rider.rider_image_data).filter_by(id=portrait_id).scalar()
-        s = str(raw or "").strip()
-        del raw
-        if not s.startswith("data:image"):
-            ext = (
-                db.session.query(Rider.image_url)
-                .filter_by(id=portrait_id)
-                .scalar()
-            )
-            ext_s = str(ext or "").strip()
-            if ext_s.startswith("http://") or ext_s.startswith("https://"):
-                return redirect(ext_s, code=302)
-            return Response(status=404)
-        try:
-            etag = '"' + hashlib.sha1(s.encode("utf-8")).hexdigest() + '"'
-            cache_bin, cache_mime = _portrait_cache_paths(portrait_id, etag)
-            inm = request.headers.get("If-None-Match")
-            if inm and inm == etag:
-                resp = Response(status=304)
-                resp.headers["ETag"] = etag
-                resp.headers["Cache-Control"] = "public, max-age=2592000, immutable"
-                return resp
-
-            if os.path.isfile(cache_bin):
-                mime = "image/jpeg"
-                if os.path.isfile(cache_mime):
-                    with open(cache_mime, encoding="utf-8") as f:
-                        mime = (f.read() or mime).strip() or mime
-                return _portrait_file_response(cache_bin, mime, etag)
-
-            meta, b64part = s.split(",", 1)
-            del s
-            mime = "image/jpeg"
-            if ";" in meta:
-                mime = meta[5:].split(";")[0].strip() or mime
-            blob = base64.b64decode(b64part)
-            del b64part, meta
+            return _portrait_file_response(hit[0], hit[1], entry[1])
+        _PORTRAIT_INDEX.invalidate(rider_id)
+        return Response(status=404)
+    if kind == "migrate":
+        # Ej migrerad: flytta ut base64-blobben till lagret en gång, servera sedan filen
+        sha = None
+        with _PORTRAIT_DECODE_SEM:
             try:
-                with open(cache_bin, "wb") as f:
-                    f.write(blob)
-                with open(cache_mime, "w", encoding="utf-8") as f:
-                    f.write(mime)
-            except OSError:
-                pass
-            resp = make_response(blob)
-            resp.headers["Content-Type"] = mime
-            resp.headers["ETag"] = etag
-            resp.headers["Cache-Control"] = "public, max-age=2592000, immutable"
-            return resp
-        except Exception:
-            return Response(status=404)
+                sha = portrait_store.migrate_rider(entry[1])
+            except Exception as e:
+                db.session.rollback()
+                print(f"rider_portrait migrate {entry[1]}: {e}")
+        hit = portrait_store.portrait_file(sha or "")
+        if hit:
+            _PORTRAIT_INDEX.set(rider_id, ("blob", sha))
+            return _portrait_file_response(hit[0], hit[1], sha)
+        _PORTRAIT_INDEX.invalidate(rider_id)
+    return Response(status=404)
+
+
+@app.route("/portraits/<sha>")
+def portrait_blob(sha: str):
+    """Content-addressed porträtt — URL:en byts när bilden byts, så den cachas hårt."""
+    hit = portrait_store.portrait_file(sha)
+    if not hit:
+        return Response(status=404)
+    return _portrait_file_response(hit[0], hit[1], sha)
+
+
+@app.route("/portraits/<sha>/<int:width>.webp")
+def portrait_blob_variant(sha: str, width: int):
+    """Tumnagel för srcset; AVIF till klienter som accepterar det (om Pillow kan skriva AVIF)."""
+    if not portrait_store.is_hash(sha):
+        return Response(status=404)
+    fmt = "webp"
+    if "image/avif" in (request.headers.get("Accept") or "") and portrait_derivatives.avif_supported():
+        fmt = "avif"
+    path = portrait_derivatives.blob_variant(sha, width, fmt)
+    if not path:
+        return Response(status=404)
+    resp = _portrait_file_response(path, f"image/{fmt}", f"{sha}.{width}.{fmt}")
+    resp.headers["Vary"] = "Accept"
+    return resp
+
+
+@app.template_global()
+def portrait_srcset(url: str | None) -> str:
+    """srcset för en porträtt-URL (tom om tumnaglar saknas) — se portrait_derivatives.py."""
+    return portrait_derivatives.srcset_for(url)
 
 
 def _resolve_rider_headshot_for_display(rider: Rider) -> str | None:
@@ -6003,13 +6189,11 @@ def _resolve_rider_headshot_for_display(rider: Rider) -> str | None:
     """
     if not rider:
         return None
-    for attr in ("rider_image_data", "image_url"):
-        v = getattr(rider, attr, None)
-        if not v:
-            continue
-        s = str(v).strip()
-        if not s:
-            continue
+    blob_url = portrait_store.rider_portrait_src(rider)
+    if blob_url:
+        return blob_url
+    s = str(getattr(rider, "image_url", None) or "").strip()
+    if s:
         if s.startswith("data:"):
             return s
         if s.startswith("http://") or s.startswith("https://"):
@@ -6189,12 +6373,16 @@ def _rank_bucket(
 
 def build_power_ranking_payload(target: Competition) -> dict:
     """Build power ranking JSON (cached)."""
-    cache_key = int(target.id)
-    now = time.time()
-    cached = _POWER_RANKING_CACHE.get(cache_key)
-    if cached and cached[0] > now:
-        return cached[1]
+    cid = int(target.id)
+    return _HOMEPAGE_REFRESH.get(
+        _POWER_RANKING_CACHE,
+        _power_ranking_cache_key(cid),
+        lambda: _build_power_ranking_payload(db.session.get(Competition, cid)),
+        stale_key=cid,
+    )
+
 
+def _build_power_ranking_payload(target: Competition) -> dict:
     series_code = _normalize_countdown_series(getattr(target, "series", None)) or getattr(
         target, "series", None
     )
@@ -6311,7 +6499,6 @@ def build_power_ranking_payload(target: Competition) -> dict:
         )
         payload["ranking_source"] = "mixed"
 
-    _POWER_RANKING_CACHE[cache_key] = (now + _POWER_RANKING_CACHE_TTL, payload)
     return payload
 
 
@@ -6686,8 +6873,8 @@ def _challenge_picks_summary(ch: LeagueChallenge) -> dict:
 
 def _serialize_challenge(ch: LeagueChallenge, viewer_id: int) -> dict:
     comp = Competition.query.get(ch.competition_id)
-    challenger = User.query.get(ch.challenger_id)
-    challenged = User.query.get(ch.challenged_id)
+    challenger = User.query.options(load_user_picture()).get(ch.challenger_id)
+    challenged = User.query.options(load_user_picture()).get(ch.challenged_id)
     type_meta = CHALLENGE_TYPE_META.get(ch.challenge_type or "", {})
     winner = User.query.get(ch.winner_id) if ch.winner_id else None
 
@@ -6821,6 +7008,7 @@ def _league_challenges_context(league_id: int, user_id: int) -> dict:
 
     members = (
         db.session.query(User)
+        .options(load_user_picture())
         .join(LeagueMembership, User.id == LeagueMembership.user_id)
         .filter(LeagueMembership.league_id == league_id, User.id != user_id)
         .order_by(User.username)
@@ -7351,6 +7539,7 @@ def league_detail_page(league_id):
 
     member_users = (
         db.session.query(User)
+        .options(load_user_picture())
         .join(LeagueMembership, User.id == LeagueMembership.user_id)
         .filter(LeagueMembership.league_id == league_id)
         .order_by(User.username)
@@ -7796,63 +7985,57 @@ def build_season_team_competition_points(user_id: int) -> tuple[dict | None, str
     if not team:
         return None, "no_team"
 
-    team_riders = SeasonTeamRider.query.filter_by(season_team_id=team.id).all()
-    rider_ids = [tr.rider_id for tr in team_riders]
+    _ensure_season_rider_points()
+    rider_ids = _team_rider_rows(team_ids=[team.id]).get(team.id, [])
+    riders = {
+        r.id: r
+        for r in rider_query_for_list_ui().filter(Rider.id.in_(rider_ids or [0])).all()
+    }
+    team_classes = {rid: riders[rid].class_name for rid in rider_ids if rid in riders}
+    # Precomputed per-rider, per-competition points (one query for the whole season)
+    position_by_comp: dict[int, dict[int, int | None]] = defaultdict(dict)
+    points_by_comp: dict[int, dict[int, int]] = defaultdict(dict)
+    if rider_ids:
+        for comp_id, rider_id, position, points in (
+            db.session.query(
+                SeasonRiderPoints.competition_id,
+                SeasonRiderPoints.rider_id,
+                SeasonRiderPoints.position,
+                SeasonRiderPoints.points,
+            )
+            .filter(SeasonRiderPoints.rider_id.in_(rider_ids))
+            .all()
+        ):
+            position_by_comp[comp_id][rider_id] = position
+            points_by_comp[comp_id][rider_id] = int(points or 0)
+    comps_with_results = {
+        cid for (cid,) in db.session.query(SeasonRiderPoints.competition_id).distinct().all()
+    }
     competitions = Competition.query.order_by(Competition.event_date.asc().nulls_last()).all()
 
     competition_points = []
     for comp in competitions:
         comp_points = 0
         rider_breakdown = []
-        bonus_points = 0
+        positions = position_by_comp.get(comp.id, {})
 
         for rider_id in rider_ids:
-            result = CompetitionResult.query.filter_by(
-                rider_id=rider_id, competition_id=comp.id
-            ).first()
-            if result:
-                rider = Rider.query.get(rider_id)
-                points = calculate_rider_points_for_position(result.position)
+            if rider_id in positions:
+                rider = riders.get(rider_id)
+                points = points_by_comp[comp.id][rider_id]
                 comp_points += points
                 rider_breakdown.append(
                     {
                         "rider_name": rider.name if rider else f"Rider {rider_id}",
                         "rider_number": rider.rider_number if rider else None,
                         "class_name": rider.class_name if rider else None,
-                        "position": result.position,
+                        "position": positions[rider_id],
                         "points": points,
                     }
                 )
 
-        if comp.series == "SMX" or comp.series is None:
-            riders_by_class = {}
-            for tr in team_riders:
-                rider = Rider.query.get(tr.rider_id)
-                if rider:
-                    riders_by_class.setdefault(rider.class_name, []).append(rider.id)
-
-            competition_bonuses = {"450cc": [], "250cc": []}
-            for rider_id in rider_ids:
-                result = CompetitionResult.query.filter_by(
-                    rider_id=rider_id, competition_id=comp.id
-                ).first()
-                if result:
-                    rider = Rider.query.get(rider_id)
-                    if rider and result.position and result.position <= 6:
-                        competition_bonuses[rider.class_name].append(rider_id)
-
-            for class_name in ("450cc", "250cc"):
-                if class_name in riders_by_class:
-                    team_riders_in_class = set(riders_by_class[class_name])
-                    top6_riders_in_class = set(competition_bonuses[class_name])
-                    if team_riders_in_class and team_riders_in_class.issubset(
-                        top6_riders_in_class
-                    ):
-                        bonus_points += 50
+        bonus_points = _season_team_bonus(comp.series, team_classes, positions)
 
-        has_results = (
-            CompetitionResult.query.filter_by(competition_id=comp.id).first() is not None
-        )
         competition_points.append(
             {
                 "competition_id": comp.id,
@@ -7864,7 +8047,7 @@ def build_season_team_competition_points(user_id: int) -> tuple[dict | None, str
                 "total_points": comp_points + bonus_points,
                 "rider_points": comp_points,
                 "bonus_points": bonus_points,
-                "has_results": has_results,
+                "has_results": comp.id in comps_with_results,
                 "rider_breakdown": rider_breakdown,
             }
         )
@@ -8108,14 +8291,206 @@ def _load_unified_leaderboard_history_baseline() -> dict[str, int]:
         return {}
 
 
+_RANK_SNAPSHOTS_READY = False
+
+
+def _pack_rank_snapshot(rows: list[dict]) -> str:
+    """Rank rows ({"id", "total_points"}) → platt JSON-lista [user_id, rank, total, ...]."""
+    import json
+
+    ranked = sorted(rows, key=lambda r: _leaderboard_sort_key(r, "total_points"))
+    flat: list[int] = []
+    for rank, row in enumerate(ranked, 1):
+        flat.extend((int(row["id"]), rank, int(row["total_points"] or 0)))
+    return json.dumps(flat, separators=(",", ":"))
+
+
+def _unpack_rank_snapshot(payload: str | None) -> dict[str, int]:
+    """Packed snapshot → {str(user_id): rank} (samma form som _build_rank_map)."""
+    import json
+
+    flat = json.loads(payload or "[]")
+    return {str(int(flat[i])): int(flat[i + 1]) for i in range(0, len(flat) - 2, 3)}
+
+
+def _rank_rows_for_scope(scope: str) -> list[dict]:
+    """Current leaderboard rows for a totals scope — AMA lists every user, WSX only users with scores."""
+    totals = _season_totals_by_user(scope)
+    if scope != AMA_TOTALS_SCOPE:
+        return [{"id": uid, "total_points": pts} for uid, pts in totals.items()]
+    return [
+        {"id": int(uid), "total_points": totals.get(int(uid), 0)}
+        for (uid,) in db.session.query(User.id).all()
+    ]
+
+
+def _competition_totals_scopes(comp: Competition, wsx_years: dict[int, list[int]] | None = None) -> list[str]:
+    if comp.series != "WSX":
+        return [AMA_TOTALS_SCOPE]
+    if wsx_years is None:
+        wsx_years = _wsx_years_by_competition()
+    return [_wsx_totals_scope(year) for year in wsx_years.get(int(comp.id), ())]
+
+
+def _backfill_rank_snapshots() -> None:
+    """
+    Bygg snapshots för alla redan poängsatta tävlingar i kronologisk ordning
+    (kumulativa totals ur en CompetitionScore-query). Caller commits.
+    """
+    from sqlalchemy import insert as sa_insert
+
+    scored_ids = {
+        int(cid)
+        for (cid,) in db.session.query(CompetitionResult.competition_id)
+        .filter(
+            CompetitionResult.competition_id.in_(
+                db.session.query(CompetitionScore.competition_id).distinct()
+            )
+        )
+        .distinct()
+    }
+    if not scored_ids:
+        return
+    comps = Competition.query.filter(Competition.id.in_(scored_ids)).all()
+    comps.sort(key=lambda c: (c.event_date is None, c.event_date or date.max, int(c.id)))
+    wsx_years = _wsx_years_by_competition()
+
+    by_comp: dict[int | None, dict[int, int]] = defaultdict(dict)
+    for (user_id, comp_id), (_score_id, total, _series) in _latest_competition_scores().items():
+        by_comp[comp_id][user_id] = int(total)
+
+    # AMA-listan = alla användare (även 0 p) inkl. säsongsteam-straff, precis som leaderboarden
+    running: dict[str, dict[int, int]] = defaultdict(dict)
+    ama = running[AMA_TOTALS_SCOPE]
+    for (uid,) in db.session.query(User.id).all():
+        ama[int(uid)] = 0
+    for uid, total in by_comp.get(None, {}).items():
+        if uid in ama:
+            ama[uid] += total
+
+    now = datetime.utcnow()
+    rows = []
+    for comp in comps:
+        for scope in _competition_totals_scopes(comp, wsx_years):
+            acc = running[scope]
+            for uid, total in by_comp.get(int(comp.id), {}).items():
+                if scope == AMA_TOTALS_SCOPE and uid not in acc:
+                    continue
+                acc[uid] = acc.get(uid, 0) + total
+            rows.append(
+                {
+                    "competition_id": int(comp.id),
+                    "scope": scope,
+                    "payload_json": _pack_rank_snapshot(
+                        [{"id": uid, "total_points": pts} for uid, pts in acc.items()]
+                    ),
+                    "created_at": now,
+                }
+            )
+    if rows:
+        db.session.execute(sa_insert(LeaderboardRankSnapshot), rows)
+
+
+def _ensure_rank_snapshots() -> None:
+    """Create/backfill leaderboard_rank_snapshots once (first boot with the table)."""
+    global _RANK_SNAPSHOTS_READY
+    if _RANK_SNAPSHOTS_READY:
+        return
+    try:
+        LeaderboardRankSnapshot.__table__.create(bind=db.engine, checkfirst=True)
+        has_rows = db.session.query(LeaderboardRankSnapshot.competition_id).first() is not None
+        _RANK_SNAPSHOTS_READY = True
+        if not has_rows:
+            _backfill_rank_snapshots()
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"leaderboard_rank_snapshots ensure: {e}")
+
+
+def _write_rank_snapshot(comp_id: int) -> None:
+    """
+    Spara rank-snapshot efter att comp_id poängsatts. Poängsätts tävlingen om
+    (rättade resultat) skrivs dess snapshot över; finns snapshots för senare
+    tävlingar i samma scope byggs alla om kronologiskt, eftersom de är kumulativa.
+    Caller commits.
+    """
+    _ensure_rank_snapshots()
+    comp = Competition.query.get(comp_id)
+    if not comp:
+        return
+    scopes = _competition_totals_scopes(comp)
+    if not scopes:
+        return
+
+    def _order(event_date, cid) -> tuple:
+        return (event_date is None, event_date or date.max, int(cid))
+
+    this = _order(comp.event_date, comp.id)
+    later = any(
+        _order(event_date, cid) > this
+        for cid, event_date in db.session.query(LeaderboardRankSnapshot.competition_id, Competition.event_date)
+        .join(Competition, Competition.id == LeaderboardRankSnapshot.competition_id)
+        .filter(LeaderboardRankSnapshot.scope.in_(scopes))
+    )
+    if later:
+        LeaderboardRankSnapshot.query.delete(synchronize_session=False)
+        _backfill_rank_snapshots()
+        return
+    LeaderboardRankSnapshot.query.filter(
+        LeaderboardRankSnapshot.competition_id == comp_id,
+        LeaderboardRankSnapshot.scope.in_(scopes),
+    ).delete(synchronize_session=False)
+    for scope in scopes:
+        db.session.add(
+            LeaderboardRankSnapshot(
+                competition_id=comp_id,
+                scope=scope,
+                payload_json=_pack_rank_snapshot(_rank_rows_for_scope(scope)),
+            )
+        )
+
+
+def _rank_snapshot_baseline(scope: str, recent_comp_ids=None) -> dict[str, int]:
+    """
+    Baseline-rank för leaderboard-delta ur sparade snapshots.
+
+    Med recent_comp_ids: senaste snapshot före fönstret (rank före veckans race).
+    Utan: näst senaste snapshot, dvs. rörelsen från senaste racet.
+    """
+    _ensure_rank_snapshots()
+    metas = (
+        db.session.query(LeaderboardRankSnapshot.competition_id, Competition.event_date)
+        .join(Competition, Competition.id == LeaderboardRankSnapshot.competition_id)
+        .filter(LeaderboardRankSnapshot.scope == scope)
+        .all()
+    )
+    metas.sort(key=lambda m: (m[1] is None, m[1] or date.max, int(m[0])))
+    recent = {int(x) for x in (recent_comp_ids or ())}
+    if recent:
+        before = [int(cid) for cid, _d in metas if int(cid) not in recent]
+        pick = before[-1] if before else None
+    else:
+        pick = int(metas[-2][0]) if len(metas) >= 2 else None
+    if pick is None:
+        return {}
+    payload = (
+        db.session.query(LeaderboardRankSnapshot.payload_json)
+        .filter(
+            LeaderboardRankSnapshot.competition_id == pick,
+            LeaderboardRankSnapshot.scope == scope,
+        )
+        .scalar()
+    )
+    return _unpack_rank_snapshot(payload)
+
+
 def calculate_leaderboard_deltas():
     """Shared function to calculate leaderboard deltas - ensures consistency between get_weekly_fun_stats and get_season_leaderboard"""
     from datetime import datetime, timedelta
 
     db.session.rollback()
 
-    baseline_from_history = _load_unified_leaderboard_history_baseline()
-
     # Samma 7-dagsfönster som get_weekly_fun_stats (event_date, icke-WSX, ej framtida)
     week_ago_date = (datetime.utcnow() - timedelta(days=7)).date()
     today_utc = datetime.utcnow().date()
@@ -8152,57 +8527,18 @@ def calculate_leaderboard_deltas():
         .all()
     )
 
-    # Per user: total + poäng från "denna veckas" tävlingar (för baslinjerank)
-    user_scores_list = []
-    for user_row in user_scores:
-        user_id = user_row.id
-        total = 0
-        recent_week_points = 0
-
-        try:
-            total = _user_pick_total_points(user_id)
-            if recent_comp_ids:
-                all_scores = (
-                    db.session.query(CompetitionScore)
-                    .outerjoin(Competition, Competition.id == CompetitionScore.competition_id)
-                    .filter(CompetitionScore.user_id == user_id)
-                    .filter(
-                        db.or_(
-                            Competition.series.is_(None),
-                            Competition.series != "WSX",
-                        )
-                    )
-                    .all()
-                )
-                scores_by_comp: dict[int | None, CompetitionScore] = {}
-                for score in all_scores:
-                    comp_id = score.competition_id
-                    prev = scores_by_comp.get(comp_id)
-                    if prev is None or score.score_id > prev.score_id:
-                        scores_by_comp[comp_id] = score
-                recent_week_points = sum(
-                    (s.total_points or 0)
-                    for cid, s in scores_by_comp.items()
-                    if cid in recent_comp_ids
-                )
-        except Exception as e:
-            print(f"Error calculating points for user {user_row.username}: {e}")
-            total = 0
-            recent_week_points = 0
-
-        baseline_total = max(0, total - recent_week_points)
-
-        user_scores_list.append(
-            {
-                "id": user_id,
-                "username": user_row.username,
-                "display_name": getattr(user_row, "display_name", None) or user_row.username,
-                "team_name": user_row.team_name,
-                "total_points": total,
-                "baseline_total": baseline_total,
-                "recent_week_points": recent_week_points,
-            }
-        )
+    # Per user: total ur user_season_totals (en query)
+    totals = _season_totals_by_user(AMA_TOTALS_SCOPE)
+    user_scores_list = [
+        {
+            "id": user_row.id,
+            "username": user_row.username,
+            "display_name": getattr(user_row, "display_name", None) or user_row.username,
+            "team_name": user_row.team_name,
+            "total_points": totals.get(int(user_row.id), 0),
+        }
+        for user_row in user_scores
+    ]
 
     # En rad per användare (outerjoin + group_by kan ge dubbletter om data är konstig)
     by_uid: dict[int, dict] = {}
@@ -8217,53 +8553,17 @@ def calculate_leaderboard_deltas():
         user_scores_list, key=lambda x: _leaderboard_sort_key(x, "total_points")
     )
 
-    # Finns avklarade race i fönstret men ingen har fått veckopoäng i CompetitionScore ännu
-    # (t.ex. perfekt gissning räknas från picks — då är baseline_total == total för alla och
-    # pilar/raket/ankare blir meningslösa). Använd då samma fallback som utan veckofönster.
-    use_recent_window_baseline = bool(recent_comp_ids) and any(
-        int(u.get("recent_week_points") or 0) > 0 for u in user_scores_list
-    )
-
     baseline_ranking: dict[str, int] = {}
-    if use_recent_window_baseline:
-        # Veckans prestationer: jämför mot rank *före* denna veckas race (samma poängkälla som leaderboard).
-        baseline_ranking = _build_rank_map(user_scores_list, "baseline_total")
-    elif baseline_from_history:
-        baseline_ranking = dict(baseline_from_history)
-    else:
-        # Inga avklarade race i veckofönstret → jämför mot rank med bara äldre tävlingar (Raket/Ankare dör inte)
-        previous_competitions = (
-            Competition.query.filter(
-                db.or_(
-                    Competition.series.is_(None),
-                    Competition.series != "WSX",
-                ),
-                Competition.event_date.isnot(None),
-                Competition.event_date < week_ago_date,
-            )
-            .order_by(Competition.event_date.asc())
-            .all()
+    if recent_comp_ids:
+        # Veckans prestationer: jämför mot rank-snapshot *före* denna veckas race.
+        baseline_ranking = _rank_snapshot_baseline(AMA_TOTALS_SCOPE, recent_comp_ids)
+    if not baseline_ranking:
+        # Inga avklarade race i veckofönstret → admin-snapshot, annars rörelsen från senaste racet
+        # (Raket/Ankare dör inte)
+        baseline_ranking = (
+            _load_unified_leaderboard_history_baseline()
+            or _rank_snapshot_baseline(AMA_TOTALS_SCOPE)
         )
-        previous_comp_ids = [c.id for c in previous_competitions]
-        previous_rows = []
-        for user_data in user_scores_list:
-            user_id = user_data["id"]
-            previous_points = 0
-            if previous_comp_ids:
-                previous_scores = (
-                    CompetitionScore.query.filter(
-                        CompetitionScore.user_id == user_id,
-                        CompetitionScore.competition_id.in_(previous_comp_ids),
-                    ).all()
-                )
-                scores_by_comp = {}
-                for score in previous_scores:
-                    comp_id = score.competition_id
-                    if comp_id not in scores_by_comp or score.score_id > scores_by_comp[comp_id].score_id:
-                        scores_by_comp[comp_id] = score
-                previous_points = sum(s.total_points or 0 for s in scores_by_comp.values())
-            previous_rows.append({"id": user_id, "total_points": previous_points})
-        baseline_ranking = _build_rank_map(previous_rows, "total_points")
 
     leaderboard_data = []
     for i, user_row in enumerate(current_leaderboard, 1):
@@ -9206,7 +9506,7 @@ def season_team_builder():
                 'class': rider.class_name,
                 'rider_number': rider.rider_number,
                 'bike_brand': rider.bike_brand,
-                'image_url': getattr(rider, 'rider_image_data', None) or rider.image_url,
+                'image_url': portrait_store.rider_portrait_src(rider) or rider.image_url,
                 'price': rider.price,
                 'coast_250': rider.coast_250
             })
@@ -9266,6 +9566,9 @@ def create_season_team():
                 rider_id=rider_id
             )
             db.session.add(team_rider)
+        db.session.flush()
+        _ensure_season_rider_points()
+        _rebuild_season_team_totals([new_team.id])
         
         db.session.commit()
         return jsonify({"success": True, "message": "Säsongsteam skapat!"})
@@ -9451,8 +9754,12 @@ def finished_series_page():
             
             # Convert to list and sort by total points
             leaderboard = []
+            users_by_id = {
+                u.id: u
+                for u in User.query.options(load_user_picture()).filter(User.id.in_(list(user_scores))).all()
+            }
             for user_id, stats in user_scores.items():
-                user = User.query.get(user_id)
+                user = users_by_id.get(user_id)
                 if user:
                     leaderboard.append({
                         'user_id': user_id,
@@ -9580,8 +9887,12 @@ def finished_series_detail_page(series_id):
         
         # Convert to list and sort by total points
         leaderboard = []
+        users_by_id = {
+            u.id: u
+            for u in User.query.options(load_user_picture()).filter(User.id.in_(list(user_scores))).all()
+        }
         for user_id, stats in user_scores.items():
-            user = User.query.get(user_id)
+            user = users_by_id.get(user_id)
             if user:
                 leaderboard.append({
                     'user_id': user_id,
@@ -10148,12 +10459,7 @@ def race_picks_page(competition_id):
         ids_with_db_portrait = frozenset(
             row[0]
             for row in db.session.query(Rider.id)
-            .filter(
-                Rider.id.in_(pick_rider_ids),
-                Rider.rider_image_data.isnot(None),
-                Rider.rider_image_data != "",
-                Rider.rider_image_data.like("data:image%"),
-            )
+            .filter(Rider.id.in_(pick_rider_ids), portrait_store.has_portrait_clause())
             .all()
         )
 
@@ -10390,6 +10696,7 @@ def create_league():
         db.session.flush()
         db.session.add(LeagueMembership(league_id=league.id, user_id=session["user_id"]))
         db.session.commit()
+        refresh_league_scores([league.id])
         
         print(f"League created successfully: {name} with code {code}")
         flash("Ligan skapades!", "success")
@@ -10435,6 +10742,7 @@ def join_league():
         return redirect(url_for("leagues_page"))
     db.session.add(LeagueMembership(league_id=league.id, user_id=session["user_id"]))
     db.session.commit()
+    refresh_league_scores([league.id])
     flash("Du gick med i ligan!", "success")
     return redirect(url_for("league_detail_page", league_id=league.id))
 
@@ -10451,6 +10759,7 @@ def leave_league(league_id):
     if mem:
         db.session.delete(mem)
         db.session.commit()
+        refresh_league_scores([league_id])
         flash("Du har lämnat ligan.", "success")
     return redirect(url_for("leagues_page"))
 
@@ -10533,6 +10842,7 @@ def delete_league(league_id):
         # Delete all related data first (same as admin_delete_league)
         LeagueRequest.query.filter_by(league_id=league_id).delete()
         LeagueMembership.query.filter_by(league_id=league_id).delete()
+        LeagueCompetitionScore.query.filter_by(league_id=league_id).delete()
         
         # Delete the league
         db.session.delete(league)
@@ -10647,6 +10957,13 @@ def save_season_team():
 
         for r in riders:
             db.session.add(SeasonTeamRider(season_team_id=team.id, rider_id=r.id))
+        db.session.flush()
+        # Team total follows the current roster (precomputed season_rider_points)
+        _ensure_season_rider_points()
+        _rebuild_season_team_totals([team.id])
+        if is_team_change and penalty_points > 0:
+            _ensure_user_season_totals()
+            _refresh_user_season_totals([uid])
 
         db.session.commit()
         
@@ -11255,12 +11572,14 @@ def _picks_series_for_rider(rider: Rider) -> str:
     return "SX"
 
 
-def _rider_class_by_id() -> dict[int, str]:
-    """Id → class_name utan att ladda rider_image_data (OOM-skydd)."""
-    return {
-        int(rid): str(cls or "")
-        for rid, cls in db.session.query(Rider.id, Rider.class_name).all()
-    }
+def _rider_class_by_id(rider_ids: set[int] | None = None) -> dict[int, str]:
+    """Id → class_name utan att ladda rider_image_data (OOM-skydd). rider_ids begränsar urvalet."""
+    q = db.session.query(Rider.id, Rider.class_name)
+    if rider_ids is not None:
+        if not rider_ids:
+            return {}
+        q = q.filter(Rider.id.in_(rider_ids))
+    return {int(rid): str(cls or "") for rid, cls in q.all()}
 
 
 def _rider_pick_class_names(rider: Rider, *, is_wsx: bool) -> set[str]:
@@ -11288,38 +11607,16 @@ def _rider_pick_stats_for_comp(rider: Rider, comp: Competition) -> dict[str, Any
     if not allowed:
         return None
 
-    class_by_id = _rider_class_by_id()
-    n_lineups = 0
-    picked = 0
-    p1 = 0
+    agg = _crowd_picks(comp)
+    n_lineups = sum(agg.lineups(cls) for cls in allowed)
     pos_counts: Counter[int] = Counter()
-    holeshot = 0
-
-    for _uid, payload in _iter_crowd_pick_payloads(int(comp.id), ensure_snapshots=True):
-        race_picks = payload.get("race_picks") or []
-        has_lineup = False
-        for p in race_picks:
-            try:
-                rid = int(p.get("rider_id"))
-                pos = int(p.get("predicted_position"))
-            except (TypeError, ValueError):
-                continue
-            r_cls = (class_by_id.get(rid) or "").strip().lower()
-            if not r_cls or r_cls not in allowed:
-                continue
-            has_lineup = True
+    if (rider.class_name or "").strip().lower() in allowed:
+        for (pos, rid), n in agg.race().items():
             if rid == rider_id:
-                picked += 1
-                pos_counts[pos] += 1
-                if pos == 1:
-                    p1 += 1
-        if has_lineup:
-            n_lineups += 1
-
-        holos = payload.get("holeshot_picks") or {}
-        for _cls, rid in holos.items():
-            if rid is not None and int(rid) == rider_id:
-                holeshot += 1
+                pos_counts[pos] += n
+    picked = sum(pos_counts.values())
+    p1 = pos_counts.get(1, 0)
+    holeshot = sum(n for (_cls, rid), n in agg.holeshots().items() if rid == rider_id)
 
     if n_lineups <= 0:
         return None
@@ -11383,11 +11680,11 @@ def _current_racing_season_year() -> int:
 
 def _accumulate_championship_totals(*, year: int | None = None) -> dict[tuple, dict[int, float]]:
     """Samma bucket-logik som race results — valfritt filter på kalenderår."""
-    if year is not None:
-        now = time.time()
-        cached = _CHAMPIONSHIP_TOTALS_CACHE.get(int(year))
-        if cached and cached[0] > now:
-            return cached[1]
+    cache_key = (int(year), *dv.versions(dv.RESULTS, dv.ROSTER)) if year is not None else None
+    if cache_key is not None:
+        cached = _CHAMPIONSHIP_TOTALS_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
 
     from collections import defaultdict
 
@@ -11427,8 +11724,8 @@ def _accumulate_championship_totals(*, year: int | None = None) -> dict[tuple, d
         totals[bucket][int(rider.id)] += pts
 
     result = {k: dict(v) for k, v in totals.items()}
-    if year is not None:
-        _CHAMPIONSHIP_TOTALS_CACHE[int(year)] = (time.time() + _HOMEPAGE_CACHE_TTL, result)
+    if cache_key is not None:
+        _CHAMPIONSHIP_TOTALS_CACHE.set(cache_key, result)
     return result
 
 
@@ -11590,6 +11887,7 @@ def _patch_spotlight_portraits(
                     url = f"/static/{wsx_rel}"
             if url:
                 card["portrait_url"] = url
+                card["portrait_srcset"] = portrait_derivatives.srcset_for(url)
 
 
 def _standing_points_for_comp_result(cr: CompetitionResult, comp: Competition) -> float:
@@ -11604,6 +11902,11 @@ def _standing_points_for_comp_result(cr: CompetitionResult, comp: Competition) -
     return float(_result_points_for_standing(cr, comp))
 
 
+def _rider_profile_path(rider_id: int) -> str:
+    """/rider/<id> utan request-kontext — spotlight byggs även i bakgrunden under app-kontext."""
+    return app.url_map.bind("").build("rider_profile", {"rider_id": int(rider_id)})
+
+
 def _spotlight_rider_card(
     rider: Rider,
     *,
@@ -11654,7 +11957,7 @@ def _spotlight_rider_card(
         "class_badge": badge,
         "brand": rider.bike_brand or "",
         "portrait_url": "",
-        "profile_url": url_for("rider_profile", rider_id=int(rider.id)),
+        "profile_url": _rider_profile_path(rider.id),
         "bio_hook": hook,
         "reason": reason,
         "subtitle": subtitle,
@@ -11669,85 +11972,28 @@ def _spotlight_rider_card(
 def _aggregate_pick_rates_for_comp(
     comp: Competition,
 ) -> tuple[int, dict[int, dict[str, Any]]]:
-    """Andel lagn som plockat varje förare (snapshots eller live RacePick)."""
-    import json
+    """Andel lagn som plockat varje förare (crowd_pick_counts: snapshots eller live-picks)."""
     from collections import Counter
 
     is_wsx = (comp.series or "") == "WSX"
     riders_dict = {r.id: r for r in rider_query_for_list_ui().all()}
-    comp_id = int(comp.id)
-    payloads: list[dict] = []
+    allowed = crowd_picks.SERIES_CLASSES[is_wsx]
 
-    snaps = PicksSnapshot.query.filter_by(competition_id=comp_id).all()
-    if snaps:
-        for s in snaps:
-            try:
-                payloads.append(json.loads(s.payload_json or "{}"))
-            except Exception:
-                payloads.append({})
-    else:
-        try:
-            locked = is_picks_locked(comp)
-        except Exception:
-            locked = False
-        if locked:
-            try:
-                ensure_picks_snapshots_for_competition(comp_id, source="auto_lock")
-            except Exception:
-                pass
-            snaps = PicksSnapshot.query.filter_by(competition_id=comp_id).all()
-            for s in snaps:
-                try:
-                    payloads.append(json.loads(s.payload_json or "{}"))
-                except Exception:
-                    payloads.append({})
-        else:
-            by_user: dict[int, list] = defaultdict(list)
-            for p in RacePick.query.filter_by(competition_id=comp_id).all():
-                by_user[int(p.user_id)].append(p)
-            for uid in sorted(by_user.keys()):
-                payloads.append(
-                    {
-                        "race_picks": [
-                            {
-                                "rider_id": p.rider_id,
-                                "predicted_position": p.predicted_position,
-                            }
-                            for p in by_user[uid]
-                        ]
-                    }
-                )
+    def _in_series(rid: int) -> bool:
+        r = riders_dict.get(rid)
+        return r is not None and (r.class_name or "").strip().lower() in allowed
 
-    n_lineups = 0
-    picked: Counter[int] = Counter()
+    agg = _crowd_picks(comp)
+    n_lineups = agg.lineups()
+    picked: Counter[int] = Counter({rid: n for rid, n in agg.riders().items() if _in_series(rid)})
     p1_picks: Counter[int] = Counter()
     pos_counts: dict[int, Counter[int]] = defaultdict(Counter)
-
-    for payload in payloads:
-        race_picks = payload.get("race_picks") or []
-        lineup_riders: set[int] = set()
-        for p in race_picks:
-            try:
-                rid = int(p.get("rider_id"))
-                pos = int(p.get("predicted_position"))
-            except (TypeError, ValueError):
-                continue
-            r = riders_dict.get(rid)
-            if not r:
-                continue
-            cls = (r.class_name or "").strip().lower()
-            if is_wsx and cls not in ("wsx_sx1", "wsx_sx2"):
-                continue
-            if not is_wsx and cls not in ("450cc", "250cc"):
-                continue
-            lineup_riders.add(rid)
-            if pos == 1:
-                p1_picks[rid] += 1
-            pos_counts[rid][pos] += 1
-        if lineup_riders:
-            n_lineups += 1
-            for rid in lineup_riders:
-                picked[rid] += 1
+    for (pos, rid), n in agg.race().items():
+        if not _in_series(rid):
+            continue
+        if pos == 1:
+            p1_picks[rid] += n
+        pos_counts[rid][pos] += n
 
     if n_lineups <= 0:
         return 0, {}
@@ -12219,11 +12465,9 @@ def build_spotlight_mode(
 ) -> dict[str, Any] | None:
     """Bygg ett spotlight-läge (cachad per flik + serie)."""
     series_code = _normalize_countdown_series(series)
-    cache_key = f"{_spotlight_series_cache_key(series_code)}:{mode_key}"
-    now = time.time()
-    cached = _RIDER_SPOTLIGHT_MODE_CACHE.get(cache_key)
-    if cached and cached[0] > now:
-        mode_data = cached[1]
+    cache_key = (_spotlight_series_cache_key(series_code), mode_key, _spotlight_data_version(series_code))
+    mode_data = _RIDER_SPOTLIGHT_MODE_CACHE.get(cache_key)
+    if mode_data is not None:
         if mode_key == "rocket" and int(mode_data.get("_calc_v") or 0) < 3:
             pass
         elif mode_key == "crowd_pick" and int(mode_data.get("_calc_v") or 0) < 2:
@@ -12249,30 +12493,35 @@ def build_spotlight_mode(
         mode_data["_calc_v"] = 3
     if mode_key == "crowd_pick":
         mode_data["_calc_v"] = 2
-    _RIDER_SPOTLIGHT_MODE_CACHE[cache_key] = (now + _HOMEPAGE_CACHE_TTL, mode_data)
+    _RIDER_SPOTLIGHT_MODE_CACHE.set(cache_key, mode_data)
     return mode_data
 
 
+def _spotlight_shell_valid(payload: dict, series: str | None) -> bool:
+    return not _spotlight_cache_needs_refresh(payload) and not _spotlight_shell_stale(
+        payload, series=series
+    )
+
+
 def build_rider_spotlight(*, series: str | None = None) -> dict[str, Any]:
     """Spotlight-shell: metadata + endast standardflik (övriga laddas lazy)."""
     series_code = _normalize_countdown_series(series)
-    cache_key = _spotlight_series_cache_key(series_code)
-    now = time.time()
-    entry = _RIDER_SPOTLIGHT_CACHE.get(cache_key)
-    if entry and entry[0] > now:
-        cached = entry[1]
-        if not _spotlight_cache_needs_refresh(cached) and not _spotlight_shell_stale(
-            cached, series=series_code
-        ):
-            return cached
+    scope = _spotlight_series_cache_key(series_code)
+    return _HOMEPAGE_REFRESH.get(
+        _RIDER_SPOTLIGHT_CACHE,
+        (scope, _spotlight_data_version(series_code)),
+        lambda: _build_rider_spotlight(series_code),
+        stale_key=scope,
+        is_valid=lambda payload: _spotlight_shell_valid(payload, series_code),
+    )
 
+
+def _build_rider_spotlight(series_code: str | None) -> dict[str, Any]:
     last_comp = _last_completed_competition(series=series_code)
     upcoming = _spotlight_upcoming_competition(series=series_code)
     available = _spotlight_available_mode_keys(last_comp, upcoming)
     if not available:
-        payload = {"available": False, "series": series_code}
-        _RIDER_SPOTLIGHT_CACHE[cache_key] = (now + _HOMEPAGE_CACHE_TTL, payload)
-        return payload
+        return {"available": False, "series": series_code}
 
     default_mode = _spotlight_default_mode_key(available, upcoming)
     default_data = build_spotlight_mode(default_mode, series=series_code)
@@ -12282,16 +12531,14 @@ def build_rider_spotlight(*, series: str | None = None) -> dict[str, Any]:
             default_mode = fallback
             default_data = build_spotlight_mode(default_mode, series=series_code)
     if not default_data:
-        payload = {"available": False, "series": series_code}
-        _RIDER_SPOTLIGHT_CACHE[cache_key] = (now + _HOMEPAGE_CACHE_TTL, payload)
-        return payload
+        return {"available": False, "series": series_code}
 
     mode_tabs = [
         {**_SPOTLIGHT_TAB_META[k], "key": k}
         for k in ("last_race", "crowd_pick", "rocket", "dark_horse")
         if k in available
     ]
-    payload = {
+    return {
         "available": True,
         "title": "I rampljuset",
         "series": series_code,
@@ -12300,8 +12547,6 @@ def build_rider_spotlight(*, series: str | None = None) -> dict[str, Any]:
         "lazy_modes": [k for k in available if k != default_mode],
         "modes": {default_mode: default_data},
     }
-    _RIDER_SPOTLIGHT_CACHE[cache_key] = (now + _HOMEPAGE_CACHE_TTL, payload)
-    return payload
 
 
 def build_rider_game_context(rider: Rider) -> dict[str, Any]:
@@ -12359,16 +12604,9 @@ def _rider_brand_logo_url(bike_brand: str | None) -> str | None:
 # Public rider profile
 @app.get('/rider/<int:rider_id>')
 def rider_profile(rider_id: int):
-    from sqlalchemy.orm import defer
     from racerx_rider_bio import ensure_rider_content_from_twins, resolve_rider_bio_source
 
-    rider = (
-        Rider.query.options(
-            defer(Rider.rider_image_data),
-        )
-        .filter_by(id=rider_id)
-        .first_or_404()
-    )
+    rider = Rider.query.options(load_rider_bio()).filter_by(id=rider_id).first_or_404()
     from racerx_rider_bio import build_riders_by_name_map, find_rider_twins, twin_group_key
 
     twins = find_rider_twins(rider)
@@ -12416,9 +12654,7 @@ def rider_bio_i18n(rider_id: int):
     """Bio/meriter på engelska eller svenska (översätter och cachar vid behov)."""
     from racerx_rider_bio import resolve_rider_bio_source
 
-    from sqlalchemy.orm import defer
-
-    rider = Rider.query.options(defer(Rider.rider_image_data)).get_or_404(rider_id)
+    rider = Rider.query.options(load_rider_bio()).get_or_404(rider_id)
     bio_source = resolve_rider_bio_source(rider)
     lang = (request.args.get("lang") or "sv").strip().lower()
     if lang not in ("en", "sv"):
@@ -12878,6 +13114,11 @@ def update_to_official_2026():
         HoleshotResult.query.delete()
         CompetitionRiderStatus.query.delete()
         CompetitionScore.query.delete()
+        UserSeasonTotal.query.delete()
+        LeaderboardRankSnapshot.query.delete()
+        SeasonRiderPoints.query.delete()
+        LeagueCompetitionScore.query.delete()
+        crowd_picks.clear()
         CompetitionImage.query.delete()
         
         # Then delete competitions
@@ -12926,6 +13167,7 @@ def update_to_official_2026():
         create_supercross_competitions(supercross.id)
         create_motocross_competitions(motocross.id)
         create_smx_finals_competitions(smx_finals.id)
+        dv.bump_schedule()
         
         return jsonify({
             'success': True,
@@ -12973,6 +13215,7 @@ def create_series():
     
     db.session.add(series)
     db.session.commit()
+    dv.bump_schedule()
     
     return jsonify({'success': True, 'id': series.id})
 
@@ -12993,6 +13236,7 @@ def update_series(series_id):
     series.points_system = data.get('points_system', 'standard')
     
     db.session.commit()
+    dv.bump_schedule()
     
     return jsonify({'success': True})
 
@@ -13005,6 +13249,7 @@ def delete_series(series_id):
     series = Series.query.get_or_404(series_id)
     db.session.delete(series)
     db.session.commit()
+    dv.bump_schedule()
     
     return jsonify({'success': True})
 
@@ -13443,6 +13688,10 @@ def fix_database_tables():
             db.session.commit()
         except Exception:
             db.session.rollback()
+        try:
+            portrait_store.ensure_schema()
+        except Exception:
+            db.session.rollback()
         
         # Check if global_simulation exists and create default entry
         try:
@@ -15146,6 +15395,7 @@ def update_holeshot():
     hs_aliases_250 = ["250cc", "wsx_sx2"]
     
     try:
+        before = _competition_result_state(comp_id)
         # Update or add primary-class holeshot (450cc / SX1)
         if hs_450:
             existing_hs_450 = HoleshotResult.query.filter(
@@ -15194,8 +15444,8 @@ def update_holeshot():
         
         db.session.commit()
         
-        # Recalculate scores to update points
-        calculate_scores(comp_id)
+        # Re-score only users with holeshot picks in the changed class
+        rescore_competition_delta(comp_id, before)
         
         flash("Holeshot-resultat uppdaterade och poäng omräknade!", "success")
     except Exception as e:
@@ -15981,6 +16231,7 @@ def bulk_import_results():
         if not competition:
             return jsonify({"error": "Competition not found"}), 400
 
+        before = _competition_result_state(int(competition_id))
         parsed = _parse_bulk_results(pasted_text, format_type)
         imported = 0
         skipped = []
@@ -16058,7 +16309,7 @@ def bulk_import_results():
         db.session.commit()
 
         try:
-            calculate_scores(int(competition_id))
+            rescore_competition_delta(int(competition_id), before)
         except Exception:
             pass
 
@@ -16401,6 +16652,7 @@ def import_wsx_official_results():
         if (competition.series or "").upper() != "WSX":
             return jsonify({"error": "Välj en WSX-tävling"}), 400
 
+        before = _competition_result_state(int(competition_id))
         imported_total = 0
         skipped_total = []
         cleared_total = 0
@@ -16476,7 +16728,7 @@ def import_wsx_official_results():
 
         db.session.commit()
         try:
-            calculate_scores(int(competition_id))
+            rescore_competition_delta(int(competition_id), before)
         except Exception:
             pass
 
@@ -16841,6 +17093,7 @@ def get_season_leaderboard():
 @app.get("/get_season_team_leaderboard")
 def get_season_team_leaderboard():
     """Get leaderboard for season teams only (separate from race picks)"""
+    _ensure_season_rider_points()
     # Get all season teams ordered by total_points
     season_teams = (
         db.session.query(
@@ -16977,7 +17230,7 @@ def compute_series_championship_totals():
         totals[bucket][rid] += pts
 
         if rid not in rider_meta:
-            merged_img = getattr(rider, "rider_image_data", None) or rider.image_url
+            merged_img = portrait_store.rider_portrait_src(rider) or rider.image_url
             rider_meta[rid] = {
                 "rider_id": rid,
                 "rider_name": rider.name,
@@ -17129,9 +17382,7 @@ def race_results_page():
                     Rider.coast_250.label("coast_250"),
                     Rider.rider_number,
                     Rider.image_url,
-                    (Rider.rider_image_data.isnot(None) & (Rider.rider_image_data != "")).label(
-                        "has_db_portrait"
-                    ),
+                    portrait_store.has_portrait_clause().label("has_db_portrait"),
                     Rider.bike_brand,
                     Rider.series_participation,
                 )
@@ -17217,9 +17468,7 @@ def race_results_page():
                     Rider.name.label("rider_name"),
                     Rider.rider_number,
                     Rider.image_url,
-                    (Rider.rider_image_data.isnot(None) & (Rider.rider_image_data != "")).label(
-                        "has_db_portrait"
-                    ),
+                    portrait_store.has_portrait_clause().label("has_db_portrait"),
                     Rider.bike_brand,
                 )
                 .join(Rider, Rider.id == HoleshotResult.rider_id)
@@ -17639,38 +17888,15 @@ def season_team_build():
 
 
 
-def _ensure_user_picks_snapshot_if_locked(user_id: int, comp: Competition) -> PicksSnapshot | None:
-    """Create a snapshot for one user when picks are locked (not the whole competition)."""
-    import json
-
+def _locked_user_picks_snapshot(user_id: int, comp: Competition) -> PicksSnapshot | None:
+    """The user's snapshot once picks are locked (created at the deadline by picks_snapshot_scheduler)."""
     if not is_picks_locked(comp):
         return None
-
-    competition_id = int(comp.id)
-    snap = PicksSnapshot.query.filter_by(user_id=user_id, competition_id=competition_id).first()
-    if snap:
-        return snap
-
-    payload = _build_picks_snapshot_payload(user_id, competition_id)
-    has_any = bool(payload.get("race_picks")) or bool(payload.get("holeshot_picks")) or (
-        payload.get("wildcard_pick") is not None
+    return (
+        PicksSnapshot.query.options(load_snapshot_payload())
+        .filter_by(user_id=user_id, competition_id=int(comp.id))
+        .first()
     )
-    if not has_any:
-        return None
-
-    try:
-        snap = PicksSnapshot(
-            user_id=user_id,
-            competition_id=competition_id,
-            payload_json=json.dumps(payload, separators=(",", ":")),
-            source="auto_lock",
-        )
-        db.session.add(snap)
-        db.session.commit()
-        return snap
-    except Exception:
-        db.session.rollback()
-        return PicksSnapshot.query.filter_by(user_id=user_id, competition_id=competition_id).first()
 
 
 def _my_picks_api_dict(user_id: int, comp: Competition) -> dict:
@@ -17683,7 +17909,7 @@ def _my_picks_api_dict(user_id: int, comp: Competition) -> dict:
 
     snap = None
     if picks_locked:
-        snap = _ensure_user_picks_snapshot_if_locked(user_id, comp)
+        snap = _locked_user_picks_snapshot(user_id, comp)
 
     if snap:
         payload = json.loads(snap.payload_json or "{}")
@@ -17917,17 +18143,14 @@ def get_my_picks(competition_id):
     return jsonify(_my_picks_api_dict(session["user_id"], comp))
 
 
-def _iter_crowd_pick_payloads(competition_id: int, ensure_snapshots: bool):
-    """Yield (user_id, payload_dict) for users with any pick rows for this competition."""
+def _iter_crowd_pick_payloads(competition_id: int):
+    """
+    Yield (user_id, payload_dict) for users with any pick rows for this competition.
+    Snapshots (skapas vid deadline av picks_snapshot_scheduler) först, annars live-picks.
+    """
     import json
 
-    if ensure_snapshots:
-        try:
-            ensure_picks_snapshots_for_competition(int(competition_id), source="auto_lock")
-        except Exception:
-            pass
-
-    snap_rows = PicksSnapshot.query.filter_by(competition_id=competition_id).all()
+    snap_rows = PicksSnapshot.query.options(load_snapshot_payload()).filter_by(competition_id=competition_id).all()
     snap_by_uid = {int(s.user_id): s for s in snap_rows}
 
     uid_sources: set[int] = set()
@@ -17940,6 +18163,7 @@ def _iter_crowd_pick_payloads(competition_id: int, ensure_snapshots: bool):
             .all()
             if uid is not None
         )
+    live = _live_picks_snapshot_payloads(competition_id, uid_sources - set(snap_by_uid))
 
     for uid in sorted(set(snap_by_uid.keys()) | uid_sources):
         snap = snap_by_uid.get(uid)
@@ -17949,14 +18173,49 @@ def _iter_crowd_pick_payloads(competition_id: int, ensure_snapshots: bool):
             except Exception:
                 payload = {}
         else:
-            payload = _build_picks_snapshot_payload(uid, competition_id)
+            payload = live.get(uid, {})
         yield uid, payload
 
 
-def _build_crowd_picks_summary(competition_id: int, comp: Competition, ensure_snapshots: bool) -> dict:
+def _crowd_picks(comp: Competition) -> crowd_picks.CrowdPicks:
+    """Crowd-aggregatet; byggs om från snapshots/live-picks om det saknas eller picks ändrats utanför save_picks."""
+    cid = int(comp.id)
+    agg = crowd_picks.load(cid)
+    if agg is not None and crowd_picks.is_current(agg):
+        return agg
+    return crowd_picks.rebuild(
+        cid,
+        _iter_crowd_pick_payloads(cid),
+        is_wsx=(comp.series or "") == "WSX",
+        class_by_id=_rider_class_by_id(),
+        # Fryst aggregat med ändrad förarlista: samma snapshots, nya klasser
+        frozen=agg is not None and agg.frozen,
+    )
+
+
+def _crowd_picks_user_changed(comp: Competition, user_id: int, before: dict | None) -> None:
+    """
+    Efter en användares plockändring, före commit: uppdatera crowd-aggregatet och
+    bumpa PICKS i samma transaktion. before = _live_picks_snapshot_payloads före ändringen.
+    """
+    cid = int(comp.id)
+    # Användare med snapshot räknas från den — live-ändringen påverkar inte aggregatet
+    has_snapshot = db.session.query(PicksSnapshot.id).filter_by(user_id=user_id, competition_id=cid).first() is not None
+    after = None if has_snapshot else _live_picks_snapshot_payloads(cid, [user_id]).get(int(user_id))
+    before = None if has_snapshot else before
+    crowd_picks.apply_user_change(
+        cid,
+        before,
+        after,
+        is_wsx=(comp.series or "") == "WSX",
+        class_by_id=_rider_class_by_id(crowd_picks.race_rider_ids(before, after)),
+    )
+
+
+def _build_crowd_picks_summary(competition_id: int, comp: Competition) -> dict:
     """
     Aggregate locked picks into per-slot popularity (pseudo-'odds' / crowd share).
-    Uses snapshots when available so results stay stable after lock.
+    Reads crowd_pick_counts (snapshots when available, so results stay stable after lock).
     """
     is_wsx = getattr(comp, "series", None) == "WSX"
     riders_dict = {r.id: r for r in rider_query_for_list_ui().all()}
@@ -17967,65 +18226,39 @@ def _build_crowd_picks_summary(competition_id: int, comp: Competition, ensure_sn
     holo_250: dict[int, int] = defaultdict(int)
     wc_key: dict[tuple[int, int], int] = defaultdict(int)
 
-    n_lineups = 0
+    agg = _crowd_picks(comp)
+    n_lineups = agg.lineups()
 
-    for _uid, payload in _iter_crowd_pick_payloads(competition_id, ensure_snapshots):
-        race_picks = payload.get("race_picks") or []
-        has_race = False
-        for p in race_picks:
-            try:
-                rid = int(p.get("rider_id"))
-                pos = int(p.get("predicted_position"))
-            except (TypeError, ValueError):
-                continue
-            rider = riders_dict.get(rid)
-            if not rider:
-                continue
-            if is_wsx:
-                if rider.class_name == "wsx_sx1":
-                    slot_450[pos][rid] += 1
-                    has_race = True
-                elif rider.class_name == "wsx_sx2":
-                    slot_250[pos][rid] += 1
-                    has_race = True
-            else:
-                if rider.class_name == "450cc":
-                    slot_450[pos][rid] += 1
-                    has_race = True
-                elif rider.class_name == "250cc":
-                    slot_250[pos][rid] += 1
-                    has_race = True
-        if has_race:
-            n_lineups += 1
-
-        holos = payload.get("holeshot_picks") or {}
-        for cls, rid in holos.items():
-            if rid is None:
-                continue
-            try:
-                rid_i = int(rid)
-            except (TypeError, ValueError):
-                continue
-            cls_s = str(cls)
-            if is_wsx:
-                if cls_s in ("450cc", "wsx_sx1"):
-                    holo_450[rid_i] += 1
-                elif cls_s in ("250cc", "wsx_sx2"):
-                    holo_250[rid_i] += 1
-            else:
-                if cls_s == "450cc":
-                    holo_450[rid_i] += 1
-                elif cls_s == "250cc":
-                    holo_250[rid_i] += 1
+    for (pos, rid), n in agg.race().items():
+        rider = riders_dict.get(rid)
+        if not rider:
+            continue
+        if is_wsx:
+            if rider.class_name == "wsx_sx1":
+                slot_450[pos][rid] += n
+            elif rider.class_name == "wsx_sx2":
+                slot_250[pos][rid] += n
+        else:
+            if rider.class_name == "450cc":
+                slot_450[pos][rid] += n
+            elif rider.class_name == "250cc":
+                slot_250[pos][rid] += n
 
-        if not is_wsx:
-            wcr = payload.get("wildcard_pick")
-            wcp = payload.get("wildcard_pos")
-            if wcr is not None and wcp is not None:
-                try:
-                    wc_key[(int(wcp), int(wcr))] += 1
-                except (TypeError, ValueError):
-                    pass
+    for (cls_s, rid_i), n in agg.holeshots().items():
+        if is_wsx:
+            if cls_s in ("450cc", "wsx_sx1"):
+                holo_450[rid_i] += n
+            elif cls_s in ("250cc", "wsx_sx2"):
+                holo_250[rid_i] += n
+        else:
+            if cls_s == "450cc":
+                holo_450[rid_i] += n
+            elif cls_s == "250cc":
+                holo_250[rid_i] += n
+
+    if not is_wsx:
+        for key, n in agg.wildcards().items():
+            wc_key[key] += n
 
     def rider_row(rid: int) -> dict:
         r = riders_dict.get(rid)
@@ -18079,43 +18312,9 @@ def _build_crowd_picks_summary(competition_id: int, comp: Competition, ensure_sn
             o["pct"] = round(100.0 * c / tot_wc, 1)
             wc_list.append(o)
 
-    snap_uids = {
-        int(u)
-        for (u,) in db.session.query(PicksSnapshot.user_id)
-        .filter(PicksSnapshot.competition_id == competition_id)
-        .distinct()
-        .all()
-        if u is not None
-    }
-    pick_uids = {
-        int(u)
-        for (u,) in db.session.query(RacePick.user_id)
-        .filter(RacePick.competition_id == competition_id)
-        .distinct()
-        .all()
-        if u is not None
-    }
-    holo_uids = {
-        int(u)
-        for (u,) in db.session.query(HoleshotPick.user_id)
-        .filter(HoleshotPick.competition_id == competition_id)
-        .distinct()
-        .all()
-        if u is not None
-    }
-    wc_uids = {
-        int(u)
-        for (u,) in db.session.query(WildcardPick.user_id)
-        .filter(WildcardPick.competition_id == competition_id)
-        .distinct()
-        .all()
-        if u is not None
-    }
-    n_users = len(snap_uids | pick_uids | holo_uids | wc_uids)
-
     return {
         "n_lineups": n_lineups,
-        "n_users_with_snapshots_or_picks": n_users,
+        "n_users_with_snapshots_or_picks": agg.n_users,
         "slots_450": slots_to_dict(slot_450),
         "slots_250": slots_to_dict(slot_250),
         "holeshot_450": top_holeshot(holo_450),
@@ -18131,16 +18330,12 @@ def crowd_picks_summary(competition_id):
         return jsonify({"error": "not_logged_in"}), 401
 
     comp = Competition.query.get_or_404(competition_id)
-    picks_locked = is_picks_locked(comp)
-    has_results = CompetitionResult.query.filter_by(competition_id=competition_id).first() is not None
 
     if not _can_view_other_users_picks(comp):
         return jsonify({"error": "Picks måste vara låsta eller race färdigt."}), 403
 
     try:
-        summary = _build_crowd_picks_summary(
-            competition_id, comp, ensure_snapshots=picks_locked or has_results
-        )
+        summary = _build_crowd_picks_summary(competition_id, comp)
         return jsonify(
             {
                 "ok": True,
@@ -18153,203 +18348,172 @@ def crowd_picks_summary(competition_id):
         return jsonify({"error": str(e)}), 500
 
 
+def _other_users_picks_entry(user, payload: dict, riders_dict: dict, is_wsx: bool) -> dict | None:
+    """En användares rad i andras picks (user: id/username/display_name, payload i snapshot-format), None om inga picks."""
+    picks_450 = []
+    picks_250 = []
+    for pick in payload.get("race_picks") or []:
+        rider = riders_dict.get(pick.get("rider_id"))
+        if not rider:
+            continue
+        rider_number = getattr(rider, 'rider_number', '?') or '?'
+        rider_name = getattr(rider, 'name', 'Unknown') or 'Unknown'
+        bike_brand = getattr(rider, 'bike_brand', 'Unknown') or 'Unknown'
+        pick_data = {
+            "position": pick.get("predicted_position"),
+            "class": rider.class_name,
+            "rider_name": f"#{rider_number} {rider_name} ({bike_brand})"
+        }
+        # WSX: wsx_sx1 → picks_450, wsx_sx2 → picks_250 (bara topp 6 per klass)
+        class_450, class_250 = ('wsx_sx1', 'wsx_sx2') if is_wsx else ('450cc', '250cc')
+        if rider.class_name == class_450 and len(picks_450) < 6:
+            picks_450.append(pick_data)
+        elif rider.class_name == class_250 and len(picks_250) < 6:
+            picks_250.append(pick_data)
+    picks_450.sort(key=lambda x: x['position'])
+    picks_250.sort(key=lambda x: x['position'])
+
+    def rider_short(rider) -> dict:
+        return {
+            "rider_number": getattr(rider, 'rider_number', '?') or '?',
+            "rider_name": getattr(rider, 'name', 'Unknown') or 'Unknown'
+        }
+
+    holeshot_450 = None
+    holeshot_250 = None
+    # WSX: wsx_sx1/wsx_sx2 eller äldre 450cc/250cc
+    holo_450 = ('450cc', 'wsx_sx1') if is_wsx else ('450cc',)
+    holo_250 = ('250cc', 'wsx_sx2') if is_wsx else ('250cc',)
+    for cls, rid in (payload.get("holeshot_picks") or {}).items():
+        rider = riders_dict.get(rid)
+        if not rider:
+            continue
+        if cls in holo_450 and not holeshot_450:
+            holeshot_450 = rider_short(rider)
+        elif cls in holo_250 and not holeshot_250:
+            holeshot_250 = rider_short(rider)
+
+    # Wildcard finns bara utanför WSX
+    wildcard = None
+    if not is_wsx:
+        rider = riders_dict.get(payload.get("wildcard_pick"))
+        if rider:
+            wildcard = {"position": payload.get("wildcard_pos"), **rider_short(rider)}
+
+    if not (picks_450 or picks_250 or holeshot_450 or holeshot_250 or wildcard):
+        return None
+    return {
+        "username": user.username,
+        "display_name": getattr(user, 'display_name', None) or user.username,
+        "picks_450": picks_450,
+        "picks_250": picks_250,
+        "holeshot_450": holeshot_450,
+        "holeshot_250": holeshot_250,
+        "wildcard": wildcard,
+        "is_wsx": is_wsx  # Include series info for frontend
+    }
+
+
+def _other_users_picks_document(comp: Competition, picks_locked: bool) -> dict:
+    """
+    Alla användares picks för tävlingen (picks_document): snapshots när låst
+    (skapade vid deadline), annars live-picks — några queries totalt, inte per användare.
+    """
+    cid = int(comp.id)
+    is_wsx = getattr(comp, 'series', None) == 'WSX'
+    # Ladda inte rider_image_data — varje blob kan vara hundratals KB (OOM på Render).
+    riders_dict = {r.id: r for r in rider_query_for_list_ui().all()}
+    if picks_locked:
+        payloads = dict(_iter_crowd_pick_payloads(cid))
+    else:
+        payloads = _live_picks_snapshot_payloads(cid)
+    users_by_id = {}
+    if payloads:
+        users_by_id = {
+            int(u.id): u
+            for u in db.session.query(User.id, User.username, User.display_name)
+            .filter(User.id.in_(list(payloads)))
+            .all()
+        }
+
+    users = []
+    for uid in sorted(payloads):
+        user = users_by_id.get(uid)
+        if user is None:
+            continue
+        entry = _other_users_picks_entry(user, payloads[uid] or {}, riders_dict, is_wsx)
+        if entry is not None:
+            users.append([uid, entry])
+
+    crowd_payload = None
+    try:
+        crowd_payload = _build_crowd_picks_summary(cid, comp)
+    except Exception as ex_crowd:
+        db.session.rollback()
+        print(f"WARNING: crowd summary skipped in get_other_users_picks: {ex_crowd}")
+
+    return {
+        "users": users,
+        "crowd": crowd_payload,
+        "competition": {"id": comp.id, "name": comp.name, "series": comp.series},
+    }
+
+
 @app.route("/get_other_users_picks/<int:competition_id>")
 def get_other_users_picks(competition_id):
+    """
+    Övriga användares picks (kräver låsta picks eller färdigt race).
+    Valfritt: ?league_id= (bara ligans medlemmar), ?page=&per_page= (sidindelat, svaret får "paging").
+    Svaret läses ur ett cachat dokument per tävling och har ETag (If-None-Match → 304).
+    """
     try:
         if "user_id" not in session:
             return jsonify({"error": "not_logged_in"}), 401
-        
-        # Get competition to determine series
+
         comp = Competition.query.get_or_404(competition_id)
-        
-        picks_locked = is_picks_locked(comp)
-        has_results = CompetitionResult.query.filter_by(competition_id=competition_id).first() is not None
-        
-        print(f"DEBUG: get_other_users_picks - Competition: {comp.name}, picks_locked: {picks_locked}, has_results: {has_results}")
-        
+
         if not _can_view_other_users_picks(comp):
-            error_msg = f"Picks måste vara låsta eller race måste vara färdigt för att se andra användares picks (picks_locked={picks_locked}, has_results={has_results})"
-            print(f"DEBUG: get_other_users_picks - Access denied: {error_msg}")
+            has_results = CompetitionResult.query.filter_by(competition_id=competition_id).first() is not None
+            error_msg = f"Picks måste vara låsta eller race måste vara färdigt för att se andra användares picks (picks_locked={is_picks_locked(comp)}, has_results={has_results})"
             return jsonify({"error": error_msg}), 403
 
-        # When locked, take snapshots (best-effort) and prefer snapshot data for stability.
-        if picks_locked:
-            try:
-                ensure_picks_snapshots_for_competition(int(competition_id), source="auto_lock")
-            except Exception:
-                pass
-        
-        is_wsx = getattr(comp, 'series', None) == 'WSX'
-        
-        # Ladda inte rider_image_data — varje blob kan vara hundratals KB (OOM på Render).
-        riders_dict = {r.id: r for r in rider_query_for_list_ui().all()}
-        
-        # Get all users except current user
-        current_user_id = session["user_id"]
-        other_users = User.query.filter(User.id != current_user_id).all()
-        
-        print(f"DEBUG: Found {len(other_users)} other users")
-        print(f"DEBUG: Competition {comp.name} is WSX: {is_wsx}")
-    
-        users_picks = []
-        for user in other_users:
-            snapshot_payload = None
-            if picks_locked:
-                snap = PicksSnapshot.query.filter_by(user_id=user.id, competition_id=competition_id).first()
-                if snap:
-                    import json
-
-                    try:
-                        snapshot_payload = json.loads(snap.payload_json or "{}")
-                    except Exception:
-                        snapshot_payload = None
-
-            # Get race picks for this user (only top 6 per class)
-            if snapshot_payload:
-                race_picks = snapshot_payload.get("race_picks", []) or []
-            else:
-                race_picks = RacePick.query.filter_by(user_id=user.id, competition_id=competition_id).all()
-            
-            picks = []
-            picks_450 = []
-            picks_250 = []
-            
-            for pick in race_picks:
-                rider_id = pick.get("rider_id") if snapshot_payload else pick.rider_id
-                pos = pick.get("predicted_position") if snapshot_payload else pick.predicted_position
-                rider = riders_dict.get(rider_id)
-                if rider:
-                    # Ensure we have valid rider data
-                    rider_number = getattr(rider, 'rider_number', '?') or '?'
-                    rider_name = getattr(rider, 'name', 'Unknown') or 'Unknown'
-                    bike_brand = getattr(rider, 'bike_brand', 'Unknown') or 'Unknown'
-                    
-                    pick_data = {
-                        "position": pos,
-                        "class": rider.class_name,
-                        "rider_name": f"#{rider_number} {rider_name} ({bike_brand})"
-                    }
-                    print(f"DEBUG: Created pick_data: {pick_data}")
-                    
-                    # Handle both regular classes and WSX classes
-                    if is_wsx:
-                        # WSX: map wsx_sx1 to picks_450, wsx_sx2 to picks_250
-                        if rider.class_name == 'wsx_sx1' and len(picks_450) < 6:
-                            picks_450.append(pick_data)
-                        elif rider.class_name == 'wsx_sx2' and len(picks_250) < 6:
-                            picks_250.append(pick_data)
-                    else:
-                        # Regular series: 450cc and 250cc
-                        if rider.class_name == '450cc' and len(picks_450) < 6:
-                            picks_450.append(pick_data)
-                        elif rider.class_name == '250cc' and len(picks_250) < 6:
-                            picks_250.append(pick_data)
-        
-            # Sort by position and take only top 6
-            picks_450.sort(key=lambda x: x['position'])
-            picks_250.sort(key=lambda x: x['position'])
-            
-            picks = picks_450 + picks_250
-            
-            # Get holeshot picks
-            if snapshot_payload:
-                holeshot_map = snapshot_payload.get("holeshot_picks", {}) or {}
-                holeshot_picks = [{"class_name": k, "rider_id": v} for k, v in holeshot_map.items()]
-            else:
-                holeshot_picks = HoleshotPick.query.filter_by(user_id=user.id, competition_id=competition_id).all()
-            holeshot_450 = None
-            holeshot_250 = None
-            
-            for holeshot in holeshot_picks:
-                cls = holeshot.get("class_name") if snapshot_payload else holeshot.class_name
-                rid = holeshot.get("rider_id") if snapshot_payload else holeshot.rider_id
-                rider = riders_dict.get(rid)
-                if rider:
-                    if is_wsx:
-                        # WSX: check for wsx_sx1 and wsx_sx2, or legacy 450cc/250cc mapping
-                        if (cls == '450cc' or cls == 'wsx_sx1') and not holeshot_450:
-                            holeshot_450 = {
-                                "rider_number": getattr(rider, 'rider_number', '?') or '?',
-                                "rider_name": getattr(rider, 'name', 'Unknown') or 'Unknown'
-                            }
-                        elif (cls == '250cc' or cls == 'wsx_sx2') and not holeshot_250:
-                            holeshot_250 = {
-                                "rider_number": getattr(rider, 'rider_number', '?') or '?',
-                                "rider_name": getattr(rider, 'name', 'Unknown') or 'Unknown'
-                            }
-                    else:
-                        # Regular series
-                        if cls == '450cc' and not holeshot_450:
-                            holeshot_450 = {
-                                "rider_number": getattr(rider, 'rider_number', '?') or '?',
-                                "rider_name": getattr(rider, 'name', 'Unknown') or 'Unknown'
-                            }
-                        elif cls == '250cc' and not holeshot_250:
-                            holeshot_250 = {
-                                "rider_number": getattr(rider, 'rider_number', '?') or '?',
-                                "rider_name": getattr(rider, 'name', 'Unknown') or 'Unknown'
-                            }
-        
-            # Get wildcard pick (only for non-WSX series)
-            wildcard = None
-            wildcard_pick = None
-            if not is_wsx:
-                if snapshot_payload:
-                    wc_rider_id = snapshot_payload.get("wildcard_pick")
-                    wc_pos = snapshot_payload.get("wildcard_pos")
-                    if wc_rider_id is not None or wc_pos is not None:
-                        wildcard_pick = type("WCPick", (), {"rider_id": wc_rider_id, "position": wc_pos})()
-                else:
-                    wildcard_pick = WildcardPick.query.filter_by(user_id=user.id, competition_id=competition_id).first()
-            if wildcard_pick:
-                rider = riders_dict.get(wildcard_pick.rider_id)
-                if rider:
-                    wildcard = {
-                        "position": wildcard_pick.position,
-                        "rider_number": getattr(rider, 'rider_number', '?') or '?',
-                        "rider_name": getattr(rider, 'name', 'Unknown') or 'Unknown'
-                    }
-            
-            print(f"DEBUG: User {user.username} - picks: {len(picks)}, holeshot_450: {holeshot_450 is not None}, holeshot_250: {holeshot_250 is not None}, wildcard: {wildcard is not None}")
-            
-            if picks or holeshot_450 or holeshot_250 or wildcard:  # Only include users who have made any picks
-                print(f"DEBUG: Including user {user.username} - picks_450: {picks_450}")
-                print(f"DEBUG: Including user {user.username} - picks_250: {picks_250}")
-                user_data = {
-                    "username": user.username,
-                    "display_name": getattr(user, 'display_name', None) or user.username,
-                    "picks_450": picks_450,
-                    "picks_250": picks_250,
-                    "holeshot_450": holeshot_450,
-                    "holeshot_250": holeshot_250,
-                    "wildcard": wildcard,
-                    "is_wsx": is_wsx  # Include series info for frontend
-                }
-                print(f"DEBUG: Adding user data: {user_data['display_name']} (username: {user_data['username']})")
-                users_picks.append(user_data)
-            else:
-                print(f"DEBUG: Excluding user {user.username} - no picks found")
-        
-        print(f"DEBUG: Returning {len(users_picks)} users with picks")
-        crowd_payload = None
         try:
-            crowd_payload = _build_crowd_picks_summary(
-                competition_id, comp, ensure_snapshots=picks_locked or has_results
-            )
-        except Exception as ex_crowd:
-            print(f"WARNING: crowd summary skipped in get_other_users_picks: {ex_crowd}")
-
-        return jsonify(
-            {
-                "users": users_picks,
-                "crowd": crowd_payload,
-                "competition": {
-                    "id": comp.id,
-                    "name": comp.name,
-                    "series": comp.series,
-                },
+            paging = picks_document.parse_paging(request.args.get("page"), request.args.get("per_page"))
+        except ValueError:
+            return jsonify({"error": "invalid_page"}), 400
+
+        current_user_id = int(session["user_id"])
+        member_ids = None
+        league_id = request.args.get("league_id", type=int)
+        if league_id is not None:
+            league = db.session.get(League, league_id)
+            if league is None:
+                return jsonify({"error": "league_not_found"}), 404
+            member_ids = {
+                int(uid)
+                for (uid,) in db.session.query(LeagueMembership.user_id)
+                .filter(LeagueMembership.league_id == league_id)
+                .all()
             }
+            # Privata ligor: bara medlemmar (och admin) ser medlemslistan
+            if not league.is_public and current_user_id not in member_ids and not is_admin_user():
+                return jsonify({"error": "forbidden"}), 403
+
+        picks_locked = is_picks_locked(comp)
+        doc = picks_document.get_or_build(
+            comp.id,
+            locked=picks_locked,
+            build=lambda: _other_users_picks_document(comp, picks_locked),
         )
+        etag = picks_document.response_etag(doc, viewer_id=current_user_id, member_ids=member_ids, paging=paging)
+        if request.headers.get("If-None-Match") == etag:
+            resp = make_response("", 304)
+        else:
+            resp = jsonify(picks_document.select(doc, viewer_id=current_user_id, member_ids=member_ids, paging=paging))
+        resp.headers["ETag"] = etag
+        # Per användare (egna raden utelämnas) — får inte delas mellan användare
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -18487,64 +18651,78 @@ def save_picks():
         if not wc_pos or str(wc_pos).strip() == "":
             return jsonify({"error": "Du måste välja en wildcard-position (rulla tärningen)"}), 400
     
-    # 4) All validering klar – nu radera och spara (en commit så inget delvis tillstånd)
-    deleted_picks = RacePick.query.filter_by(user_id=uid, competition_id=comp_id).delete()
-    deleted_holeshots = HoleshotPick.query.filter_by(user_id=uid, competition_id=comp_id).delete()
-    deleted_wildcards = WildcardPick.query.filter_by(user_id=uid, competition_id=comp_id).delete()
-    print(f"DEBUG: Deleted {deleted_picks} old picks, {deleted_holeshots} old holeshots, {deleted_wildcards} old wildcards")
+    # 4) All validering klar – nu spara (en commit så inget delvis tillstånd)
+    crowd_before = _live_picks_snapshot_payloads(comp_id, [uid]).get(int(uid))
+    hs_class_450 = "wsx_sx1" if comp.series == "WSX" else "450cc"
+    hs_class_250 = "wsx_sx2" if comp.series == "WSX" else "250cc"
+    if pick_storage.unique_enabled():
+        # Unika index finns: upsert per tabell, inga dubbletter kan uppstå
+        pick_storage.replace_user_picks(
+            uid,
+            comp_id,
+            race=[(int(p.get("rider_id")), int(p.get("position"))) for p in picks],
+            holeshots={hs_class_450: int(hs450), hs_class_250: int(hs250)},
+            wildcard=(
+                (int(wc_pick), int(wc_pos)) if comp.series != "WSX" and wc_pick and wc_pos else None
+            ),
+        )
+    else:
+        deleted_picks = RacePick.query.filter_by(user_id=uid, competition_id=comp_id).delete()
+        deleted_holeshots = HoleshotPick.query.filter_by(user_id=uid, competition_id=comp_id).delete()
+        deleted_wildcards = WildcardPick.query.filter_by(user_id=uid, competition_id=comp_id).delete()
+        print(f"DEBUG: Deleted {deleted_picks} old picks, {deleted_holeshots} old holeshots, {deleted_wildcards} old wildcards")
     
-    saved_picks = 0
-    for p in picks:
-        try:
-            pos = int(p.get("position"))
-            rid = int(p.get("rider_id"))
-        except Exception:
-            continue
-        rider = Rider.query.get(rid)
-        if not rider:
-            continue
+        saved_picks = 0
+        for p in picks:
+            try:
+                pos = int(p.get("position"))
+                rid = int(p.get("rider_id"))
+            except Exception:
+                continue
+            rider = Rider.query.get(rid)
+            if not rider:
+                continue
+            db.session.add(
+                RacePick(
+                    user_id=uid,
+                    competition_id=comp_id,
+                    rider_id=rid,
+                    predicted_position=pos
+                )
+            )
+            saved_picks += 1
+            print(f"DEBUG: Added pick - {rider.name} at position {pos}")
+    
+        rid = int(hs450)
         db.session.add(
-            RacePick(
+            HoleshotPick(
                 user_id=uid,
                 competition_id=comp_id,
                 rider_id=rid,
-                predicted_position=pos
+                class_name=hs_class_450,
             )
         )
-        saved_picks += 1
-        print(f"DEBUG: Added pick - {rider.name} at position {pos}")
-    
-    hs_class_450 = "wsx_sx1" if comp.series == "WSX" else "450cc"
-    hs_class_250 = "wsx_sx2" if comp.series == "WSX" else "250cc"
-    rid = int(hs450)
-    db.session.add(
-        HoleshotPick(
-            user_id=uid,
-            competition_id=comp_id,
-            rider_id=rid,
-            class_name=hs_class_450,
-        )
-    )
-    rid = int(hs250)
-    db.session.add(
-        HoleshotPick(
-            user_id=uid,
-            competition_id=comp_id,
-            rider_id=rid,
-            class_name=hs_class_250,
+        rid = int(hs250)
+        db.session.add(
+            HoleshotPick(
+                user_id=uid,
+                competition_id=comp_id,
+                rider_id=rid,
+                class_name=hs_class_250,
+            )
         )
-    )
     
-    if comp.series != "WSX" and wc_pick and wc_pos:
-        wc_pick_i = int(wc_pick)
-        wc_pos_i = int(wc_pos)
-        existing_wc = WildcardPick.query.filter_by(user_id=uid, competition_id=comp_id).first()
-        if not existing_wc:
-            existing_wc = WildcardPick(user_id=uid, competition_id=comp_id)
-            db.session.add(existing_wc)
-        existing_wc.rider_id = wc_pick_i
-        existing_wc.position = wc_pos_i
-
+        if comp.series != "WSX" and wc_pick and wc_pos:
+            wc_pick_i = int(wc_pick)
+            wc_pos_i = int(wc_pos)
+            existing_wc = WildcardPick.query.filter_by(user_id=uid, competition_id=comp_id).first()
+            if not existing_wc:
+                existing_wc = WildcardPick(user_id=uid, competition_id=comp_id)
+                db.session.add(existing_wc)
+            existing_wc.rider_id = wc_pick_i
+            existing_wc.position = wc_pos_i
+
+    _crowd_picks_user_changed(comp, uid, crowd_before)
     db.session.commit()
     return jsonify({"message": "Picks sparade"}), 200
 
@@ -18568,6 +18746,7 @@ def clear_my_picks(competition_id: int):
 
     uid = session["user_id"]
 
+    crowd_before = _live_picks_snapshot_payloads(competition_id, [uid]).get(int(uid))
     deleted_race = RacePick.query.filter_by(user_id=uid, competition_id=competition_id).delete()
     deleted_holo = HoleshotPick.query.filter_by(user_id=uid, competition_id=competition_id).delete()
     wc = WildcardPick.query.filter_by(user_id=uid, competition_id=competition_id).first()
@@ -18575,6 +18754,7 @@ def clear_my_picks(competition_id: int):
         wc.rider_id = None
     deleted_wc = 0
 
+    _crowd_picks_user_changed(comp, uid, crowd_before)
     db.session.commit()
 
     print(
@@ -18601,11 +18781,13 @@ def clear_my_bonus_picks(competition_id: int):
         return jsonify({"error": "Picks är låsta! Du kan inte längre ändra eller rensa dina val."}), 403
 
     uid = session["user_id"]
+    crowd_before = _live_picks_snapshot_payloads(competition_id, [uid]).get(int(uid))
     deleted_holo = HoleshotPick.query.filter_by(user_id=uid, competition_id=competition_id).delete()
     wc = WildcardPick.query.filter_by(user_id=uid, competition_id=competition_id).first()
     if wc:
         wc.rider_id = None
 
+    _crowd_picks_user_changed(comp, uid, crowd_before)
     db.session.commit()
 
     print(
@@ -18644,12 +18826,35 @@ def lock_wildcard_pos():
             409,
         )
 
+    crowd_before = _live_picks_snapshot_payloads(comp_id, [uid]).get(int(uid))
+    comp = Competition.query.get(comp_id)
     if not wc:
         wc = WildcardPick(user_id=uid, competition_id=comp_id, position=pos)
         db.session.add(wc)
     else:
         wc.position = pos
-    db.session.commit()
+    from sqlalchemy.exc import IntegrityError
+
+    try:
+        if comp is not None:
+            _crowd_picks_user_changed(comp, uid, crowd_before)
+        db.session.commit()
+    except IntegrityError:
+        # Unikt index (pick_storage): en samtidig request hann skapa raden
+        db.session.rollback()
+        wc = WildcardPick.query.filter_by(user_id=uid, competition_id=comp_id).first()
+        return (
+            jsonify(
+                {
+                    "error": "Wildcard-platsen är redan bestämd.",
+                    "status": "already_locked",
+                    "position": int(wc.position) if wc and wc.position is not None else None,
+                }
+            ),
+            409,
+        )
+    if comp is None:
+        dv.bump_picks(comp_id)
     return jsonify({"status": "locked", "position": pos}), 200
 
 
@@ -18723,6 +18928,8 @@ def _build_race_results_detail(
     actual = CompetitionResult.query.filter_by(competition_id=competition_id).all()
     actual_by_rider = {r.rider_id: r for r in actual}
 
+    # Med unika index (pick_storage) finns inga dubbletter att rensa
+    dedupe_picks = dedupe_picks and not pick_storage.unique_enabled()
     all_picks = RacePick.query.filter_by(user_id=user_id, competition_id=competition_id).all()
     if dedupe_picks:
         seen_picks: dict[tuple, RacePick] = {}
@@ -19540,34 +19747,23 @@ def api_race_recap_png():
     if _user_competition_points(uid, int(comp_id)) is None:
         return Response(status=403)
 
-    layout = (request.args.get("layout") or "facebook").lower()
-    if layout == "feed":
-        layout = "facebook"
-    if layout not in ("facebook", "portrait", "story"):
-        layout = "facebook"
-    part = (request.args.get("part") or "graphic").lower()
-    if part not in ("graphic", "stats"):
-        part = "graphic"
-
     try:
-        from social_recap_service import build_social_recap_data, render_social_recap_png
+        import recap_cache
+        from flask import send_file
 
-        data = build_social_recap_data(
+        # Förrenderad efter poängberäkningen (recap_cache.py); renderas här bara vid miss
+        path = recap_cache.recap_png_path(
             int(comp_id),
-            race_top=5,
-            season_top=5,
-            include_race=True,
-            include_weekly=False,
-            include_season_snippet=False,
-            include_facts=False,
-            include_rider_podium=True,
+            layout=request.args.get("layout"),
+            part=request.args.get("part"),
         )
-        png_bytes = render_social_recap_png(data, layout=layout, part=part)
-        resp = Response(png_bytes, mimetype="image/png")
+        resp = send_file(path, mimetype="image/png", conditional=True)
         resp.headers["Cache-Control"] = "private, max-age=120"
         return resp
     except ValueError:
         return Response(status=404)
+    except render_pool.RenderPoolUnavailable:
+        return render_pool.busy_response()
     except Exception as e:
         print(f"api_race_recap_png failed: {e}")
         return Response(status=500)
@@ -19598,12 +19794,12 @@ def api_din_kvall_png():
                 or ""
             ),
         }
-        from invite_card_service import render_din_kvall_card_png
-
-        png_bytes = render_din_kvall_card_png(data)
+        png_bytes = render_pool.render("invite_card_service:render_din_kvall_card_png", data)
         resp = Response(png_bytes, mimetype="image/png")
         resp.headers["Cache-Control"] = "private, max-age=60"
         return resp
+    except render_pool.RenderPoolUnavailable:
+        return render_pool.busy_response()
     except Exception as e:
         print(f"api_din_kvall_png failed: {e}")
         return Response(status=500)
@@ -19695,280 +19891,653 @@ def calculate_race_pick_points(predicted_position, actual_position):
     return 3
 
 
-def calculate_scores(comp_id: int):
-    
-    # Determine series for this competition (to disable features for WSX)
+def _dedupe_rows_keep_latest(rows, key_fn, id_fn):
+    """Dedupe rows on key_fn, keeping the highest id_fn. Returns (kept_by_key, losers)."""
+    kept: dict = {}
+    losers: list = []
+    for row in rows:
+        key = key_fn(row)
+        existing = kept.get(key)
+        if existing is None:
+            kept[key] = row
+        elif id_fn(row) > id_fn(existing):
+            losers.append(existing)
+            kept[key] = row
+        else:
+            losers.append(row)
+    return kept, losers
+
+
+def _load_competition_scoring_inputs(comp_id: int, user_ids=None) -> dict:
+    """
+    Bulk-load everything calculate_scores needs for one competition.
+
+    A handful of queries regardless of user count: results, holeshot results,
+    rider classes for the results, and all race/holeshot/wildcard picks.
+    Duplicate pick rows are deleted here (same rule as before: keep highest id)
+    unless pick_storage's unique indexes are in place.
+    """
     comp = Competition.query.get(comp_id)
-    series_name = getattr(comp, 'series', None)
-    # Rollback any existing transaction to avoid "aborted transaction" errors
-    db.session.rollback()
-    
-    users = User.query.all()
-    actual_results = CompetitionResult.query.filter_by(competition_id=comp_id).all()
+    series_name = getattr(comp, "series", None)
+
+    actual_results = (
+        CompetitionResult.query.filter_by(competition_id=comp_id)
+        .order_by(CompetitionResult.result_id.asc())
+        .all()
+    )
     actual_holeshots = HoleshotResult.query.filter_by(competition_id=comp_id).all()
 
-    print(f"DEBUG: Found {len(users)} users, {len(actual_results)} results, {len(actual_holeshots)} holeshots")
-    
-    # Check for duplicates and handle them (keep the one with highest result_id = most recent)
-    seen_riders = {}
-    duplicate_count = 0
-    for res in actual_results:
-        if res.rider_id in seen_riders:
-            duplicate_count += 1
-            # Keep the one with higher result_id (more recent)
-            if res.result_id > seen_riders[res.rider_id].result_id:
-                seen_riders[res.rider_id] = res
+    result_by_rider, result_dupes = _dedupe_rows_keep_latest(
+        actual_results, lambda r: r.rider_id, lambda r: r.result_id
+    )
+    if result_dupes:
+        print(
+            f"⚠️ WARNING: Found {len(result_dupes)} duplicate results for competition {comp_id}. "
+            "Using most recent entry for each rider."
+        )
+
+    # Wildcard is always 450cc: first 450cc result row per position (result_id order).
+    wildcard_rider_by_pos: dict[int, int] = {}
+    if series_name != "WSX" and actual_results:
+        result_rider_ids = {r.rider_id for r in actual_results if r.rider_id is not None}
+        rider_class = dict(
+            db.session.query(Rider.id, Rider.class_name)
+            .filter(Rider.id.in_(result_rider_ids))
+            .all()
+        )
+        for res in actual_results:
+            if rider_class.get(res.rider_id) == "450cc":
+                wildcard_rider_by_pos.setdefault(res.position, res.rider_id)
+
+    def _picks(model):
+        q = model.query.filter_by(competition_id=comp_id)
+        if user_ids is not None:
+            q = q.filter(model.user_id.in_(list(user_ids)))
+        return q.all()
+
+    if pick_storage.unique_enabled():
+        # Unika index (pick_storage) — inga dubbletter att rensa
+        race_by_key = {p.pick_id: p for p in _picks(RacePick)}
+        holo_by_key = {h.id: h for h in _picks(HoleshotPick)}
+        race_dupes, holo_dupes = [], []
+    else:
+        race_by_key, race_dupes = _dedupe_rows_keep_latest(
+            _picks(RacePick),
+            lambda p: (p.user_id, p.competition_id, p.rider_id),
+            lambda p: p.pick_id,
+        )
+        holo_by_key, holo_dupes = _dedupe_rows_keep_latest(
+            _picks(HoleshotPick),
+            lambda h: (h.user_id, h.competition_id, h.class_name),
+            lambda h: h.id,
+        )
+    if race_dupes:
+        print(f"⚠️ WARNING: Removing {len(race_dupes)} duplicate RacePick rows for competition {comp_id}")
+        RacePick.query.filter(
+            RacePick.pick_id.in_([p.pick_id for p in race_dupes])
+        ).delete(synchronize_session=False)
+    if holo_dupes:
+        print(f"⚠️ WARNING: Removing {len(holo_dupes)} duplicate HoleshotPick rows for competition {comp_id}")
+        HoleshotPick.query.filter(
+            HoleshotPick.id.in_([h.id for h in holo_dupes])
+        ).delete(synchronize_session=False)
+    if race_dupes or holo_dupes:
+        db.session.commit()
+
+    race_picks_by_user: dict[int, list] = defaultdict(list)
+    for p in race_by_key.values():
+        race_picks_by_user[p.user_id].append(p)
+    holeshot_picks_by_user: dict[int, list] = defaultdict(list)
+    for h in holo_by_key.values():
+        holeshot_picks_by_user[h.user_id].append(h)
+
+    # Old loop used .first() per user — lowest id wins.
+    wildcard_by_user: dict[int, WildcardPick] = {}
+    if series_name != "WSX":
+        for wc in sorted(_picks(WildcardPick), key=lambda w: w.id):
+            wildcard_by_user.setdefault(wc.user_id, wc)
+
+    return {
+        "competition": comp,
+        "series_name": series_name,
+        "result_by_rider": result_by_rider,
+        "holeshot_by_bucket": holeshot_results_by_bucket(actual_holeshots),
+        "wildcard_rider_by_pos": wildcard_rider_by_pos,
+        "race_picks_by_user": race_picks_by_user,
+        "holeshot_picks_by_user": holeshot_picks_by_user,
+        "wildcard_by_user": wildcard_by_user,
+    }
+
+
+def _score_user_from_inputs(user_id: int, inputs: dict) -> tuple[int, int, int]:
+    """Pure in-memory scoring of one user: (race, holeshot, wildcard) points."""
+    result_by_rider = inputs["result_by_rider"]
+    race_points = 0
+    for pick in inputs["race_picks_by_user"].get(user_id, ()):
+        res = result_by_rider.get(pick.rider_id)
+        race_points += calculate_race_pick_points(
+            pick.predicted_position, res.position if res is not None else None
+        )
+
+    holeshot_points = 0
+    holeshot_450_correct = False
+    holeshot_250_correct = False
+    for hp in inputs["holeshot_picks_by_user"].get(user_id, ()):
+        bucket = holeshot_pick_class_for_result(hp.class_name)
+        actual_hs = inputs["holeshot_by_bucket"].get(bucket)
+        if actual_hs and actual_hs.rider_id == hp.rider_id:
+            if bucket == "450cc":
+                holeshot_450_correct = True
+                holeshot_points += 10
+            elif bucket == "250cc":
+                holeshot_250_correct = True
+                holeshot_points += 10
+    # Bonus: Om båda holeshots är rätt, ge 25 poäng totalt istället för 20
+    if holeshot_450_correct and holeshot_250_correct:
+        holeshot_points = 25
+
+    wildcard_points = 0
+    wc_pick = inputs["wildcard_by_user"].get(user_id)
+    if wc_pick is not None:
+        actual_rider = inputs["wildcard_rider_by_pos"].get(wc_pick.position)
+        if actual_rider is not None and actual_rider == wc_pick.rider_id:
+            wildcard_points = 15
+
+    return race_points, holeshot_points, wildcard_points
+
+
+def _write_competition_scores_bulk(comp_id: int, computed: dict[int, tuple[int, int, int]]) -> dict[int, int]:
+    """
+    Upsert CompetitionScore rows for comp_id in bulk.
+
+    One SELECT for existing rows, one DELETE for duplicate rows, then one
+    executemany UPDATE and one executemany INSERT. Returns {user_id: old_total}
+    for users that already had a row (used for delta propagation).
+    """
+    if not computed:
+        return {}
+    existing_rows = (
+        db.session.query(CompetitionScore.score_id, CompetitionScore.user_id, CompetitionScore.total_points)
+        .filter(
+            CompetitionScore.competition_id == comp_id,
+            CompetitionScore.user_id.in_(list(computed.keys())),
+        )
+        .order_by(CompetitionScore.score_id.asc())
+        .all()
+    )
+    keep_by_user: dict[int, tuple[int, int]] = {}
+    duplicate_ids: list[int] = []
+    for score_id, user_id, total in existing_rows:
+        if user_id in keep_by_user:
+            duplicate_ids.append(score_id)
         else:
-            seen_riders[res.rider_id] = res
-    
-    if duplicate_count > 0:
-        print(f"⚠️ WARNING: Found {duplicate_count} duplicate results for competition {comp_id}. Using most recent entry for each rider.")
+            keep_by_user[user_id] = (score_id, int(total or 0))
+    if duplicate_ids:
+        print(f"⚠️ WARNING: Removing {len(duplicate_ids)} duplicate score entries for competition {comp_id}")
+        CompetitionScore.query.filter(CompetitionScore.score_id.in_(duplicate_ids)).delete(
+            synchronize_session=False
+        )
+
+    updates: list[dict] = []
+    inserts: list[dict] = []
+    for user_id, (race_points, holeshot_points, wildcard_points) in computed.items():
+        row = {
+            "total_points": race_points + holeshot_points + wildcard_points,
+            "race_points": race_points,
+            "holeshot_points": holeshot_points,
+            "wildcard_points": wildcard_points,
+        }
+        kept = keep_by_user.get(user_id)
+        if kept is not None:
+            row["score_id"] = kept[0]
+            updates.append(row)
+        else:
+            row["user_id"] = user_id
+            row["competition_id"] = comp_id
+            inserts.append(row)
+
+    from sqlalchemy import insert as sa_insert, update as sa_update
+
+    if updates:
+        db.session.execute(sa_update(CompetitionScore), updates)
+    if inserts:
+        db.session.execute(sa_insert(CompetitionScore), inserts)
+    return {user_id: kept[1] for user_id, kept in keep_by_user.items()}
+
+
+def _schedule_recap_prerender(comp_id: int) -> None:
+    """Rendera recap-PNG:erna i bakgrunden så att delningsbilderna är klara direkt."""
+    try:
+        import recap_cache
+
+        recap_cache.schedule_prerender(comp_id)
+    except Exception as e:
+        print(f"recap prerender schedule {comp_id}: {e}")
+
+
+def calculate_scores(comp_id: int):
+    # Rollback any existing transaction to avoid "aborted transaction" errors
+    db.session.rollback()
+
+    _ensure_user_season_totals()
+    user_ids = [row[0] for row in db.session.query(User.id).all()]
+    inputs = _load_competition_scoring_inputs(comp_id)
+    computed = {uid: _score_user_from_inputs(uid, inputs) for uid in user_ids}
+    _write_competition_scores_bulk(comp_id, computed)
+    db.session.flush()
+    _refresh_user_season_totals(computed.keys())
+    if inputs["result_by_rider"]:
+        _write_rank_snapshot(comp_id)
+    db.session.commit()
+    print(
+        f"DEBUG: Scored {len(computed)} users for competition {comp_id} "
+        f"({len(inputs['result_by_rider'])} results, {len(inputs['holeshot_by_bucket'])} holeshots)"
+    )
+
+    _recalculate_season_team_points(comp_id)
+
+    db.session.commit()
+    dv.bump_results(comp_id)
+    _schedule_recap_prerender(comp_id)
+    print(f"✅ Poängberäkning klar för tävling ID: {comp_id}")
     
-    actual_results_dict = seen_riders
-    actual_holeshots_dict = holeshot_results_by_bucket(actual_holeshots)
+    # Automatically calculate league points after race scores are calculated
+    try:
+        print(f"🏆 Automatically calculating league points for competition {comp_id}...")
+        update_league_points_for_competition(comp_id)
+        print(f"✅ League points updated for competition {comp_id}")
+    except Exception as e:
+        print(f"❌ Error calculating league points: {e}")
+        # Don't fail the entire score calculation if league points fail
 
-    for user in users:
-        race_points = 0
-        holeshot_points = 0
-        wildcard_points = 0
-        picks = RacePick.query.filter_by(user_id=user.id, competition_id=comp_id).all()
-        
-        # Check for duplicate RacePick entries (same user, competition, rider)
-        # Keep only the most recent one (highest pick_id). Endast *förlorande* rad raderas —
-        # annars kan båda hamna i delete-listan om DB returnerar äldre rad före nyare.
-        seen_picks = {}
-        duplicate_picks = []
-        for pick in picks:
-            key = (pick.user_id, pick.competition_id, pick.rider_id)
-            if key not in seen_picks:
-                seen_picks[key] = pick
-                continue
-            existing = seen_picks[key]
-            if pick.pick_id > existing.pick_id:
-                duplicate_picks.append(existing)
-                seen_picks[key] = pick
-            else:
-                duplicate_picks.append(pick)
-        
-        if duplicate_picks:
-            print(f"⚠️ WARNING: Found {len(duplicate_picks)} duplicate RacePick entries for {user.username} in competition {comp_id}. Removing duplicates...")
-            for dup in duplicate_picks:
-                print(f"  - Deleting duplicate pick_id={dup.pick_id} for rider_id={dup.rider_id}, position={dup.predicted_position}")
-                db.session.delete(dup)
-            # Commit deletions immediately to avoid issues
-            db.session.commit()
-            print(f"DEBUG: Kept {len(seen_picks)} unique picks for {user.username}")
-        
-        # Use only unique picks for scoring
-        unique_picks = list(seen_picks.values())
-        
-        if user.username == 'Robban B':
-            print(f"DEBUG: ===== Robban B Score Calculation =====")
-            print(f"DEBUG: Found {len(picks)} total picks in database")
-            print(f"DEBUG: Found {len(duplicate_picks)} duplicate picks")
-            print(f"DEBUG: Kept {len(unique_picks)} unique picks after deduplication")
-            for pick in unique_picks:
-                rider = Rider.query.get(pick.rider_id)
-                rider_name = rider.name if rider else f"rider {pick.rider_id}"
-                print(f"  - Pick: {rider_name} at position {pick.predicted_position} (pick_id={pick.pick_id})")
-        
-        for pick in unique_picks:
-            actual_pos_for_pick = (
-                actual_results_dict.get(pick.rider_id).position
-                if pick.rider_id in actual_results_dict
-                else None
+    try:
+        resolved = resolve_league_challenges_for_competition(comp_id)
+        if resolved:
+            print(f"⚔️ Resolved {resolved} league challenge(s) for competition {comp_id}")
+    except Exception as e:
+        print(f"❌ Error resolving league challenges: {e}")
+
+
+_SEASON_RIDER_POINTS_READY = False
+
+
+def _season_team_bonus(series, class_by_rider: dict, position_by_rider: dict) -> int:
+    """+50 per class (450cc/250cc) where every team rider finished top 6 — SMX (or no series) only."""
+    if not (series == 'SMX' or series is None):
+        return 0
+    bonus_points = 0
+    for class_name in ('450cc', '250cc'):
+        team_riders_in_class = {rid for rid, cls in class_by_rider.items() if cls == class_name}
+        # Check if ALL team riders in this class finished top 6
+        if team_riders_in_class and all(
+            (position_by_rider.get(rid) or 0) and position_by_rider[rid] <= 6
+            for rid in team_riders_in_class
+        ):
+            bonus_points += 50  # 50 bonus points per class per competition
+    return bonus_points
+
+
+def _refresh_season_rider_points(comp_id: int) -> tuple[dict, dict]:
+    """
+    Rewrite season_rider_points for one competition from CompetitionResult.
+    Returns ({rider_id: old_position}, {rider_id: new_position}).
+    """
+    old = dict(
+        db.session.query(SeasonRiderPoints.rider_id, SeasonRiderPoints.position)
+        .filter(SeasonRiderPoints.competition_id == comp_id)
+        .all()
+    )
+    new = dict(
+        db.session.query(CompetitionResult.rider_id, CompetitionResult.position)
+        .filter(
+            CompetitionResult.competition_id == comp_id,
+            CompetitionResult.rider_id.isnot(None),
+        )
+        .order_by(CompetitionResult.result_id.asc())
+        .all()
+    )
+    if old != new:
+        SeasonRiderPoints.query.filter_by(competition_id=comp_id).delete(synchronize_session=False)
+        if new:
+            from sqlalchemy import insert as sa_insert
+
+            db.session.execute(
+                sa_insert(SeasonRiderPoints),
+                [
+                    {
+                        "competition_id": comp_id,
+                        "rider_id": rider_id,
+                        "position": position,
+                        # Season team always uses position-based points (not WSX rider_points)
+                        "points": calculate_rider_points_for_position(position),
+                    }
+                    for rider_id, position in new.items()
+                ],
             )
-            # Use new scoring system based on position difference
-            race_points += calculate_race_pick_points(pick.predicted_position, actual_pos_for_pick)
+    return old, new
 
-        holeshot_picks = HoleshotPick.query.filter_by(
-            user_id=user.id, competition_id=comp_id
-        ).all()
-        
-        # Check for duplicate HoleshotPick entries (same user, competition, class)
-        # Keep only the most recent one (highest id); radera bara den äldre dubbletten.
-        seen_holeshots = {}
-        duplicate_holeshots = []
-        for hp in holeshot_picks:
-            key = (hp.user_id, hp.competition_id, hp.class_name)
-            if key not in seen_holeshots:
-                seen_holeshots[key] = hp
-                continue
-            existing = seen_holeshots[key]
-            if hp.id > existing.id:
-                duplicate_holeshots.append(existing)
-                seen_holeshots[key] = hp
-            else:
-                duplicate_holeshots.append(hp)
-        
-        if duplicate_holeshots:
-            print(f"⚠️ WARNING: Found {len(duplicate_holeshots)} duplicate HoleshotPick entries for {user.username} in competition {comp_id}. Removing duplicates...")
-            for dup in duplicate_holeshots:
-                print(f"  - Deleting duplicate holeshot id={dup.id} for class={dup.class_name}, rider_id={dup.rider_id}")
-                db.session.delete(dup)
-            # Commit deletions immediately to avoid issues
-            db.session.commit()
-            print(f"DEBUG: Kept {len(seen_holeshots)} unique holeshot picks for {user.username}")
-        
-        # Use only unique holeshot picks for scoring
-        unique_holeshot_picks = list(seen_holeshots.values())
-        
-        holeshot_450_correct = False
-        holeshot_250_correct = False
-        for hp in unique_holeshot_picks:
-            bucket = holeshot_pick_class_for_result(hp.class_name)
-            actual_hs = actual_holeshots_dict.get(bucket)
-            if actual_hs and actual_hs.rider_id == hp.rider_id:
-                if bucket == "450cc":
-                    holeshot_450_correct = True
-                    holeshot_points += 10
-                elif bucket == "250cc":
-                    holeshot_250_correct = True
-                    holeshot_points += 10
-        
-        # Bonus: Om båda holeshots är rätt, ge 25 poäng totalt istället för 20
-        if holeshot_450_correct and holeshot_250_correct:
-            holeshot_points = 25
 
-        # Disable wildcard scoring for WSX competitions
-        if series_name != 'WSX':
-            wc_pick = WildcardPick.query.filter_by(
-                user_id=user.id, competition_id=comp_id
-            ).first()
-            if wc_pick:
-                # Wildcard is always 450cc, so filter results to only 450cc
-                actual_results_450cc = []
-                for res in actual_results:
-                    rider = Rider.query.get(res.rider_id)
-                    if rider and rider.class_name == "450cc":
-                        actual_results_450cc.append(res)
-                actual_wc = next(
-                    (res for res in actual_results_450cc if res.position == wc_pick.position), None
+def _team_rider_rows(team_ids=None, rider_ids=None) -> dict[int, list[int]]:
+    """{season_team_id: [rider_id, ...]} for the given teams, or teams holding any of rider_ids."""
+    q = db.session.query(SeasonTeamRider.season_team_id, SeasonTeamRider.rider_id)
+    if team_ids is not None:
+        q = q.filter(SeasonTeamRider.season_team_id.in_(list(team_ids)))
+    if rider_ids is not None:
+        q = q.filter(
+            SeasonTeamRider.season_team_id.in_(
+                db.session.query(SeasonTeamRider.season_team_id).filter(
+                    SeasonTeamRider.rider_id.in_(list(rider_ids))
                 )
-                if actual_wc and actual_wc.rider_id == wc_pick.rider_id:
-                    wildcard_points += 15
+            )
+        )
+    out: dict[int, list[int]] = defaultdict(list)
+    for team_id, rider_id in q.order_by(SeasonTeamRider.entry_id.asc()).all():
+        out[team_id].append(rider_id)
+    return out
 
-        total_points = race_points + holeshot_points + wildcard_points
 
-        # Check for duplicates first (in case calculate_scores was called multiple times)
-        all_score_entries = CompetitionScore.query.filter_by(
-            user_id=user.id, competition_id=comp_id
-        ).all()
-        
-        if len(all_score_entries) > 1:
-            # Found duplicates - keep the first one, delete the rest
-            print(f"⚠️ WARNING: Found {len(all_score_entries)} duplicate score entries for {user.username} in competition {comp_id}. Fixing...")
-            score_entry = all_score_entries[0]
-            for dup in all_score_entries[1:]:
-                db.session.delete(dup)
-        elif len(all_score_entries) == 1:
-            score_entry = all_score_entries[0]
-        else:
-            score_entry = CompetitionScore(user_id=user.id, competition_id=comp_id)
-            db.session.add(score_entry)
-            print(f"DEBUG: Created new score entry for {user.username}")
-        
-        score_entry.total_points = total_points
-        score_entry.race_points = race_points
-        score_entry.holeshot_points = holeshot_points
-        score_entry.wildcard_points = wildcard_points
-        
-        if user.username == 'Robban B':
-            print(f"DEBUG: Robban B FINAL SCORES:")
-            print(f"  - Race points: {race_points}")
-            print(f"  - Holeshot points: {holeshot_points}")
-            print(f"  - Wildcard points: {wildcard_points}")
-            print(f"  - TOTAL: {total_points}")
-            print(f"DEBUG: ===== End Robban B Calculation =====")
-        
-        print(f"DEBUG: {user.username} - Race: {race_points}, Holeshot: {holeshot_points}, Wildcard: {wildcard_points}, Total: {total_points}")
-        
-        # Debug: Check if user has any picks at all
-        all_user_picks = RacePick.query.filter_by(user_id=user.id).all()
-        print(f"DEBUG: {user.username} has {len(all_user_picks)} total picks across all competitions")
+def _rider_classes(rider_ids) -> dict[int, str]:
+    ids = {int(r) for r in rider_ids if r is not None}
+    if not ids:
+        return {}
+    return dict(db.session.query(Rider.id, Rider.class_name).filter(Rider.id.in_(ids)).all())
+
+
+def _rebuild_season_team_totals(team_ids=None) -> int:
+    """
+    Recompute SeasonTeam.total_points from season_rider_points (all competitions,
+    including the per-race top-6 bonus). Used on roster changes and for backfill.
+    """
+    riders_by_team = _team_rider_rows(team_ids=team_ids)
+    teams_q = SeasonTeam.query
+    if team_ids is not None:
+        ids = list(team_ids)
+        if not ids:
+            return 0
+        teams_q = teams_q.filter(SeasonTeam.id.in_(ids))
+    teams = teams_q.all()
+    all_rider_ids = {rid for rids in riders_by_team.values() for rid in rids}
+    class_by_rider = _rider_classes(all_rider_ids)
+
+    points_by_rider: dict[int, list[tuple[int, int | None, int]]] = defaultdict(list)
+    if all_rider_ids:
+        for comp_id, rider_id, position, points in (
+            db.session.query(
+                SeasonRiderPoints.competition_id,
+                SeasonRiderPoints.rider_id,
+                SeasonRiderPoints.position,
+                SeasonRiderPoints.points,
+            )
+            .filter(SeasonRiderPoints.rider_id.in_(list(all_rider_ids)))
+            .all()
+        ):
+            points_by_rider[rider_id].append((comp_id, position, int(points or 0)))
+    series_by_comp = dict(db.session.query(Competition.id, Competition.series).all())
+
+    for team in teams:
+        team_rider_ids = riders_by_team.get(team.id, [])
+        base = 0
+        positions_by_comp: dict[int, dict[int, int | None]] = defaultdict(dict)
+        for rider_id in team_rider_ids:
+            for comp_id, position, points in points_by_rider.get(rider_id, ()):
+                base += points
+                positions_by_comp[comp_id][rider_id] = position
+        team_classes = {rid: class_by_rider.get(rid) for rid in team_rider_ids if rid in class_by_rider}
+        bonus = sum(
+            _season_team_bonus(series_by_comp.get(comp_id), team_classes, positions)
+            for comp_id, positions in positions_by_comp.items()
+        )
+        team.total_points = base + bonus
+    return len(teams)
+
 
+def _ensure_season_rider_points() -> None:
+    """Backfill season_rider_points once (first boot after the table was introduced)."""
+    global _SEASON_RIDER_POINTS_READY
+    if _SEASON_RIDER_POINTS_READY:
+        return
+    try:
+        SeasonRiderPoints.__table__.create(bind=db.engine, checkfirst=True)
+        has_rows = db.session.query(SeasonRiderPoints.rider_id).first() is not None
+        has_results = db.session.query(CompetitionResult.result_id).first() is not None
+        if has_results and not has_rows:
+            _rebuild_season_team_points()
+        _SEASON_RIDER_POINTS_READY = True
+    except Exception as e:
+        db.session.rollback()
+        print(f"season_rider_points ensure: {e}")
+
+
+def _rebuild_season_team_points() -> int:
+    """Full rebuild: season_rider_points for every competition, then every team total."""
+    comp_ids = [
+        cid
+        for (cid,) in db.session.query(CompetitionResult.competition_id).distinct().all()
+        if cid is not None
+    ]
+    SeasonRiderPoints.query.delete(synchronize_session=False)
+    for cid in comp_ids:
+        _refresh_season_rider_points(cid)
+    updated = _rebuild_season_team_totals()
     db.session.commit()
+    return updated
 
-    # Update season team points based on rider results (separate from race picks)
-    # NOTE: This recalculates points based on ALL race results in the database
-    # If you want to reset points to 0 for a new season, use /reset_season_team_points first
-    # and make sure to clear old CompetitionResult entries for previous season
-    all_season_teams = SeasonTeam.query.all()
-    for team in all_season_teams:
-        # Get all riders in this season team
-        team_riders = SeasonTeamRider.query.filter_by(season_team_id=team.id).all()
-        rider_ids = [tr.rider_id for tr in team_riders]
-        
-        total_season_points = 0
-        
-        # Calculate points for each rider based on their race results
-        for rider_id in rider_ids:
-            # Get all race results for this rider
-            rider_results = CompetitionResult.query.filter_by(rider_id=rider_id).all()
-            
-            for result in rider_results:
-                # Season team always uses position-based points (not WSX rider_points)
-                points = calculate_rider_points_for_position(result.position)
-                total_season_points += points
-        
-        # BONUS: Check if all riders in team finished in top 6 for this competition
-        # Get riders by class
-        riders_by_class = {}
-        for tr in team_riders:
-            rider = Rider.query.get(tr.rider_id)
-            if rider:
-                class_name = rider.class_name
-                if class_name not in riders_by_class:
-                    riders_by_class[class_name] = []
-                riders_by_class[class_name].append(rider.id)
-        
-        # Check for top 6 bonus for THIS competition (only if it's SMX)
-        competition_bonuses = {'450cc': [], '250cc': []}
-        current_competition = Competition.query.get(comp_id)
-        # Only calculate bonus for SMX competitions
-        if current_competition and (current_competition.series == 'SMX' or current_competition.series is None):
-            for rider_id in rider_ids:
-                rider_results = CompetitionResult.query.filter_by(rider_id=rider_id, competition_id=comp_id).all()
-                for result in rider_results:
-                    rider = Rider.query.get(rider_id)
-                    if rider and result.position and result.position <= 6:
-                        competition_bonuses[rider.class_name].append(rider_id)
-        
-        # Apply bonus if all riders in a class finished top 6
-        bonus_points = 0
-        for class_name in ['450cc', '250cc']:
-            if class_name in riders_by_class:
-                team_riders_in_class = set(riders_by_class[class_name])
-                top6_riders_in_class = set(competition_bonuses[class_name])
-                # Check if ALL team riders in this class finished top 6
-                if team_riders_in_class and team_riders_in_class.issubset(top6_riders_in_class):
-                    bonus_points += 50  # 50 bonus points per class per competition
-                    print(f"DEBUG: 🎉 BONUS! Team {team.team_name} - All {class_name} riders in top 6 for competition {comp_id} (+50p)")
-        
-        team.total_points = total_season_points + bonus_points
-        if bonus_points > 0:
-            print(f"DEBUG: Updated season team {team.team_name} (user {team.user_id}) to {team.total_points} points ({total_season_points} base + {bonus_points} bonus) based on {len(rider_ids)} riders")
-        else:
-            print(f"DEBUG: Updated season team {team.team_name} (user {team.user_id}) to {team.total_points} points based on {len(rider_ids)} riders")
 
+def _recalculate_season_team_points(comp_id: int) -> None:
+    """
+    Sync season-team points after a competition's results changed.
+
+    Rewrites this race's season_rider_points rows and moves SeasonTeam.total_points
+    by the race delta (rider points + top-6 bonus) for teams holding a changed rider.
+    """
+    _ensure_season_rider_points()
+    old, new = _refresh_season_rider_points(comp_id)
+    changed = {rid for rid in set(old) | set(new) if old.get(rid) != new.get(rid)}
+    if not changed:
+        return
+    riders_by_team = _team_rider_rows(rider_ids=changed)
+    if not riders_by_team:
+        return
+    comp = Competition.query.get(comp_id)
+    series = getattr(comp, "series", None)
+    class_by_rider = _rider_classes({rid for rids in riders_by_team.values() for rid in rids})
+    for team in SeasonTeam.query.filter(SeasonTeam.id.in_(list(riders_by_team))).all():
+        team_rider_ids = riders_by_team[team.id]
+        team_classes = {rid: class_by_rider.get(rid) for rid in team_rider_ids if rid in class_by_rider}
+        delta = 0
+        for positions, sign in ((new, 1), (old, -1)):
+            race = sum(calculate_rider_points_for_position(positions.get(rid)) for rid in team_rider_ids)
+            race += _season_team_bonus(series, team_classes, {rid: positions.get(rid) for rid in team_rider_ids})
+            delta += sign * race
+        if delta:
+            team.total_points = int(team.total_points or 0) + delta
+            print(f"DEBUG: Season team {team.team_name} (user {team.user_id}) {delta:+d}p for competition {comp_id} → {team.total_points}")
+
+
+def _competition_result_state(comp_id: int) -> dict:
+    """
+    Light snapshot of a competition's results for delta re-scoring.
+
+    {"results": {rider_id: position}, "holeshots": {"450cc"/"250cc": rider_id}} —
+    same dedupe rules as scoring (latest result_id per rider, latest holeshot per bucket).
+    """
+    rows = (
+        db.session.query(CompetitionResult.rider_id, CompetitionResult.position)
+        .filter(CompetitionResult.competition_id == comp_id)
+        .order_by(CompetitionResult.result_id.asc())
+        .all()
+    )
+    holeshots = (
+        db.session.query(HoleshotResult.id, HoleshotResult.rider_id, HoleshotResult.class_name)
+        .filter(HoleshotResult.competition_id == comp_id)
+        .all()
+    )
+    return {
+        "results": {rider_id: position for rider_id, position in rows},
+        "holeshots": {
+            bucket: hs.rider_id for bucket, hs in holeshot_results_by_bucket(holeshots).items()
+        },
+    }
+
+
+def rescore_competition_delta(comp_id: int, before: dict) -> dict:
+    """
+    Re-score only what a result correction touched.
+
+    `before` is _competition_result_state() taken before the edit. Users whose race,
+    wildcard or holeshot picks reference a changed rider / position / holeshot class
+    are re-scored; league totals get the per-race delta of affected leagues, season
+    teams holding changed riders are recomputed and duels on changed riders re-resolved.
+    Falls back to calculate_scores() when the competition has never been scored.
+    """
+    after = _competition_result_state(comp_id)
+    old_res, new_res = before.get("results") or {}, after["results"]
+    changed_riders = {
+        rid for rid in set(old_res) | set(new_res) if old_res.get(rid) != new_res.get(rid)
+    }
+    changed_positions = {
+        pos
+        for rid in changed_riders
+        for pos in (old_res.get(rid), new_res.get(rid))
+        if pos is not None
+    }
+    old_hs, new_hs = before.get("holeshots") or {}, after["holeshots"]
+    changed_buckets = {b for b in set(old_hs) | set(new_hs) if old_hs.get(b) != new_hs.get(b)}
+
+    if not (changed_riders or changed_buckets):
+        return {"mode": "noop", "users": 0}
+
+    already_scored = (
+        db.session.query(CompetitionScore.score_id)
+        .filter(CompetitionScore.competition_id == comp_id)
+        .first()
+    )
+    if not already_scored:
+        calculate_scores(comp_id)
+        return {"mode": "full"}
+
+    comp = Competition.query.get(comp_id)
+    is_wsx = (getattr(comp, "series", None) or "") == "WSX"
+
+    affected: set[int] = set()
+    if changed_riders:
+        affected.update(
+            uid
+            for (uid,) in db.session.query(RacePick.user_id)
+            .filter(RacePick.competition_id == comp_id, RacePick.rider_id.in_(changed_riders))
+            .distinct()
+        )
+        if not is_wsx:
+            affected.update(
+                uid
+                for (uid,) in db.session.query(WildcardPick.user_id)
+                .filter(
+                    WildcardPick.competition_id == comp_id,
+                    db.or_(
+                        WildcardPick.rider_id.in_(changed_riders),
+                        WildcardPick.position.in_(changed_positions),
+                    ),
+                )
+                .distinct()
+            )
+    if changed_buckets:
+        for uid, cls in (
+            db.session.query(HoleshotPick.user_id, HoleshotPick.class_name)
+            .filter(HoleshotPick.competition_id == comp_id)
+            .distinct()
+        ):
+            if holeshot_pick_class_for_result(cls) in changed_buckets:
+                affected.add(uid)
+    affected.discard(None)
+
+    league_ids: list[int] = []
+    if affected and not is_wsx:
+        league_ids = [
+            lid
+            for (lid,) in db.session.query(LeagueMembership.league_id)
+            .filter(LeagueMembership.user_id.in_(affected))
+            .distinct()
+        ]
+
+    user_deltas: dict[int, int] = {}
+    if affected:
+        _ensure_user_season_totals()
+        inputs = _load_competition_scoring_inputs(comp_id, user_ids=affected)
+        computed = {uid: _score_user_from_inputs(uid, inputs) for uid in affected}
+        old_totals = _write_competition_scores_bulk(comp_id, computed)
+        for uid, parts in computed.items():
+            delta = sum(parts) - old_totals.get(uid, 0)
+            if delta:
+                user_deltas[uid] = delta
+        db.session.flush()
+        _refresh_user_season_totals(affected)
+        if new_res:
+            # Samma snapshot som calculate_scores skriver — annars visar deltat gamla placeringar
+            _write_rank_snapshot(comp_id)
+
+    if league_ids:
+        _ensure_league_competition_scores()
+        _sync_league_totals(_store_league_competition_scores([comp_id], league_ids))
+
+    if changed_riders:
+        _recalculate_season_team_points(comp_id)
     db.session.commit()
-    print(f"✅ Poängberäkning klar för tävling ID: {comp_id}")
-    
-    # Automatically calculate league points after race scores are calculated
-    try:
-        print(f"🏆 Automatically calculating league points for competition {comp_id}...")
-        update_league_points_for_competition(comp_id)
-        print(f"✅ League points updated for competition {comp_id}")
-    except Exception as e:
-        print(f"❌ Error calculating league points: {e}")
-        # Don't fail the entire score calculation if league points fail
+    dv.bump_results(comp_id)
+    _schedule_recap_prerender(comp_id)
 
     try:
-        resolved = resolve_league_challenges_for_competition(comp_id)
-        if resolved:
-            print(f"⚔️ Resolved {resolved} league challenge(s) for competition {comp_id}")
+        _re_resolve_challenges_for_riders(comp_id, changed_riders)
     except Exception as e:
-        print(f"❌ Error resolving league challenges: {e}")
+        db.session.rollback()
+        print(f"❌ Error re-resolving league challenges: {e}")
+
+    print(
+        f"✅ Delta re-score competition {comp_id}: {len(changed_riders)} riders, "
+        f"{len(changed_buckets)} holeshot classes → {len(affected)} users, {len(league_ids)} leagues"
+    )
+    return {
+        "mode": "delta",
+        "users": len(affected),
+        "user_deltas": user_deltas,
+        "leagues": len(league_ids),
+        "changed_riders": sorted(changed_riders),
+        "changed_holeshots": sorted(changed_buckets),
+    }
+
+
+def _re_resolve_challenges_for_riders(comp_id: int, rider_ids: set[int]) -> int:
+    """Re-open and re-resolve duels whose outcome depends on corrected result rows."""
+    reopened: list[LeagueChallenge] = []
+    if rider_ids:
+        ids = list(rider_ids)
+        reopened = LeagueChallenge.query.filter(
+            LeagueChallenge.competition_id == comp_id,
+            LeagueChallenge.status.in_(("resolved", "tie")),
+            db.or_(
+                LeagueChallenge.challenge_type == "brand_battle",
+                LeagueChallenge.challenger_rider_id.in_(ids),
+                LeagueChallenge.challenged_rider_id.in_(ids),
+                LeagueChallenge.rider_a_id.in_(ids),
+                LeagueChallenge.rider_b_id.in_(ids),
+            ),
+        ).all()
+    previous = {ch.id: (ch.status, ch.winner_id) for ch in reopened}
+    for ch in reopened:
+        ch.status = "locked"
+        _resolve_single_challenge(ch)
+    touched = {(ch.challenger_id, ch.league_id) for ch in reopened}
+    touched |= {(ch.challenged_id, ch.league_id) for ch in reopened}
+    for uid, lid in touched:
+        _recompute_user_challenge_badge(uid, lid, comp_id)
+    db.session.commit()
+    for ch in reopened:
+        if previous.get(ch.id) != (ch.status, ch.winner_id):
+            try:
+                _notify_challenge_resolved(ch)
+            except Exception as ex:
+                print(f"challenge resolve notify error: {ex}")
+    return len(reopened) + resolve_league_challenges_for_competition(comp_id)
+
 
 # -------------------------------------------------
 # Felsökning: lista routes
@@ -20015,6 +20584,7 @@ def clear_my_picks_for_competition(competition_id):
     deleted_wildcards = WildcardPick.query.filter_by(user_id=uid, competition_id=competition_id).delete()
     
     db.session.commit()
+    dv.bump_picks(competition_id)
     
     print(f"DEBUG: Deleted {deleted_picks} picks, {deleted_holeshots} holeshots, {deleted_wildcards} wildcards for competition {competition_id}")
     
@@ -20034,12 +20604,21 @@ def clear_admin_results():
     print(f"DEBUG: clear_admin_results called")
     
     # Delete all admin results
+    result_comp_ids = [cid for (cid,) in db.session.query(CompetitionResult.competition_id).distinct()]
     deleted_results = CompetitionResult.query.delete()
     deleted_holeshot_results = HoleshotResult.query.delete()
     deleted_scores = CompetitionScore.query.delete()
     deleted_out_status = CompetitionRiderStatus.query.delete()
+    SeasonRiderPoints.query.delete()
+    UserSeasonTotal.query.delete()
+    LeaderboardRankSnapshot.query.delete()
+    # League.total_points är summan av league_competition_scores — nollställ via raderna
+    _ensure_league_competition_scores()
+    LeagueCompetitionScore.query.delete()
+    _sync_league_totals()
     
     db.session.commit()
+    dv.bump_results(*result_comp_ids)
     
     print(f"DEBUG: Deleted {deleted_results} results, {deleted_holeshot_results} holeshot results, {deleted_scores} scores, {deleted_out_status} out statuses")
     
@@ -20072,13 +20651,22 @@ def clear_competition_results(competition_id):
     print(f"DEBUG: Before deletion - Results: {existing_results}, Holeshots: {existing_holeshots}, Scores: {existing_scores}, Out Status: {existing_out_status} (keeping OUT status)")
     
     # Delete results for this specific competition
+    _ensure_user_season_totals()
+    _ensure_league_competition_scores()
+    scored_user_ids = {
+        uid for (uid,) in db.session.query(CompetitionScore.user_id).filter_by(competition_id=competition_id)
+    }
     deleted_results = CompetitionResult.query.filter_by(competition_id=competition_id).delete()
     deleted_holeshot_results = HoleshotResult.query.filter_by(competition_id=competition_id).delete()
     deleted_scores = CompetitionScore.query.filter_by(competition_id=competition_id).delete()
+    _refresh_user_season_totals(scored_user_ids)
+    _sync_league_totals(_store_league_competition_scores([competition_id]))
+    LeaderboardRankSnapshot.query.filter_by(competition_id=competition_id).delete()
     # DON'T delete OUT status - it should persist across competitions
     deleted_out_status = 0  # OUT status is kept
     
     # ALSO delete user picks for this competition
+    crowd_picks.clear(competition_id)
     deleted_race_picks = RacePick.query.filter_by(competition_id=competition_id).delete()
     deleted_holeshot_picks = HoleshotPick.query.filter_by(competition_id=competition_id).delete()
     deleted_wildcard_picks = WildcardPick.query.filter_by(competition_id=competition_id).delete()
@@ -20086,28 +20674,10 @@ def clear_competition_results(competition_id):
     db.session.commit()
     
     # Update season team points after clearing competition scores (rider results system)
-    all_season_teams = SeasonTeam.query.all()
-    for team in all_season_teams:
-        # Get all riders in this season team
-        team_riders = SeasonTeamRider.query.filter_by(season_team_id=team.id).all()
-        rider_ids = [tr.rider_id for tr in team_riders]
-        
-        total_season_points = 0
-        
-        # Calculate points for each rider based on their race results
-        for rider_id in rider_ids:
-            # Get all race results for this rider
-            rider_results = CompetitionResult.query.filter_by(rider_id=rider_id).all()
-            
-            for result in rider_results:
-                # Season team always uses position-based points (not WSX rider_points)
-                points = calculate_rider_points_for_position(result.position)
-                total_season_points += points
-        
-        team.total_points = total_season_points
-        print(f"DEBUG: Updated season team {team.team_name} (user {team.user_id}) to {total_season_points} points based on {len(rider_ids)} riders")
-    
+    _recalculate_season_team_points(competition_id)
     db.session.commit()
+    dv.bump_results(competition_id)
+    dv.bump_picks(competition_id)
     
     print(f"DEBUG: Deleted {deleted_results} results, {deleted_holeshot_results} holeshot results, {deleted_scores} scores, {deleted_race_picks} race picks, {deleted_holeshot_picks} holeshot picks, {deleted_wildcard_picks} wildcard picks for competition {competition_id} (kept OUT status)")
     
@@ -20341,73 +20911,20 @@ def update_season_team_points():
     
     print("DEBUG: update_season_team_points called - calculating based on rider results")
     
-    all_season_teams = SeasonTeam.query.all()
-    updated_teams = []
+    # Full rebuild of season_rider_points + every team total (incl. top-6 bonus per competition)
+    old_points = {team.id: team.total_points for team in SeasonTeam.query.all()}
+    rider_counts = {team_id: len(rids) for team_id, rids in _team_rider_rows().items()}
+    _rebuild_season_team_points()
     
-    for team in all_season_teams:
-        # Get all riders in this season team
-        team_riders = SeasonTeamRider.query.filter_by(season_team_id=team.id).all()
-        rider_ids = [tr.rider_id for tr in team_riders]
-        
-        total_season_points = 0
-        
-        # Calculate points for each rider based on their race results
-        for rider_id in rider_ids:
-            # Get all race results for this rider
-            rider_results = CompetitionResult.query.filter_by(rider_id=rider_id).all()
-            
-            for result in rider_results:
-                # Season team always uses position-based points (not WSX rider_points)
-                points = calculate_rider_points_for_position(result.position)
-                total_season_points += points
-        
-        # BONUS: Check if all riders in team finished in top 6 per competition
-        riders_by_class = {}
-        for tr in team_riders:
-            rider = Rider.query.get(tr.rider_id)
-            if rider:
-                class_name = rider.class_name
-                if class_name not in riders_by_class:
-                    riders_by_class[class_name] = []
-                riders_by_class[class_name].append(rider.id)
-        
-        # Check for top 6 bonus per competition
-        competition_bonuses = {}
-        for rider_id in rider_ids:
-            rider_results = CompetitionResult.query.filter_by(rider_id=rider_id).all()
-            for result in rider_results:
-                comp_id_key = result.competition_id
-                if comp_id_key not in competition_bonuses:
-                    competition_bonuses[comp_id_key] = {'450cc': [], '250cc': []}
-                
-                rider = Rider.query.get(rider_id)
-                if rider and result.position and result.position <= 6:
-                    competition_bonuses[comp_id_key][rider.class_name].append(rider_id)
-        
-        # Apply bonus if all riders in a class finished top 6
-        bonus_points = 0
-        for comp_id_key, classes in competition_bonuses.items():
-            for class_name in ['450cc', '250cc']:
-                if class_name in riders_by_class:
-                    team_riders_in_class = set(riders_by_class[class_name])
-                    top6_riders_in_class = set(classes[class_name])
-                    # Check if ALL team riders in this class finished top 6
-                    if team_riders_in_class and team_riders_in_class.issubset(top6_riders_in_class):
-                        bonus_points += 50  # 50 bonus points per class per competition
-                        print(f"DEBUG: 🎉 BONUS! Team {team.team_name} - All {class_name} riders in top 6 for competition {comp_id_key} (+50p)")
-        
-        old_points = team.total_points
-        team.total_points = total_season_points + bonus_points
+    updated_teams = []
+    for team in SeasonTeam.query.all():
         updated_teams.append({
             "team_name": team.team_name,
             "user_id": team.user_id,
-            "old_points": old_points,
-            "new_points": total_season_points,
-            "rider_count": len(rider_ids)
+            "old_points": old_points.get(team.id),
+            "new_points": team.total_points,
+            "rider_count": rider_counts.get(team.id, 0)
         })
-        print(f"DEBUG: Updated season team {team.team_name} (user {team.user_id}) from {old_points} to {total_season_points} points based on {len(rider_ids)} riders")
-    
-    db.session.commit()
     
     return jsonify({
         "message": f"Updated {len(updated_teams)} season teams based on rider results",
@@ -20877,6 +21394,7 @@ def confirm_import_entry_lists():
                 continue
         
         db.session.commit()
+        dv.bump_roster()
         
         return jsonify({
             "success": True,
@@ -21058,6 +21576,7 @@ def confirm_import_results():
         
         # Commit changes
         db.session.commit()
+        dv.bump_results(int(competition_id))
         
         return jsonify({
             "success": True,
@@ -21112,7 +21631,7 @@ def _wsx_competitions_for_year(year: int):
     return comps
 
 
-_import_competitions_cache: dict[str, tuple[float, dict]] = {}
+_import_competitions_cache = get_cache("import_competitions", maxsize=16)
 
 
 @app.get("/get_competitions_for_import")
@@ -21127,8 +21646,6 @@ def get_competitions_for_import():
         return jsonify({"error": "admin_only"}), 403
 
     try:
-        import time
-
         series_raw = (request.args.get("series") or "").strip().upper()
         series_filter = None
         if series_raw == "AMA":
@@ -21151,10 +21668,10 @@ def get_competitions_for_import():
             cache_key = f"WSX:{year_filter if year_filter is not None else 'all'}"
 
         ttl = float((os.getenv("IMPORT_COMPETITIONS_CACHE_TTL") or "25").strip())
-        now = time.time()
+        cache_key = (cache_key, *dv.versions(dv.RESULTS, dv.SCHEDULE))
         cached = _import_competitions_cache.get(cache_key)
-        if cached and (now - cached[0]) < ttl:
-            return jsonify(cached[1])
+        if cached is not None:
+            return jsonify(cached)
 
         if series_filter == "WSX" and year_filter is not None:
             competitions = _wsx_competitions_for_year(year_filter)
@@ -21197,7 +21714,7 @@ def get_competitions_for_import():
             "series": series_filter,
             "year": year_filter,
         }
-        _import_competitions_cache[cache_key] = (now, payload)
+        _import_competitions_cache.set(cache_key, payload, ttl=ttl)
         return jsonify(payload)
 
     except Exception as e:
@@ -22307,6 +22824,9 @@ def admin_set_user_score():
             total_points=total_points
         )
         db.session.add(score)
+        db.session.flush()
+        _ensure_user_season_totals()
+        _refresh_user_season_totals([user.id])
         db.session.commit()
         
         print(f"Set score for {username} in {comp.name}: {total_points} points (Race: {race_points}, Holeshot: {holeshot_points}, Wildcard: {wildcard_points})")
@@ -22908,6 +23428,7 @@ def approve_league_request(league_id, request_id):
     )
     db.session.add(membership)
     db.session.commit()
+    refresh_league_scores([league_id])
     
     flash("Ansökan godkändes!", "success")
     return redirect(url_for("league_detail_page", league_id=league_id))
@@ -22954,6 +23475,7 @@ def admin_delete_league(league_id):
         # Delete all related data
         LeagueRequest.query.filter_by(league_id=league_id).delete()
         LeagueMembership.query.filter_by(league_id=league_id).delete()
+        LeagueCompetitionScore.query.filter_by(league_id=league_id).delete()
         
         # Delete the league
         db.session.delete(league)
@@ -23244,32 +23766,9 @@ def calculate_league_points(league_id, competition_id):
         if not member_scores:
             return 0
         
-        # Sort scores descending (best first)
-        member_scores.sort(reverse=True)
+        final_score, top_n = _fair_league_score(member_scores)
         num_members = len(member_scores)
         
-        # Fair calculation based on league size
-        if num_members == 1:
-            # Single member: use their score directly
-            final_score = member_scores[0]
-            top_n = 1
-        elif num_members == 2:
-            # 2 members: average of both
-            final_score = sum(member_scores) / 2
-            top_n = 2
-        elif num_members <= 4:
-            # 3-4 members: average of top 2
-            final_score = sum(member_scores[:2]) / 2
-            top_n = 2
-        elif num_members <= 6:
-            # 5-6 members: average of top 3
-            final_score = sum(member_scores[:3]) / 3
-            top_n = 3
-        else:
-            # 7+ members: average of top 50% (rounded up)
-            top_n = (num_members + 1) // 2  # Round up
-            final_score = sum(member_scores[:top_n]) / top_n
-        
         print(f"🏆 League {league_id}: {num_members} members, using top {top_n}, league score: {final_score:.1f}")
         
         return round(final_score, 1)
@@ -23279,11 +23778,168 @@ def calculate_league_points(league_id, competition_id):
         return 0
 
 
+def _fair_league_score(member_scores: list) -> tuple[float, int]:
+    """Top-N fair average used for league race scores: (score, top_n). See calculate_league_points."""
+    # Sort scores descending (best first)
+    scores = sorted(member_scores, reverse=True)
+    num_members = len(scores)
+    
+    # Fair calculation based on league size
+    if num_members == 1:
+        # Single member: use their score directly
+        top_n = 1
+    elif num_members == 2:
+        # 2 members: average of both
+        top_n = 2
+    elif num_members <= 4:
+        # 3-4 members: average of top 2
+        top_n = 2
+    elif num_members <= 6:
+        # 5-6 members: average of top 3
+        top_n = 3
+    else:
+        # 7+ members: average of top 50% (rounded up)
+        top_n = (num_members + 1) // 2  # Round up
+    return sum(scores[:top_n]) / top_n, top_n
+
+
+_LEAGUE_COMPETITION_SCORES_READY = False
+
+
+def _league_scores_grouped(comp_ids=None, league_ids=None) -> dict[tuple[int, int], tuple[float, int]]:
+    """
+    Fair league score per (league_id, competition_id) from one grouped query.
+
+    Same rule as calculate_league_points (first score row per member, zero scores
+    ignored, WSX never counts). Values are (rounded score, members counted).
+    """
+    q = (
+        db.session.query(
+            LeagueMembership.league_id,
+            CompetitionScore.competition_id,
+            CompetitionScore.user_id,
+            CompetitionScore.total_points,
+        )
+        .join(User, User.id == LeagueMembership.user_id)
+        .join(CompetitionScore, CompetitionScore.user_id == LeagueMembership.user_id)
+        .join(Competition, Competition.id == CompetitionScore.competition_id)
+        .filter(db.or_(Competition.series.is_(None), Competition.series != "WSX"))
+        .order_by(CompetitionScore.score_id.asc())
+    )
+    if comp_ids is not None:
+        q = q.filter(CompetitionScore.competition_id.in_(list(comp_ids)))
+    if league_ids is not None:
+        q = q.filter(LeagueMembership.league_id.in_(list(league_ids)))
+    first_score: dict[tuple[int, int, int], int] = {}
+    for league_id, comp_id, user_id, total in q.all():
+        first_score.setdefault((league_id, comp_id, user_id), total)
+    grouped: dict[tuple[int, int], list] = defaultdict(list)
+    for (league_id, comp_id, _user_id), total in first_score.items():
+        if total:
+            grouped[(league_id, comp_id)].append(total)
+    out: dict[tuple[int, int], tuple[float, int]] = {}
+    for key, scores in grouped.items():
+        score, _top_n = _fair_league_score(scores)
+        out[key] = (round(score, 1), len(scores))
+    return out
+
+
+def _store_league_competition_scores(comp_ids=None, league_ids=None) -> set[int]:
+    """
+    Rewrite league_competition_scores rows for comp_ids × league_ids (None = all).
+    Returns the league ids whose rows were touched.
+    """
+    grouped = _league_scores_grouped(comp_ids, league_ids)
+    old_q = LeagueCompetitionScore.query
+    if comp_ids is not None:
+        old_q = old_q.filter(LeagueCompetitionScore.competition_id.in_(list(comp_ids)))
+    if league_ids is not None:
+        old_q = old_q.filter(LeagueCompetitionScore.league_id.in_(list(league_ids)))
+    touched = {lid for (lid,) in old_q.with_entities(LeagueCompetitionScore.league_id).distinct()}
+    old_q.delete(synchronize_session=False)
+    if grouped:
+        from sqlalchemy import insert as sa_insert
+
+        now = datetime.utcnow()
+        db.session.execute(
+            sa_insert(LeagueCompetitionScore),
+            [
+                {
+                    "league_id": league_id,
+                    "competition_id": comp_id,
+                    "score": score,
+                    "members_counted": counted,
+                    "updated_at": now,
+                }
+                for (league_id, comp_id), (score, counted) in grouped.items()
+            ],
+        )
+        touched.update(league_id for league_id, _comp_id in grouped)
+    return touched
+
+
+def _sync_league_totals(league_ids=None) -> None:
+    """League.total_points = SUM(league_competition_scores.score), one grouped query."""
+    from sqlalchemy import func, update as sa_update
+
+    sums_q = db.session.query(
+        LeagueCompetitionScore.league_id, func.sum(LeagueCompetitionScore.score)
+    ).group_by(LeagueCompetitionScore.league_id)
+    ids_q = db.session.query(League.id)
+    if league_ids is not None:
+        ids = list(league_ids)
+        if not ids:
+            return
+        sums_q = sums_q.filter(LeagueCompetitionScore.league_id.in_(ids))
+        ids_q = ids_q.filter(League.id.in_(ids))
+    sums = dict(sums_q.all())
+    rows = [
+        {"id": league_id, "total_points": round(float(sums.get(league_id) or 0), 1)}
+        for (league_id,) in ids_q.all()
+    ]
+    if rows:
+        db.session.execute(sa_update(League), rows)
+
+
+def _ensure_league_competition_scores() -> None:
+    """Create/backfill league_competition_scores once (first boot with the table)."""
+    global _LEAGUE_COMPETITION_SCORES_READY
+    if _LEAGUE_COMPETITION_SCORES_READY:
+        return
+    try:
+        LeagueCompetitionScore.__table__.create(bind=db.engine, checkfirst=True)
+        has_rows = db.session.query(LeagueCompetitionScore.league_id).first() is not None
+        _LEAGUE_COMPETITION_SCORES_READY = True
+        if not has_rows and db.session.query(CompetitionScore.score_id).first() is not None:
+            _recalculate_all_league_totals()
+    except Exception as e:
+        db.session.rollback()
+        print(f"league_competition_scores ensure: {e}")
+
+
+def refresh_league_scores(league_ids) -> None:
+    """Membership changed: rebuild the given leagues' rows for every competition."""
+    ids = [int(lid) for lid in league_ids if lid is not None]
+    if not ids:
+        return
+    try:
+        _ensure_league_competition_scores()
+        _store_league_competition_scores(None, ids)
+        _sync_league_totals(ids)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"refresh_league_scores error: {e}")
+
+
 def update_league_points_for_competition(competition_id):
-    """Recalculate league totals after a competition is scored (avoids double-count on re-import)."""
+    """Refresh this race's league_competition_scores rows and re-sum the touched leagues."""
     try:
-        _recalculate_all_league_totals()
-        print(f"✅ Recalculated league points after competition {competition_id}")
+        _ensure_league_competition_scores()
+        touched = _store_league_competition_scores([int(competition_id)])
+        _sync_league_totals(touched)
+        db.session.commit()
+        print(f"✅ Recalculated league points after competition {competition_id} ({len(touched)} leagues)")
     except Exception as e:
         print(f"❌ Error updating league points: {e}")
         db.session.rollback()
@@ -23291,26 +23947,19 @@ def update_league_points_for_competition(competition_id):
 
 
 def _recalculate_all_league_totals() -> None:
-    """Sum fair per-race league scores into League.total_points (excludes WSX)."""
-    competitions_with_results = (
-        db.session.query(Competition.id)
-        .join(CompetitionScore, Competition.id == CompetitionScore.competition_id)
-        .filter(
-            db.or_(
-                Competition.series.is_(None),
-                Competition.series != "WSX",
-            )
-        )
+    """Rebuild league_competition_scores (one grouped query per race) and sum into League.total_points."""
+    comp_ids = [
+        cid
+        for (cid,) in db.session.query(CompetitionScore.competition_id)
+        .filter(CompetitionScore.competition_id.isnot(None))
         .distinct()
-        .order_by(Competition.id.asc())
+        .order_by(CompetitionScore.competition_id.asc())
         .all()
-    )
-    comp_ids = [row[0] for row in competitions_with_results]
-
-    for league in League.query.all():
-        league_total = sum(calculate_league_points(league.id, comp_id) for comp_id in comp_ids)
-        league.total_points = round(league_total, 1)
-
+    ]
+    LeagueCompetitionScore.query.delete(synchronize_session=False)
+    for comp_id in comp_ids:
+        _store_league_competition_scores([comp_id])
+    _sync_league_totals()
     db.session.commit()
 
 
@@ -23521,7 +24170,7 @@ def backup_profiles():
         return jsonify({"error": "admin_only"}), 403
     
     try:
-        users = User.query.all()
+        users = User.query.options(load_user_picture()).all()
         profile_backups = []
         for user in users:
             profile_pic = getattr(user, 'profile_picture_url', None)
@@ -24369,7 +25018,7 @@ def user_profile_image(user_id: int):
     from flask import send_from_directory
     import base64
 
-    user = User.query.get(user_id)
+    user = User.query.options(load_user_picture()).get(user_id)
     if not user:
         return "", 404
     pic = getattr(user, "profile_picture_url", None)
@@ -24430,7 +25079,7 @@ def view_user_profile(user_id):
                         "number": r.rider_number,
                         "brand": (r.bike_brand or "").lower(),
                         "class": r.class_name,
-                        "image_url": getattr(r, 'rider_image_data', None) or r.image_url or None,
+                        "image_url": portrait_store.rider_portrait_src(r) or r.image_url or None,
                     }
                     for r in rs
                 ]
@@ -24895,6 +25544,7 @@ def fix_database_route():
             db.session.commit()
         
         # Create competitions
+        crowd_picks.clear()
         Competition.query.delete()
         competitions = [
             {'name': 'Anaheim 1', 'event_date': '2026-01-04', 'coast_250': 'west', 'series': 'SX', 'point_multiplier': 1.0},
@@ -25134,6 +25784,7 @@ def reset_database_route():
 def force_create_data_route():
     """Force create all data"""
     # Clear existing data
+    crowd_picks.clear()
     Competition.query.delete()
     # Don't delete riders - use rider management as master list
     db.session.commit()
@@ -25607,6 +26258,10 @@ def init_database():
                     _ensure_racerx_bio_skip_column()
                 except Exception as skip_col_err:
                     print(f"Warning: racerx_bio_skip migration skipped: {skip_col_err}")
+                try:
+                    portrait_store.ensure_schema()
+                except Exception as portrait_err:
+                    print(f"Warning: portrait store migration skipped: {portrait_err}")
                 try:
                     _ensure_email_opt_out_column()
                 except Exception as opt_col_err:
@@ -25898,7 +26553,7 @@ def force_recreate_data():
         with app.app_context():
             # BACKUP USER PROFILE DATA AND SEASON TEAMS BEFORE DELETION
             print("Backing up user profile data and season teams...")
-            users = User.query.all()
+            users = User.query.options(load_user_picture()).all()
             profile_backups = []
             season_team_backups = []
             
@@ -25934,6 +26589,11 @@ def force_recreate_data():
             db.session.query(CompetitionImage).delete()
             db.session.query(CompetitionRiderStatus).delete()
             db.session.query(CompetitionScore).delete()
+            db.session.query(UserSeasonTotal).delete()
+            db.session.query(LeaderboardRankSnapshot).delete()
+            db.session.query(SeasonRiderPoints).delete()
+            db.session.query(LeagueCompetitionScore).delete()
+            crowd_picks.clear()
             db.session.query(HoleshotPick).delete()
             db.session.query(WildcardPick).delete()
             db.session.query(RacePick).delete()
@@ -26148,6 +26808,7 @@ def quick_anaheim2_simulation():
         CompetitionResult.query.filter_by(competition_id=competition_id).delete()
         HoleshotResult.query.filter_by(competition_id=competition_id).delete()
         CompetitionScore.query.filter_by(competition_id=competition_id).delete()
+        LeaderboardRankSnapshot.query.filter_by(competition_id=competition_id).delete()
         
         import random
         shuffled_riders = riders.copy()
@@ -26847,17 +27508,28 @@ def clear_anaheim1():
     try:
         with app.app_context():
             comp_id = 1  # Anaheim 1
+            _ensure_league_competition_scores()
             
             # Delete all data for Anaheim 1
             deleted_results = CompetitionResult.query.filter_by(competition_id=comp_id).delete()
             deleted_holeshot_results = HoleshotResult.query.filter_by(competition_id=comp_id).delete()
             deleted_scores = CompetitionScore.query.filter_by(competition_id=comp_id).delete()
+            LeaderboardRankSnapshot.query.filter_by(competition_id=comp_id).delete()
             deleted_out_status = CompetitionRiderStatus.query.filter_by(competition_id=comp_id).delete()
+            crowd_picks.clear(comp_id)
             deleted_race_picks = RacePick.query.filter_by(competition_id=comp_id).delete()
             deleted_holeshot_picks = HoleshotPick.query.filter_by(competition_id=comp_id).delete()
             deleted_wildcard_picks = WildcardPick.query.filter_by(competition_id=comp_id).delete()
+            _ensure_user_season_totals()
+            _refresh_user_season_totals()
+            _sync_league_totals(_store_league_competition_scores([comp_id]))
+            # Tävlingens season_rider_points-rader bort + lagens poäng flyttas med
+            _recalculate_season_team_points(comp_id)
             
             db.session.commit()
+            # Query.delete() passerar inte before_flush-lyssnarna — bumpa explicit
+            dv.bump_results(comp_id)
+            dv.bump_picks(comp_id)
             
             return f"""
             <h1>Anaheim 1 Cleared Successfully!</h1>
@@ -26971,6 +27643,10 @@ def bulletin_board():
         try:
             posts = (
                 BulletinPost.query
+                .options(
+                    load_bulletin_content(),
+                    db.selectinload(BulletinPost.replies).options(load_bulletin_content()),
+                )
                 .filter_by(is_deleted=False, parent_id=None)
                 .order_by(BulletinPost.created_at.desc())
                 .limit(50)  # Visa max 50 senaste posts
@@ -26980,6 +27656,7 @@ def bulletin_board():
             # Fallback if new columns don't exist yet
             posts = (
                 BulletinPost.query
+                .options(load_bulletin_content())
                 .filter_by(is_deleted=False)
                 .order_by(BulletinPost.created_at.desc())
                 .limit(50)
@@ -27978,6 +28655,7 @@ def delete_user(user_id):
         
         # 2. Delete competition scores
         CompetitionScore.query.filter_by(user_id=user_id).delete()
+        UserSeasonTotal.query.filter_by(user_id=user_id).delete()
         
         # 3. Delete race picks
         RacePick.query.filter_by(user_id=user_id).delete()
@@ -27998,10 +28676,18 @@ def delete_user(user_id):
         LeagueRequest.query.filter_by(user_id=user_id).delete()
         
         # 9. Delete league memberships
+        member_league_ids = [
+            lid for (lid,) in db.session.query(LeagueMembership.league_id).filter_by(user_id=user_id).all()
+        ]
         LeagueMembership.query.filter_by(user_id=user_id).delete()
         
         # 10. Delete leagues where user is creator (handle carefully - might want to transfer ownership)
         # For now, we'll delete them but you might want to handle this differently
+        LeagueCompetitionScore.query.filter(
+            LeagueCompetitionScore.league_id.in_(
+                db.session.query(League.id).filter(League.creator_id == user_id)
+            )
+        ).delete(synchronize_session=False)
         League.query.filter_by(creator_id=user_id).delete()
         
         # 11. Delete season team (cascade should handle riders, but let's be explicit)
@@ -28014,6 +28700,7 @@ def delete_user(user_id):
         # 13. Finally, delete the user
         db.session.delete(user)
         db.session.commit()
+        refresh_league_scores(member_league_ids)
         
         return jsonify({
             "message": f"User '{username}' and all related data deleted successfully"
@@ -28657,13 +29344,6 @@ def race_countdown():
             payload["picks_status"] = _user_picks_status_code(int(uid), status_comp)
             payload["picks_competition_id"] = int(status_comp.id)
 
-        # Auto-freeze picks when deadline passes (homepage syncs ~every 60s).
-        if picks_locked:
-            snap_comp = upcoming_race or next_race_obj
-            snap_id = int(getattr(snap_comp, "id", 0) or 0)
-            if snap_comp is not None and snap_id > 0 and snap_id != 999:
-                _auto_ensure_picks_snapshots_if_locked(snap_comp)
-
         # Cache for a short time to cut bandwidth if clients still poll.
         # ETag rotates each minute to keep countdown reasonably fresh.
         from flask import make_response
@@ -29061,6 +29741,7 @@ def test_countdown():
                 'start_time': datetime.utcnow().isoformat(),
                 'scenario': scenario
             })
+            dv.bump_in_transaction(dv.SIMULATION)
             db.session.commit()
         except Exception as e:
             print(f"DEBUG: Error setting global simulation (table might not exist): {e}")
@@ -29070,6 +29751,7 @@ def test_countdown():
             app.global_simulated_time = simulated_time.isoformat()
             app.global_simulation_start_time = datetime.utcnow().isoformat()
             app.global_initial_simulated_time = simulated_time.isoformat()
+        _LOCK_STATE.invalidate()
         
         # Get next upcoming race (use simulated time for testing)
         next_race = (
@@ -29404,11 +30086,13 @@ def reset_simulation():
         # Clear database simulation
         try:
             db.session.execute(db.text("UPDATE global_simulation SET active = FALSE, active_race_id = NULL WHERE id = 1"))
+            dv.bump_in_transaction(dv.SIMULATION)
             db.session.commit()
             print("DEBUG: Reset simulation to real time")
         except Exception as db_error:
             print(f"Database reset failed: {db_error}")
             db.session.rollback()
+        _LOCK_STATE.invalidate()
         
         return jsonify({"message": "Simulation reset to real time"})
         
@@ -29625,6 +30309,7 @@ def quick_simulation():
             CompetitionResult.query.filter_by(competition_id=competition.id).delete()
             HoleshotResult.query.filter_by(competition_id=competition.id).delete()
             CompetitionScore.query.filter_by(competition_id=competition.id).delete()
+            LeaderboardRankSnapshot.query.filter_by(competition_id=competition.id).delete()
             
             picks_created = 0
             
@@ -29714,6 +30399,7 @@ def generate_simulated_results():
         CompetitionResult.query.filter_by(competition_id=competition_id).delete()
         HoleshotResult.query.filter_by(competition_id=competition_id).delete()
         CompetitionScore.query.filter_by(competition_id=competition_id).delete()
+        LeaderboardRankSnapshot.query.filter_by(competition_id=competition_id).delete()
         print(f"DEBUG: Cleared existing results for competition {competition_id}")
         
         # Get all riders based on class and coast (same logic as race_picks_page)
@@ -29779,6 +30465,7 @@ def clear_all_results():
         HoleshotResult.query.delete()
         
         db.session.commit()
+        dv.bump_results()
         
         return jsonify({
             "message": "All results cleared successfully",
@@ -29803,6 +30490,7 @@ def clear_all_picks():
         WildcardPick.query.delete()
         
         db.session.commit()
+        dv.bump_picks()
         
         return jsonify({
             "message": "All picks cleared successfully",
@@ -29838,13 +30526,18 @@ def clear_all_data():
         print("🧹 Starting full reset - clearing all data...")
         
         # Clear all picks and results
+        result_comp_ids = [cid for (cid,) in db.session.query(CompetitionResult.competition_id).distinct()]
+        crowd_picks.clear()
         deleted_race_picks = RacePick.query.delete()
         deleted_holeshot_picks = HoleshotPick.query.delete()
         deleted_wildcard_picks = WildcardPick.query.delete()
         deleted_results = CompetitionResult.query.delete()
         deleted_holeshot_results = HoleshotResult.query.delete()
+        SeasonRiderPoints.query.delete()
         # Wildcard results are calculated automatically from user picks vs race results
         deleted_scores = CompetitionScore.query.delete()
+        UserSeasonTotal.query.delete()
+        LeaderboardRankSnapshot.query.delete()
         deleted_out_status = CompetitionRiderStatus.query.delete()
         
         # Clear season team riders and reset team points
@@ -29854,14 +30547,16 @@ def clear_all_data():
             team.total_points = 0
         deleted_season_teams = 0  # Keep the teams but clear riders
         
-        # Clear league points and scores
-        try:
-            # Reset league total_points to 0
-            db.session.execute(db.text("UPDATE leagues SET total_points = 0"))
-        except Exception as e:
-            print(f"Warning: Could not reset league points: {e}")
+        # Clear league points and scores (total_points är summan av league_competition_scores)
+        _ensure_league_competition_scores()
+        LeagueCompetitionScore.query.delete()
+        _sync_league_totals()
         
         db.session.commit()
+        # Query.delete() passerar inte before_flush-lyssnarna — bumpa explicit
+        # (per tävling: recap m.fl. nycklar bara på results_key)
+        dv.bump_results(*result_comp_ids)
+        dv.bump_picks()
         
         print(f"✅ Full reset complete - deleted: {deleted_race_picks} race picks, {deleted_holeshot_picks} holeshot picks, {deleted_wildcard_picks} wildcard picks, {deleted_results} results, {deleted_holeshot_results} holeshot results, {deleted_scores} scores, {deleted_out_status} out status, {deleted_season_team_riders} season team riders, {deleted_season_teams} season teams")
         
@@ -30236,273 +30931,179 @@ def get_smx_qualification_points(position):
     }
     return points_map.get(position, 0)
 
-def is_picks_locked(competition):
-    """Check if picks are locked for a specific competition"""
-    # Rollback any existing transaction to avoid "aborted transaction" errors
-    db.session.rollback()
-    
-    # Handle both Competition objects and competition IDs
-    if isinstance(competition, int):
-        # If it's an ID, fetch the competition object
-        competition_obj = Competition.query.get(competition)
-        if not competition_obj:
-            return False
-        competition_name = f"ID {competition}"
-        competition_id = competition
-    else:
-        # If it's a Competition object
-        competition_obj = competition
-        competition_name = competition.name if hasattr(competition, 'name') else f"ID {competition.id}"
-        competition_id = competition.id
+def _heal_competition_schedule(competition_obj) -> bool:
+    """Self-heal timezone/start_time for known races if missing; True om något ändrades."""
+    needs_commit = False
+    if 'australian' in (competition_obj.name or '').lower():
+        if hasattr(competition_obj, 'timezone') and not competition_obj.timezone:
+            competition_obj.timezone = 'Australia/Brisbane'
+            needs_commit = True
+        if hasattr(competition_obj, 'start_time') and not competition_obj.start_time:
+            from datetime import time as _t
+            competition_obj.start_time = _t(hour=18, minute=0)
+            needs_commit = True
+    elif 'swedish' in (competition_obj.name or '').lower():
+        if hasattr(competition_obj, 'timezone') and not competition_obj.timezone:
+            competition_obj.timezone = 'Europe/Stockholm'
+            needs_commit = True
+        if hasattr(competition_obj, 'start_time') and not competition_obj.start_time:
+            from datetime import time as _t
+            competition_obj.start_time = _t(hour=17, minute=0)
+            needs_commit = True
+    elif 'anaheim 1' in (competition_obj.name or '').lower():
+        if hasattr(competition_obj, 'timezone') and not competition_obj.timezone:
+            competition_obj.timezone = 'America/Los_Angeles'
+            needs_commit = True
+        # Always set start_time to 11:30 for Anaheim 1 (even if it's already set)
+        if hasattr(competition_obj, 'start_time'):
+            from datetime import time as _t
+            correct_time = _t(hour=11, minute=30)
+            if competition_obj.start_time != correct_time:
+                # Race start 11:30 AM PT (11:30) = Sunday Jan 11, 8:30 PM GMT+1, picks deadline 9:30 AM PT (2h before)
+                competition_obj.start_time = correct_time
+                needs_commit = True
+    return needs_commit
+
+
+_HEAL_SCHEDULE_NAMES = ('australian', 'swedish', 'anaheim 1')
+
+
+def _load_pick_deadlines() -> dict:
+    """Alla tävlingars pick-deadline (UTC) — två queries, laddas av lock_state."""
+    from types import SimpleNamespace
+
+    def _rows():
+        with db.session.no_autoflush:
+            rows = db.session.query(Competition.id, Competition.name, Competition.event_date, Competition.timezone).all()
+            start_times = {}
+            if Competition.has_start_time_column():
+                start_times = dict(db.session.execute(db.text("SELECT id, start_time FROM competitions")).fetchall())
+        return rows, start_times
+
+    rows, start_times = _rows()
+    healed = [r.id for r in rows if any(n in (r.name or '').lower() for n in _HEAL_SCHEDULE_NAMES)]
+    if healed:
+        try:
+            changed = [c for c in Competition.query.filter(Competition.id.in_(healed)).all() if _heal_competition_schedule(c)]
+            if changed:
+                db.session.commit()
+                # Refresh to get updated values
+                rows, start_times = _rows()
+        except Exception as _e:
+            db.session.rollback()
+            print(f"DEBUG: is_picks_locked failed to auto-fix timezone/start_time: {_e}")
 
-    # Check if we're in simulation mode (use only global database state for consistency)
-    simulation_active = False
-    
+    out = {}
+    for r in rows:
+        try:
+            start_time = _parse_start_time_value(start_times.get(r.id))
+        except (TypeError, ValueError):
+            start_time = None
+        try:
+            deadline_utc = _competition_race_schedule(
+                SimpleNamespace(event_date=r.event_date, timezone=r.timezone, start_time=start_time)
+            )["deadline_utc"]
+        except Exception:
+            deadline_utc = None  # saknar datum — aldrig låst
+        out[int(r.id)] = CompetitionDeadline(
+            id=int(r.id),
+            name=r.name or f"ID {r.id}",
+            event_date=r.event_date,
+            start_time=start_time,
+            deadline_utc=deadline_utc,
+        )
+    return out
+
+
+def _load_simulation_state():
+    """Aktiv simulering för lock_state (None = verklig tid)."""
     try:
-        # Rollback any existing transaction first
-        db.session.rollback()
-        
-        result = db.session.execute(db.text("SELECT active FROM global_simulation WHERE id = 1")).fetchone()
-        simulation_active = result and result[0] if result else False
-    except Exception as e:
+        row = db.session.execute(db.text(
+            "SELECT active, scenario, simulated_time, start_time, active_race_id FROM global_simulation WHERE id = 1"
+        )).fetchone()
+    except Exception:
         # Rollback and fallback to app globals if database table doesn't exist
         db.session.rollback()
-        simulation_active = hasattr(app, 'global_simulation_active') and app.global_simulation_active
-    
-    if simulation_active:
-        # Use the same logic as test_countdown for consistency
-        # Get the scenario from global database state or use default
-        try:
-            result = db.session.execute(db.text("SELECT scenario FROM global_simulation WHERE id = 1")).fetchone()
-            scenario = result[0] if result and result[0] else 'race_in_3h'
-        except Exception as e:
-            scenario = session.get('test_scenario', 'race_in_3h')
-        
-        # Get current time first
-        current_time = get_current_time()
-        
-        # Use the same scenario-based logic as race_countdown
-        if scenario and scenario.startswith('active_race_'):
-            # Get the initial simulated time when simulation started
-            try:
-                result = db.session.execute(db.text("SELECT simulated_time FROM global_simulation WHERE id = 1")).fetchone()
-                simulated_time_str = result[0] if result and result[0] else current_time.isoformat()
-                initial_simulated_time = datetime.fromisoformat(simulated_time_str)
-            except Exception as e:
-                initial_simulated_time = current_time
-            
-            # Use actual competition start time if available
-            if hasattr(competition_obj, 'start_time') and competition_obj.start_time:
-                race_date = competition_obj.event_date or initial_simulated_time.date()
-                race_datetime = datetime.combine(race_date, competition_obj.start_time)
-                deadline_datetime = race_datetime - timedelta(hours=2)
-            else:
-                # Fallback to 11 AM
-                fake_race_base_time = initial_simulated_time.replace(hour=11, minute=0, second=0, microsecond=0)
-                race_datetime = fake_race_base_time
-                deadline_datetime = race_datetime - timedelta(hours=2)
-        elif scenario == 'race_in_3h':
-            # Check if this is the active race
-            try:
-                result = db.session.execute(db.text("SELECT active_race_id FROM global_simulation WHERE id = 1")).fetchone()
-                active_race_id = result[0] if result and result[0] else None
-                
-                if active_race_id == competition_id:
-                    # This is the active race - use simulated time
-                    print(f"DEBUG: is_picks_locked - {competition_name} is the ACTIVE race (ID: {competition_id})")
-                    if hasattr(competition_obj, 'start_time') and competition_obj.start_time:
-                        # Use the competition's actual start time with simulated date
-                        race_date = current_time.date()
-                        race_datetime = datetime.combine(race_date, competition_obj.start_time)
-                        deadline_datetime = race_datetime - timedelta(hours=2)
-                    else:
-                        # Fallback to 3 hours from simulated time
-                        race_datetime = current_time + timedelta(hours=3)
-                        deadline_datetime = race_datetime - timedelta(hours=2)
-                else:
-                    # This is not the active race - use real event date
-                    print(f"DEBUG: is_picks_locked - {competition_name} is NOT the active race (ID: {competition_id}, active: {active_race_id})")
-                    if hasattr(competition_obj, 'start_time') and competition_obj.start_time:
-                        race_date = competition_obj.event_date or current_time.date()
-                        race_datetime = datetime.combine(race_date, competition_obj.start_time)
-                        deadline_datetime = race_datetime - timedelta(hours=2)
-                    else:
-                        # Fallback to 3 hours from now
-                        race_datetime = current_time + timedelta(hours=3)
-                        deadline_datetime = race_datetime - timedelta(hours=2)
-            except Exception as e:
-                # Fallback to original logic
-                if hasattr(competition_obj, 'start_time') and competition_obj.start_time:
-                    race_date = competition_obj.event_date or current_time.date()
-                    race_datetime = datetime.combine(race_date, competition_obj.start_time)
-                    deadline_datetime = race_datetime - timedelta(hours=2)
-                else:
-                    race_datetime = current_time + timedelta(hours=3)
-                    deadline_datetime = race_datetime - timedelta(hours=2)
-        elif scenario == 'race_in_1h':
-            # Race in 1 hour - use actual competition start time if available
-            if hasattr(competition_obj, 'start_time') and competition_obj.start_time:
-                race_date = competition_obj.event_date or current_time.date()
-                race_datetime = datetime.combine(race_date, competition_obj.start_time)
-                deadline_datetime = race_datetime - timedelta(hours=2)
-            else:
-                race_datetime = current_time + timedelta(hours=1)
-                deadline_datetime = race_datetime - timedelta(hours=2)
-        elif scenario == 'race_in_30m':
-            # Race in 30 minutes - use actual competition start time if available
-            if hasattr(competition_obj, 'start_time') and competition_obj.start_time:
-                race_date = competition_obj.event_date or current_time.date()
-                race_datetime = datetime.combine(race_date, competition_obj.start_time)
-                deadline_datetime = race_datetime - timedelta(hours=2)
-            else:
-                race_datetime = current_time + timedelta(minutes=30)
-                deadline_datetime = race_datetime - timedelta(hours=2)
-        elif scenario == 'race_in_10m':
-            # Race in 10 minutes - use actual competition start time if available
-            if hasattr(competition_obj, 'start_time') and competition_obj.start_time:
-                race_date = competition_obj.event_date or current_time.date()
-                race_datetime = datetime.combine(race_date, competition_obj.start_time)
-                deadline_datetime = race_datetime - timedelta(hours=2)
-            else:
-                race_datetime = current_time + timedelta(minutes=10)
-                deadline_datetime = race_datetime - timedelta(hours=2)
-        elif scenario == 'race_in_5m':
-            # Race in 5 minutes - use actual competition start time if available
-            if hasattr(competition_obj, 'start_time') and competition_obj.start_time:
-                race_date = competition_obj.event_date or current_time.date()
-                race_datetime = datetime.combine(race_date, competition_obj.start_time)
-                deadline_datetime = race_datetime - timedelta(hours=2)
-            else:
-                race_datetime = current_time + timedelta(minutes=5)
-                deadline_datetime = race_datetime - timedelta(hours=2)
-        elif scenario == 'race_in_1m':
-            # Race in 1 minute - use actual competition start time if available
-            if hasattr(competition_obj, 'start_time') and competition_obj.start_time:
-                race_date = competition_obj.event_date or current_time.date()
-                race_datetime = datetime.combine(race_date, competition_obj.start_time)
-                deadline_datetime = race_datetime - timedelta(hours=2)
+        if getattr(app, 'global_simulation_active', False):
+            return {"scenario": None, "simulated_time": None, "start_time": None, "active_race_id": None, "fallback": True}
+        return None
+    if not row or not row[0]:
+        return None
+    return {"scenario": row[1], "simulated_time": row[2], "start_time": row[3], "active_race_id": row[4]}
+
+
+def _simulated_picks_locked(comp, sim: dict) -> bool:
+    """Låsläge i simuleringsläge — samma scenariologik som race_countdown."""
+    if sim.get("fallback"):
+        scenario = session.get('test_scenario', 'race_in_3h')
+    else:
+        scenario = sim.get("scenario") or 'race_in_3h'
+
+    # Samma som get_current_time(): simulerad starttid + förfluten verklig tid
+    now = datetime.utcnow()
+    current_time = now
+    try:
+        if sim.get("simulated_time") and sim.get("start_time"):
+            current_time = datetime.fromisoformat(sim["simulated_time"]) + (now - datetime.fromisoformat(sim["start_time"]))
+        elif sim.get("simulated_time"):
+            current_time = datetime.fromisoformat(sim["simulated_time"])
+    except (TypeError, ValueError):
+        current_time = now
+    try:
+        initial_simulated_time = datetime.fromisoformat(sim["simulated_time"]) if sim.get("simulated_time") else current_time
+    except (TypeError, ValueError):
+        initial_simulated_time = current_time
+
+    def _at_start(fallback_date):
+        return datetime.combine(comp.event_date or fallback_date, comp.start_time)
+
+    in_offsets = {
+        'race_in_1h': timedelta(hours=1),
+        'race_in_30m': timedelta(minutes=30),
+        'race_in_10m': timedelta(minutes=10),
+        'race_in_5m': timedelta(minutes=5),
+        'race_in_1m': timedelta(minutes=1),
+    }
+    if scenario.startswith('active_race_'):
+        if comp.start_time:
+            race_datetime = _at_start(initial_simulated_time.date())
+        else:
+            # Fallback to 11 AM
+            race_datetime = initial_simulated_time.replace(hour=11, minute=0, second=0, microsecond=0)
+    elif scenario == 'race_in_3h':
+        if comp.start_time:
+            if sim.get("active_race_id") == comp.id:
+                # This is the active race - use simulated date
+                race_datetime = datetime.combine(current_time.date(), comp.start_time)
             else:
-                race_datetime = current_time + timedelta(minutes=1)
-            deadline_datetime = race_datetime - timedelta(hours=2)
-        elif scenario == 'race_started':
-            # Race has started
-            race_datetime = current_time - timedelta(minutes=1)
-            deadline_datetime = race_datetime - timedelta(hours=2)
+                race_datetime = _at_start(current_time.date())
         else:
-            # Default to race in 3 hours
             race_datetime = current_time + timedelta(hours=3)
-            deadline_datetime = race_datetime - timedelta(hours=2)
-        
-        # Calculate time differences using simulated time (same as countdown)
-        # Get the current simulated time from the same source as countdown
-        try:
-            result = db.session.execute(db.text("SELECT simulated_time FROM global_simulation WHERE id = 1")).fetchone()
-            current_simulated_time_str = result[0] if result and result[0] else current_time.isoformat()
-            current_simulated_time = datetime.fromisoformat(current_simulated_time_str)
-        except Exception as e:
-            current_simulated_time = current_time
-        
-        time_to_deadline = deadline_datetime - current_simulated_time
-        
-        # Check if picks are locked (2 hours before race)
-        # If time_to_deadline is negative, deadline has passed and picks are locked
-        picks_locked = time_to_deadline.total_seconds() <= 0
+    elif scenario in in_offsets:
+        race_datetime = _at_start(current_time.date()) if comp.start_time else current_time + in_offsets[scenario]
+    elif scenario == 'race_started':
+        race_datetime = current_time - timedelta(minutes=1)
     else:
-        # Check if picks are locked (2 hours before race)
-        # Self-heal timezone/start_time for known races if missing
-        try:
-            needs_commit = False
-            if 'australian' in (competition_obj.name or '').lower():
-                if hasattr(competition_obj, 'timezone') and not competition_obj.timezone:
-                    competition_obj.timezone = 'Australia/Brisbane'
-                    needs_commit = True
-                if hasattr(competition_obj, 'start_time') and not competition_obj.start_time:
-                    from datetime import time as _t
-                    competition_obj.start_time = _t(hour=18, minute=0)
-                    needs_commit = True
-            elif 'swedish' in (competition_obj.name or '').lower():
-                if hasattr(competition_obj, 'timezone') and not competition_obj.timezone:
-                    competition_obj.timezone = 'Europe/Stockholm'
-                    needs_commit = True
-                if hasattr(competition_obj, 'start_time') and not competition_obj.start_time:
-                    from datetime import time as _t
-                    competition_obj.start_time = _t(hour=17, minute=0)
-                    needs_commit = True
-            elif 'anaheim 1' in (competition_obj.name or '').lower():
-                if hasattr(competition_obj, 'timezone') and not competition_obj.timezone:
-                    competition_obj.timezone = 'America/Los_Angeles'
-                    needs_commit = True
-                # Always set start_time to 11:30 for Anaheim 1 (even if it's already set)
-                if hasattr(competition_obj, 'start_time'):
-                    from datetime import time as _t
-                    correct_time = _t(hour=11, minute=30)
-                    current_time = competition_obj.start_time
-                    if current_time is None or current_time != correct_time:
-                        # Race start 11:30 AM PT (11:30) = Sunday Jan 11, 8:30 PM GMT+1, picks deadline 9:30 AM PT (2h before)
-                        competition_obj.start_time = correct_time
-                        needs_commit = True
-            if needs_commit:
-                db.session.commit()
-                # Refresh the object to get updated values
-                db.session.refresh(competition_obj)
-        except Exception as _e:
-            db.session.rollback()
-            print(f"DEBUG: is_picks_locked failed to auto-fix timezone/start_time: {_e}")
-        
-        race_date = competition_obj.event_date
-        
-        # Use start_time from database if available, otherwise default to 8 PM
-        if competition_obj.start_time:
-            race_datetime_local = datetime.combine(race_date, competition_obj.start_time)
-        else:
-            race_time_str = "20:00"  # 8pm local time default
-            race_hour, race_minute = map(int, race_time_str.split(':'))
-            race_datetime_local = datetime.combine(race_date, datetime.min.time().replace(hour=race_hour, minute=race_minute))
-        
-        # Convert to UTC for countdown calculation
-        # Use proper timezone handling with zoneinfo (Python 3.9+) or pytz fallback
-        timezone = getattr(competition_obj, 'timezone', 'America/Los_Angeles')
-        
-        try:
-            # Try using zoneinfo (Python 3.9+)
-            from zoneinfo import ZoneInfo
-            tz = ZoneInfo(timezone)
-            # Make race_datetime_local timezone-aware
-            race_datetime_aware = race_datetime_local.replace(tzinfo=tz)
-            # Convert to UTC
-            race_datetime_utc = race_datetime_aware.astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
-        except (ImportError, Exception):
-            # Fallback to pytz if zoneinfo not available
-            try:
-                import pytz
-                tz = pytz.timezone(timezone)
-                # Make race_datetime_local timezone-aware
-                race_datetime_aware = tz.localize(race_datetime_local)
-                # Convert to UTC
-                race_datetime_utc = race_datetime_aware.astimezone(pytz.UTC).replace(tzinfo=None)
-            except ImportError:
-                # Final fallback: use fixed offsets (not ideal, but works)
-                timezone_offsets = {
-                    'America/Los_Angeles': -8,  # PST (winter) / -7 PDT (summer)
-                    'America/Denver': -7,       # MST (winter) / -6 MDT (summer)
-                    'America/Phoenix': -7,      # MST (no DST)
-                    'America/Chicago': -6,      # CST (winter) / -5 CDT (summer)
-                    'America/New_York': -5,     # EST (winter) / -4 EDT (summer)
-                    'America/Argentina/Buenos_Aires': -3,  # ART (no DST)
-                    'Australia/Brisbane': 10,  # AEST (no DST)
-                    'Europe/Stockholm': 1  # CET (UTC+1 in winter, UTC+2 in summer)
-                }
-                # For January, use winter offsets
-                utc_offset = timezone_offsets.get(timezone, -8)
-                race_datetime_utc = race_datetime_local - timedelta(hours=utc_offset)
-        
-        
-        # Check if picks are locked (2 hours before race)
-        current_time = get_current_time()
-        time_to_deadline = race_datetime_utc - timedelta(hours=2) - current_time
-        picks_locked = time_to_deadline.total_seconds() <= 0
-    
-    return picks_locked
+        # Default to race in 3 hours
+        race_datetime = current_time + timedelta(hours=3)
+
+    # Picks lock 2 hours before race, compared against the simulated time (same as countdown)
+    deadline_datetime = race_datetime - timedelta(hours=2)
+    return (deadline_datetime - initial_simulated_time).total_seconds() <= 0
+
+
+_LOCK_STATE = LockStateService(
+    _load_pick_deadlines,
+    _load_simulation_state,
+    _simulated_picks_locked,
+    check_interval=float(os.getenv("LOCK_STATE_CHECK_SEC") or 5),
+)
+
+
+def is_picks_locked(competition):
+    """Check if picks are locked for a specific competition (cachat per dataversion, se lock_state.py)"""
+    competition_id = competition if isinstance(competition, int) else competition.id
+    return _LOCK_STATE.is_locked(competition_id)
 
 def is_season_active():
     """Check if the season is active (has active races or competitions with results)"""
@@ -30885,6 +31486,13 @@ def api_cron_reminders():
 
 _start_homepage_cache_warm()
 
+try:
+    from picks_snapshot_scheduler import start_picks_snapshot_scheduler
+
+    start_picks_snapshot_scheduler(app, run_due_picks_snapshots)
+except Exception as _snap_sched_err:
+    print(f"Picks snapshot scheduler not started: {_snap_sched_err}")
+
 try:
     from reminder_scheduler import start_reminder_scheduler
 
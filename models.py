@@ -12,7 +12,8 @@ class User(db.Model):
     password_reset_token = db.Column(db.String(64), nullable=True)  # Engångstoken för återställning
     password_reset_expires = db.Column(db.DateTime, nullable=True)  # När token går ut
     display_name = db.Column(db.String(100), nullable=True)  # Användarens riktiga namn
-    profile_picture_url = db.Column(db.Text, nullable=True)  # Profilbild (base64 data)
+    # Profilbild (base64 data) — deferred, se load_user_picture()
+    profile_picture_url = db.deferred(db.Column(db.Text, nullable=True))
     bio = db.Column(db.Text, nullable=True)  # Kort beskrivning om sig själv
     favorite_rider = db.Column(db.String(100), nullable=True)  # Favoritförare
     favorite_team = db.Column(db.String(100), nullable=True)  # Favoritlag
@@ -113,6 +114,10 @@ class Competition(db.Model):
                 db.text("UPDATE competitions SET start_time = :start_time WHERE id = :id"),
                 {"start_time": bound, "id": self.id},
             )
+            # Rå SQL — flush-lyssnaren ser inte ändringen (pick-deadlines i lock_state)
+            import data_versions as dv
+
+            dv.bump_in_transaction(dv.SCHEDULE)
         except Exception:
             pass
 
@@ -125,7 +130,9 @@ class Rider(db.Model):
     rider_number = db.Column(db.Integer)
     bike_brand = db.Column(db.String(50))
     image_url = db.Column(db.String(200))
-    rider_image_data = db.Column(db.Text, nullable=True)  # base64 data URL, överlever deploy (Render)
+    # legacy base64 data URL — flyttas till portrait_blobs; deferred
+    rider_image_data = db.deferred(db.Column(db.Text, nullable=True))
+    portrait_hash = db.Column(db.String(40), nullable=True)  # sha1 → PortraitBlob (se portrait_store.py)
     price = db.Column(db.Integer, nullable=False)
     coast_250 = db.Column(db.String(10), nullable=True)
     series_participation = db.Column(db.String(50), default='all')
@@ -146,24 +153,30 @@ class Rider(db.Model):
     twitter = db.Column(db.String(100))
     facebook = db.Column(db.String(100))
     website = db.Column(db.String(200))
-    bio = db.Column(db.Text)
-    achievements = db.Column(db.Text)
-    bio_sv = db.Column(db.Text, nullable=True)
-    achievements_sv = db.Column(db.Text, nullable=True)
+    # Bio/meriter laddas som grupp vid första åtkomst — se load_rider_bio()
+    bio = db.deferred(db.Column(db.Text), group="rider_bio")
+    achievements = db.deferred(db.Column(db.Text), group="rider_bio")
+    bio_sv = db.deferred(db.Column(db.Text, nullable=True), group="rider_bio")
+    achievements_sv = db.deferred(db.Column(db.Text, nullable=True), group="rider_bio")
     racerx_bio_skip = db.Column(db.String(200), nullable=True)
 
 
 def rider_query_for_list_ui():
-    """Lista/kort: ladda inte stora blob-kolumner (rider_image_data, bio) i RAM."""
-    from sqlalchemy.orm import defer
-
-    return Rider.query.options(
-        defer(Rider.rider_image_data),
-        defer(Rider.bio),
-        defer(Rider.achievements),
-        defer(Rider.bio_sv),
-        defer(Rider.achievements_sv),
-    )
+    """Lista/kort: stora kolumner (rider_image_data, bio) är deferred på modellen."""
+    return Rider.query
+
+
+class PortraitBlob(db.Model):
+    """
+    Förarporträtt som råa bytes, content-addressed (sha1 av innehållet).
+    Förare pekar hit via riders.portrait_hash; samma bild lagras bara en gång.
+    """
+    __tablename__ = "portrait_blobs"
+    sha = db.Column(db.String(40), primary_key=True)
+    mime = db.Column(db.String(40), nullable=False, default="image/jpeg")
+    size_bytes = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 class SeasonTeam(db.Model):
@@ -202,6 +215,15 @@ class SeasonTeamClassPromotion(db.Model):
     to_rider = db.relationship("Rider", foreign_keys=[to_rider_id])
 
 
+class SeasonRiderPoints(db.Model):
+    """Säsongsteam-poäng per förare och tävling — fylls när resultat importeras/poängsätts."""
+    __tablename__ = "season_rider_points"
+    competition_id = db.Column(db.Integer, db.ForeignKey("competitions.id"), primary_key=True)
+    rider_id = db.Column(db.Integer, db.ForeignKey("riders.id"), primary_key=True, index=True)
+    position = db.Column(db.Integer, nullable=True)
+    points = db.Column(db.Integer, nullable=False, default=0)
+
+
 class League(db.Model):
     __tablename__ = "leagues"
     id = db.Column(db.Integer, primary_key=True)
@@ -209,13 +231,26 @@ class League(db.Model):
     creator_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     invite_code = db.Column(db.String(10), unique=True, nullable=False)
     image_url = db.Column(db.String(200))
-    image_data = db.Column(db.Text)
+    image_data = db.deferred(db.Column(db.Text))  # base64 — bara /league_image läser den
     image_mime_type = db.Column(db.String(50))
     description = db.Column(db.String(255))
     is_public = db.Column(db.Boolean, default=True)
     total_points = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+
+class LeagueCompetitionScore(db.Model):
+    """Fair ligapoäng per tävling (top-N-snitt) — League.total_points är summan av raderna."""
+    __tablename__ = "league_competition_scores"
+    league_id = db.Column(db.Integer, db.ForeignKey("leagues.id"), primary_key=True)
+    competition_id = db.Column(
+        db.Integer, db.ForeignKey("competitions.id"), primary_key=True, index=True
+    )
+    score = db.Column(db.Float, nullable=False, default=0)
+    members_counted = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class LeagueMembership(db.Model):
     __tablename__ = "league_memberships"
     id = db.Column(db.Integer, primary_key=True)
@@ -296,7 +331,7 @@ class BulletinPost(db.Model):
     __tablename__ = "bulletin_posts"
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.deferred(db.Column(db.Text, nullable=False))  # se load_bulletin_content()
     category = db.Column(db.String(20), default="general")
     parent_id = db.Column(db.Integer, db.ForeignKey("bulletin_posts.id"), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -317,6 +352,7 @@ class BulletinReaction(db.Model):
 
 class RacePick(db.Model):
     __tablename__ = "race_picks"
+    # Unikt index (user_id, competition_id, rider_id) skapas av pick_storage.migrate
     pick_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     competition_id = db.Column(db.Integer, db.ForeignKey("competitions.id"))
@@ -333,7 +369,8 @@ class PicksSnapshot(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     competition_id = db.Column(db.Integer, db.ForeignKey("competitions.id"), nullable=False, index=True)
-    payload_json = db.Column(db.Text, nullable=False)  # JSON string (race/holeshot/wildcard)
+    # JSON string (race/holeshot/wildcard) — deferred, se load_snapshot_payload()
+    payload_json = db.deferred(db.Column(db.Text, nullable=False))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     source = db.Column(db.String(30), default="auto_lock", nullable=False)
     __table_args__ = (
@@ -341,6 +378,31 @@ class PicksSnapshot(db.Model):
         db.Index("idx_picks_snapshot_comp_created", "competition_id", "created_at"),
     )
 
+class CrowdPickCount(db.Model):
+    """
+    Antal användare per (kind, klass, position, förare) för en tävling — crowd-andelar
+    utan att läsa varje snapshot. kind: race (position), rider (var som helst i topp 6),
+    holeshot (klass), wildcard (position), lineup (klass, "*" = seriens klasser).
+    Underhålls av crowd_picks.py.
+    """
+    __tablename__ = "crowd_pick_counts"
+    competition_id = db.Column(db.Integer, db.ForeignKey("competitions.id"), primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)
+    class_name = db.Column(db.String(16), primary_key=True, default="")
+    position = db.Column(db.Integer, primary_key=True, default=0)
+    rider_id = db.Column(db.Integer, primary_key=True, default=0)
+    n = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CrowdPickState(db.Model):
+    """Ett aggregat per tävling: vilken plockversion det motsvarar, och om det frusits vid låsning."""
+    __tablename__ = "crowd_pick_state"
+    competition_id = db.Column(db.Integer, db.ForeignKey("competitions.id"), primary_key=True)
+    n_users = db.Column(db.Integer, nullable=False, default=0)
+    picks_version = db.Column(db.String(32))
+    frozen_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class CompetitionScore(db.Model):
     __tablename__ = "competition_scores"
     score_id = db.Column(db.Integer, primary_key=True)
@@ -351,6 +413,15 @@ class CompetitionScore(db.Model):
     holeshot_points = db.Column(db.Integer, default=0)
     wildcard_points = db.Column(db.Integer, default=0)
 
+
+class UserSeasonTotal(db.Model):
+    """Summerade tippa-poäng per användare och scope ("AMA" = allt utom WSX, "WSX:<år>")."""
+    __tablename__ = "user_season_totals"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    scope = db.Column(db.String(16), primary_key=True, index=True)
+    total_points = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class LeaderboardHistory(db.Model):
     __tablename__ = "leaderboard_history"
     id = db.Column(db.Integer, primary_key=True)
@@ -362,6 +433,18 @@ class LeaderboardHistory(db.Model):
         db.Index('idx_leaderboard_history_user_created', 'user_id', 'created_at'),
     )
 
+
+class LeaderboardRankSnapshot(db.Model):
+    """
+    Rank-snapshot efter att en tävling poängsatts (per scope, se UserSeasonTotal); skrivs om vid omräkning.
+    payload_json är en platt lista [user_id, rank, total_points, user_id, rank, ...].
+    """
+    __tablename__ = "leaderboard_rank_snapshots"
+    competition_id = db.Column(db.Integer, db.ForeignKey("competitions.id"), primary_key=True)
+    scope = db.Column(db.String(16), primary_key=True, index=True)
+    payload_json = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 class CompetitionRiderStatus(db.Model):
     __tablename__ = "competition_rider_status"
     id = db.Column(db.Integer, primary_key=True)
@@ -391,6 +474,7 @@ class CompetitionResult(db.Model):
 
 class HoleshotPick(db.Model):
     __tablename__ = "holeshot_picks"
+    # Unikt index (user_id, competition_id, class) skapas av pick_storage.migrate
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     competition_id = db.Column(db.Integer, db.ForeignKey("competitions.id"))
@@ -406,6 +490,7 @@ class HoleshotResult(db.Model):
 
 class WildcardPick(db.Model):
     __tablename__ = "wildcard_picks"
+    # Unikt index (user_id, competition_id) skapas av pick_storage.migrate
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     competition_id = db.Column(db.Integer, db.ForeignKey("competitions.id"))
@@ -579,9 +664,53 @@ class DailySiteStats(db.Model):
     pageviews = db.Column(db.Integer, nullable=False, default=0)
     unique_visitors = db.Column(db.Integer, nullable=False, default=0)
 
+class DataVersion(db.Model):
+    """
+    Versionsräknare per datadomän ("results", "results:<comp_id>", "picks:<comp_id>", "roster" …).
+    Bumpas när datan ändras; cachenycklar innehåller versionen (se data_versions.py).
+    """
+    __tablename__ = "data_versions"
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class DailyVisitorSighting(db.Model):
     # One row per unique visitor key per day (dedupe cookie races).
     __tablename__ = "daily_visitor_sightings"
     day = db.Column(db.Date, primary_key=True)
     visitor_key = db.Column(db.String(64), primary_key=True)
 
+
+# --- Tunga kolumner ---
+# Base64-bilder, bios och JSON-payloads är deferred: en vanlig query (t.ex.
+# User.query.all() i poängberäkningen) läser dem inte. Där de faktiskt används
+# i listor laddas de explicit med optionerna nedan, annars blir det en extra
+# query per rad vid första åtkomst.
+
+HEAVY_COLUMNS = (
+    User.profile_picture_url,
+    Rider.rider_image_data,
+    Rider.bio,
+    Rider.achievements,
+    Rider.bio_sv,
+    Rider.achievements_sv,
+    League.image_data,
+    PicksSnapshot.payload_json,
+    BulletinPost.content,
+)
+
+
+def load_user_picture():
+    return db.undefer(User.profile_picture_url)
+
+
+def load_rider_bio():
+    return db.undefer_group("rider_bio")
+
+
+def load_snapshot_payload():
+    return db.undefer(PicksSnapshot.payload_json)
+
+
+def load_bulletin_content():
+    return db.undefer(BulletinPost.content)
@@ -0,0 +1,289 @@
+"""Unika picks per användare och tävling — dedupe-migrering + upsert-sparning.
+
+race_picks, holeshot_picks och wildcard_picks saknade unika index, så dubbla
+rader (dubbelklick, samtidiga sparningar, gamla importvägar) kunde smyga in.
+Därför dedupade calculate_scores, _build_race_results_detail m.fl. vid varje
+anrop (högsta id vinner) och raderade rader mitt i poängräkningen.
+
+Här finns lagringsläget med unika index:
+
+* race_picks (user_id, competition_id, rider_id),
+* holeshot_picks (user_id, competition_id, class),
+* wildcard_picks (user_id, competition_id).
+
+migrate() tar bort dubbletter med samma regler som läsvägarna (högsta id för
+race/holeshot, lägsta id för wildcard — den som .first() och poängräkningen
+använde) och skapar sedan indexen; på Postgres med CREATE INDEX CONCURRENTLY så
+att sparningar inte blockeras, och under ett advisory lock så att bara en
+process migrerar åt gången. Den körs som release-steg (render.yaml
+preDeployCommand) eller manuellt via tools/migrate_pick_uniqueness.py — inte
+från webbprocessen.
+
+unique_enabled() säger om indexen finns och är giltiga (kontrolleras i den
+egna processen). Då sparar save_picks med upsert (replace_user_picks) och
+poängräkningen hoppar över sin dedupe.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, NamedTuple
+
+from sqlalchemy import text, update
+
+import data_versions as dv
+from models import HoleshotPick, RacePick, WildcardPick, db
+
+
+class UniqueIndex(NamedTuple):
+    name: str
+    table: str
+    pk: str
+    columns: tuple[str, ...]
+    keep: str  # "max" | "min" — vilken rad som behålls vid dubbletter
+
+
+INDEXES = (
+    UniqueIndex("uq_race_picks_user_comp_rider", "race_picks", "pick_id", ("user_id", "competition_id", "rider_id"), "max"),
+    UniqueIndex("uq_holeshot_picks_user_comp_class", "holeshot_picks", "id", ("user_id", "competition_id", "class"), "max"),
+    UniqueIndex("uq_wildcard_picks_user_comp", "wildcard_picks", "id", ("user_id", "competition_id"), "min"),
+)
+
+# Läget kontrolleras högst så här ofta tills indexen finns (sedan aldrig igen)
+_CHECK_INTERVAL = 60.0
+_enabled = False
+_checked_at = 0.0
+# pg_advisory_lock-nyckel för migreringen (godtycklig men fast)
+_ADVISORY_KEY = 7_425_031
+
+
+def _quote(col: str) -> str:
+    # "class" är ett reserverat ord
+    return f'"{col}"'
+
+
+def _existing_indexes(conn) -> set[str]:
+    names = [ix.name for ix in INDEXES]
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        # Ett avbrutet CREATE INDEX CONCURRENTLY lämnar ett ogiltigt index — räknas inte
+        rows = conn.execute(
+            text(
+                "SELECT c.relname FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = ANY(:names) AND i.indisvalid"
+            ),
+            {"names": names},
+        )
+        return {r[0] for r in rows}
+    if dialect == "sqlite":
+        rows = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND name IN (%s)" % ",".join(f"'{n}'" for n in names))
+        )
+        return {r[0] for r in rows}
+    from sqlalchemy import inspect
+
+    insp = inspect(conn)
+    found: set[str] = set()
+    for ix in INDEXES:
+        found.update(i["name"] for i in insp.get_indexes(ix.table) if i.get("name") in names)
+    return found
+
+
+def unique_enabled(*, fresh: bool = False) -> bool:
+    """True när alla tre unika index finns (kontrolleras högst var _CHECK_INTERVAL s)."""
+    global _enabled, _checked_at
+    if _enabled:
+        return True
+    now = time.monotonic()
+    if not fresh and now - _checked_at < _CHECK_INTERVAL:
+        return False
+    _checked_at = now
+    try:
+        with db.engine.connect() as conn:
+            found = _existing_indexes(conn)
+    except Exception as e:
+        print(f"pick_storage check: {e}")
+        return False
+    _enabled = all(ix.name in found for ix in INDEXES)
+    return _enabled
+
+
+def _dedupe(conn, ix: UniqueIndex) -> int:
+    cols = ", ".join(_quote(c) for c in ix.columns)
+    order = "DESC" if ix.keep == "max" else "ASC"
+    not_null = " AND ".join(f"{_quote(c)} IS NOT NULL" for c in ix.columns)
+    res = conn.execute(
+        text(
+            f"DELETE FROM {ix.table} WHERE {ix.pk} IN ("
+            f" SELECT {ix.pk} FROM ("
+            f"  SELECT {ix.pk}, ROW_NUMBER() OVER (PARTITION BY {cols} ORDER BY {ix.pk} {order}) AS rn"
+            f"  FROM {ix.table} WHERE {not_null}"
+            f" ) ranked WHERE rn > 1"
+            f")"
+        )
+    )
+    return int(res.rowcount or 0)
+
+
+def duplicate_counts() -> dict[str, int]:
+    """Rader som migrate() skulle ta bort, per tabell (för --dry-run)."""
+    out: dict[str, int] = {}
+    with db.engine.connect() as conn:
+        for ix in INDEXES:
+            cols = ", ".join(_quote(c) for c in ix.columns)
+            not_null = " AND ".join(f"{_quote(c)} IS NOT NULL" for c in ix.columns)
+            out[ix.table] = int(
+                conn.execute(
+                    text(
+                        f"SELECT COALESCE(SUM(n - 1), 0) FROM ("
+                        f" SELECT COUNT(*) AS n FROM {ix.table} WHERE {not_null} GROUP BY {cols}"
+                        f") grouped"
+                    )
+                ).scalar()
+                or 0
+            )
+    return out
+
+
+def _invalid_index(conn, name: str) -> bool:
+    """Postgres: finns indexet men är ogiltigt (avbrutet CREATE INDEX CONCURRENTLY)?"""
+    return (
+        conn.execute(
+            text(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": name},
+        ).first()
+        is not None
+    )
+
+
+def _create_index(ix: UniqueIndex) -> int:
+    """Dedupe + CREATE UNIQUE INDEX; försöker igen om en dubblett hann skrivas emellan. Returnerar raderade rader."""
+    cols = ", ".join(_quote(c) for c in ix.columns)
+    postgres = db.engine.dialect.name == "postgresql"
+    deleted = 0
+    for attempt in range(3):
+        with db.engine.begin() as conn:
+            deleted += _dedupe(conn, ix)
+        try:
+            if postgres:
+                with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    # Bara ett ogiltigt index tas bort — ett giltigt kan redan användas av upserts
+                    if _invalid_index(conn, ix.name):
+                        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {ix.name}"))
+                    conn.execute(text(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {ix.name} ON {ix.table} ({cols})"))
+            else:
+                with db.engine.begin() as conn:
+                    conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {ix.name} ON {ix.table} ({cols})"))
+            return deleted
+        except Exception as e:
+            print(f"pick_storage {ix.name} attempt {attempt + 1}: {e}")
+    raise RuntimeError(f"could not create {ix.name}")
+
+
+def _migrate_locked() -> dict[str, Any]:
+    with db.engine.connect() as conn:
+        found = _existing_indexes(conn)
+    deleted: dict[str, int] = {}
+    for ix in INDEXES:
+        if ix.name in found:
+            continue
+        deleted[ix.table] = _create_index(ix)
+    if any(deleted.values()):
+        # Läsvägarna (snapshot-payloads, crowd-aggregatet) kan ha sett de borttagna raderna
+        dv.bump_picks()
+    return {"deleted": deleted, "enabled": unique_enabled(fresh=True)}
+
+
+def migrate() -> dict[str, Any]:
+    """
+    Online-migrering till unika index. Idempotent; kräver app-kontext.
+    Postgres: körs under pg_try_advisory_lock — är låset upptaget (annan
+    process migrerar) returneras {"skipped": "locked"} utan att något görs.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return _migrate_locked()
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _ADVISORY_KEY}).scalar():
+            return {"skipped": "locked", "enabled": unique_enabled(fresh=True)}
+        try:
+            return _migrate_locked()
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _ADVISORY_KEY})
+
+
+def _upsert(model, rows: list[dict], index_elements: list[str], update_cols: list[str]) -> None:
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.engine.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={c: stmt.excluded[c] for c in update_cols},
+        )
+        db.session.execute(stmt, rows)
+        return
+    for row in rows:
+        res = db.session.execute(
+            update(table)
+            .where(*(table.c[c] == row[c] for c in index_elements))
+            .values(**{c: row[c] for c in update_cols})
+        )
+        if not res.rowcount:
+            db.session.execute(table.insert().values(**row))
+
+
+def replace_user_picks(
+    user_id: int,
+    competition_id: int,
+    *,
+    race: list[tuple[int, int]],
+    holeshots: dict[str, int],
+    wildcard: tuple[int, int] | None,
+) -> None:
+    """
+    Ersätt användarens picks (kräver unique_enabled()): en upsert per tabell +
+    borttag av rader som inte längre finns. race = [(rider_id, position)],
+    holeshots = {klass: rider_id}, wildcard = (rider_id, position) eller None.
+    Committar inte.
+    """
+    uid, cid = int(user_id), int(competition_id)
+    rider_ids = [rid for rid, _pos in race]
+    q = RacePick.query.filter(RacePick.user_id == uid, RacePick.competition_id == cid)
+    if rider_ids:
+        q = q.filter(RacePick.rider_id.notin_(rider_ids))
+    q.delete(synchronize_session=False)
+    _upsert(
+        RacePick,
+        [{"user_id": uid, "competition_id": cid, "rider_id": rid, "predicted_position": pos} for rid, pos in race],
+        ["user_id", "competition_id", "rider_id"],
+        ["predicted_position"],
+    )
+
+    q = HoleshotPick.query.filter(HoleshotPick.user_id == uid, HoleshotPick.competition_id == cid)
+    if holeshots:
+        q = q.filter(HoleshotPick.class_name.notin_(list(holeshots)))
+    q.delete(synchronize_session=False)
+    _upsert(
+        HoleshotPick,
+        [{"user_id": uid, "competition_id": cid, "class": cls, "rider_id": rid} for cls, rid in holeshots.items()],
+        ["user_id", "competition_id", "class"],
+        ["rider_id"],
+    )
+
+    if wildcard is None:
+        WildcardPick.query.filter_by(user_id=uid, competition_id=cid).delete(synchronize_session=False)
+    else:
+        _upsert(
+            WildcardPick,
+            [{"user_id": uid, "competition_id": cid, "rider_id": wildcard[0], "position": wildcard[1]}],
+            ["user_id", "competition_id"],
+            ["rider_id", "position"],
+        )
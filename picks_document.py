@@ -0,0 +1,150 @@
+"""Andras picks som ett färdigt dokument per tävling (/get_other_users_picks).
+
+Endpointen laddade alla användare och gjorde en PicksSnapshot-query (eller tre
+live-queries) per användare och byggde hela JSON-svaret vid varje anrop — trots
+att datan inte kan ändras efter låsning.
+
+Här byggs dokumentet (alla användare med picks + crowd-sammanfattningen) en gång
+per tävling och dataversion och sparas zlib-komprimerat i cachelagret
+(cache_store, delat mellan workers när ett delat backend finns). Nyckeln består
+av tävlingens PICKS-version, förarlistan och användarnamnen (USERS, bumpas vid
+flush nedan), så en admin-ändring ger ett nytt dokument automatiskt.
+
+Varje request filtrerar sedan bort den inloggade användaren, ev. till en liga,
+och kan sidindelas (page/per_page). Svaret får en ETag som härleds ur
+dokumentets hash + urvalet, så klienter som redan har svaret får 304.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from typing import Any, Callable, NamedTuple
+
+import data_versions as dv
+from cache_store import get_cache
+from models import User
+
+# Namnbyten syns i dokumentet — bumpa i samma transaktion som ändringen
+dv.bump_on_change(User, dv.USERS, "username", "display_name")
+
+# Höj när dokumentets format ändras (ger nya nycklar/ETags)
+REVISION = 1
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+# Nyckeln innehåller dataversionerna — TTL:en är bara ett skyddsnät
+_cache = get_cache(
+    "other_users_picks",
+    maxsize=max(1, int(os.getenv("OTHER_PICKS_CACHE_SIZE") or 8)),
+    ttl=float(os.getenv("OTHER_PICKS_CACHE_TTL_SEC") or 6 * 3600),
+)
+_lock = threading.Lock()
+_key_locks: dict[tuple, threading.Lock] = {}
+
+
+class PicksDocument(NamedTuple):
+    etag: str
+    blob: bytes  # zlib-komprimerad JSON: {"users": [[user_id, entry], ...], "crowd", "competition"}
+    n_users: int
+
+
+def cache_key(competition_id: int, *, locked: bool) -> tuple:
+    cid = int(competition_id)
+    # Olåst (resultat finns men deadline flyttad) läses live-picks i stället för snapshots
+    return (REVISION, cid, bool(locked), *dv.versions(dv.picks_key(cid), dv.PICKS_ALL, dv.ROSTER, dv.USERS))
+
+
+def _key_lock(key: tuple) -> threading.Lock:
+    with _lock:
+        lock = _key_locks.get(key)
+        if lock is None:
+            if len(_key_locks) > 256:
+                _key_locks.clear()
+            lock = _key_locks[key] = threading.Lock()
+        return lock
+
+
+def encode(document: dict[str, Any]) -> PicksDocument:
+    raw = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return PicksDocument(
+        etag=hashlib.sha1(raw).hexdigest()[:20],
+        blob=zlib.compress(raw, 6),
+        n_users=len(document.get("users") or []),
+    )
+
+
+def decode(doc: PicksDocument) -> dict[str, Any]:
+    return json.loads(zlib.decompress(doc.blob).decode("utf-8"))
+
+
+def get_or_build(competition_id: int, *, locked: bool, build: Callable[[], dict[str, Any]]) -> PicksDocument:
+    """Cachat dokument; build() anropas högst en gång per nyckel och process samtidigt."""
+    key = cache_key(competition_id, locked=locked)
+    doc = _cache.get(key)
+    if doc is not None:
+        return doc
+    with _key_lock(key):
+        doc = _cache.get(key)
+        if doc is None:
+            doc = encode(build())
+            _cache.set(key, doc)
+    return doc
+
+
+def parse_paging(page: Any, per_page: Any) -> tuple[int, int] | None:
+    """(page, per_page) om klienten bad om en sida, annars None (hela listan). ValueError vid ogiltiga värden."""
+    if page in (None, "") and per_page in (None, ""):
+        return None
+    page_i = int(page) if page not in (None, "") else 1
+    per_page_i = int(per_page) if per_page not in (None, "") else DEFAULT_PER_PAGE
+    if page_i < 1 or per_page_i < 1:
+        raise ValueError("page/per_page must be positive")
+    return page_i, min(per_page_i, MAX_PER_PAGE)
+
+
+def response_etag(
+    doc: PicksDocument,
+    *,
+    viewer_id: int,
+    member_ids: set[int] | None = None,
+    paging: tuple[int, int] | None = None,
+) -> str:
+    """ETag för ett urval ur dokumentet (svaret är per användare: den egna raden utelämnas)."""
+    parts = [doc.etag, str(int(viewer_id)), repr(paging)]
+    if member_ids is not None:
+        parts.append(",".join(str(u) for u in sorted(member_ids)))
+    return '"%s"' % hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:24]
+
+
+def select(
+    doc: PicksDocument,
+    *,
+    viewer_id: int,
+    member_ids: set[int] | None = None,
+    paging: tuple[int, int] | None = None,
+) -> dict[str, Any]:
+    """Svaret till en användare: övriga användare (ev. bara ligans medlemmar), ev. en sida."""
+    document = decode(doc)
+    viewer_id = int(viewer_id)
+    users = [
+        entry
+        for uid, entry in document.get("users") or []
+        if uid != viewer_id and (member_ids is None or uid in member_ids)
+    ]
+    out: dict[str, Any] = {"crowd": document.get("crowd"), "competition": document.get("competition")}
+    if paging is not None:
+        page, per_page = paging
+        total = len(users)
+        users = users[(page - 1) * per_page : page * per_page]
+        out["paging"] = {
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "pages": (total + per_page - 1) // per_page,
+        }
+    out["users"] = users
+    return out
+
@@ -0,0 +1,63 @@
+"""Pick-deadline-klocka — fryser allas picks (PicksSnapshot) när picks låses.
+
+Snapshots skapades tidigare lat från sidladdningar, en användare i taget, så
+de första besökarna efter låsningen fick betala hela kostnaden. Här vaknar en
+tråd i web-tjänsten precis efter nästa deadline (och minst var
+PICKS_SNAPSHOT_CHECK_SEC sekund) och skapar snapshots för tävlingen i en
+mängdbaserad omgång. Flera workers kan köra samtidigt — insert hoppar över
+rader som redan finns.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def _scheduler_enabled() -> bool:
+    mode = (os.getenv("PICKS_SNAPSHOT_SCHEDULER") or "on").strip().lower()
+    return mode not in ("0", "false", "off", "no")
+
+
+def start_picks_snapshot_scheduler(app, run_due: Callable[[], dict[str, Any]]) -> None:
+    """run_due körs i app-kontext och returnerar {"created": {comp_id: n}, "next_deadline": datetime|None}."""
+    global _started
+    if not _scheduler_enabled():
+        return
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+
+    from app_metrics import record_job, register_job_thread
+
+    check_sec = max(5.0, float(os.getenv("PICKS_SNAPSHOT_CHECK_SEC") or 60))
+
+    def loop() -> None:
+        time.sleep(10)
+        while True:
+            wait = check_sec
+            t0 = time.perf_counter()
+            try:
+                with app.app_context():
+                    result = run_due()
+                created = result.get("created") or {}
+                if created:
+                    print(f"Picks snapshot scheduler created={created}")
+                next_deadline = result.get("next_deadline")
+                if next_deadline is not None:
+                    # Vakna strax efter deadline (låst = deadline <= nu)
+                    wait = min(wait, max(1.0, (next_deadline - datetime.utcnow()).total_seconds() + 1))
+                record_job("picks_snapshot_scheduler", duration=time.perf_counter() - t0)
+            except Exception as ex:
+                print(f"Picks snapshot scheduler error: {ex}")
+                record_job("picks_snapshot_scheduler", ok=False, error=str(ex))
+            time.sleep(wait)
+
+    register_job_thread("picks_snapshot_scheduler", "mx-picks-snapshots")
+    threading.Thread(target=loop, daemon=True, name="mx-picks-snapshots").start()
@@ -4,6 +4,7 @@ from __future__ import annotations
 import unicodedata
 from datetime import datetime
 
+import data_versions as dv
 from models import (
     db,
     User,
@@ -72,6 +73,7 @@ def migrate_legacy_announcement_if_needed() -> None:
     )
     db.session.add(ann)
     db.session.commit()
+    dv.bump_announcements()
 
 
 def sync_global_sim_announcement(body: str | None, priority: str, active: bool) -> None:
@@ -104,6 +106,7 @@ def publish_admin_announcement(
     db.session.add(ann)
     sync_global_sim_announcement(body, ann.priority, True)
     db.session.commit()
+    dv.bump_announcements()
     try:
         import pit_lane_notify as pln
 
@@ -134,6 +137,7 @@ def deactivate_admin_announcements() -> None:
     AdminAnnouncement.query.filter_by(is_active=True).update({"is_active": False})
     sync_global_sim_announcement(None, "info", False)
     db.session.commit()
+    dv.bump_announcements()
 
 
 def dismiss_announcement(user_id: int, announcement_id: int) -> None:
@@ -0,0 +1,219 @@
+"""Förminskade porträtt (WebP, AVIF om Pillow stöder det) i fasta bredder + srcset.
+
+Porträtt serverades i originalupplösning överallt, även i 40 px-cirklar på mobil.
+Vid import skapas tumnaglar i SIZES-bredderna:
+
+* statiska filer: static/riders/.../_thumbs/<namn>.<bredd>.webp (följer med i git),
+* blob-lagret (portrait_store): <sha>.<bredd>.<format> i samma katalog som blobben;
+  /portraits/<sha>/<bredd>.webp bygger saknade varianter on demand.
+
+srcset_for(url) ger srcset-strängen för en porträtt-URL om varianter finns.
+"""
+from __future__ import annotations
+
+import importlib
+import os
+import re
+import threading
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+SIZES = (64, 128, 256)
+_WEBP_QUALITY = 78
+_AVIF_QUALITY = 55
+_THUMB_DIR = "_thumbs"
+_STATIC_ROOT = Path(__file__).resolve().parent / "static"
+
+_RE_BLOB_URL = re.compile(r"^/portraits/([0-9a-f]{40})$")
+
+_lock = threading.Lock()
+_static_hits: dict[str, tuple[int, ...]] = {}
+_blob_hits: dict[str, tuple[int, ...]] = {}  # sha → bredder (innehållsadresserat, ändras aldrig)
+_avif: bool | None = None
+
+
+def avif_supported() -> bool:
+    """AVIF kräver Pillow med libavif eller pillow-avif-plugin (valfritt beroende)."""
+    global _avif
+    if _avif is None:
+        try:
+            importlib.import_module("pillow_avif")  # registrerar AVIF i Pillow
+        except ImportError:
+            pass
+        try:
+            from PIL import Image
+
+            Image.init()
+            _avif = "AVIF" in Image.SAVE
+        except Exception:
+            _avif = False
+    return _avif
+
+
+def formats() -> tuple[str, ...]:
+    return ("webp", "avif") if avif_supported() else ("webp",)
+
+
+def render(data: bytes, width: int, fmt: str = "webp") -> bytes:
+    """En variant: `width` px bred (srcset-w), behåller proportioner (uppskalar aldrig)."""
+    from PIL import Image
+
+    im = Image.open(BytesIO(data))
+    im = im.convert("RGBA" if im.mode in ("RGBA", "LA", "P") else "RGB")
+    im.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+    out = BytesIO()
+    if fmt == "avif":
+        im.save(out, format="AVIF", quality=_AVIF_QUALITY)
+    else:
+        im.save(out, format="WEBP", quality=_WEBP_QUALITY, method=6)
+    return out.getvalue()
+
+
+def render_all(data: bytes) -> dict[tuple[int, str], bytes]:
+    out: dict[tuple[int, str], bytes] = {}
+    for fmt in formats():
+        for width in SIZES:
+            out[(width, fmt)] = render(data, width, fmt)
+    return out
+
+
+def _widths_up_to(src_width: int) -> tuple[int, ...]:
+    """SIZES som inte överstiger originalet (minsta alltid med) — uppskalade varianter ger bara fler bytes."""
+    return tuple(w for w in SIZES if w <= src_width or w == SIZES[0])
+
+
+def _write(path: str, payload: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+# --- statiska filer (importskript) ---
+
+
+def _static_thumb_path(rel: str, width: int, fmt: str = "webp") -> Path:
+    src = _STATIC_ROOT / rel
+    return src.parent / _THUMB_DIR / f"{src.stem}.{width}.{fmt}"
+
+
+def generate_for_static(rel: str | os.PathLike, *, force: bool = False) -> int:
+    """Skapa tumnaglar för en fil under static/ (t.ex. 'riders/wsx/foo.jpg'). Returnerar antal skrivna."""
+    src = Path(rel)
+    if src.is_absolute():
+        src = src.relative_to(_STATIC_ROOT)
+    rel_s = src.as_posix()
+    data = (_STATIC_ROOT / rel_s).read_bytes()
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as im:
+        src_width = im.width
+    written = 0
+    for width in _widths_up_to(src_width):
+        # srcset pekar bara på webp — statiska filer kan inte content-negotiatas
+        dest = _static_thumb_path(rel_s, width)
+        if dest.is_file() and not force:
+            continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        _write(str(dest), render(data, width))
+        written += 1
+    with _lock:
+        _static_hits.pop(rel_s, None)
+    return written
+
+
+def _static_widths(rel: str) -> tuple[int, ...]:
+    with _lock:
+        hit = _static_hits.get(rel)
+    if hit is not None:
+        return hit
+    widths = tuple(w for w in SIZES if _static_thumb_path(rel, w).is_file())
+    with _lock:
+        _static_hits[rel] = widths
+    return widths
+
+
+# --- blob-lagret ---
+
+
+def blob_variant_path(sha: str, width: int, fmt: str) -> str:
+    from portrait_store import store_dir
+
+    return os.path.join(store_dir(), f"{sha}.{int(width)}.{fmt}")
+
+
+def generate_for_blob(sha: str, data: bytes | None = None) -> str | None:
+    """Alla varianter för en blob (anropas vid import). None om blobben saknas."""
+    if data is None:
+        from portrait_store import portrait_bytes
+
+        data = portrait_bytes(sha)
+        if data is None:
+            return None
+    for (width, fmt), payload in render_all(data).items():
+        path = blob_variant_path(sha, width, fmt)
+        if not os.path.isfile(path):
+            _write(path, payload)
+    return sha
+
+
+def blob_variant(sha: str, width: int, fmt: str = "webp") -> str | None:
+    """Sökväg till en blob-variant; skapas on demand (ny worker / ny deploy)."""
+    if width not in SIZES or fmt not in formats():
+        return None
+    path = blob_variant_path(sha, width, fmt)
+    if os.path.isfile(path):
+        return path
+    from portrait_store import portrait_bytes
+
+    data = portrait_bytes(sha)
+    if data is None:
+        return None
+    _write(path, render(data, width, fmt))
+    return path
+
+
+def _blob_widths(sha: str) -> tuple[int, ...]:
+    """Bredder upp till blobbens verkliga bredd (läser bara bildhuvudet, en gång per sha)."""
+    with _lock:
+        hit = _blob_hits.get(sha)
+    if hit is not None:
+        return hit
+    from portrait_store import portrait_file
+
+    found = portrait_file(sha)
+    if found is None:
+        return ()
+    try:
+        from PIL import Image
+
+        with Image.open(found[0]) as im:
+            widths = _widths_up_to(im.width)
+    except Exception:
+        return ()
+    with _lock:
+        _blob_hits[sha] = widths
+    return widths
+
+
+# --- uppslag för mallar / JSON ---
+
+
+def srcset_for(url: str | None) -> str:
+    """'url 64w, url 128w, …' för en porträtt-URL, tom sträng om varianter saknas."""
+    u = str(url or "").strip()
+    m = _RE_BLOB_URL.match(u)
+    if m:
+        sha = m.group(1)
+        return ", ".join(f"/portraits/{sha}/{w}.webp {w}w" for w in _blob_widths(sha))
+    if not u.startswith("/static/"):
+        return ""
+    rel = unquote(u[len("/static/"):].split("?", 1)[0])
+    widths = _static_widths(rel)
+    if not widths:
+        return ""
+    base = "/static/" + Path(rel).parent.as_posix()
+    stem = Path(rel).stem
+    # srcset separerar på mellanslag — filnamn som "foo (1).jpg" måste kodas
+    return ", ".join(quote(f"{base}/{_THUMB_DIR}/{stem}.{w}.webp") + f" {w}w" for w in widths)
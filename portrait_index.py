@@ -0,0 +1,110 @@
+"""Förberäknat uppslag förare → porträtt för /rider_portrait/<id>.
+
+Varje porträttrequest körde tvillingsökning (find_rider_twins +
+find_best_portrait_rider_for_name) och flera queries innan en fil kunde
+serveras — och en förarlista ger 40+ sådana requests per sidvisning.
+Nu löses varje förare en gång per process till en färdig post:
+
+    ("static", url)     redirect till fil under static/
+    ("blob", sha)       portrait_store-fil (send_file, ETag = sha)
+    ("migrate", pid)    base64 ej flyttad ännu — flyttas vid första anrop
+    ("external", url)   redirect till extern bild
+    ("missing",)        404
+
+Posterna löses lazy (första anropet per förare) — bara förare som faktiskt
+visas hamnar i indexet. Det töms när dataversionen PORTRAITS ändras (bumpas
+vid flush när en förares bild/namn/klass ändras, se portrait_store och
+data_versions.bump_on_change). Versionen kontrolleras högst var
+check_interval sekund, så andra workers ser en ändring inom några sekunder.
+En post som löstes medan indexet tömdes sparas inte (generation).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+import data_versions as dv
+
+Entry = tuple[Any, ...]
+
+_indexes: list["PortraitIndex"] = []
+
+
+class PortraitIndex:
+    def __init__(self, resolve: Callable[[int], Entry | None], *, check_interval: float = 5.0):
+        self._resolve = resolve
+        self._check_interval = float(check_interval)
+        self._lock = threading.Lock()
+        self._entries: dict[int, Entry] = {}
+        # Ökas vid varje tömning — en post löst före tömningen får inte sparas efter den
+        self._generation = 0
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._resets = 0
+        _indexes.append(self)
+
+    def _sync(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self._check_interval:
+            return
+        self._checked_at = now
+        (version,) = dv.versions(dv.PORTRAITS)
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self._resets += 1
+                self._entries.clear()
+                self._generation += 1
+                self._version = version
+
+    def get(self, rider_id: int) -> Entry | None:
+        """Post för föraren; None om föraren inte finns (cachas inte)."""
+        self._sync()
+        rid = int(rider_id)
+        entry = self._entries.get(rid)
+        if entry is not None:
+            self._hits += 1
+            return entry
+        self._misses += 1
+        generation = self._generation
+        entry = self._resolve(rid)
+        if entry is not None:
+            self.set(rid, entry, generation=generation)
+        return entry
+
+    def set(self, rider_id: int, entry: Entry, *, generation: int | None = None) -> None:
+        """Spara posten; med generation bara om indexet inte tömts sedan den lästes."""
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._entries[int(rider_id)] = entry
+
+    def invalidate(self, rider_id: int | None = None) -> None:
+        with self._lock:
+            if rider_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(rider_id), None)
+            self._generation += 1
+
+    def stats(self) -> dict[str, int | None]:
+        return {
+            "entries": len(self._entries),
+            "version": self._version,
+            "hits": self._hits,
+            "misses": self._misses,
+            "resets": self._resets,
+        }
+
+
+def index_stats() -> dict[str, int | None]:
+    """Summerad statistik (den här workern) för admin/cache_stats."""
+    out: dict[str, int | None] = {"entries": 0, "hits": 0, "misses": 0, "resets": 0, "version": None}
+    for idx in _indexes:
+        st = idx.stats()
+        for k in ("entries", "hits", "misses", "resets"):
+            out[k] += st[k] or 0
+        out["version"] = st["version"]
+    return out
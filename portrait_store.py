@@ -0,0 +1,334 @@
+"""Content-addressed lagring av förarporträtt.
+
+Porträtt låg tidigare som hela base64 data-URL:er i riders.rider_image_data
+(hundratals KB per rad) och avkodades i request-vägen. Nu sparas råa bytes en
+gång per innehåll i portrait_blobs (nyckel = sha1 av bytes — överlever deploy
+på Render) och förare pekar på blobben via riders.portrait_hash.
+
+Varje worker skriver ut blobben som fil i PORTRAIT_CACHE_DIR första gången den
+efterfrågas; därefter serveras filen direkt med send_file och ETag = hash.
+Gamla rader flyttas med migrate_rider_blobs() (tools/migrate_portraits_to_blob_store.py)
+eller lazy via /rider_portrait/<id>.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import re
+import threading
+from typing import Any
+
+from flask import current_app
+from sqlalchemy import and_, or_
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+
+import data_versions as dv
+from models import PortraitBlob, Rider, db
+
+_TABLE_READY = False
+_COLUMN_READY = False
+
+_EXT_BY_MIME = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+    "image/avif": "avif",
+}
+_MIME_BY_EXT = {ext: mime for mime, ext in _EXT_BY_MIME.items()}
+_RE_HASH = re.compile(r"^[0-9a-f]{40}$")
+
+_lock = threading.Lock()
+_store_dir: str | None = None
+# hash → (sökväg, mime) för filer som redan finns på disk i den här processen
+_files: dict[str, tuple[str, str]] = {}
+# (PORTRAITS-version, förar-id:n som fortfarande har base64 i riders.rider_image_data)
+_legacy: tuple[int, frozenset[int]] | None = None
+
+# Fält som avgör vilket porträtt en förare (eller dess tvillingar) får
+dv.bump_on_change(Rider, dv.PORTRAITS, "name", "class_name", "image_url", "portrait_hash", "rider_image_data")
+
+
+def ensure_schema() -> None:
+    """portrait_blobs-tabellen + riders.portrait_hash (äldre databaser)."""
+    global _TABLE_READY, _COLUMN_READY
+    if not _TABLE_READY:
+        PortraitBlob.__table__.create(bind=db.engine, checkfirst=True)
+        _TABLE_READY = True
+    if _COLUMN_READY:
+        return
+    try:
+        if db.engine.dialect.name == "postgresql":
+            db.session.execute(
+                db.text("ALTER TABLE riders ADD COLUMN IF NOT EXISTS portrait_hash VARCHAR(40)")
+            )
+        else:
+            rows = db.session.execute(db.text("PRAGMA table_info(riders)")).fetchall()
+            if "portrait_hash" not in {row[1] for row in rows}:
+                db.session.execute(db.text("ALTER TABLE riders ADD COLUMN portrait_hash VARCHAR(40)"))
+                print("Added missing column riders.portrait_hash")
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Warning: riders.portrait_hash column patch skipped: {e}")
+        return
+    _COLUMN_READY = True
+
+
+def store_dir() -> str:
+    global _store_dir
+    if _store_dir is None:
+        base = os.environ.get("PORTRAIT_CACHE_DIR") or (
+            "/tmp/mx_portrait_cache"
+            if os.getenv("RENDER")
+            else os.path.join(current_app.instance_path, "portrait_cache")
+        )
+        d = os.path.join(base, "blobs")
+        os.makedirs(d, exist_ok=True)
+        _store_dir = d
+    return _store_dir
+
+
+def is_hash(value: str | None) -> bool:
+    return bool(value and _RE_HASH.match(value))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _normalize_mime(mime: str | None) -> str:
+    m = (mime or "").split(";", 1)[0].strip().lower()
+    if m == "image/jpg":
+        m = "image/jpeg"
+    return m if m in _EXT_BY_MIME else "image/jpeg"
+
+
+def decode_data_url(value: str | None) -> tuple[bytes, str] | None:
+    """'data:image/png;base64,…' → (bytes, mime); None om det inte är en bild-data-URL."""
+    s = str(value or "").strip()
+    if not s.startswith("data:image") or "," not in s:
+        return None
+    meta, b64part = s.split(",", 1)
+    mime = meta[5:].split(";")[0].strip() if ";" in meta else "image/jpeg"
+    try:
+        return base64.b64decode(b64part), _normalize_mime(mime)
+    except Exception:
+        return None
+
+
+def _write_file(sha: str, data: bytes, mime: str) -> tuple[str, str]:
+    path = os.path.join(store_dir(), f"{sha}.{_EXT_BY_MIME[mime]}")
+    if not os.path.isfile(path):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    with _lock:
+        _files[sha] = (path, mime)
+    return path, mime
+
+
+def put_bytes(data: bytes, mime: str | None = None, *, derivatives: bool = True) -> str:
+    """
+    Spara bildbytes (idempotent) och returnera hash. Committar inte.
+    derivatives: skapa tumnaglar direkt (import); annars on demand.
+    """
+    ensure_schema()
+    mime = _normalize_mime(mime)
+    sha = content_hash(data)
+    exists = db.session.query(PortraitBlob.sha).filter_by(sha=sha).first()
+    if exists is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(PortraitBlob(sha=sha, mime=mime, size_bytes=len(data), data=data))
+                db.session.flush()
+        except IntegrityError:
+            pass  # samma bild sparad samtidigt av annan request/worker
+    try:
+        _write_file(sha, data, mime)
+    except OSError:
+        pass
+    if derivatives:
+        try:
+            from portrait_derivatives import generate_for_blob
+
+            generate_for_blob(sha, data)
+        except Exception as e:
+            print(f"portrait_store derivatives {sha}: {e}")
+    return sha
+
+
+def set_rider_portrait(rider: Any, image: bytes | str | None, mime: str | None = None) -> str | None:
+    """
+    Koppla förare till ett porträtt (bytes eller data-URL); None rensar.
+    Legacy-kolumnen töms alltid. Committar inte.
+    """
+    if image is None:
+        rider.portrait_hash = None
+        rider.rider_image_data = None
+        return None
+    if isinstance(image, str):
+        decoded = decode_data_url(image)
+        if decoded is None:
+            return None
+        image, mime = decoded
+    sha = put_bytes(image, mime)
+    rider.portrait_hash = sha
+    rider.rider_image_data = None
+    return sha
+
+
+def portrait_file(sha: str) -> tuple[str, str] | None:
+    """(sökväg, mime) för blobben — skrivs ut från DB till disk vid första anrop."""
+    if not is_hash(sha):
+        return None
+    with _lock:
+        hit = _files.get(sha)
+    if hit and os.path.isfile(hit[0]):
+        return hit
+    d = store_dir()
+    for ext, mime in _MIME_BY_EXT.items():
+        path = os.path.join(d, f"{sha}.{ext}")
+        if os.path.isfile(path):
+            with _lock:
+                _files[sha] = (path, mime)
+            return path, mime
+    ensure_schema()
+    row = db.session.query(PortraitBlob.mime, PortraitBlob.data).filter_by(sha=sha).first()
+    if row is None:
+        return None
+    try:
+        return _write_file(sha, bytes(row.data), _normalize_mime(row.mime))
+    except OSError as e:
+        print(f"portrait_store write {sha}: {e}")
+        return None
+
+
+def portrait_bytes(sha: str) -> bytes | None:
+    hit = portrait_file(sha)
+    if hit is None:
+        return None
+    with open(hit[0], "rb") as f:
+        return f.read()
+
+
+def portrait_url(sha: str) -> str:
+    return f"/portraits/{sha}"
+
+
+def _legacy_rider_ids() -> frozenset[int]:
+    """Förare med ej migrerad data-URL — en query per PORTRAITS-version, inte per förare."""
+    global _legacy
+    (version,) = dv.versions(dv.PORTRAITS)
+    hit = _legacy
+    if hit is not None and hit[0] == version:
+        return hit[1]
+    ids = frozenset(
+        int(r[0])
+        for r in db.session.query(Rider.id).filter(Rider.rider_image_data.like("data:image%")).all()
+    )
+    _legacy = (version, ids)
+    return ids
+
+
+def rider_portrait_src(rider: Any) -> str | None:
+    """URL till förarens DB-porträtt (aldrig base64 i JSON/HTML)."""
+    if not rider:
+        return None
+    sha = getattr(rider, "portrait_hash", None)
+    if sha:
+        return portrait_url(sha)
+    # Ej migrerad ännu — /rider_portrait/<id> flyttar ut blobben vid första anrop.
+    # rider_image_data är deferred: läs den inte per förare i listor.
+    state = sa_inspect(rider, raiseerr=False)
+    if state is not None and "rider_image_data" in state.unloaded:
+        has_legacy = int(rider.id) in _legacy_rider_ids()
+    else:
+        data = getattr(rider, "rider_image_data", None)
+        has_legacy = bool(data and str(data).strip().startswith("data:image"))
+    if has_legacy:
+        return f"/rider_portrait/{int(rider.id)}"
+    return None
+
+
+def has_portrait_clause():
+    """SQL-villkor: förare har DB-porträtt (blob-lagret eller ännu ej migrerad data-URL)."""
+    return or_(
+        Rider.portrait_hash.isnot(None),
+        and_(
+            Rider.rider_image_data.isnot(None),
+            Rider.rider_image_data.like("data:image%"),
+        ),
+    )
+
+
+def migrate_rider(rider_id: int, *, commit: bool = True) -> str | None:
+    """Flytta en förares base64-blob till lagret; returnerar hash (eller befintlig)."""
+    ensure_schema()
+    row = db.session.query(Rider.portrait_hash, Rider.rider_image_data).filter_by(id=int(rider_id)).first()
+    if row is None:
+        return None
+    if row.portrait_hash:
+        return row.portrait_hash
+    decoded = decode_data_url(row.rider_image_data)
+    del row
+    if decoded is None:
+        return None
+    sha = put_bytes(*decoded, derivatives=False)
+    # Rå UPDATE går förbi flush-lyssnaren i data_versions, avsiktligt: samma bild
+    # flyttas bara mellan kolumner. Indexposten ("migrate") och /rider_portrait/<id>
+    # fungerar även efter flytten, så lazy-migrering ska inte tömma andra workers
+    # index. migrate_rider_blobs bumpar PORTRAITS en gång efter hela körningen.
+    db.session.execute(
+        db.text("UPDATE riders SET portrait_hash = :h, rider_image_data = NULL WHERE id = :id"),
+        {"h": sha, "id": int(rider_id)},
+    )
+    if commit:
+        db.session.commit()
+    return sha
+
+
+def migrate_rider_blobs(*, limit: int | None = None, batch_size: int = 25, dry_run: bool = False) -> dict[str, int]:
+    """
+    Flytta alla riders.rider_image_data till portrait_blobs. En rad i taget i
+    minnet, commit per batch. Identiska bilder (dubblettförare) lagras en gång.
+    """
+    ensure_schema()
+    q = (
+        db.session.query(Rider.id)
+        .filter(Rider.rider_image_data.isnot(None), Rider.rider_image_data != "")
+        .order_by(Rider.id)
+    )
+    if limit:
+        q = q.limit(int(limit))
+    ids = [int(r[0]) for r in q.all()]
+    stats = {"candidates": len(ids), "migrated": 0, "blobs_created": 0, "skipped": 0, "errors": 0}
+    if dry_run:
+        return stats
+    before = db.session.query(PortraitBlob.sha).count()
+    pending = 0
+    for rid in ids:
+        try:
+            if migrate_rider(rid, commit=False):
+                stats["migrated"] += 1
+                pending += 1
+            else:
+                stats["skipped"] += 1
+            if pending >= batch_size:
+                db.session.commit()
+                db.session.expunge_all()
+                pending = 0
+        except Exception as e:
+            db.session.rollback()
+            stats["migrated"] -= pending  # ocommittad batch rullades tillbaka
+            pending = 0
+            stats["errors"] += 1
+            print(f"portrait_store migrate id={rid}: {e}")
+    db.session.commit()
+    if stats["migrated"]:
+        dv.bump(dv.PORTRAITS)
+    stats["blobs_created"] = db.session.query(PortraitBlob.sha).count() - before
+    return stats
@@ -315,6 +315,22 @@ def send_challenge_push_sync(
     )
 
 
+def _timed_push(fn, *args, **kwargs):
+    """Kör utskicket och rapportera till app_metrics (mx_background_*{job="push_dispatch"})."""
+    import time
+
+    from app_metrics import record_job
+
+    t0 = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as ex:
+        record_job("push_dispatch", ok=False, error=str(ex))
+        raise
+    record_job("push_dispatch", duration=time.perf_counter() - t0)
+    return result
+
+
 def _dispatch_push(fn, *args, **kwargs) -> None:
     if not push_configured():
         return
@@ -322,7 +338,7 @@ def _dispatch_push(fn, *args, **kwargs) -> None:
         from flask import has_app_context
 
         if has_app_context():
-            fn(*args, **kwargs)
+            _timed_push(fn, *args, **kwargs)
             return
     except Exception:
         pass
@@ -337,7 +353,7 @@ def _dispatch_push(fn, *args, **kwargs) -> None:
     def job():
         with app.app_context():
             try:
-                fn(*args, **kwargs)
+                _timed_push(fn, *args, **kwargs)
             except Exception as ex:
                 print(f"Web push error: {ex}")
 
@@ -260,17 +260,10 @@ def _rider_class_priority(class_name: str) -> int:
 
 
 def _rider_query_light():
-    """För dublett-uppslag utan att ladda porträtt-blobbar och långa textfält."""
-    from sqlalchemy.orm import defer
+    """För dublett-uppslag — porträtt-blobbar och långa textfält är deferred på modellen."""
     from models import Rider
 
-    return Rider.query.options(
-        defer(Rider.rider_image_data),
-        defer(Rider.bio),
-        defer(Rider.achievements),
-        defer(Rider.bio_sv),
-        defer(Rider.achievements_sv),
-    )
+    return Rider.query
 
 
 def _canonical_rider_name(name: str) -> str:
@@ -278,19 +271,15 @@ def _canonical_rider_name(name: str) -> str:
 
 
 def rider_ids_with_db_portrait(rider_ids: list[int]) -> set[int]:
-    """Kolla vilka id som har DB-porträtt utan att läsa base64-innehållet."""
+    """Kolla vilka id som har DB-porträtt utan att läsa blob-innehållet."""
     if not rider_ids:
         return set()
-    from sqlalchemy import func
     from models import Rider, db
+    from portrait_store import has_portrait_clause
 
     rows = (
         db.session.query(Rider.id)
-        .filter(
-            Rider.id.in_(rider_ids),
-            Rider.rider_image_data.isnot(None),
-            func.length(Rider.rider_image_data) > 24,
-        )
+        .filter(Rider.id.in_(rider_ids), has_portrait_clause())
         .all()
     )
     return {int(r.id) for r in rows}
@@ -463,8 +452,9 @@ def pick_primary_rider_for_name(name: str, riders: list[Any] | None = None) -> A
 def _portrait_quality(rider: Any, *, has_db_portrait: bool | None = None) -> int:
     """Högre = bättre källa (data-URL / CDN före trasig lokal sökväg)."""
     if has_db_portrait is None:
-        data = getattr(rider, "rider_image_data", None)
-        has_db_portrait = bool(data and str(data).strip().startswith("data:image"))
+        from portrait_store import rider_portrait_src
+
+        has_db_portrait = rider_portrait_src(rider) is not None
     if has_db_portrait:
         return 100
     url = getattr(rider, "image_url", None)
@@ -520,11 +510,12 @@ def copy_portrait_between_riders(
         target.image_url = source.image_url
         return True
     if allow_blob and int(source.id) in src_ids and int(target.id) not in tgt_ids and not src_url:
-        from models import Rider, db
+        from portrait_store import migrate_rider
 
-        blob = db.session.query(Rider.rider_image_data).filter_by(id=int(source.id)).scalar()
-        if blob and str(blob).strip().startswith("data:image"):
-            target.rider_image_data = blob
+        # Content-addressed: tvillingen pekar på samma blob, inget kopieras
+        sha = migrate_rider(int(source.id), commit=False)
+        if sha:
+            target.portrait_hash = sha
             return True
     return False
 
@@ -736,22 +727,27 @@ def compact_wsx_portrait_blobs() -> int:
         if not (getattr(row, "image_url", None) or "").strip():
             continue
         db.session.execute(
-            db.text("UPDATE riders SET rider_image_data = NULL WHERE id = :id"),
+            db.text("UPDATE riders SET rider_image_data = NULL, portrait_hash = NULL WHERE id = :id"),
             {"id": int(row.id)},
         )
         cleared += 1
+    if cleared:
+        import data_versions as dv
+
+        dv.bump_in_transaction(dv.PORTRAITS)
     return cleared
 
 
 def bulk_fill_wsx_from_ama_twins() -> dict[str, int]:
     """Snabb pass: fyll WSX-rader från 450/250-syskon (bio + porträtt-URL)."""
-    from models import Rider
+    from models import Rider, load_rider_bio
 
     bio_n = 0
     img_n = 0
     name_n = 0
     wsx_rows = (
         _rider_query_light()
+        .options(load_rider_bio())
         .filter(Rider.class_name.in_(("wsx_sx1", "wsx_sx2")))
         .all()
     )
@@ -833,9 +829,9 @@ def sync_all_rider_name_twins(riders: list[Any] | None = None) -> dict[str, int]
     """Kopiera bio och porträtt mellan alla dublett-rader (samma namn)."""
     wsx_prefill = bulk_fill_wsx_from_ama_twins()
     if riders is None:
-        from models import Rider
+        from models import Rider, load_rider_bio
 
-        riders = _rider_query_light().order_by(
+        riders = _rider_query_light().options(load_rider_bio()).order_by(
             Rider.class_name, Rider.rider_number, Rider.name
         ).all()
     seen_keys: set[str] = set()
@@ -0,0 +1,316 @@
+"""Diskcache + förrendering av social recap-PNG:er.
+
+/api/race_recap.png och /admin/api/social-recap.png byggde recap-datan och
+komponerade bilden med Pillow (mallar, avatarer, typsnittsanpassning) vid
+varje anrop — trots att bilden inte ändras när resultaten väl är satta.
+
+Renderade PNG:er sparas nu som filer, nyckel = tävling + layout + del +
+datainställningar + versionshash. Hashen består av renderer-revisionen,
+mallfilernas mtime och dataversionerna för tävlingens resultat, förare och
+porträtt, så en ny poängberäkning eller nya mallar ger nya filer automatiskt.
+Admin-exporten tar bara emot valen som admin-sidan erbjuder (admin_options),
+så antalet filer per tävling är begränsat; gamla versioner och filer äldre än
+RECAP_CACHE_MAX_AGE_DAYS rensas vid varje förrendering.
+
+Efter calculate_scores köas tävlingen och en bakgrundstråd renderar alla
+layouter (schedule_prerender), så användarnas requests blir send_file.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import queue
+import threading
+import time
+from typing import Any
+
+from flask import current_app
+
+import data_versions as dv
+
+# Publik resultatgrafik (/api/race_recap.png)
+PUBLIC_OPTIONS: dict[str, Any] = {
+    "race_top": 5,
+    "season_top": 5,
+    "include_race": True,
+    "include_weekly": False,
+    "include_season_snippet": False,
+    "include_facts": False,
+    "include_rider_podium": True,
+}
+# Admin-exportens standardval (/admin/social-recap)
+ADMIN_OPTIONS: dict[str, Any] = {
+    "race_top": 3,
+    "season_top": 5,
+    "include_race": True,
+    "include_weekly": True,
+    "include_season_snippet": True,
+    "include_facts": True,
+    "include_rider_podium": True,
+}
+# Valen i admin-sidans dropdowns (templates/admin_social_recap.html)
+ADMIN_RACE_TOP = (3, 5, 6, 10)
+ADMIN_SEASON_TOP = (5, 10)
+VARIANTS = (("facebook", "graphic"), ("facebook", "stats"), ("portrait", "graphic"), ("story", "graphic"))
+MAX_AGE_DAYS = float(os.getenv("RECAP_CACHE_MAX_AGE_DAYS") or 30)
+
+_lock = threading.Lock()
+# Fast antal lås (per hash av sökvägen) i stället för ett lås per fil
+_key_locks = tuple(threading.Lock() for _ in range(32))
+_cache_dir: str | None = None
+_queue: "queue.Queue[int]" = queue.Queue()
+_queued: set[int] = set()
+_worker_started = False
+
+
+def cache_dir() -> str:
+    global _cache_dir
+    if _cache_dir is None:
+        d = os.environ.get("RECAP_CACHE_DIR") or (
+            "/tmp/mx_recap_cache"
+            if os.getenv("RENDER")
+            else os.path.join(current_app.instance_path, "recap_cache")
+        )
+        os.makedirs(d, exist_ok=True)
+        _cache_dir = d
+    return _cache_dir
+
+
+def normalize_variant(layout: str | None, part: str | None) -> tuple[str, str]:
+    layout = (layout or "facebook").lower()
+    if layout == "feed":
+        layout = "facebook"
+    if layout not in ("facebook", "portrait", "story"):
+        layout = "facebook"
+    part = (part or "graphic").lower()
+    # Bara facebook-layouten har en separat statistikbild
+    if layout != "facebook" or part not in ("graphic", "stats"):
+        part = "graphic"
+    return layout, part
+
+
+def admin_options(
+    *,
+    race_top: int,
+    season_top: int,
+    include_race: bool,
+    include_weekly: bool,
+    include_season_snippet: bool,
+    include_facts: bool,
+    include_rider_podium: bool,
+) -> dict[str, Any]:
+    """Admin-exportens val; ValueError om race_top/season_top inte finns på admin-sidan."""
+    if race_top not in ADMIN_RACE_TOP or season_top not in ADMIN_SEASON_TOP:
+        raise ValueError("invalid_options")
+    return {
+        "race_top": int(race_top),
+        "season_top": int(season_top),
+        "include_race": bool(include_race),
+        "include_weekly": bool(include_weekly),
+        "include_season_snippet": bool(include_season_snippet),
+        "include_facts": bool(include_facts),
+        "include_rider_podium": bool(include_rider_podium),
+    }
+
+
+def _template_signature() -> str:
+    from social_recap_service import RECAP_TEMPLATE_GRAPHIC
+
+    d = RECAP_TEMPLATE_GRAPHIC.parent
+    try:
+        return ",".join(f"{e.name}:{int(e.stat().st_mtime)}" for e in sorted(os.scandir(d), key=lambda e: e.name))
+    except OSError:
+        return ""
+
+
+def version_hash(competition_id: int) -> str:
+    """Ändras när tävlingens resultat/poäng, förarlistan, porträtt, renderer eller mallar ändras."""
+    from social_recap_service import RECAP_RENDERER_REV, recap_renderer_engine
+
+    parts = (
+        RECAP_RENDERER_REV,
+        recap_renderer_engine(),
+        _template_signature(),
+        # Bara den här tävlingen: säsongslistan i admin-exporten är ställningen när
+        # tävlingen poängsattes, inte efter senare race
+        *dv.versions(dv.results_key(competition_id), dv.ROSTER, dv.PORTRAITS),
+    )
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:12]
+
+
+def _options_hash(options: dict[str, Any]) -> str:
+    return hashlib.sha1(repr(sorted(options.items())).encode()).hexdigest()[:8]
+
+
+def _path(competition_id: int, version: str, kind: str, layout: str, part: str, options: dict[str, Any]) -> str:
+    d = os.path.join(cache_dir(), str(int(competition_id)))
+    return os.path.join(d, f"{version}-{kind}-{layout}-{part}-{_options_hash(options)}.png")
+
+
+def _key_lock(path: str) -> threading.Lock:
+    return _key_locks[hash(path) % len(_key_locks)]
+
+
+def _write(path: str, payload: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+def _render_variants(
+    competition_id: int,
+    kind: str,
+    options: dict[str, Any],
+    variants: tuple[tuple[str, str], ...],
+    version: str,
+) -> dict[tuple[str, str], str]:
+    import render_pool
+    from social_recap_service import build_social_recap_data
+
+    data = None
+    out: dict[tuple[str, str], str] = {}
+    for layout, part in variants:
+        path = _path(competition_id, version, kind, layout, part, options)
+        with _key_lock(path):
+            if os.path.isfile(path):
+                _touch(path)
+            else:
+                if data is None:
+                    data = build_social_recap_data(int(competition_id), **options)
+                # Admin-exporten sätter layout i datan (kompakt header) — den publika inte
+                payload = {**data, "layout": layout} if kind == "admin" else data
+                png = render_pool.render(
+                    "social_recap_service:render_social_recap_png", payload, layout=layout, part=part
+                )
+                _write(path, png)
+        out[(layout, part)] = path
+    return out
+
+
+def recap_png_path(
+    competition_id: int,
+    *,
+    layout: str | None = None,
+    part: str | None = None,
+    admin: bool = False,
+    options: dict[str, Any] | None = None,
+) -> str:
+    """Sökväg till färdig PNG — renderas och sparas vid miss. ValueError om tävlingen saknas."""
+    layout, part = normalize_variant(layout, part)
+    kind = "admin" if admin else "public"
+    opts = dict(options or (ADMIN_OPTIONS if admin else PUBLIC_OPTIONS))
+    version = version_hash(competition_id)
+    return _render_variants(competition_id, kind, opts, ((layout, part),), version)[(layout, part)]
+
+
+def _prune(competition_id: int, version: str) -> int:
+    """
+    Ta bort tävlingens gamla versioner och, för alla tävlingar, filer som inte
+    använts på MAX_AGE_DAYS (mtime; även borttagna tävlingars kataloger).
+    """
+    root = cache_dir()
+    cutoff = time.time() - MAX_AGE_DAYS * 86400
+    removed = 0
+    try:
+        dirs = [e for e in os.scandir(root) if e.is_dir()]
+    except OSError:
+        return 0
+    for d in dirs:
+        own = d.name == str(int(competition_id))
+        try:
+            entries = list(os.scandir(d.path))
+        except OSError:
+            continue
+        left = len(entries)
+        for e in entries:
+            if not e.name.endswith((".png", ".tmp")):
+                continue
+            try:
+                stale = (own and not e.name.startswith(f"{version}-")) or e.stat().st_mtime < cutoff
+                if stale:
+                    os.remove(e.path)
+                    removed += 1
+                    left -= 1
+            except OSError:
+                pass
+        if not left and not own:
+            try:
+                os.rmdir(d.path)
+            except OSError:
+                pass
+    return removed
+
+
+def _touch(path: str) -> None:
+    # Träff räknas som användning — åldersrensningen tar bara bort oanvända filer
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prerender(competition_id: int) -> int:
+    """Rendera alla layouter för publik + admin-standard; returnerar antal filer."""
+    version = version_hash(competition_id)
+    _prune(competition_id, version)
+    n = 0
+    for kind, options in (("public", PUBLIC_OPTIONS), ("admin", ADMIN_OPTIONS)):
+        n += len(_render_variants(competition_id, kind, options, VARIANTS, version))
+    return n
+
+
+def _prerender_with_app(app, competition_id: int) -> None:
+    t0 = time.perf_counter()
+    try:
+        with app.app_context():
+            prerender(competition_id)
+        ok, error = True, None
+    except ValueError:
+        ok, error = True, None  # tävlingen borttagen
+    except Exception as e:
+        print(f"recap_cache prerender {competition_id}: {e}")
+        ok, error = False, str(e)
+    try:
+        from app_metrics import record_job
+
+        record_job("recap_prerender", ok=ok, duration=time.perf_counter() - t0, error=error)
+    except Exception:
+        pass
+
+
+def _start_worker(app) -> None:
+    global _worker_started
+    with _lock:
+        if _worker_started:
+            return
+        _worker_started = True
+
+    def loop() -> None:
+        while True:
+            cid = _queue.get()
+            with _lock:
+                _queued.discard(cid)
+            _prerender_with_app(app, cid)
+
+    threading.Thread(target=loop, daemon=True, name="mx-recap-prerender").start()
+    try:
+        from app_metrics import register_job_thread
+
+        register_job_thread("recap_prerender", "mx-recap-prerender")
+    except Exception:
+        pass
+
+
+def schedule_prerender(competition_id: int) -> None:
+    """Köa förrendering (anropas efter calculate_scores). RECAP_PRERENDER=0 stänger av."""
+    if os.getenv("RECAP_PRERENDER", "1").lower() in ("0", "false", "no"):
+        return
+    cid = int(competition_id)
+    with _lock:
+        if cid in _queued:
+            return
+        _queued.add(cid)
+    _start_worker(current_app._get_current_object())
+    _queue.put(cid)
@@ -0,0 +1,283 @@
+"""Single-flight + stale-while-revalidate för tunga cachade payloads.
+
+Startsidans payloads (spotlight, power ranking, seriekort) byggdes tidigare
+inline av den request som först såg en utgången post — samtidiga requests
+byggde då samma payload parallellt. Koordinatorn:
+
+* returnerar färskt värde ur cachen om det finns,
+* annars senast byggda värde (stale) och bygger om i bakgrunden,
+* och när inget värde alls finns bygger en tråd medan övriga väntar.
+
+Bara en ombyggnad per nyckel åt gången i processen; med delad cache-backend
+(CACHE_BACKEND) även mellan workers via en lease. Tider per cache exponeras
+via stats().
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+from cache_store import BoundedCache, acquire_lease, get_cache, has_shared_backend, release_lease
+
+_coordinators: dict[str, "RefreshCoordinator"] = {}
+
+
+class _Timing:
+    __slots__ = ("builds", "errors", "total_ms", "max_ms", "last_ms", "last_at",
+                 "stale_served", "background", "waits", "skipped")
+
+    def __init__(self) -> None:
+        self.builds = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms: float | None = None
+        self.last_at: float | None = None
+        self.stale_served = 0
+        self.background = 0
+        self.waits = 0
+        self.skipped = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "builds": self.builds,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.builds, 1) if self.builds else None,
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": round(self.last_ms, 1) if self.last_ms is not None else None,
+            "last_at": self.last_at,
+            "stale_served": self.stale_served,
+            "background_refreshes": self.background,
+            "waited_on_other_build": self.waits,
+            "skipped_other_worker": self.skipped,
+        }
+
+
+class RefreshCoordinator:
+    """
+    context_factory: t.ex. app.app_context — bakgrundsbyggen körs inuti den.
+    max_stale: hur länge ett gammalt värde får serveras medan nytt byggs.
+    empty_retry: gav ett bakgrundsbygge inget värde (None/fel) startas inget nytt
+    för nyckeln förrän så här många sekunder gått — annars en tråd per peek().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        context_factory: Callable[[], Any] | None = None,
+        max_stale: float = 24 * 3600.0,
+        lease_ttl: float = 120.0,
+        wait_timeout: float = 30.0,
+        empty_retry: float = 30.0,
+    ):
+        self.name = name
+        self.context_factory = context_factory
+        self.max_stale = max_stale
+        self.lease_ttl = lease_ttl
+        self.wait_timeout = wait_timeout
+        self.empty_retry = empty_retry
+        self._lock = threading.Lock()
+        self._inflight: dict[tuple, threading.Event] = {}
+        # (cache, nyckel) → monotonic-tid för senaste bakgrundsbygge utan värde
+        self._empty_at: dict[tuple, float] = {}
+        self._timings: dict[str, _Timing] = {}
+        _coordinators[name] = self
+
+    # --- publika ---
+
+    def get(
+        self,
+        cache: BoundedCache,
+        key: Any,
+        build: Callable[[], Any],
+        *,
+        stale_key: Any = None,
+        is_valid: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        """Färskt värde, annars stale + bakgrundsbygge, annars ett (delat) synkront bygge."""
+        value = self._fresh(cache, key, is_valid)
+        if value is not None:
+            return value
+        stale = self._stale_cache(cache).get(self._stale_id(key, stale_key))
+        if stale is not None:
+            self._count(cache.name, "stale_served")
+            self.refresh_async(cache, key, build, stale_key=stale_key)
+            return stale
+        return self._build_single_flight(cache, key, build, stale_key, is_valid)
+
+    def peek(
+        self,
+        cache: BoundedCache,
+        key: Any,
+        build: Callable[[], Any] | None = None,
+        *,
+        stale_key: Any = None,
+        is_valid: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        """Som get() men bygger aldrig inline — None om inget värde finns än."""
+        value = self._fresh(cache, key, is_valid)
+        if value is not None:
+            return value
+        stale = self._stale_cache(cache).get(self._stale_id(key, stale_key))
+        if build is not None:
+            self.refresh_async(cache, key, build, stale_key=stale_key)
+        if stale is not None:
+            self._count(cache.name, "stale_served")
+        return stale
+
+    def refresh_async(self, cache: BoundedCache, key: Any, build: Callable[[], Any], *, stale_key: Any = None) -> bool:
+        """Starta ombyggnad i bakgrunden om ingen redan pågår för nyckeln."""
+        flight = (cache.name, key)
+        now = time.monotonic()
+        with self._lock:
+            if flight in self._inflight:
+                return False
+            empty_at = self._empty_at.get(flight)
+            if empty_at is not None and now - empty_at < self.empty_retry:
+                return False
+            done = self._inflight[flight] = threading.Event()
+        self._count(cache.name, "background")
+
+        def _run() -> None:
+            value = None
+            try:
+                if self.context_factory is not None:
+                    with self.context_factory():
+                        value = self._build_with_lease(cache, key, build, stale_key)
+                else:
+                    value = self._build_with_lease(cache, key, build, stale_key)
+            except Exception as e:
+                print(f"refresh[{cache.name}] background: {e}")
+            finally:
+                self._note_result(flight, value is not None)
+                self._finish(flight, done)
+
+        threading.Thread(target=_run, name=f"refresh-{cache.name}", daemon=True).start()
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            inflight = sorted({name for name, _ in self._inflight})
+            timings = {name: t.as_dict() for name, t in sorted(self._timings.items())}
+        return {"inflight": inflight, "caches": timings}
+
+    # --- interna ---
+
+    @staticmethod
+    def _fresh(cache: BoundedCache, key: Any, is_valid: Callable[[Any], bool] | None) -> Any:
+        value = cache.get(key)
+        if value is not None and (is_valid is None or is_valid(value)):
+            return value
+        return None
+
+    @staticmethod
+    def _stale_id(key: Any, stale_key: Any) -> Any:
+        return key if stale_key is None else stale_key
+
+    def _stale_cache(self, cache: BoundedCache) -> BoundedCache:
+        return get_cache(f"{cache.name}:stale", maxsize=cache.maxsize, ttl=self.max_stale, shared=False)
+
+    def _timing(self, name: str) -> _Timing:
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = _Timing()
+            return timing
+
+    def _count(self, name: str, field: str) -> None:
+        timing = self._timing(name)
+        with self._lock:
+            setattr(timing, field, getattr(timing, field) + 1)
+
+    def _note_result(self, flight: tuple, built: bool) -> None:
+        with self._lock:
+            if built:
+                self._empty_at.pop(flight, None)
+                return
+            now = time.monotonic()
+            if len(self._empty_at) > 256:
+                self._empty_at = {f: t for f, t in self._empty_at.items() if now - t < self.empty_retry}
+            self._empty_at[flight] = now
+
+    def _finish(self, flight: tuple, done: threading.Event) -> None:
+        with self._lock:
+            if self._inflight.get(flight) is done:
+                del self._inflight[flight]
+        done.set()
+
+    def _timed_build(self, cache: BoundedCache, key: Any, build: Callable[[], Any], stale_key: Any) -> Any:
+        timing = self._timing(cache.name)
+        t0 = time.perf_counter()
+        try:
+            value = build()
+        except Exception:
+            with self._lock:
+                timing.errors += 1
+            raise
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            timing.builds += 1
+            timing.total_ms += ms
+            timing.max_ms = max(timing.max_ms, ms)
+            timing.last_ms = ms
+            timing.last_at = time.time()
+        if value is not None:
+            cache.set(key, value)
+            self._stale_cache(cache).set(self._stale_id(key, stale_key), value)
+        return value
+
+    def _build_with_lease(self, cache: BoundedCache, key: Any, build: Callable[[], Any], stale_key: Any) -> Any:
+        lease = f"{cache.name}:{key!r}"
+        if not acquire_lease(lease, self.lease_ttl):
+            # En annan worker bygger redan — värdet dyker upp i den delade cachen
+            self._count(cache.name, "skipped")
+            return None
+        try:
+            return self._timed_build(cache, key, build, stale_key)
+        finally:
+            release_lease(lease)
+
+    def _wait_for_shared(self, cache: BoundedCache, key: Any, is_valid) -> Any:
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            value = self._fresh(cache, key, is_valid)
+            if value is not None:
+                return value
+        return None
+
+    def _build_single_flight(self, cache: BoundedCache, key: Any, build: Callable[[], Any], stale_key: Any, is_valid) -> Any:
+        flight = (cache.name, key)
+        with self._lock:
+            done = self._inflight.get(flight)
+            owner = done is None
+            if owner:
+                done = self._inflight[flight] = threading.Event()
+        if not owner:
+            self._count(cache.name, "waits")
+            done.wait(self.wait_timeout)
+            value = self._fresh(cache, key, is_valid)
+            if value is not None:
+                return value
+            return self._timed_build(cache, key, build, stale_key)
+        try:
+            lease = f"{cache.name}:{key!r}"
+            if has_shared_backend() and not acquire_lease(lease, self.lease_ttl):
+                self._count(cache.name, "waits")
+                value = self._wait_for_shared(cache, key, is_valid)
+                if value is not None:
+                    return value
+                return self._timed_build(cache, key, build, stale_key)
+            try:
+                return self._timed_build(cache, key, build, stale_key)
+            finally:
+                release_lease(lease)
+        finally:
+            self._finish(flight, done)
+
+
+def refresh_stats() -> dict[str, Any]:
+    """Byggtider + stale/väntestatistik per koordinator (den här workern)."""
+    return {name: c.stats() for name, c in sorted(_coordinators.items())}
@@ -28,9 +28,12 @@ def start_reminder_scheduler(app) -> None:
             return
         _started = True
 
+    from app_metrics import record_job, register_job_thread
+
     def loop() -> None:
         time.sleep(20)
         while True:
+            t0 = time.perf_counter()
             try:
                 with app.app_context():
                     from reminder_service import process_due_reminders
@@ -39,10 +42,13 @@ def start_reminder_scheduler(app) -> None:
                     sent = int(result.get("sent") or 0)
                     if sent:
                         print(f"Reminder scheduler sent={sent} {result}")
+                record_job("reminder_scheduler", duration=time.perf_counter() - t0)
             except Exception as ex:
                 print(f"Reminder scheduler error: {ex}")
+                record_job("reminder_scheduler", ok=False, error=str(ex))
             time.sleep(60)
 
+    register_job_thread("reminder_scheduler", "mx-reminder-scheduler")
     threading.Thread(
         target=loop, daemon=True, name="mx-reminder-scheduler"
     ).start()
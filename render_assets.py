@@ -0,0 +1,219 @@
+"""Förladdade typsnitt, loggor och recap-mallar för bildrenderingen.
+
+Recap-, Din kväll- och invite-korten laddade typsnitt (TTF), loggor och
+mallbilder från disk vid varje anrop — ett kort ber om samma typsnitt i
+tiotals storlekar. Här hålls allt per process:
+
+* källfiler läses en gång: TTF-bytes, avkodade RGBA-bilder, mall-JSON
+  (även "saknas" cachas, så ingen ny is_file()/open() per render),
+* typsnitt per (kandidatlista, storlek) och nedskalade bilder per
+  (sökväg, maxbredd, maxhöjd) i LRU:er via cache_store (syns i cache_stats),
+* första anropet i processen förvärmer loggor, typsnittsfiler och (för
+  mallmotorerna) recap-mallarna (warm).
+
+Bilder returneras som kopior — anroparna ritar/klistrar i dem.
+"""
+from __future__ import annotations
+
+import copy
+import io
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+from cache_store import get_cache
+
+_ROOT = Path(__file__).resolve().parent
+
+_lock = threading.Lock()
+_warmed = False
+_font_files: dict[str, bytes | None] = {}
+_images: dict[str, Any] = {}
+_json: dict[str, Any] = {}
+
+_fonts = get_cache("render_fonts", maxsize=int(os.getenv("RENDER_ASSET_FONTS", "256")), shared=False)
+_fitted = get_cache("render_images", maxsize=int(os.getenv("RENDER_ASSET_IMAGES", "128")), shared=False)
+
+# Förvärms vid första användningen (mallar, varumärkesloggor, typsnittsfiler)
+_WARM_IMAGES = (
+    "static/icons/mx_fantasy_app_icon_512.png",
+    "static/images/mx_fantasy_favicon.png",
+    "static/images/mx_fantasy_logo.png",
+    "static/images/motoaction_logo.png",
+    "static/images/motoaction_mark.png",
+)
+# Mallarna är ~14 MB avkodade styck och används bara av RECAP_ENGINE=hybrid/template
+_WARM_TEMPLATES = ("static/recap_templates/recap_fb_graphic.png", "static/recap_templates/recap_fb_stats.png")
+_WARM_JSON = ("static/recap_templates/slots.json", "static/recap_templates/layout_hybrid.json")
+_WARM_FONTS = (
+    "C:/Windows/Fonts/arial.ttf",
+    "C:/Windows/Fonts/arialbd.ttf",
+    "C:/Windows/Fonts/impact.ttf",
+    "C:/Windows/Fonts/ariblk.ttf",
+    "C:/Windows/Fonts/segoeui.ttf",
+    "C:/Windows/Fonts/segoeuib.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+)
+
+
+def _abs(path: str | Path) -> str:
+    p = Path(path)
+    return str(p if p.is_absolute() else _ROOT / p)
+
+
+def _font_bytes(path: str) -> bytes | None:
+    if path in _font_files:
+        return _font_files[path]
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        data = None
+    with _lock:
+        _font_files[path] = data
+    return data
+
+
+def _source_image(path: str):
+    """Avkodad RGBA-original (None om filen saknas eller inte går att läsa)."""
+    if path in _images:
+        return _images[path]
+    from PIL import Image
+
+    try:
+        with Image.open(path) as im:
+            img = im.convert("RGBA")
+    except (OSError, ValueError):
+        img = None
+    with _lock:
+        _images[path] = img
+    return img
+
+
+def _ensure_warm() -> None:
+    if not _warmed:
+        warm()
+
+
+def warm() -> None:
+    """Ladda mallar, loggor och typsnittsfiler i förväg (idempotent)."""
+    global _warmed
+    with _lock:
+        if _warmed:
+            return
+        _warmed = True
+    images = _WARM_IMAGES
+    if (os.getenv("RECAP_ENGINE") or "").strip().lower() in ("hybrid", "template"):
+        images += _WARM_TEMPLATES
+    for rel in images:
+        _source_image(_abs(rel))
+    for rel in _WARM_JSON:
+        try:
+            _load_json(_abs(rel))
+        except (OSError, ValueError):
+            pass
+    for path in _WARM_FONTS:
+        _font_bytes(path)
+
+
+def font(candidates: Iterable[str], size: int):
+    """Första kandidaten som går att ladda i given storlek; None om ingen finns."""
+    from PIL import ImageFont
+
+    _ensure_warm()
+    key = (tuple(candidates), int(size))
+    hit = _fonts.get(key)
+    if hit is not None:
+        return hit
+    for path in key[0]:
+        data = _font_bytes(path)
+        if data is None:
+            continue
+        try:
+            return _fonts.set(key, ImageFont.truetype(io.BytesIO(data), key[1]))
+        except OSError:
+            continue
+    return None
+
+
+def image(path: str | Path, *, max_w: int | None = None, max_h: int | None = None):
+    """RGBA-kopia av bilden, ev. thumbnail((max_w, max_h), LANCZOS); None om den saknas."""
+    from PIL import Image
+
+    _ensure_warm()
+    src_path = _abs(path)
+    if max_w is None and max_h is None:
+        src = _source_image(src_path)
+        return src.copy() if src is not None else None
+    key = (src_path, int(max_w or max_h), int(max_h or max_w))
+    hit = _fitted.get(key)
+    if hit is None:
+        src = _source_image(src_path)
+        if src is None:
+            return None
+        hit = src.copy()
+        hit.thumbnail((key[1], key[2]), Image.Resampling.LANCZOS)
+        _fitted.set(key, hit)
+    return hit.copy()
+
+
+def has_image(path: str | Path) -> bool:
+    _ensure_warm()
+    return _source_image(_abs(path)) is not None
+
+
+def _load_json(path: str) -> Any:
+    if path not in _json:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        with _lock:
+            _json[path] = data
+    return _json[path]
+
+
+def load_json(path: str | Path) -> Any:
+    """Parsad JSON (djupkopia — layoutdicts justeras ibland av renderingen)."""
+    _ensure_warm()
+    return copy.deepcopy(_load_json(_abs(path)))
+
+
+def _image_bytes(img) -> int:
+    return img.width * img.height * len(img.getbands()) if img is not None else 0
+
+
+def stats() -> dict[str, Any]:
+    """Minnesräkning för admin/cache_stats (den här processen)."""
+    with _lock:
+        sources = list(_images.values())
+        font_files = list(_font_files.values())
+        n_json = len(_json)
+    fitted = _fitted.values()
+    source_bytes = sum(_image_bytes(img) for img in sources)
+    fitted_bytes = sum(_image_bytes(img) for img in fitted)
+    font_bytes = sum(len(b) for b in font_files if b)
+    return {
+        "warmed": _warmed,
+        "images": len([i for i in sources if i is not None]),
+        "image_bytes": source_bytes,
+        "fitted_images": len(fitted),
+        "fitted_bytes": fitted_bytes,
+        "font_files": len([b for b in font_files if b]),
+        "font_file_bytes": font_bytes,
+        "fonts": _fonts.stats()["size"],
+        "json": n_json,
+        "total_bytes": source_bytes + fitted_bytes + font_bytes,
+    }
+
+
+def clear() -> None:
+    global _warmed
+    with _lock:
+        _font_files.clear()
+        _images.clear()
+        _json.clear()
+        _warmed = False
+    _fonts.clear()
+    _fitted.clear()
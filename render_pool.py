@@ -0,0 +1,197 @@
+"""Processpool för Pillow-tunga bildendpoints (recap, Din kväll, invite-kort).
+
+Kortrendering är ren CPU i Python/Pillow och håller GIL:en — i en gthread-worker
+står då övriga requesttrådar (HTML/JSON) still medan ett kort ritas. Här körs
+renderingen i separata processer:
+
+* begränsat antal processer (RENDER_POOL_WORKERS, 0 = kör i tråden som förut),
+* begränsad kö: högst workers + RENDER_POOL_QUEUE jobb i luften; annars väntar
+  anroparen högst RENDER_POOL_WAIT_SEC och får sedan RenderPoolBusy (→ 503),
+* timeout per jobb (RENDER_POOL_TIMEOUT_SEC) → RenderPoolTimeout.
+
+Barnprocesserna startas med spawn (säkert från en trådad worker, fungerar på
+Windows) och får en minimal Flask-app mot samma databas, så renderingens egna
+uppslag (förarporträtt, avatarer) fungerar. Jobb anges som "modul:funktion"
+med picklebara argument.
+"""
+from __future__ import annotations
+
+import atexit
+import importlib
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from flask import Flask, Response, has_request_context, request
+
+
+class RenderPoolUnavailable(RuntimeError):
+    """Basklass: endpointen svarar 503 + Retry-After (busy_response)."""
+
+
+class RenderPoolBusy(RenderPoolUnavailable):
+    """Kön är full — svara 503 i stället för att stapla trådar."""
+
+
+class RenderPoolTimeout(RenderPoolUnavailable):
+    pass
+
+
+_lock = threading.Lock()
+_config: dict[str, Any] | None = None
+_executor: ProcessPoolExecutor | None = None
+_slots: threading.BoundedSemaphore | None = None
+_stats = {"submitted": 0, "inline": 0, "rejected": 0, "timeouts": 0, "errors": 0, "restarts": 0}
+
+# Barnprocessens app (sätts av _init_child)
+_child_app: Flask | None = None
+
+
+def _workers() -> int:
+    default = "1" if os.getenv("RENDER") else "2"
+    return max(0, int(os.getenv("RENDER_POOL_WORKERS", default)))
+
+
+def init_app(app: Flask) -> None:
+    """Spara DB-konfigurationen som barnprocesserna behöver; poolen startas vid första jobbet."""
+    global _config
+    uri = str(app.config.get("SQLALCHEMY_DATABASE_URI") or "")
+    if ":memory:" in uri:
+        return  # barnprocesser ser inte en in-memory-databas — rendera i tråden
+    if getattr(sys.modules.get("__main__"), "app", None) is app:
+        # "python main.py": spawn-barnen kör om __main__ (schemaläggare, cachevärmning) — rendera i tråden
+        return
+    engine_options = {"pool_pre_ping": True, "pool_recycle": 300}
+    connect_args = (app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}).get("connect_args")
+    if connect_args:
+        engine_options["connect_args"] = dict(connect_args)
+    _config = {"uri": uri, "engine_options": engine_options, "instance_path": app.instance_path}
+
+
+def _init_child(config: dict[str, Any]) -> None:
+    global _child_app
+    from models import db
+
+    app = Flask(__name__, instance_path=config["instance_path"])
+    app.config["SQLALCHEMY_DATABASE_URI"] = config["uri"]
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = config["engine_options"]
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    _child_app = app
+    try:
+        import render_assets
+
+        render_assets.warm()
+    except Exception as e:
+        print(f"render_pool warm: {e}")
+
+
+def _run_job(target: str, args: tuple, kwargs: dict, host_url: str | None = None) -> Any:
+    module_name, func_name = target.split(":", 1)
+    fn = getattr(importlib.import_module(module_name), func_name)
+    if _child_app is None:
+        return fn(*args, **kwargs)
+    # Samma värd som anroparens request (sidfotens sajtadress via public_url)
+    ctx = _child_app.test_request_context(base_url=host_url) if host_url else _child_app.app_context()
+    with ctx:
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            from models import db
+
+            db.session.remove()
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+    global _executor, _slots
+    if _config is None:
+        return None
+    workers = _workers()
+    if workers <= 0:
+        return None
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_child,
+                initargs=(_config,),
+            )
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(workers + max(0, int(os.getenv("RENDER_POOL_QUEUE", "4"))))
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor) -> None:
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+            _stats["restarts"] += 1
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def render(target: str, *args: Any, **kwargs: Any) -> Any:
+    """
+    Kör target ("modul:funktion") i poolen och vänta på resultatet.
+    Utan pool (avstängd/in-memory-DB) körs funktionen direkt i anropande tråd.
+    """
+    executor = _get_executor()
+    if executor is None:
+        _stats["inline"] += 1
+        module_name, func_name = target.split(":", 1)
+        return getattr(importlib.import_module(module_name), func_name)(*args, **kwargs)
+
+    slots = _slots
+    if not slots.acquire(timeout=float(os.getenv("RENDER_POOL_WAIT_SEC", "5"))):
+        _stats["rejected"] += 1
+        raise RenderPoolBusy("render pool full")
+    try:
+        host_url = request.host_url if has_request_context() else None
+        future = executor.submit(_run_job, target, args, kwargs, host_url)
+    except BrokenProcessPool:
+        slots.release()
+        _reset_executor(executor)
+        _stats["errors"] += 1
+        raise
+    except BaseException:
+        slots.release()
+        raise
+    # Platsen släpps när jobbet faktiskt är klart — även efter timeout
+    future.add_done_callback(lambda _f: slots.release())
+    _stats["submitted"] += 1
+    try:
+        return future.result(timeout=float(os.getenv("RENDER_POOL_TIMEOUT_SEC", "45")))
+    except FutureTimeout:
+        _stats["timeouts"] += 1
+        raise RenderPoolTimeout(target) from None
+    except BrokenProcessPool:
+        _stats["errors"] += 1
+        _reset_executor(executor)
+        raise
+
+
+def busy_response(retry_after: int = 5) -> Response:
+    resp = Response("Bildrenderingen är upptagen, försök igen strax.", status=503, mimetype="text/plain")
+    resp.headers["Retry-After"] = str(int(retry_after))
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+def stats() -> dict[str, Any]:
+    return {"workers": _workers() if _config is not None else 0, "running": _executor is not None, **_stats}
+
+
+def _shutdown() -> None:
+    ex = _executor
+    if ex is not None:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(_shutdown)
+
@@ -2,10 +2,13 @@
 from __future__ import annotations
 
 import base64
+import copy
+import hashlib
 import io
 import json
 import os
 import re
+import threading
 from urllib.parse import urlparse
 from collections import defaultdict
 from pathlib import Path
@@ -23,7 +26,10 @@ from models import (
     HoleshotPick,
     WildcardPick,
     rider_query_for_list_ui,
+    load_user_picture,
+    load_snapshot_payload,
 )
+import render_assets
 
 # Brand palette
 BG_TOP = (8, 15, 35)
@@ -707,16 +713,11 @@ def _rider_podium(
 
 
 def _iter_pick_payloads(competition_id: int) -> list[tuple[int, dict]]:
-    from main import _build_picks_snapshot_payload, ensure_picks_snapshots_for_competition
-
-    try:
-        ensure_picks_snapshots_for_competition(int(competition_id), source="social_recap")
-    except Exception:
-        pass
+    from main import _live_picks_snapshot_payloads
 
     snap_by_uid = {
         int(s.user_id): s
-        for s in PicksSnapshot.query.filter_by(competition_id=competition_id).all()
+        for s in PicksSnapshot.query.options(load_snapshot_payload()).filter_by(competition_id=competition_id).all()
     }
     uid_sources: set[int] = set()
     for model in (RacePick, HoleshotPick, WildcardPick):
@@ -728,6 +729,7 @@ def _iter_pick_payloads(competition_id: int) -> list[tuple[int, dict]]:
             .all()
             if uid is not None
         )
+    live = _live_picks_snapshot_payloads(competition_id, uid_sources - set(snap_by_uid))
     out: list[tuple[int, dict]] = []
     for uid in sorted(set(snap_by_uid.keys()) | uid_sources):
         snap = snap_by_uid.get(uid)
@@ -737,7 +739,7 @@ def _iter_pick_payloads(competition_id: int) -> list[tuple[int, dict]]:
             except Exception:
                 payload = {}
         else:
-            payload = _build_picks_snapshot_payload(uid, competition_id)
+            payload = live.get(uid, {})
         out.append((uid, payload))
     return out
 
@@ -799,7 +801,7 @@ def _select_fun_facts_for_display(
 def _compute_fun_facts(comp: Competition, competition_id: int) -> list[dict[str, str]]:
     from main import _build_crowd_picks_summary
 
-    crowd = _build_crowd_picks_summary(competition_id, comp, ensure_snapshots=True)
+    crowd = _build_crowd_picks_summary(competition_id, comp)
     n_lineups = int(crowd.get("n_lineups") or 0)
     n_users = int(crowd.get("n_users_with_snapshots_or_picks") or 0)
     picker_n = n_lineups or n_users
@@ -1184,11 +1186,9 @@ def _load_font_px(size: int, bold: bool = False):
                 "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
             ]
         )
-    for path in candidates:
-        try:
-            return ImageFont.truetype(path, size)
-        except OSError:
-            continue
+    font = render_assets.font(candidates, size)
+    if font is not None:
+        return font
     # load_default() ignorerar size — ger alltid ~10px text (vanlig orsak på Render utan fonts)
     return ImageFont.load_default()
 
@@ -1212,18 +1212,14 @@ def _load_font(size: int, bold: bool = False):
                 "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
             ]
         )
-    for path in candidates:
-        try:
-            return ImageFont.truetype(path, size)
-        except OSError:
-            continue
+    font = render_assets.font(candidates, size)
+    if font is not None:
+        return font
     return ImageFont.load_default()
 
 
 def _load_display_font(size: int, bold: bool = True):
     """Större display-rubriker (Impact/Arial Black när det finns)."""
-    from PIL import ImageFont
-
     size = _fs(size)
     candidates = []
     if bold:
@@ -1244,11 +1240,9 @@ def _load_display_font(size: int, bold: bool = True):
                 "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
             ]
         )
-    for path in candidates:
-        try:
-            return ImageFont.truetype(path, size)
-        except OSError:
-            continue
+    font = render_assets.font(candidates, size)
+    if font is not None:
+        return font
     return _load_font(size, bold=bold)
 
 
@@ -1478,16 +1472,12 @@ def _draw_recap_header(img, draw, data: dict[str, Any]) -> int:
 
 
 def _load_brand_logo(size: int = 96):
-    from PIL import Image
-
     for rel in (
         "static/icons/mx_fantasy_app_icon_512.png",
         "static/images/mx_fantasy_favicon.png",
     ):
-        p = _ROOT / rel
-        if p.exists():
-            img = Image.open(p).convert("RGBA")
-            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        img = render_assets.image(_ROOT / rel, max_w=size, max_h=size)
+        if img is not None:
             return img
     return None
 
@@ -1564,9 +1554,20 @@ def _normalize_portrait_url(url: str) -> str:
 
 
 def _load_rider_thumb(rider_id: int, size: int = 72):
-    rider = Rider.query.get(rider_id)
+    rider = rider_query_for_list_ui().filter_by(id=rider_id).first()
     if not rider:
         return None
+    if rider.portrait_hash:
+        from portrait_store import portrait_file
+
+        hit = portrait_file(rider.portrait_hash)
+        if hit:
+            try:
+                from PIL import Image
+
+                return Image.open(hit[0]).convert("RGBA")
+            except Exception:
+                pass
     raw = getattr(rider, "rider_image_data", None) or getattr(rider, "image_url", None)
     if not raw:
         return None
@@ -1577,7 +1578,7 @@ def _load_rider_thumb(rider_id: int, size: int = 72):
 
 
 def _load_user_profile_image(user_id: int, size: int = 72):
-    user = User.query.get(user_id)
+    user = User.query.options(load_user_picture()).get(user_id)
     if not user:
         return None
     raw = getattr(user, "profile_picture_url", None)
@@ -2400,6 +2401,10 @@ RECAP_TEMPLATE_GRAPHIC = _ROOT / "static" / "recap_templates" / "recap_fb_graphi
 RECAP_TEMPLATE_STATS = _ROOT / "static" / "recap_templates" / "recap_fb_stats.png"
 RECAP_SLOTS_JSON = _ROOT / "static" / "recap_templates" / "slots.json"
 RECAP_LAYOUT_HYBRID = _ROOT / "static" / "recap_templates" / "layout_hybrid.json"
+# Uppmätta slots per mall (nyckel = mallfilens sha1) — se _recap_detected_slots
+RECAP_SLOTS_DETECTED_JSON = _ROOT / "static" / "recap_templates" / "slots_detected.json"
+# Höj när detekteringen ändras, så sparade slots mäts om
+RECAP_SLOT_DETECT_REV = 1
 
 
 def _recap_engine_preference() -> str:
@@ -2425,13 +2430,93 @@ def _recap_templates_ready() -> bool:
 
 
 def _load_recap_slots() -> dict[str, Any]:
-    with open(RECAP_SLOTS_JSON, encoding="utf-8") as f:
-        return json.load(f)
+    return render_assets.load_json(RECAP_SLOTS_JSON)
 
 
 def _load_recap_hybrid_layout() -> dict[str, Any]:
-    with open(RECAP_LAYOUT_HYBRID, encoding="utf-8") as f:
-        return json.load(f)
+    return render_assets.load_json(RECAP_LAYOUT_HYBRID)
+
+
+_recap_slot_lock = threading.Lock()
+_recap_slot_cache: dict[str, dict[str, Any]] = {}
+
+
+def _recap_template_sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_detected_recap_slots() -> dict[str, Any]:
+    try:
+        with open(RECAP_SLOTS_DETECTED_JSON, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_detected_recap_slots(stored: dict[str, Any]) -> None:
+    tmp = RECAP_SLOTS_DETECTED_JSON.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp, RECAP_SLOTS_DETECTED_JSON)
+    except OSError as exc:
+        print(f"recap slots: kunde inte spara {RECAP_SLOTS_DETECTED_JSON.name}: {exc}")
+
+
+def _detect_recap_template_slots(kind: str) -> dict[str, Any]:
+    if kind == "graphic":
+        # Samma bild som renderingen mäter på: mallen efter artefakt-tvätt
+        img = render_assets.image(RECAP_TEMPLATE_GRAPHIC)
+        _clean_recap_template_artifacts(img)
+        detected = _detect_recap_graphic_slots_from_image(img)
+    else:
+        detected = _detect_recap_stats_slots_from_image(render_assets.image(RECAP_TEMPLATE_STATS))
+    # JSON-form direkt, så färsk och inläst detektering ger identiska dicts
+    return json.loads(json.dumps(detected))
+
+
+def _recap_detected_slots(kind: str) -> dict[str, Any]:
+    """
+    Uppmätta avatar-/textrutor för mallen ("graphic" | "stats").
+
+    Pixelskanningen körs en gång per mallfil: resultatet sparas i
+    slots_detected.json med mallens sha1 och läses därifrån av alla processer.
+    Byts mallen (ny hash) eller RECAP_SLOT_DETECT_REV mäts den om och filen skrivs.
+    """
+    with _recap_slot_lock:
+        slots = _recap_slot_cache.get(kind)
+        if slots is None:
+            path = RECAP_TEMPLATE_GRAPHIC if kind == "graphic" else RECAP_TEMPLATE_STATS
+            sha1 = _recap_template_sha1(path)
+            stored = _read_detected_recap_slots()
+            entry = stored.get(kind) or {}
+            if entry.get("sha1") == sha1 and entry.get("rev") == RECAP_SLOT_DETECT_REV:
+                slots = entry["slots"]
+            else:
+                slots = _detect_recap_template_slots(kind)
+                stored[kind] = {"sha1": sha1, "rev": RECAP_SLOT_DETECT_REV, "slots": slots}
+                _write_detected_recap_slots(stored)
+            _recap_slot_cache[kind] = slots
+    return copy.deepcopy(slots)
+
+
+def refresh_detected_recap_slots() -> dict[str, Any]:
+    """Mät om båda mallarna och skriv slots_detected.json (tools/detect_recap_slots.py --write)."""
+    stored: dict[str, Any] = {}
+    with _recap_slot_lock:
+        _recap_slot_cache.clear()
+        for kind, path in (("graphic", RECAP_TEMPLATE_GRAPHIC), ("stats", RECAP_TEMPLATE_STATS)):
+            slots = _detect_recap_template_slots(kind)
+            stored[kind] = {"sha1": _recap_template_sha1(path), "rev": RECAP_SLOT_DETECT_REV, "slots": slots}
+            _recap_slot_cache[kind] = slots
+        _write_detected_recap_slots(stored)
+    return stored
 
 
 def _recap_is_grey_pixel(r: int, g: int, b: int) -> bool:
@@ -3535,10 +3620,10 @@ def _render_recap_graphic_hybrid(data: dict[str, Any]) -> bytes:
     Hybrid B: bakgrunds-PNG + kodade komponenter (ring, avatar, namnplatta).
     Layout i layout_hybrid.json (andelar 0–1) — namn alltid centrerat under avatar.
     """
-    from PIL import Image, ImageDraw
+    from PIL import ImageDraw
 
     layout = _load_recap_hybrid_layout()["graphic"]
-    base = Image.open(RECAP_TEMPLATE_GRAPHIC).convert("RGBA")
+    base = render_assets.image(RECAP_TEMPLATE_GRAPHIC)
     out_w, out_h = base.size
     _clean_recap_template_artifacts(base)
     draw = ImageDraw.Draw(base)
@@ -3662,14 +3747,14 @@ def _render_recap_graphic_hybrid(data: dict[str, Any]) -> bytes:
 
 
 def _render_recap_graphic_from_template(data: dict[str, Any]) -> bytes:
-    from PIL import Image, ImageDraw
+    from PIL import ImageDraw
 
     static_slots = _load_recap_slots()["graphic"]
-    base = Image.open(RECAP_TEMPLATE_GRAPHIC).convert("RGBA")
+    base = render_assets.image(RECAP_TEMPLATE_GRAPHIC)
     out_w, out_h = base.size
     _clean_recap_template_artifacts(base)
     try:
-        detected = _detect_recap_graphic_slots_from_image(base)
+        detected = _recap_detected_slots("graphic")
         slots = _merge_detected_graphic_slots(static_slots, detected)
     except Exception as exc:
         print(f"recap slot detect fallback: {exc}")
@@ -3779,12 +3864,12 @@ def _render_recap_graphic_from_template(data: dict[str, Any]) -> bytes:
 
 
 def _render_recap_stats_from_template(data: dict[str, Any]) -> bytes:
-    from PIL import Image, ImageDraw
+    from PIL import ImageDraw
 
     static_slots = _load_recap_slots()["stats"]
-    base_src = Image.open(RECAP_TEMPLATE_STATS).convert("RGBA")
+    base_src = render_assets.image(RECAP_TEMPLATE_STATS)
     try:
-        detected = _detect_recap_stats_slots_from_image(base_src)
+        detected = _recap_detected_slots("stats")
         slots = _merge_detected_stats_slots(static_slots, detected)
     except Exception as exc:
         print(f"recap stats slot detect fallback: {exc}")
@@ -3905,14 +3990,8 @@ def _footer(img, draw, final_h: int, *, bar_h: int = 6) -> None:
 
 
 def _load_logo_fit(path: Path, *, max_w: int, max_h: int):
-    from PIL import Image
-
-    if not path.is_file():
-        return None
     try:
-        img = Image.open(path).convert("RGBA")
-        img.thumbnail((max_w, max_h), Image.Resampling.LANCZOS)
-        return img
+        return render_assets.image(path, max_w=max_w, max_h=max_h)
     except Exception:
         return None
 
@@ -0,0 +1,214 @@
+"""Per-request SQL-instrumentering + N+1-detektor.
+
+Aktiveras med SQL_PROFILING=1. Varje request räknar antal queries, total
+DB-tid och hur många gånger samma statement (fingerprint, literaler och
+IN-listor normaliserade) körts. Ett SELECT som körs minst
+SQL_N_PLUS_ONE_THRESHOLD gånger (default 10) i samma request flaggas som
+troligt N+1. Svaret får en Server-Timing-header (db;dur=…;desc="N queries")
+och per endpoint aggregeras statistik som visas på /admin/sql-profile.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from typing import Any
+
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_TOP_FINGERPRINTS = 5
+_MAX_ENDPOINTS = 300
+
+_lock = threading.Lock()
+_endpoints: dict[str, dict[str, Any]] = {}
+_warned: set[tuple[str, str]] = set()
+_installed = False
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)\s*,?)+\)", re.IGNORECASE)
+_RE_SPACE = re.compile(r"\s+")
+
+
+def profiling_enabled() -> bool:
+    return (os.getenv("SQL_PROFILING") or "").lower() in ("1", "true", "yes")
+
+
+def _threshold() -> int:
+    try:
+        return max(2, int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10")))
+    except ValueError:
+        return 10
+
+
+def fingerprint(statement: str) -> str:
+    """Normalisera SQL så att samma query med olika parametrar får samma nyckel."""
+    s = _RE_STRING.sub("?", statement or "")
+    s = _RE_IN_LIST.sub("IN (…)", s)
+    s = _RE_NUMBER.sub("?", s)
+    return _RE_SPACE.sub(" ", s).strip()[:400]
+
+
+def _request_stats() -> dict[str, Any] | None:
+    if not has_request_context():
+        return None
+    return g.get("_sql_profile")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats() is not None:
+        conn.info.setdefault("_sql_profile_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats()
+    if stats is None:
+        return
+    starts = conn.info.get("_sql_profile_t0")
+    elapsed = (time.perf_counter() - starts.pop()) * 1000.0 if starts else 0.0
+    stats["queries"] += 1
+    stats["db_ms"] += elapsed
+    fp = fingerprint(statement)
+    entry = stats["fingerprints"].get(fp)
+    if entry is None:
+        stats["fingerprints"][fp] = [1, elapsed]
+    else:
+        entry[0] += 1
+        entry[1] += elapsed
+
+
+def _endpoint_name() -> str:
+    rule = request.url_rule.rule if request.url_rule is not None else "<404>"
+    return f"{request.method} {rule}"
+
+
+def _start_request() -> None:
+    g._sql_profile = {
+        "queries": 0,
+        "db_ms": 0.0,
+        "fingerprints": {},
+        "t0": time.perf_counter(),
+    }
+
+
+def _finish_request(response: Response) -> Response:
+    stats = g.pop("_sql_profile", None)
+    if stats is None:
+        return response
+    total_ms = (time.perf_counter() - stats["t0"]) * 1000.0
+    threshold = _threshold()
+    suspects = sorted(
+        (
+            (count, ms, fp)
+            for fp, (count, ms) in stats["fingerprints"].items()
+            if count >= threshold and fp[:6].upper() == "SELECT"
+        ),
+        reverse=True,
+    )
+    endpoint = _endpoint_name()
+    _record(endpoint, stats, total_ms, suspects)
+    for count, _ms, fp in suspects[:1]:
+        with _lock:
+            first = (endpoint, fp) not in _warned
+            _warned.add((endpoint, fp))
+        if first:
+            print(f"⚠️ SQL N+1? {endpoint}: {count}× {fp[:160]}")
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={stats["db_ms"]:.1f};desc="{stats["queries"]} queries", app;dur={total_ms:.1f}',
+    )
+    return response
+
+
+def _record(endpoint: str, stats: dict, total_ms: float, suspects: list) -> None:
+    with _lock:
+        agg = _endpoints.get(endpoint)
+        if agg is None:
+            if len(_endpoints) >= _MAX_ENDPOINTS:
+                return
+            agg = _endpoints[endpoint] = {
+                "endpoint": endpoint,
+                "requests": 0,
+                "queries": 0,
+                "max_queries": 0,
+                "db_ms": 0.0,
+                "max_db_ms": 0.0,
+                "total_ms": 0.0,
+                "n_plus_one_requests": 0,
+                "suspects": {},
+                "last_at": None,
+            }
+        agg["requests"] += 1
+        agg["queries"] += stats["queries"]
+        agg["max_queries"] = max(agg["max_queries"], stats["queries"])
+        agg["db_ms"] += stats["db_ms"]
+        agg["max_db_ms"] = max(agg["max_db_ms"], stats["db_ms"])
+        agg["total_ms"] += total_ms
+        agg["last_at"] = time.time()
+        if suspects:
+            agg["n_plus_one_requests"] += 1
+            for count, _ms, fp in suspects:
+                prev = agg["suspects"].get(fp, 0)
+                agg["suspects"][fp] = max(prev, count)
+            if len(agg["suspects"]) > _TOP_FINGERPRINTS:
+                keep = sorted(agg["suspects"].items(), key=lambda kv: kv[1], reverse=True)
+                agg["suspects"] = dict(keep[:_TOP_FINGERPRINTS])
+
+
+def endpoint_report(sort: str = "queries", limit: int = 50) -> dict[str, Any]:
+    """Värsta endpoints (snitt-queries, DB-tid eller N+1) för den här workern."""
+    with _lock:
+        rows = []
+        for agg in _endpoints.values():
+            n = agg["requests"] or 1
+            rows.append(
+                {
+                    "endpoint": agg["endpoint"],
+                    "requests": agg["requests"],
+                    "avg_queries": round(agg["queries"] / n, 1),
+                    "max_queries": agg["max_queries"],
+                    "avg_db_ms": round(agg["db_ms"] / n, 1),
+                    "max_db_ms": round(agg["max_db_ms"], 1),
+                    "avg_total_ms": round(agg["total_ms"] / n, 1),
+                    "n_plus_one_requests": agg["n_plus_one_requests"],
+                    "suspects": [
+                        {"statement": fp, "max_per_request": count}
+                        for fp, count in sorted(agg["suspects"].items(), key=lambda kv: kv[1], reverse=True)
+                    ],
+                    "last_at": agg["last_at"],
+                }
+            )
+    sort_key = {
+        "queries": lambda r: r["avg_queries"],
+        "db": lambda r: r["avg_db_ms"],
+        "n_plus_one": lambda r: (r["n_plus_one_requests"], r["avg_queries"]),
+        "requests": lambda r: r["requests"],
+    }.get(sort, lambda r: r["avg_queries"])
+    rows.sort(key=sort_key, reverse=True)
+    return {
+        "enabled": profiling_enabled(),
+        "threshold": _threshold(),
+        "pid": os.getpid(),
+        "endpoints": rows[: max(1, int(limit))],
+    }
+
+
+def reset() -> None:
+    with _lock:
+        _endpoints.clear()
+        _warned.clear()
+
+
+def init_app(app: Flask) -> None:
+    """Koppla in engine-events och request-hooks (no-op om SQL_PROFILING inte är satt)."""
+    global _installed
+    if _installed or not profiling_enabled():
+        return
+    _installed = True
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
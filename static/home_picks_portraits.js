@@ -35,12 +35,20 @@
           const fallback = brandSrc(r);
           if (photo && this.getAttribute('src') !== fallback && !this.dataset.brandTried) {
             this.dataset.brandTried = '1';
+            this.removeAttribute('srcset');
             this.src = fallback;
             return;
           }
           this.removeAttribute('src');
         };
         if (photo) {
+          // Tumnaglar (portrait_derivatives) bara när de hör till samma bild
+          if (r.portrait_srcset && photo === String(r.portrait_url || '').trim()) {
+            img.sizes = '2.25rem';
+            img.srcset = r.portrait_srcset;
+          } else {
+            img.removeAttribute('srcset');
+          }
           img.src = photo;
         } else {
           img.src = brandSrc(r);
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Regression: vanliga list-queries får inte SELECT:a tunga kolumner.
+
+Base64-bilder, bios och JSON-payloads är deferred på modellnivå (models.HEAVY_COLUMNS).
+Scriptet fångar SQL:en som typiska listor och poängberäkningen kör och felar om
+någon av kolumnerna läses — och kontrollerar att opt-in-optionerna fortfarande laddar dem.
+
+Körs mot en temporär SQLite-databas (DATABASE_URL sätts före import av main) —
+calculate_scores committar, så den riktiga databasen får inte användas.
+
+  python test_deferred_columns.py      (eller: python -m pytest test_deferred_columns.py)
+"""
+from __future__ import annotations
+
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+_DB_DIR = tempfile.mkdtemp(prefix="deferred_columns_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+# Inga bakgrundstrådar mot test-databasen
+os.environ["DISABLE_HOMEPAGE_CACHE_WARM"] = "1"
+os.environ["RECAP_PRERENDER"] = "0"
+os.environ["PICKS_SNAPSHOT_SCHEDULER"] = "0"
+
+from sqlalchemy import event  # noqa: E402
+
+from main import app, calculate_scores  # noqa: E402
+from models import (  # noqa: E402
+    HEAVY_COLUMNS,
+    BulletinPost,
+    Competition,
+    CompetitionResult,
+    League,
+    RacePick,
+    PicksSnapshot,
+    Rider,
+    User,
+    db,
+    load_bulletin_content,
+    load_rider_bio,
+    load_snapshot_payload,
+    load_user_picture,
+    rider_query_for_list_ui,
+)
+
+_HEAVY = {f"{c.property.columns[0].table.name}.{c.property.columns[0].name}" for c in HEAVY_COLUMNS}
+
+
+def _ok(msg: str) -> None:
+    print(f"  OK  {msg}")
+
+
+@contextmanager
+def _captured_selects():
+    statements: list[str] = []
+    # Bara testtrådens SQL — bakgrundstrådar (cache-warm m.m.) kan köra samtidigt
+    thread_id = threading.get_ident()
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread_id and statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+
+
+def _heavy_selected(statements: list[str]) -> set[str]:
+    found: set[str] = set()
+    for sql in statements:
+        # Bara SELECT-listan — WHERE-villkor på kolumnerna (t.ex. "bio IS NULL") är ok
+        head = re.split(r"\bFROM\b", sql, maxsplit=1, flags=re.IGNORECASE)[0]
+        found.update(col for col in _HEAVY if col in head)
+    return found
+
+
+def _assert_light(label: str, fn) -> None:
+    with _captured_selects() as statements:
+        fn()
+    heavy = _heavy_selected(statements)
+    assert not heavy, f"{label} laddar tunga kolumner: {sorted(heavy)}"
+    _ok(label)
+
+
+def _assert_loads(label: str, fn, column: str) -> None:
+    with _captured_selects() as statements:
+        fn()
+    assert column in _heavy_selected(statements), f"{label} laddar inte {column}"
+    _ok(label)
+
+
+def _seed_scored_competition() -> int:
+    """En användare med en pick och ett resultat, så att poängberäkningen läser riktiga rader."""
+    comp = Competition(name="Deferred SX", series="SX")
+    rider = Rider(name="Deferred Rider", class_name="450cc", rider_number=999, price=100)
+    user = User(username="deferred_columns", password_hash="x")
+    db.session.add_all([comp, rider, user])
+    db.session.flush()
+    db.session.add(RacePick(user_id=user.id, competition_id=comp.id, rider_id=rider.id, predicted_position=1))
+    db.session.add(CompetitionResult(competition_id=comp.id, rider_id=rider.id, position=1, class_name="450cc"))
+    db.session.commit()
+    return int(comp.id)
+
+
+def test_list_queries_skip_heavy_columns() -> None:
+    with app.app_context():
+        comp_id = _seed_scored_competition()
+        db.session.expunge_all()
+        _assert_light("User.query.all()", lambda: User.query.all())
+        _assert_light("Rider.query.all()", lambda: Rider.query.all())
+        _assert_light("rider_query_for_list_ui()", lambda: rider_query_for_list_ui().all())
+        _assert_light("League.query.all()", lambda: League.query.all())
+        _assert_light("PicksSnapshot.query.all()", lambda: PicksSnapshot.query.all())
+        _assert_light("BulletinPost.query.all()", lambda: BulletinPost.query.all())
+        _assert_light(f"calculate_scores({comp_id})", lambda: calculate_scores(comp_id))
+
+
+def test_opt_in_loaders_select_heavy_columns() -> None:
+    with app.app_context():
+        db.session.expunge_all()
+        _assert_loads(
+            "load_user_picture()",
+            lambda: User.query.options(load_user_picture()).all(),
+            "users.profile_picture_url",
+        )
+        db.session.expunge_all()
+        _assert_loads("load_rider_bio()", lambda: Rider.query.options(load_rider_bio()).all(), "riders.bio")
+        db.session.expunge_all()
+        _assert_loads(
+            "load_snapshot_payload()",
+            lambda: PicksSnapshot.query.options(load_snapshot_payload()).all(),
+            "picks_snapshots.payload_json",
+        )
+        db.session.expunge_all()
+        _assert_loads(
+            "load_bulletin_content()",
+            lambda: BulletinPost.query.options(load_bulletin_content()).all(),
+            "bulletin_posts.content",
+        )
+
+
+if __name__ == "__main__":
+    print("Deferred heavy columns")
+    test_list_queries_skip_heavy_columns()
+    test_opt_in_loaders_select_heavy_columns()
+    print("All checks passed")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Regression: rättade resultat (delta-omräkning) skriver om tävlingens rank-snapshot.
+
+bulk_import_results, import_wsx_official_results och update_holeshot går via
+rescore_competition_delta; leaderboardens rörelse läses ur leaderboard_rank_snapshots.
+Scriptet poängsätter en tävling, byter plats på två förare och kontrollerar att
+snapshoten följer med.
+
+Körs mot en temporär SQLite-databas (DATABASE_URL sätts före import av main).
+
+  python test_rank_snapshots.py      (eller: python -m pytest test_rank_snapshots.py)
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from datetime import date
+
+_DB_DIR = tempfile.mkdtemp(prefix="rank_snapshots_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+# Inga bakgrundstrådar mot test-databasen
+os.environ["DISABLE_HOMEPAGE_CACHE_WARM"] = "1"
+os.environ["RECAP_PRERENDER"] = "0"
+os.environ["PICKS_SNAPSHOT_SCHEDULER"] = "0"
+
+from main import (  # noqa: E402
+    AMA_TOTALS_SCOPE,
+    _competition_result_state,
+    _unpack_rank_snapshot,
+    app,
+    calculate_scores,
+    rescore_competition_delta,
+)
+from models import (  # noqa: E402
+    Competition,
+    CompetitionResult,
+    LeaderboardRankSnapshot,
+    RacePick,
+    Rider,
+    User,
+    db,
+)
+
+
+def _ok(msg: str) -> None:
+    print(f"  OK  {msg}")
+
+
+def _snapshot_ranks(comp_id: int) -> dict[str, int]:
+    payload = (
+        db.session.query(LeaderboardRankSnapshot.payload_json)
+        .filter_by(competition_id=comp_id, scope=AMA_TOTALS_SCOPE)
+        .scalar()
+    )
+    assert payload is not None, f"ingen snapshot för tävling {comp_id}"
+    return _unpack_rank_snapshot(payload)
+
+
+def _seed() -> tuple[int, int, int, int, int]:
+    """Två användare som tippar var sin förare som P1 i en AMA-tävling."""
+    comp = Competition(name="Snapshot SX", series="SX", event_date=date(2026, 1, 10))
+    db.session.add(comp)
+    riders = []
+    for number in (901, 902):
+        rider = Rider(name=f"Snapshot {number}", class_name="450cc", rider_number=number, price=100)
+        db.session.add(rider)
+        riders.append(rider)
+    users = []
+    for name in ("snapshot_a", "snapshot_b"):
+        user = User(username=name, password_hash="x")
+        db.session.add(user)
+        users.append(user)
+    db.session.flush()
+    for user, rider in zip(users, riders):
+        db.session.add(RacePick(user_id=user.id, competition_id=comp.id, rider_id=rider.id, predicted_position=1))
+    for pos, rider in enumerate(riders, 1):
+        db.session.add(CompetitionResult(competition_id=comp.id, rider_id=rider.id, position=pos, class_name="450cc"))
+    db.session.commit()
+    return comp.id, users[0].id, users[1].id, riders[0].id, riders[1].id
+
+
+def test_delta_rescore_rewrites_rank_snapshot() -> None:
+    with app.app_context():
+        db.create_all()
+        comp_id, user_a, user_b, rider_a, rider_b = _seed()
+
+        calculate_scores(comp_id)
+        ranks = _snapshot_ranks(comp_id)
+        assert ranks[str(user_a)] < ranks[str(user_b)], ranks
+        _ok("calculate_scores: A före B i snapshoten")
+
+        # Rättad import: förarna byter plats
+        before = _competition_result_state(comp_id)
+        for res in CompetitionResult.query.filter_by(competition_id=comp_id).all():
+            res.position = 2 if res.rider_id == rider_a else 1
+        db.session.flush()
+        out = rescore_competition_delta(comp_id, before)
+        assert out.get("mode") != "full", out
+        ranks = _snapshot_ranks(comp_id)
+        assert ranks[str(user_b)] < ranks[str(user_a)], ranks
+        _ok("rescore_competition_delta: B före A i snapshoten")
+
+
+if __name__ == "__main__":
+    print("Rank snapshots")
+    test_delta_rescore_rewrites_rank_snapshot()
+    print("All checks passed")
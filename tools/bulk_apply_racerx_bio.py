@@ -15,7 +15,7 @@ from dotenv import load_dotenv  # noqa: E402
 
 load_dotenv(ROOT / ".env")
 
-from models import Rider, db  # noqa: E402
+from models import Rider, db, load_rider_bio  # noqa: E402
 from racerx_rider_bio import (  # noqa: E402
     apply_profile_to_rider,
     copy_bio_between_riders,
@@ -42,7 +42,7 @@ def main() -> None:
     app = _make_app()
     with app.app_context():
         print("DB:", app.config["SQLALCHEMY_DATABASE_URI"])
-        all_riders = Rider.query.order_by(Rider.class_name, Rider.rider_number, Rider.name).all()
+        all_riders = Rider.query.options(load_rider_bio()).order_by(Rider.class_name, Rider.rider_number, Rider.name).all()
         limit = args.limit if args.limit > 0 else None
         name_keys = iter_names_needing_racerx_bio(
             all_riders,
@@ -1,11 +1,24 @@
-"""Detect grey avatar circles and name plates on recap graphic template."""
+"""Detect grey avatar circles and name plates on recap graphic template.
+
+Renderingen läser uppmätta slots från static/recap_templates/slots_detected.json
+(nyckel = mallens sha1). Efter byte av mall: kör med --write och committa filen.
+
+Usage:
+  py -3 tools/detect_recap_slots.py            (debugutskrift av blobbar/namnplattor)
+  py -3 tools/detect_recap_slots.py --write    (mät om och skriv slots_detected.json)
+"""
 from __future__ import annotations
 
+import argparse
+import sys
 from pathlib import Path
 
 from PIL import Image
 
 ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
 GRAPHIC = ROOT / "static/recap_templates/recap_fb_graphic.png"
 
 
@@ -92,7 +105,17 @@ def find_name_plates(px, y0, y1, x0, x1) -> list[dict]:
     return sorted(by_cx.values(), key=lambda p: p["cx"])
 
 
-if __name__ == "__main__":
+def write_detected() -> int:
+    from social_recap_service import RECAP_SLOTS_DETECTED_JSON, refresh_detected_recap_slots
+
+    stored = refresh_detected_recap_slots()
+    for kind, entry in stored.items():
+        print(f"{kind}: sha1={entry['sha1'][:12]} keys={sorted(entry['slots'])}")
+    print(f"Wrote {RECAP_SLOTS_DETECTED_JSON.relative_to(ROOT)}")
+    return 0
+
+
+def print_debug() -> int:
     im = Image.open(GRAPHIC).convert("RGB")
     px = im.load()
     print("size", im.size)
@@ -110,3 +133,15 @@ if __name__ == "__main__":
     print("=== 250 name plates ===")
     for p in find_name_plates(px, 720, 800, 1110, 2160):
         print(p)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Detect recap template slots.")
+    parser.add_argument("--write", action="store_true", help="Mät om mallarna och skriv slots_detected.json.")
+    args = parser.parse_args()
+    return write_detected() if args.write else print_debug()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -326,8 +326,9 @@ def main() -> int:
                 if (r.image_url or "").strip() != rel:
                     r.image_url = rel
                     updated += 1
-                if getattr(r, "rider_image_data", None):
+                if getattr(r, "rider_image_data", None) or getattr(r, "portrait_hash", None):
                     r.rider_image_data = None
+                    r.portrait_hash = None
                     updated += 1
         db.session.commit()
     print(f"DB rows touched: {updated}")
@@ -339,6 +340,20 @@ def main() -> int:
         gen_avatars()
     except Exception as exc:
         print(f"Avatar generation skipped: {exc}")
+
+    # Tumnaglar (64/128/256 WebP) för srcset — se portrait_derivatives.py
+    from portrait_derivatives import generate_for_static
+
+    thumbs = 0
+    for rel in sorted(set(saved.values())):
+        try:
+            thumbs += generate_for_static(rel, force=True)
+            avatar = f"riders/wsx/avatars/{Path(rel).name}"
+            if (Path("static") / avatar).is_file():
+                thumbs += generate_for_static(avatar, force=True)
+        except Exception as exc:
+            print(f"[THUMB FAIL] {rel}: {exc}")
+    print(f"Thumbnails written: {thumbs}")
     return 0
 
 
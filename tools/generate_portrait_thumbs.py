@@ -0,0 +1,46 @@
+"""Skapa 64/128/256 px WebP-tumnaglar för befintliga porträtt under static/riders/.
+
+Nya porträtt får tumnaglar vid import; det här fyller i för filer som redan
+ligger i repot. Committa static/riders/**/_thumbs efteråt.
+
+Usage:
+  py -3 tools/generate_portrait_thumbs.py
+  py -3 tools/generate_portrait_thumbs.py --force
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from portrait_derivatives import generate_for_static  # noqa: E402
+
+SRC = ROOT / "static" / "riders"
+_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate srcset thumbnails for static rider portraits.")
+    parser.add_argument("--force", action="store_true", help="Skriv om befintliga tumnaglar.")
+    args = parser.parse_args()
+
+    files = [
+        p for p in sorted(SRC.rglob("*"))
+        if p.suffix.lower() in _EXTS and "_thumbs" not in p.parts
+    ]
+    written = 0
+    for p in files:
+        try:
+            written += generate_for_static(p, force=args.force)
+        except Exception as exc:
+            print(f"[ERR] {p.relative_to(ROOT)}: {exc}")
+    print(f"Wrote {written} thumbnails for {len(files)} portraits")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
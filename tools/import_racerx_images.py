@@ -29,6 +29,7 @@ if db_url and "postgres" in db_url and "sslmode=" not in db_url:
 # IMPORTANT: repo has both app.py and app/ package; use app factory to avoid side effects.
 from app import create_app  # noqa: E402
 from models import db, Rider  # noqa: E402
+from portrait_derivatives import generate_for_static  # noqa: E402
 
 app = create_app()
 
@@ -203,6 +204,8 @@ def main():
                     dest.write_bytes(webp)
                     # store path relative to static/
                     candidate.image_url = f"riders/headshots/{fname}"
+                    # 64/128/256 px-varianter för srcset
+                    generate_for_static(candidate.image_url, force=True)
                 else:
                     # safest default: store remote URL; templates accept http(s)
                     candidate.image_url = img
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Ta bort dubbla picks och skapa unika index på race_picks, holeshot_picks och
+wildcard_picks (se pick_storage.py).
+
+Körs som release-steg (render.yaml preDeployCommand) innan nya webbprocesser
+startar; webbtjänsten migrerar inte själv. Kör från projektroten:
+
+  python tools/migrate_pick_uniqueness.py --dry-run
+  python tools/migrate_pick_uniqueness.py
+  python tools/migrate_pick_uniqueness.py --production
+
+Postgres: indexen skapas med CREATE INDEX CONCURRENTLY — sparningar blockeras inte —
+under ett advisory lock, så två samtidiga körningar krockar inte.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+
+load_dotenv(ROOT / ".env")
+
+
+def _ensure_db_url() -> None:
+    url = (os.getenv("DATABASE_URL") or "").strip()
+    prod = (os.getenv("PRODUCTION_DATABASE_URL") or "").strip()
+    if not url and prod:
+        os.environ["DATABASE_URL"] = prod
+        url = prod
+    if url and "postgres" in url and "sslmode=" not in url:
+        os.environ["DATABASE_URL"] = url + ("&" if "?" in url else "?") + "sslmode=require"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dedupe pick rows and add unique indexes.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Visa antal dubbletter och befintliga index utan att ändra databasen.",
+    )
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="Använd PRODUCTION_DATABASE_URL (Render) istället för lokal DATABASE_URL.",
+    )
+    args = parser.parse_args()
+
+    if args.production:
+        prod = (os.getenv("PRODUCTION_DATABASE_URL") or "").strip()
+        if not prod:
+            print("ERROR: PRODUCTION_DATABASE_URL saknas i .env")
+            sys.exit(1)
+        os.environ["DATABASE_URL"] = prod
+    _ensure_db_url()
+
+    db_target = (os.getenv("DATABASE_URL") or "")[:60]
+    print(f"DATABASE_URL: {db_target}...")
+
+    from app import create_app
+    import pick_storage
+
+    app = create_app()
+    with app.app_context():
+        print(f"Unika index aktiva: {pick_storage.unique_enabled(fresh=True)}")
+        print(f"Dubbletter: {pick_storage.duplicate_counts()}")
+        if args.dry_run:
+            print("DRY RUN — inga DB-ändringar sparas.")
+            return
+        result = pick_storage.migrate()
+
+    print("\n--- Summary ---")
+    for k, v in result.items():
+        print(f"  {k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Flytta rider_image_data (base64 data-URL:er i riders) till portrait_blobs.
+
+Varför: riders-tabellen krymper (inga hundratals KB per rad) och porträtt
+serveras som filer via send_file utan base64-avkodning i request-vägen.
+Identiska bilder (dublettförare AMA/WSX) lagras en gång — se portrait_store.py.
+
+Kör från projektroten:
+
+  python tools/migrate_portraits_to_blob_store.py --dry-run
+  python tools/migrate_portraits_to_blob_store.py
+  python tools/migrate_portraits_to_blob_store.py --production
+
+Ej migrerade rader flyttas även lazy när /rider_portrait/<id> efterfrågas.
+Postgres: kör VACUUM FULL riders efteråt för att faktiskt frigöra utrymmet.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+
+load_dotenv(ROOT / ".env")
+
+
+def _ensure_db_url() -> None:
+    url = (os.getenv("DATABASE_URL") or "").strip()
+    prod = (os.getenv("PRODUCTION_DATABASE_URL") or "").strip()
+    if not url and prod:
+        os.environ["DATABASE_URL"] = prod
+        url = prod
+    if url and "postgres" in url and "sslmode=" not in url:
+        os.environ["DATABASE_URL"] = url + ("&" if "?" in url else "?") + "sslmode=require"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move DB rider portraits into the portrait blob store.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Visa antal kandidater utan att ändra databasen.",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Max antal förare (test).")
+    parser.add_argument("--batch-size", type=int, default=25, help="Commit var N:e förare.")
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="Använd PRODUCTION_DATABASE_URL (Render) istället för lokal DATABASE_URL.",
+    )
+    args = parser.parse_args()
+
+    if args.production:
+        prod = (os.getenv("PRODUCTION_DATABASE_URL") or "").strip()
+        if not prod:
+            print("ERROR: PRODUCTION_DATABASE_URL saknas i .env")
+            sys.exit(1)
+        os.environ["DATABASE_URL"] = prod
+    _ensure_db_url()
+
+    db_target = (os.getenv("DATABASE_URL") or "")[:60]
+    print(f"DATABASE_URL: {db_target}...")
+    if args.dry_run:
+        print("DRY RUN — inga DB-ändringar sparas.\n")
+
+    from app import create_app
+    from portrait_store import migrate_rider_blobs
+
+    app = create_app()
+    with app.app_context():
+        stats = migrate_rider_blobs(
+            limit=args.limit,
+            batch_size=max(1, args.batch_size),
+            dry_run=args.dry_run,
+        )
+
+    print("\n--- Summary ---")
+    for k, v in stats.items():
+        print(f"  {k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
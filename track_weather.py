@@ -3,12 +3,13 @@
 from __future__ import annotations
 
 import re
-import time
 from datetime import date
 from typing import Any, Optional
 
 import requests
 
+from cache_store import get_cache
+
 # lat, lon, city label, optional timezone override
 TRACK_GEO: dict[str, dict[str, Any]] = {
     # Supercross
@@ -58,8 +59,8 @@ TRACK_GEO: dict[str, dict[str, Any]] = {
     "South African GP": {"lat": -33.9249, "lon": 18.4241, "city": "Cape Town", "timezone": "Africa/Johannesburg"},
 }
 
-_WEATHER_CACHE: dict[str, tuple[float, dict[str, Any]]] = {}
 _CACHE_TTL_SEC = 45 * 60
+_WEATHER_CACHE = get_cache("track_weather", maxsize=128, ttl=_CACHE_TTL_SEC)
 
 
 def _normalize_track_key(name: str) -> str:
@@ -353,10 +354,9 @@ def get_weather_for_competition(comp) -> dict[str, Any]:
         return unavailable
     tz = _resolve_weather_timezone(geo, comp)
     cache_key = f"{comp.id}:{comp.event_date}:{tz}"
-    now = time.time()
     cached = _WEATHER_CACHE.get(cache_key)
-    if cached and now < cached[0]:
-        return cached[1]
+    if cached is not None:
+        return cached
     try:
         forecast = fetch_race_day_forecast(
             geo["lat"],
@@ -368,7 +368,7 @@ def get_weather_for_competition(comp) -> dict[str, Any]:
             return unavailable
         forecast = _adjust_for_low_precip(forecast)
         payload = build_weather_payload(forecast, geo["city"], comp.event_date)
-        _WEATHER_CACHE[cache_key] = (now + _CACHE_TTL_SEC, payload)
+        _WEATHER_CACHE.set(cache_key, payload)
         return payload
     except Exception as e:
         print(f"track_weather: fetch failed for {comp.name}: {e}")
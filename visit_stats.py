@@ -1,15 +1,18 @@
 """Daily visit counters for the fantasy game (not tools / not staff)."""
 from __future__ import annotations
 
+import atexit
 import hashlib
 import os
 import re
+import threading
+import time
 import uuid
 from datetime import date, datetime, timedelta
 from typing import Any
 from zoneinfo import ZoneInfo
 
-from flask import Request, Response, g, has_request_context, session
+from flask import Request, Response, current_app, g, has_request_context, session
 from sqlalchemy.exc import IntegrityError
 
 from models import DailySiteStats, DailyVisitorSighting, User, db
@@ -76,6 +79,17 @@ _GAME_PREFIXES = (
 
 _TABLE_READY = False
 
+# Pageviews buffras i minnet och skrivs i batch (VISIT_STATS_FLUSH_SEC, default 5 s)
+# i stället för savepoint + COUNT(*) + commit i varje svar.
+_FLUSH_INTERVAL = float(os.getenv("VISIT_STATS_FLUSH_SEC", "5"))
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_pending_views: dict[date, int] = {}
+_pending_keys: dict[date, set[bytes]] = {}
+# Nycklar som den här workern redan skrivit (per dag) — skickas inte igen
+_flushed_keys: dict[date, set[bytes]] = {}
+_flusher_started = False
+
 
 def today_stockholm() -> date:
     try:
@@ -222,39 +236,146 @@ def _recount_uniques(day: date) -> int:
     return int(db.session.query(DailyVisitorSighting).filter_by(day=day).count())
 
 
+def _insert_sightings(day: date, keys: list[str]) -> None:
+    """Batch-insert; dubbletter (andra workers, samma besökare) ignoreras av PK:n."""
+    rows = [{"day": day, "visitor_key": k} for k in keys]
+    dialect = db.engine.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        db.session.execute(
+            dialect_insert(DailyVisitorSighting).on_conflict_do_nothing(),
+            rows,
+        )
+        return
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.add(DailyVisitorSighting(**row))
+                db.session.flush()
+        except IntegrityError:
+            pass
+
+
+def _take_pending() -> tuple[dict[date, int], dict[date, set[bytes]]]:
+    global _pending_views, _pending_keys
+    with _buffer_lock:
+        views, keys = _pending_views, _pending_keys
+        _pending_views, _pending_keys = {}, {}
+    return views, keys
+
+
+def _restore_pending(views: dict[date, int], keys: dict[date, set[bytes]]) -> None:
+    with _buffer_lock:
+        for day, n in views.items():
+            _pending_views[day] = _pending_views.get(day, 0) + n
+        for day, ks in keys.items():
+            _pending_keys.setdefault(day, set()).update(ks)
+
+
+def flush_visits() -> int:
+    """
+    Skriv buffrade pageviews + besökarnycklar. Uniques räknas om från
+    sightings-tabellen en gång per dag och flush, så de blir exakta även med
+    flera workers. Returnerar antal skrivna pageviews.
+    """
+    with _flush_lock:
+        views, keys = _take_pending()
+        if not views and not keys:
+            return 0
+        try:
+            _ensure_table()
+            for day in sorted(set(views) | set(keys)):
+                row = _get_or_create_day_row(day)
+                if row is None:
+                    continue
+                new_keys = keys.get(day) or set()
+                if new_keys:
+                    _insert_sightings(day, [f"f:{k.hex()}" for k in new_keys])
+                db.session.execute(
+                    DailySiteStats.__table__.update()
+                    .where(DailySiteStats.day == day)
+                    .values(
+                        pageviews=DailySiteStats.pageviews + int(views.get(day, 0)),
+                        unique_visitors=_recount_uniques(day),
+                    )
+                )
+            db.session.commit()
+        except Exception as e:
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
+            _restore_pending(views, keys)
+            print(f"visit_stats flush: {e}")
+            return 0
+        today = today_stockholm()
+        with _buffer_lock:
+            for day, ks in keys.items():
+                _flushed_keys.setdefault(day, set()).update(ks)
+            for day in [d for d in _flushed_keys if d < today - timedelta(days=1)]:
+                del _flushed_keys[day]
+        return sum(views.values())
+
+
+def _flush_with_app(app) -> None:
+    t0 = time.perf_counter()
+    try:
+        with app.app_context():
+            flush_visits()
+        ok, error = True, None
+    except Exception as e:
+        print(f"visit_stats flush: {e}")
+        ok, error = False, str(e)
+    try:
+        from app_metrics import record_job
+
+        record_job("visit_stats_flush", ok=ok, duration=time.perf_counter() - t0, error=error)
+    except Exception:
+        pass
+
+
+def _start_flusher(app) -> None:
+    global _flusher_started
+    with _buffer_lock:
+        if _flusher_started:
+            return
+        _flusher_started = True
+
+    def loop() -> None:
+        while True:
+            time.sleep(max(0.5, _FLUSH_INTERVAL))
+            _flush_with_app(app)
+
+    threading.Thread(target=loop, daemon=True, name="mx-visit-stats-flush").start()
+    atexit.register(_flush_with_app, app)
+    try:
+        from app_metrics import register_job_thread
+
+        register_job_thread("visit_stats_flush", "mx-visit-stats-flush")
+    except Exception:
+        pass
+
+
 def record_visit(req: Request) -> str | None:
     """
-    Count a game-page visit. Uniques = distinct fingerprints that day
-    (savepoint insert + recount so races cannot inflate the number).
+    Count a game-page visit. Only buffers in memory (no DB work in the
+    response path); flush_visits() persists pageviews and unique fingerprints.
     """
     try:
-        _ensure_table()
         day = today_stockholm()
         existing = (req.cookies.get(COOKIE_NAME) or "").strip()
         new_cookie = None if existing else str(uuid.uuid4())
-        visitor_key = f"f:{_visitor_fingerprint(req)}"
-
-        row = _get_or_create_day_row(day)
-        if not row:
-            return new_cookie
-
-        try:
-            with db.session.begin_nested():
-                db.session.add(DailyVisitorSighting(day=day, visitor_key=visitor_key))
-                db.session.flush()
-        except IntegrityError:
-            pass
-
-        row = DailySiteStats.query.filter_by(day=day).first() or row
-        row.pageviews = int(row.pageviews or 0) + 1
-        row.unique_visitors = _recount_uniques(day)
-        db.session.commit()
+        key = bytes.fromhex(_visitor_fingerprint(req))
+        with _buffer_lock:
+            _pending_views[day] = _pending_views.get(day, 0) + 1
+            if key not in _flushed_keys.get(day, ()):
+                _pending_keys.setdefault(day, set()).add(key)
+        _start_flusher(current_app._get_current_object())
         return new_cookie
     except Exception as e:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
         print(f"visit_stats record_visit: {e}")
         return None
 
@@ -315,7 +436,13 @@ def _signup_stats(start: date, end: date) -> tuple[dict[str, int], list[dict[str
 
 
 def get_visit_summary(days: int = 14) -> dict[str, Any]:
+    """
+    Sammanställning ur daily_site_stats. Bara den här workerns buffert flushas
+    först — andra workers besök syns efter deras nästa flush (högst
+    VISIT_STATS_FLUSH_SEC sekunder), så dagens siffror kan ligga så mycket efter.
+    """
     _ensure_table()
+    flush_visits()
     days = max(1, min(int(days or 14), 90))
     end = today_stockholm()
     start = end - timedelta(days=days - 1)
@@ -387,12 +514,17 @@ def get_visit_summary(days: int = 14) -> dict[str, Any]:
             "new_signups": sum(int(d.get("new_signups") or 0) for d in last7),
         },
         "days": series,
+        # Andra workers buffert är inte med — se docstringen
+        "flush_interval_sec": _FLUSH_INTERVAL,
     }
 
 
 def reset_today_stats() -> dict[str, Any]:
     _ensure_table()
     day = today_stockholm()
+    flush_visits()
+    with _buffer_lock:
+        _flushed_keys.pop(day, None)
     DailyVisitorSighting.query.filter_by(day=day).delete()
     row = DailySiteStats.query.filter_by(day=day).first()
     if not row: